@@ -3,13 +3,14 @@ from django.utils.translation import gettext_lazy as _
 
 from .models import (
     Event, EventServiceTeamMember, EventRole, EventParticipant,
-    EventTalk, EventWorkshop, 
+    EventTalk, EventWorkshop, EventWorkshopEnrolment,
     CountryLocation, ClusterLocation, ChapterLocation, UnitLocation, AreaLocation,
     EventResource, EventVenue, SearchAreaSupportLocation,
     ExtraQuestion, QuestionChoice, QuestionAnswer,
     EventPaymentMethod, EventPaymentPackage, EventPayment, EventDayAttendance, ParticipantQuestion,
     ParticipantRefund, ServiceTeamPermission, Organisation, OrganisationSocialMediaLink, DonationPayment,
-    EventRoleDiscount
+    EventRoleDiscount, RefundBatch, RefundBatchItem, EventRegistrationCounter, EventExport,
+    RegistrationImport, RegistrationImportRow, CheckInSyncOperation
 )
 
 
@@ -169,6 +170,9 @@ class EventAdmin(admin.ModelAdmin):
         (_('Finance'), {'fields': (
             'registration_discount_type', 'registration_discount_value', 'product_discount_type', 'product_discount_value'
         )}),
+        (_('Capacity'), {'fields': (
+            'maximum_attendees', 'participant_type_caps', 'waitlist_enabled', 'waitlist_offer_hours'
+        )}),
     )
     
     inlines = [
@@ -307,7 +311,7 @@ class EventTalkAdmin(admin.ModelAdmin):
 
 @admin.register(EventWorkshop)
 class EventWorkshopAdmin(admin.ModelAdmin):
-    list_display = ('title', 'event', 'primary_facilitator', 'start_time', 'is_published')
+    list_display = ('title', 'event', 'primary_facilitator', 'start_time', 'enrolled_count', 'waitlist_count', 'is_published')
     list_filter = ('is_published', 'is_full', 'start_time')
     search_fields = ('title', 'event__name', 'primary_facilitator__first_name', 'primary_facilitator__last_name')
     autocomplete_fields = ('event', 'primary_facilitator')
@@ -317,6 +321,67 @@ class EventWorkshopAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('event', 'primary_facilitator')
+
+@admin.register(EventWorkshopEnrolment)
+class EventWorkshopEnrolmentAdmin(admin.ModelAdmin):
+    list_display = ('participant', 'workshop', 'status', 'created_at', 'enrolled_at')
+    list_filter = ('status',)
+    search_fields = ('participant__event_pax_id', 'participant__user__first_name', 'participant__user__last_name', 'workshop__title')
+    # Enrolments change through WorkshopEnrolmentService so the workshop counters stay correct
+    readonly_fields = ('workshop', 'participant', 'status', 'created_at', 'enrolled_at', 'cancelled_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('workshop', 'participant__user')
+    
+@admin.register(EventRegistrationCounter)
+class EventRegistrationCounterAdmin(admin.ModelAdmin):
+    list_display = ('event', 'participant_type', 'held')
+    search_fields = ('event__name', 'event__event_code')
+    # Counters change through RegistrationCapacityService (use expire_waitlist_offers --recount to repair)
+    readonly_fields = ('event', 'participant_type', 'held')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event')
+    
+@admin.register(EventExport)
+class EventExportAdmin(admin.ModelAdmin):
+    list_display = ('event', 'export_type', 'file_format', 'status', 'row_count', 'requested_by', 'created_at', 'completed_at')
+    list_filter = ('export_type', 'file_format', 'status', 'created_at')
+    search_fields = ('event__name', 'event__event_code', 'requested_by__username')
+    readonly_fields = ('row_count', 'error', 'created_at', 'completed_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event', 'requested_by')
+    
+class RegistrationImportRowInline(admin.TabularInline):
+    model = RegistrationImportRow
+    extra = 0
+    can_delete = False
+    fields = ('row_number', 'status', 'errors', 'warnings', 'user', 'participant')
+    readonly_fields = fields
+    raw_id_fields = ('user', 'participant')
+    
+@admin.register(RegistrationImport)
+class RegistrationImportAdmin(admin.ModelAdmin):
+    list_display = ('event', 'file_name', 'status', 'total_rows', 'valid_rows', 'invalid_rows', 'imported_rows', 'skipped_rows', 'uploaded_by', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('event__name', 'event__event_code', 'file_name', 'uploaded_by__username')
+    readonly_fields = ('file_hash', 'total_rows', 'valid_rows', 'invalid_rows', 'imported_rows', 'skipped_rows', 'created_at', 'completed_at')
+    inlines = [RegistrationImportRowInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event', 'uploaded_by')
+    
+@admin.register(CheckInSyncOperation)
+class CheckInSyncOperationAdmin(admin.ModelAdmin):
+    list_display = ('event', 'device_id', 'participant', 'action', 'client_time', 'outcome', 'received_at')
+    list_filter = ('action', 'outcome', 'received_at')
+    search_fields = ('event__name', 'device_id', 'idempotency_key', 'participant__event_pax_id')
+    readonly_fields = ('received_at',)
+    raw_id_fields = ('participant', 'attendance')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event', 'participant')
     
 @admin.register(EventResource)
 class PublicEventResourceAdmin(admin.ModelAdmin):
@@ -382,7 +447,7 @@ class EventParticipantAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'event', 'participant_type', 'status', 'registration_date')
     list_filter = ('participant_type', 'status', 'registration_date', 'event__event_type')
     search_fields = ('user__first_name', 'user__last_name', 'event__name')
-    readonly_fields = ('id','registration_date', 'confirmation_date', 'attended_date')
+    readonly_fields = ('id','registration_date', 'confirmation_date', 'attended_date', 'waitlisted_at', 'offer_expires_at')
     autocomplete_fields = ('user', 'event')
     date_hierarchy = 'registration_date'
     inlines = [QuestionAnswerInline]
@@ -554,4 +619,21 @@ class ParticipantRefundAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         return qs.select_related('participant__user', 'event', 'removed_by', 'processed_by')
     
-admin.site.register(EventRoleDiscount)
\ No newline at end of file
+admin.site.register(EventRoleDiscount)
+
+
+class RefundBatchItemInline(admin.TabularInline):
+    model = RefundBatchItem
+    extra = 0
+    fields = ('participant_refund', 'order_refund', 'status', 'attempts', 'stripe_refund_id', 'last_error', 'completed_at')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(RefundBatch)
+class RefundBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event', 'status', 'total_items', 'succeeded_count', 'failed_count', 'created_by', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('event__name', 'event__event_code')
+    readonly_fields = ('total_items', 'succeeded_count', 'failed_count', 'created_at', 'completed_at')
+    inlines = [RefundBatchItemInline]
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from apps.events.models import (
     Event, EventServiceTeamMember, EventRole, EventRoleDiscount, EventParticipant,
-    EventTalk, EventWorkshop, EventResource, ParticipantQuestion,
+    EventTalk, EventWorkshop, EventWorkshopEnrolment, EventResource, ParticipantQuestion,
     AreaLocation, EventVenue
 )
 from django.utils.translation import gettext_lazy as _
@@ -9,7 +9,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.shortcuts import get_list_or_404, get_object_or_404
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import F, Q
 from django.core.exceptions import ValidationError
 
 import pprint
@@ -24,6 +24,8 @@ from apps.users.api.serializers import (
     SimpleAllergySerializer, SimpleMedicalConditionSerializer,
 )
 from apps.users.models import MedicalCondition, Allergy, EmergencyContact
+from core.location_hierarchy import get_area_path
+from apps.events.services.registration_capacity_service import get_registration_capacity_service
 from .location_serializers import EventVenueSerializer
 from .registration_serializers import ExtraQuestionSerializer, QuestionAnswerSerializer
 from .payment_serializers import EventPaymentPackageSerializer, EventPaymentMethodSerializer, EventPaymentSerializer
@@ -113,13 +115,45 @@ class EventWorkshopSerializer(serializers.ModelSerializer):
     primary_facilitator_details = SimplifiedCommunityUserSerializer(
         source='primary_facilitator', read_only=True
     )
-    level_display = serializers.CharField(source='get_level_display', read_only=True)
     event_name = serializers.CharField(source='event.name', read_only=True)
     current_participant_count = serializers.IntegerField(read_only=True)
+    remaining_capacity = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = EventWorkshop
         fields = '__all__'
+        read_only_fields = ('is_full',)
+    
+    def update(self, instance, validated_data):
+        # Save only the edited fields: the enrolment counters and is_full are changed by
+        # WorkshopEnrolmentService under the workshop row lock, and a full save would
+        # write back the stale values this instance was loaded with
+        many_to_many = {
+            field: validated_data.pop(field) for field in list(validated_data)
+            if instance._meta.get_field(field).many_to_many
+        }
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        if validated_data:
+            instance.save(update_fields=list(validated_data))
+        for field, value in many_to_many.items():
+            getattr(instance, field).set(value)
+        return instance
+
+class EventWorkshopEnrolmentSerializer(serializers.ModelSerializer):
+    '''
+    Workshop enrolment / waitlist entry
+    '''
+    workshop_title = serializers.CharField(source='workshop.title', read_only=True)
+    event_pax_id = serializers.CharField(source='participant.event_pax_id', read_only=True)
+    participant_name = serializers.CharField(source='participant.user.get_full_name', read_only=True, default=None)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = EventWorkshopEnrolment
+        fields = ('id', 'workshop', 'workshop_title', 'participant', 'event_pax_id', 'participant_name',
+                  'status', 'status_display', 'created_at', 'enrolled_at', 'cancelled_at')
+        read_only_fields = fields
 
 class PublicEventResourceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -138,7 +172,7 @@ class SimplifiedEventSerializer(serializers.ModelSerializer):
     main_venue = serializers.SerializerMethodField(read_only=True)
     cost = serializers.SerializerMethodField(read_only=True)
     organisation = OrganisationSerializer(read_only=True)
-    chapter = serializers.CharField(source="created_by.area_from.unit.chapter.chapter_name")
+    chapter = serializers.CharField(source="created_by.area_from.path_chapter_name")
     created_by = SimplifiedCommunityUserSerializer(required=False)
     spots_left = serializers.SerializerMethodField()
 
@@ -506,6 +540,9 @@ class EventSerializer(serializers.ModelSerializer):
             "age_range",
             "expected_attendees",
             "maximum_attendees",
+            "participant_type_caps",
+            "waitlist_enabled",
+            "waitlist_offer_hours",
             "payment_packages",
             "payment_methods",
             "payment_packages_data",
@@ -639,6 +676,9 @@ class EventSerializer(serializers.ModelSerializer):
                 "event_heads": rep["supervising_youth_heads"],
                 "cfc_coordinators": rep["supervising_CFC_coordinators"],
                 "maximum_attendees": rep["maximum_attendees"],
+                "participant_type_caps": rep["participant_type_caps"],
+                "waitlist_enabled": rep["waitlist_enabled"],
+                "waitlist_offer_hours": rep["waitlist_offer_hours"],
                 "expected_attendees": rep["expected_attendees"],
                 "age_range": rep["age_range"],
                 "organisers": rep["organisers"],
@@ -696,6 +736,17 @@ class EventSerializer(serializers.ModelSerializer):
             many=True
         ).data
 
+    def validate_participant_type_caps(self, value):
+        caps = value or {}
+        if not isinstance(caps, dict):
+            raise serializers.ValidationError(_("Expected an object of participant type to cap."))
+        for participant_type, cap in caps.items():
+            if participant_type not in EventParticipant.ParticipantType.values:
+                raise serializers.ValidationError(_(f"'{participant_type}' is not a participant type."))
+            if not isinstance(cap, int) or isinstance(cap, bool) or cap < 0:
+                raise serializers.ValidationError(_(f"Cap for {participant_type} must be a non-negative integer."))
+        return caps
+
     def validate(self, attrs):
         
         # ensure that name of event is unqiue at anytime
@@ -1219,6 +1270,10 @@ class EventSerializer(serializers.ModelSerializer):
                         method.delete()
 
             instance.save()
+
+            # A raised cap frees places - offer them to the waitlist
+            if {'maximum_attendees', 'participant_type_caps'} & validated_data.keys():
+                get_registration_capacity_service().fill_from_waitlist(instance.id)
         return instance
 
 
@@ -1314,7 +1369,9 @@ class EventParticipantSerializer(serializers.ModelSerializer):
             "payment_method",
             "payment_package",
             "consent",
-            "carts_display"
+            "carts_display",
+            "waitlisted_at",
+            "offer_expires_at",
         ]
         read_only_fields = [
             "id",
@@ -1324,6 +1381,8 @@ class EventParticipantSerializer(serializers.ModelSerializer):
             "registered_on",
             "confirmed_on",
             "attended_on",
+            "waitlisted_at",
+            "offer_expires_at",
         ]
         
     def get_carts_display(self, obj):
@@ -1348,6 +1407,8 @@ class EventParticipantSerializer(serializers.ModelSerializer):
                 "confirmed_on": rep["confirmed_on"],
                 "attended_on": rep["attended_on"],
                 "payment_date": rep["payment_date"],
+                "waitlisted_on": rep["waitlisted_at"],
+                "offer_expires_at": rep["offer_expires_at"],
             },
             "consents": {
                 "media_consent": rep["media_consent"],
@@ -1508,6 +1569,16 @@ class EventParticipantSerializer(serializers.ModelSerializer):
                 if event.organisation:
                     validated_data["organisation"] = event.organisation
             
+            # Take a place (or a waitlist spot) last, so the capacity counter stays locked for as short as possible
+            registration_status, capacity_message = get_registration_capacity_service().register(
+                event, validated_data.get('participant_type', EventParticipant.ParticipantType.PARTICIPANT)
+            )
+            if registration_status is None:
+                raise serializers.ValidationError({"non_field_errors": capacity_message})
+            validated_data["status"] = registration_status
+            if registration_status == EventParticipant.ParticipantStatus.WAITLISTED:
+                validated_data["waitlisted_at"] = timezone.now()
+            
             participant = EventParticipant.objects.create(event=event, user=updated_user, **validated_data)
 
             # payment - register the type of payment used
@@ -1527,6 +1598,9 @@ class EventParticipantSerializer(serializers.ModelSerializer):
                 else:
                     status = EventPayment.PaymentStatus.SUCCEEDED if final_amount == 0 else EventPayment.PaymentStatus.PENDING
                     # no need for payment method if the package is free, so we mark as paid if the package is free                    
+                if participant.status == EventParticipant.ParticipantStatus.WAITLISTED:
+                    # nothing is taken until a place is offered from the waitlist
+                    status = EventPayment.PaymentStatus.PENDING
                 EventPayment.objects.create(
                     user=participant,
                     event=event,
@@ -1580,12 +1654,8 @@ class EventParticipantSerializer(serializers.ModelSerializer):
             
 
             pprint.pprint(changes)
-        if event.maximum_attendees is not None and event.number_of_pax is not None:
-            event.maximum_attendees - event.number_of_pax
-            event.save()
-        if event.number_of_pax is not None:
-            event.number_of_pax += 1
-            event.save()
+        if event.number_of_pax is not None and participant.status != EventParticipant.ParticipantStatus.WAITLISTED:
+            Event.objects.filter(pk=event.pk).update(number_of_pax=F('number_of_pax') + 1)
         return participant
 
     #? A little note for the update method, most likely users will need to submit change requests to admins so they can verifiy changes manually    
@@ -2355,19 +2425,31 @@ class ListEventParticipantSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+    def _event_carts(self, obj):
+        # Prefetched by EventViewSet.participants (with their payments and products)
+        carts = getattr(obj.user, 'event_carts', None)
+        if carts is None:
+            carts = obj.user.carts.filter(event=obj.event).prefetch_related('product_payments', 'products')
+        return carts
+    
+    def _event_payments(self, obj):
+        # Prefetched by EventViewSet.participants, in primary key order like .first()
+        payments = getattr(obj, 'event_payments_by_pk', None)
+        if payments is None:
+            payments = EventPayment.objects.filter(user=obj, event=obj.event).order_by('pk')
+        return payments
+    
     def get_merch_data(self, obj):
         try:
-            carts = obj.user.carts.filter(event=obj.event)    
-            
             merch_data = []
-            for cart in carts:
+            for cart in self._event_carts(obj):
                 cart_data = {
                     "cart_id": str(cart.uuid),
                     "total": cart.total,
                 }
-                reference = shop_models.ProductPayment.objects.filter(cart=cart).first()
+                reference = min(cart.product_payments.all(), key=lambda payment: payment.pk, default=None)
                 cart_data["bank_reference"] = reference.bank_reference if reference else None
-                cart_data["number_of_items"] = cart.products.count()
+                cart_data["number_of_items"] = len(cart.products.all())
                 merch_data.append(cart_data)
             return merch_data
         except Exception as e:
@@ -2376,7 +2458,7 @@ class ListEventParticipantSerializer(serializers.ModelSerializer):
     
     def get_bank_reference(self, obj):
         try:
-            reference = EventPayment.objects.filter(user=obj, event=obj.event).first()
+            reference = next(iter(self._event_payments(obj)), None)
             return reference.bank_reference if reference else None
         except Exception as e:
             print(f"Error getting bank reference for participant {obj.id}: {e}")
@@ -2384,11 +2466,12 @@ class ListEventParticipantSerializer(serializers.ModelSerializer):
     
     def get_area_from(self, obj):
         try:
-            if obj.user and obj.user.area_from:
+            path = get_area_path(obj.user.area_from_id) if obj.user else None
+            if path:
                 return {
-                    "area": obj.user.area_from.area_name,
-                    "chapter": obj.user.area_from.unit.chapter.chapter_name if obj.user.area_from.unit and obj.user.area_from.unit.chapter else None,
-                    "cluster": obj.user.area_from.unit.chapter.cluster.cluster_id if obj.user.area_from.unit and obj.user.area_from.unit.chapter and obj.user.area_from.unit.chapter.cluster else None,
+                    "area": path["area_name"],
+                    "chapter": path["chapter_name"],
+                    "cluster": path["cluster_code"],
                 }
             return None
         except AttributeError as e:
@@ -2406,22 +2489,16 @@ class ListEventParticipantSerializer(serializers.ModelSerializer):
             outstanding_count = 0
             
             # Count unapproved merch orders for this event
-            unapproved_carts = obj.user.carts.filter(
-                event=obj.event,
-                submitted=True,
-                approved=False,
-                active=True
+            outstanding_count += sum(
+                1 for cart in self._event_carts(obj)
+                if cart.submitted and not cart.approved and cart.active
             )
-            outstanding_count += unapproved_carts.count()
             
             # Count outstanding event payments (unverified or failed)
-            outstanding_event_payments = EventPayment.objects.filter(
-                user=obj,
-                event=obj.event
-            ).filter(
-                Q(verified=False) | Q(status=EventPayment.PaymentStatus.FAILED)
+            outstanding_count += sum(
+                1 for payment in self._event_payments(obj)
+                if not payment.verified or payment.status == EventPayment.PaymentStatus.FAILED
             )
-            outstanding_count += outstanding_event_payments.count()
             
             return outstanding_count
             
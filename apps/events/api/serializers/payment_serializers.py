@@ -430,9 +430,8 @@ class DonationPaymentSerializer(serializers.ModelSerializer):
             # Add area and chapter information
             if hasattr(user, 'area_from') and user.area_from:
                 details["area"] = user.area_from.area_name
-                if hasattr(user.area_from, 'unit') and user.area_from.unit:
-                    if hasattr(user.area_from.unit, 'chapter') and user.area_from.unit.chapter:
-                        details["chapter"] = user.area_from.unit.chapter.chapter_name
+                if user.area_from.path_chapter_name:
+                    details["chapter"] = user.area_from.path_chapter_name
             
             return details
         return None
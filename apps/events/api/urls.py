@@ -24,6 +24,7 @@ event_router.register(r'event-roles', EventRoleViewSet)
 event_router.register(r'participants', EventParticipantViewSet)
 event_router.register(r"resources", PublicEventResourceViewSet)
 event_router.register(r"attendances", EventDayAttendanceViewSet)
+event_router.register(r"workshops", EventWorkshopViewSet)
 location_router.register(r"venues", EventVenueViewSet, basename="eventvenue")
 
 payment_routers = DefaultRouter()
@@ -1,13 +1,15 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Q, F
+from django.db.models import Count, Sum, Q, F, Prefetch
 from django.db.models.functions import Coalesce, TruncDate
 from collections import defaultdict
 from datetime import datetime
 
 from apps.events.models import Event, EventParticipant, EventPayment
 from apps.shop.models import EventCart, EventProductOrder, ProductPayment, EventProduct, ProductPaymentMethod, OrderRefund
+from core.money import money_to_float
+from core.statistics import grouped_statistics, choice_buckets, ZERO
 
 
 class EventStatisticsViewSet(viewsets.ViewSet):
@@ -27,7 +29,7 @@ class EventStatisticsViewSet(viewsets.ViewSet):
             group_by = request.query_params.get('group_by', 'area')
             
             participants = EventParticipant.objects.filter(event=event).select_related(
-                'user__area_from__unit__chapter__cluster'
+                'user__area_from'
             )
             
             distribution = defaultdict(lambda: {
@@ -44,16 +46,9 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 else:
                     area_from = participant.user.area_from
                     if group_by == 'cluster':
-                        location_key = area_from.unit.chapter.cluster.cluster_id if (
-                            area_from.unit and 
-                            area_from.unit.chapter and 
-                            area_from.unit.chapter.cluster
-                        ) else 'Unknown'
+                        location_key = area_from.path_cluster_code or 'Unknown'
                     elif group_by == 'chapter':
-                        location_key = area_from.unit.chapter.chapter_name if (
-                            area_from.unit and 
-                            area_from.unit.chapter
-                        ) else 'Unknown'
+                        location_key = area_from.path_chapter_name or 'Unknown'
                     else:  # area
                         location_key = area_from.area_name or 'Unknown'
                 
@@ -98,9 +93,13 @@ class EventStatisticsViewSet(viewsets.ViewSet):
             event = Event.objects.get(id=pk)
             group_by = request.query_params.get('group_by', 'area')
             
+            # Only this event's payments, prefetched (filtering the relations per participant ran 2 queries each)
             participants = EventParticipant.objects.filter(event=event).select_related(
-                'user__area_from__unit__chapter__cluster'
-            ).prefetch_related('participant_event_payments', 'user__product_payments')
+                'user__area_from'
+            ).prefetch_related(
+                Prefetch('participant_event_payments', queryset=EventPayment.objects.filter(event=event), to_attr='event_payments'),
+                Prefetch('user__product_payments', queryset=ProductPayment.objects.filter(cart__event=event), to_attr='event_product_payments'),
+            )
             
             distribution = defaultdict(lambda: {
                 'total_participants': 0,
@@ -110,8 +109,8 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 'product_payments_verified': 0,
                 'total_outstanding': 0,
                 'total_verified': 0,
-                'outstanding_amount': 0,
-                'verified_amount': 0
+                'outstanding_amount': ZERO,
+                'verified_amount': ZERO
             })
             
             for participant in participants:
@@ -121,42 +120,31 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 else:
                     area_from = participant.user.area_from
                     if group_by == 'cluster':
-                        location_key = area_from.unit.chapter.cluster.cluster_id if (
-                            area_from.unit and 
-                            area_from.unit.chapter and 
-                            area_from.unit.chapter.cluster
-                        ) else 'Unknown'
+                        location_key = area_from.path_cluster_code or 'Unknown'
                     elif group_by == 'chapter':
-                        location_key = area_from.unit.chapter.chapter_name if (
-                            area_from.unit and 
-                            area_from.unit.chapter
-                        ) else 'Unknown'
+                        location_key = area_from.path_chapter_name or 'Unknown'
                     else:  # area
                         location_key = area_from.area_name or 'Unknown'
                 
                 distribution[location_key]['total_participants'] += 1
                 
                 # Event payments
-                event_payments = participant.participant_event_payments.filter(event=event)
-                for payment in event_payments:
+                for payment in participant.event_payments:
                     if payment.verified and payment.status == EventPayment.PaymentStatus.SUCCEEDED:
                         distribution[location_key]['event_payments_verified'] += 1
-                        distribution[location_key]['verified_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['verified_amount'] += payment.amount or ZERO
                     else:
                         distribution[location_key]['event_payments_outstanding'] += 1
-                        distribution[location_key]['outstanding_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['outstanding_amount'] += payment.amount or ZERO
                 
                 # Product payments
-                product_payments = participant.user.product_payments.filter(
-                    cart__event=event
-                )
-                for payment in product_payments:
+                for payment in participant.user.event_product_payments:
                     if payment.approved and payment.status == ProductPayment.PaymentStatus.SUCCEEDED:
                         distribution[location_key]['product_payments_verified'] += 1
-                        distribution[location_key]['verified_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['verified_amount'] += payment.amount or ZERO
                     else:
                         distribution[location_key]['product_payments_outstanding'] += 1
-                        distribution[location_key]['outstanding_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['outstanding_amount'] += payment.amount or ZERO
                 
                 # Calculate totals
                 distribution[location_key]['total_outstanding'] = (
@@ -364,16 +352,18 @@ class EventStatisticsViewSet(viewsets.ViewSet):
             
             # Get all participants with their product payments
             participants = EventParticipant.objects.filter(event=event).select_related(
-                'user__area_from__unit__chapter__cluster'
-            ).prefetch_related('user__product_payments')
+                'user__area_from'
+            ).prefetch_related(
+                Prefetch('user__product_payments', queryset=ProductPayment.objects.filter(cart__event=event), to_attr='event_product_payments')
+            )
             
             distribution = defaultdict(lambda: {
                 'total_participants': 0,
                 'participants_with_orders': 0,
                 'total_outstanding': 0,
                 'total_verified': 0,
-                'outstanding_amount': 0,
-                'verified_amount': 0
+                'outstanding_amount': ZERO,
+                'verified_amount': ZERO
             })
             
             for participant in participants:
@@ -382,37 +372,28 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 else:
                     area_from = participant.user.area_from
                     if group_by == 'cluster':
-                        location_key = area_from.unit.chapter.cluster.cluster_id if (
-                            area_from.unit and 
-                            area_from.unit.chapter and 
-                            area_from.unit.chapter.cluster
-                        ) else 'Unknown'
+                        location_key = area_from.path_cluster_code or 'Unknown'
                     elif group_by == 'chapter':
-                        location_key = area_from.unit.chapter.chapter_name if (
-                            area_from.unit and 
-                            area_from.unit.chapter
-                        ) else 'Unknown'
+                        location_key = area_from.path_chapter_name or 'Unknown'
                     else:  # area
                         location_key = area_from.area_name or 'Unknown'
                 
                 distribution[location_key]['total_participants'] += 1
                 
                 # Product payments for this event only
-                product_payments = participant.user.product_payments.filter(
-                    cart__event=event
-                )
+                product_payments = participant.user.event_product_payments if participant.user else []
                 
-                if product_payments.exists():
+                if product_payments:
                     distribution[location_key]['participants_with_orders'] += 1
                 
                 for payment in product_payments:
                     # Verified: approved=True AND status=SUCCEEDED
                     if payment.approved and payment.status == ProductPayment.PaymentStatus.SUCCEEDED:
                         distribution[location_key]['total_verified'] += 1
-                        distribution[location_key]['verified_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['verified_amount'] += payment.amount or ZERO
                     elif payment.status in [ProductPayment.PaymentStatus.PENDING] or not payment.approved:
                         distribution[location_key]['total_outstanding'] += 1
-                        distribution[location_key]['outstanding_amount'] += float(payment.amount or 0)
+                        distribution[location_key]['outstanding_amount'] += payment.amount or ZERO
             
             # Convert to list format for chart
             chart_data = [
@@ -506,23 +487,23 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 'total_payments': 0,
                 'verified_payments': 0,
                 'pending_payments': 0,
-                'total_amount': 0,
-                'verified_amount': 0,
-                'pending_amount': 0
+                'total_amount': ZERO,
+                'verified_amount': ZERO,
+                'pending_amount': ZERO
             })
             
             for payment in payments:
                 method_name = payment.method.get_method_display() if payment.method else 'Unknown'
                 
                 method_stats[method_name]['total_payments'] += 1
-                method_stats[method_name]['total_amount'] += float(payment.amount or 0)
+                method_stats[method_name]['total_amount'] += payment.amount or ZERO
                 
                 if payment.approved and payment.status == ProductPayment.PaymentStatus.SUCCEEDED:
                     method_stats[method_name]['verified_payments'] += 1
-                    method_stats[method_name]['verified_amount'] += float(payment.amount or 0)
+                    method_stats[method_name]['verified_amount'] += payment.amount or ZERO
                 else:
                     method_stats[method_name]['pending_payments'] += 1
-                    method_stats[method_name]['pending_amount'] += float(payment.amount or 0)
+                    method_stats[method_name]['pending_amount'] += payment.amount or ZERO
             
             # Convert to list
             chart_data = [
@@ -645,7 +626,7 @@ class EventStatisticsViewSet(viewsets.ViewSet):
             
             # Calculate summary statistics BEFORE pagination (across all carts)
             total_carts_count = carts.count()
-            total_revenue = sum(float(cart.total or 0) for cart in carts)
+            total_revenue = money_to_float(carts.aggregate(stat_revenue=Coalesce(Sum('total'), ZERO))['stat_revenue'])
             
             # Apply pagination
             paginator = Paginator(carts, page_size)
@@ -678,11 +659,11 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 payments = cart.product_payments.all()
                 payment_status = cart.cart_status
                 payment_method = None
-                total_paid = 0
+                total_paid = ZERO
                 
                 for payment in payments:
                     if payment.approved and payment.status == ProductPayment.PaymentStatus.SUCCEEDED:
-                        total_paid += float(payment.amount or 0)
+                        total_paid += payment.amount or ZERO
                    
                     
                     if payment.method:
@@ -698,7 +679,7 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                     'area_from': cart.user.area_from.area_name if cart.user.area_from else 'Unknown',
                     'payment_status': payment_status,
                     'payment_method': payment_method,
-                    'total_paid': total_paid
+                    'total_paid': money_to_float(total_paid)
                 }
                 
                 orders_data.append(enhanced_cart)
@@ -745,42 +726,48 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                 'cart', 'payment', 'user'
             )
             
-            # Overall statistics
-            total_refunds = refunds.count()
-            total_refund_amount = refunds.aggregate(total=Sum('refund_amount'))['total'] or 0
+            # Overall, status, reason and method statistics in a single query
+            stats = grouped_statistics(
+                refunds,
+                amount_field='refund_amount',
+                groups={
+                    'status': choice_buckets('status', OrderRefund.RefundStatus.choices),
+                    'reason': choice_buckets('refund_reason', OrderRefund.RefundReason.choices),
+                    'method': {
+                        'automatic': Q(is_automatic_refund=True),
+                        'manual': Q(is_automatic_refund=False),
+                    },
+                },
+            )
+            total_refunds = stats['count']
+            total_refund_amount = stats['amount']
             
             # Status breakdown
             status_breakdown = {}
-            for status_choice in OrderRefund.RefundStatus.choices:
-                status_code = status_choice[0]
-                status_display = status_choice[1]
-                count = refunds.filter(status=status_code).count()
-                amount = refunds.filter(status=status_code).aggregate(total=Sum('refund_amount'))['total'] or 0
+            for status_code, status_display in OrderRefund.RefundStatus.choices:
+                bucket = stats['groups']['status'][status_code]
                 status_breakdown[status_code] = {
                     'display': status_display,
-                    'count': count,
-                    'total_amount': float(amount)
+                    'count': bucket['count'],
+                    'total_amount': float(bucket['amount'])
                 }
             
             # Refund reasons breakdown
             reason_breakdown = {}
-            for reason_choice in OrderRefund.RefundReason.choices:
-                reason_code = reason_choice[0]
-                reason_display = reason_choice[1]
-                count = refunds.filter(refund_reason=reason_code).count()
-                amount = refunds.filter(refund_reason=reason_code).aggregate(total=Sum('refund_amount'))['total'] or 0
-                if count > 0:  # Only include reasons that have been used
+            for reason_code, reason_display in OrderRefund.RefundReason.choices:
+                bucket = stats['groups']['reason'][reason_code]
+                if bucket['count'] > 0:  # Only include reasons that have been used
                     reason_breakdown[reason_code] = {
                         'display': reason_display,
-                        'count': count,
-                        'total_amount': float(amount)
+                        'count': bucket['count'],
+                        'total_amount': float(bucket['amount'])
                     }
             
             # Automatic vs Manual refunds
-            automatic_count = refunds.filter(is_automatic_refund=True).count()
-            manual_count = refunds.filter(is_automatic_refund=False).count()
-            automatic_amount = refunds.filter(is_automatic_refund=True).aggregate(total=Sum('refund_amount'))['total'] or 0
-            manual_amount = refunds.filter(is_automatic_refund=False).aggregate(total=Sum('refund_amount'))['total'] or 0
+            automatic_count = stats['groups']['method']['automatic']['count']
+            manual_count = stats['groups']['method']['manual']['count']
+            automatic_amount = stats['groups']['method']['automatic']['amount']
+            manual_amount = stats['groups']['method']['manual']['amount']
             
             # Item-level statistics (products that were refunded)
             refunded_cart_ids = refunds.values_list('cart_id', flat=True)
@@ -798,12 +785,12 @@ class EventStatisticsViewSet(viewsets.ViewSet):
                         'product_name': order.product.title,
                         'product_id': product_id,
                         'total_quantity': 0,
-                        'total_value': 0,
+                        'total_value': ZERO,
                         'sizes': {}
                     }
                 
                 product_refunds[product_id]['total_quantity'] += order.quantity
-                product_refunds[product_id]['total_value'] += float(order.price_at_purchase * order.quantity)
+                product_refunds[product_id]['total_value'] += (order.price_at_purchase or ZERO) * order.quantity
                 
                 # Track sizes
                 if order.size:
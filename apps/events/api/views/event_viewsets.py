@@ -1,9 +1,11 @@
 import uuid
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets, filters, status, permissions
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import viewsets, filters, status, permissions, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from rest_framework.views import APIView
+from django.db.models import Prefetch, Q
 from rest_framework import serializers
 from django.conf import settings
 from decimal import Decimal
@@ -20,7 +22,8 @@ import re
 
 from apps.events.models import (
     Event, EventServiceTeamMember, EventRole, EventParticipant,
-    EventTalk, EventWorkshop, EventPayment, EventDayAttendance
+    EventTalk, EventWorkshop, EventWorkshopEnrolment, EventPayment, EventDayAttendance, EventAttendanceHourlyRollup,
+    EventExport, RegistrationImport
 )
 from apps.events.models.location_models import AreaLocation
 from apps.users.models import EmergencyContact
@@ -33,6 +36,8 @@ from apps.events.api.serializers.permission_serializers import (
 from apps.users.api.serializers import CommunityUserSerializer
 from apps.events.api.filters import EventFilter
 from apps.shop.api.serializers import EventProductSerializer, EventCartSerializer
+from core.money import round_money, sum_money
+from core.websocket_limits import get_websocket_metrics
 from core.event_permissions import (
     has_full_event_access, can_manage_permissions, get_user_event_permissions,
     has_event_permission
@@ -40,8 +45,16 @@ from core.event_permissions import (
 from apps.shop.models import EventCart, ProductPayment, EventProduct, EventProductOrder, ProductSize
 from apps.shop.api.serializers import EventCartMinimalSerializer
 from apps.shop.api.serializers.payment_serializers import ProductPaymentMethodSerializer
-from apps.events.websocket_utils import websocket_notifier, serialize_participant_for_websocket, get_event_supervisors
+from apps.events.websocket_utils import websocket_notifier, serialize_participant_for_websocket
 from apps.events.email_utils import send_booking_confirmation_email, send_payment_verification_email
+from apps.events.services.workshop_enrolment_service import get_workshop_enrolment_service
+from apps.events.services.registration_capacity_service import get_registration_capacity_service
+from apps.events.services.export_service import ExportFormatUnavailable, get_export_service, get_sync_row_limit
+from apps.events.services.registration_import_service import get_registration_import_service
+from apps.events.services.checkin_scan_service import (
+    CHECKED_IN, ALREADY_CHECKED_IN, NOT_FOUND, NOT_STARTED, get_checkin_scan_service
+)
+from apps.events.services.checkin_sync_service import get_checkin_sync_service
 from apps.shop.email_utils import send_payment_verified_email, send_order_update_email, send_cart_created_by_admin_email
 import threading
 
@@ -1382,12 +1395,23 @@ class EventViewSet(viewsets.ModelViewSet):
                     raise serializers.ValidationError("could not parse query correctly")
         try:
             # Base queryset with optimized joins
+            # This event's payments and carts are prefetched for ListEventParticipantSerializer,
+            # so the page costs the same number of queries whatever its size
             participants = event.participants.select_related(
                 'user', 'user__area_from', 'user__area_from__unit__chapter', 
-                'user__area_from__unit__chapter__cluster'
+                'user__area_from__unit__chapter__cluster', 'organisation'
             ).prefetch_related(
-                'participant_event_payments', 'user__product_payments', 
-                'user__carts', 'event_question_answers'
+                'participant_event_payments', 'user__product_payments', 'event_question_answers',
+                Prefetch(
+                    'participant_event_payments',
+                    queryset=EventPayment.objects.filter(event=event).order_by('pk'),
+                    to_attr='event_payments_by_pk',
+                ),
+                Prefetch(
+                    'user__carts',
+                    queryset=EventCart.objects.filter(event=event).prefetch_related('product_payments', 'products'),
+                    to_attr='event_carts',
+                ),
             )
             
             print(f"🔍 DEBUG participants - Base queryset count: {participants.count()}")
@@ -1441,9 +1465,11 @@ class EventViewSet(viewsets.ModelViewSet):
 
         # Get available filter options for dropdowns (from all participants, not filtered ones)
         try:
-            all_participants = event.participants.select_related(
-                'user', 'user__area_from', 'user__area_from__unit__chapter', 
-                'user__area_from__unit__chapter__cluster'
+            # Read the materialized location path of each participant's area in one query
+            area_paths = event.participants.filter(user__area_from__isnull=False).values_list(
+                'user__area_from__area_name',
+                'user__area_from__path_chapter_name',
+                'user__area_from__path_cluster_code',
             ).distinct()
             
             # Extract unique areas, chapters, and clusters for filter dropdowns
@@ -1451,34 +1477,13 @@ class EventViewSet(viewsets.ModelViewSet):
             chapters = set()
             clusters = set()
             
-            print(f"🔍 Processing {all_participants.count()} participants for filter options")
-            
-            for participant in all_participants:
-                try:
-                    user = participant.user
-                    if user and hasattr(user, 'area_from') and user.area_from:
-                        area_from = user.area_from
-                        
-                        # Area name
-                        if hasattr(area_from, 'area_name') and area_from.area_name:
-                            areas.add(area_from.area_name)
-                            
-                        # Chapter name (via unit.chapter)
-                        if hasattr(area_from, 'unit') and area_from.unit:
-                            unit = area_from.unit
-                            if hasattr(unit, 'chapter') and unit.chapter:
-                                chapter = unit.chapter
-                                if hasattr(chapter, 'chapter_name') and chapter.chapter_name:
-                                    chapters.add(chapter.chapter_name)
-                                    
-                                # Cluster name (via chapter.cluster)
-                                if hasattr(chapter, 'cluster') and chapter.cluster:
-                                    cluster = chapter.cluster
-                                    if hasattr(cluster, 'cluster_id') and cluster.cluster_id:
-                                        clusters.add(cluster.cluster_id)
-                except Exception as e:
-                    print(f"⚠️ Error processing participant {participant.id}: {e}")
-                    continue
+            for area_name, chapter_name, cluster_code in area_paths:
+                if area_name:
+                    areas.add(area_name)
+                if chapter_name:
+                    chapters.add(chapter_name)
+                if cluster_code:
+                    clusters.add(cluster_code)
             
             print(f"📊 Filter options found - Areas: {len(areas)}, Chapters: {len(chapters)}, Clusters: {len(clusters)}")
             
@@ -1769,6 +1774,192 @@ class EventViewSet(viewsets.ModelViewSet):
         serializer = ProductPaymentListSerializer(payments, many=True)
         return Response({'results': serializer.data})
     
+    @action(detail=True, methods=['get'], url_name="export", url_path="export/(?P<export_type>participants|payments|merch)")
+    def export(self, request, id=None, export_type=None):
+        '''
+        Download the participant roster, payment ledger or merch pick list of the event.
+        
+        - ?file_format=csv|xlsx (default: csv)
+        - ?status= (repeatable, filter by participant/payment/order status)
+        - ?participant_type= (participant roster only)
+        - ?background=true (always generate as a background job)
+        
+        Small CSV exports are streamed straight back. Larger exports (and background=true)
+        are generated by a Celery job: the response is 202 with the export to poll at
+        exports/<export_id>/, and the requester is notified when the file is ready.
+        '''
+        event = self.get_object()
+        service = get_export_service()
+        if not service.can_export(request.user, event, export_type):
+            return Response(
+                {'error': _('You do not have permission to export this data.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        file_format = request.query_params.get('file_format', EventExport.FileFormat.CSV).lower()
+        if file_format not in EventExport.FileFormat.values:
+            return Response(
+                {'error': _('file_format must be one of: %s') % ', '.join(EventExport.FileFormat.values)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filters = service.parse_filters(request.query_params)
+        background = request.query_params.get('background', 'false').lower() == 'true'
+        if background or service.count(event, export_type, filters) > get_sync_row_limit():
+            export, message = service.start(event, export_type, file_format, filters, request.user)
+            return Response(
+                {**service.describe(export), 'message': message},
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        filename = service.filename(event, export_type, file_format)
+        if file_format == EventExport.FileFormat.CSV:
+            response = StreamingHttpResponse(
+                service.stream_csv(event, export_type, filters),
+                content_type=service.CONTENT_TYPES[file_format]
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        
+        try:
+            tmp, _rows = service.write_tempfile(event, export_type, file_format, filters)
+        except ExportFormatUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return FileResponse(tmp, as_attachment=True, filename=filename, content_type=service.CONTENT_TYPES[file_format])
+    
+    @action(detail=True, methods=['get'], url_name="export-status", url_path="exports/(?P<export_id>[^/.]+)")
+    def export_status(self, request, id=None, export_id=None):
+        '''
+        Progress and download link of a background export of this event.
+        '''
+        event = self.get_object()
+        if not test_safe_uuid(export_id):
+            return Response({'error': _('Export not found.')}, status=status.HTTP_404_NOT_FOUND)
+        export = get_object_or_404(EventExport, id=export_id, event=event)
+        service = get_export_service()
+        if not service.can_export(request.user, event, export.export_type):
+            return Response(
+                {'error': _('You do not have permission to view this export.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(service.describe(export))
+    
+    @action(detail=True, methods=['post'], url_name="imports", url_path="imports")
+    def registration_import(self, request, id=None):
+        '''
+        Upload a CSV of offline registrations. Nothing is registered yet - the response is
+        the validation report (unknown areas, invalid packages, duplicate emails, similar names).
+        Uploading the same file again returns the existing import.
+        '''
+        event = self.get_object()
+        if not has_event_permission(request.user, event, 'can_add_participants'):
+            return Response(
+                {'error': _('You do not have permission to add participants to this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({'error': _('A CSV file is required.')}, status=status.HTTP_400_BAD_REQUEST)
+        
+        service = get_registration_import_service()
+        registration_import, message = service.upload(event, uploaded_file, uploaded_by=request.user)
+        if registration_import is None:
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': message, **service.report(registration_import)})
+    
+    @action(detail=True, methods=['get'], url_name="import-detail", url_path="imports/(?P<import_id>[^/.]+)")
+    def registration_import_detail(self, request, id=None, import_id=None):
+        '''
+        Validation/import report of a registration import (?all=true to include rows without issues).
+        '''
+        event = self.get_object()
+        if not has_event_permission(request.user, event, 'can_add_participants'):
+            return Response(
+                {'error': _('You do not have permission to add participants to this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not test_safe_uuid(import_id):
+            return Response({'error': _('Import not found.')}, status=status.HTTP_404_NOT_FOUND)
+        registration_import = get_object_or_404(RegistrationImport, id=import_id, event=event)
+        include_valid = request.query_params.get('all', '').lower() == 'true'
+        return Response(get_registration_import_service().report(registration_import, include_valid=include_valid))
+    
+    @action(detail=True, methods=['post'], url_name="import-commit", url_path="imports/(?P<import_id>[^/.]+)/commit")
+    def registration_import_commit(self, request, id=None, import_id=None):
+        '''
+        Register every valid row of a registration import. Safe to repeat - rows already
+        imported are never registered twice, so an interrupted import can simply be committed again.
+        '''
+        event = self.get_object()
+        if not has_event_permission(request.user, event, 'can_add_participants'):
+            return Response(
+                {'error': _('You do not have permission to add participants to this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not test_safe_uuid(import_id):
+            return Response({'error': _('Import not found.')}, status=status.HTTP_404_NOT_FOUND)
+        registration_import = get_object_or_404(RegistrationImport, id=import_id, event=event)
+        
+        service = get_registration_import_service()
+        registration_import, message = service.commit(registration_import)
+        return Response({'message': message, **service.report(registration_import)})
+    
+    @action(detail=True, methods=['post'], url_name="scan", url_path="scan")
+    def scan(self, request, id=None):
+        '''
+        Check in a participant by scanning their badge: {"code": "<event pax ID or secondary reference>"}.
+        Resolved from the event's cached scan index, so duplicate scans and badges of another
+        event are reported without loading the participant.
+        '''
+        event = get_object_or_404(Event, id=id)
+        if not has_event_permission(request.user, event, 'can_access_checkin'):
+            return Response(
+                {'error': _('You do not have permission to check in participants for this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        result, message = get_checkin_scan_service().scan(event, request.data.get('code'))
+        response_status = {
+            CHECKED_IN: status.HTTP_201_CREATED,
+            ALREADY_CHECKED_IN: status.HTTP_200_OK,
+            NOT_FOUND: status.HTTP_404_NOT_FOUND,
+            NOT_STARTED: status.HTTP_400_BAD_REQUEST,
+        }.get(result['outcome'], status.HTTP_409_CONFLICT)  # wrong event, cancelled/waitlisted
+        return Response({'message': message, **result}, status=response_status)
+    
+    @action(detail=True, methods=['get'], url_name="checkin-sync-snapshot", url_path="checkin-sync/snapshot")
+    def checkin_sync_snapshot(self, request, id=None):
+        '''
+        Signed roster snapshot for a check-in desk that may go offline, with its first sync token.
+        '''
+        event = get_object_or_404(Event, id=id)
+        if not has_event_permission(request.user, event, 'can_access_checkin'):
+            return Response(
+                {'error': _('You do not have permission to check in participants for this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(get_checkin_sync_service().snapshot(event))
+    
+    @action(detail=True, methods=['post'], url_name="checkin-sync", url_path="checkin-sync")
+    def checkin_sync(self, request, id=None):
+        '''
+        Upload check-ins/check-outs recorded offline:
+        {"device_id", "sync_token", "operations": [{"key", "participant_id", "action", "client_time"}]}.
+        Returns the outcome of each operation, changes made by other desks since the token and the next token.
+        '''
+        event = get_object_or_404(Event, id=id)
+        if not has_event_permission(request.user, event, 'can_access_checkin'):
+            return Response(
+                {'error': _('You do not have permission to check in participants for this event.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        result, message = get_checkin_sync_service().sync(
+            event, request.data.get('device_id'), request.data.get('sync_token'), request.data.get('operations')
+        )
+        if result is None:
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': message, **result})
+    
     @action(detail=True, methods=['post'], url_name="register", url_path="register")
     def register(self, request, id=None):
         '''
@@ -1813,12 +2004,9 @@ class EventViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 ) 
             
-        participant = EventParticipant.objects.create(
-            event=event,
-            user=user,
-            status=EventParticipant.ParticipantStatus.REGISTERED,
-            participant_type=participant_type
-        )
+        participant, capacity_message = get_registration_capacity_service().create_participant(event, user, participant_type)
+        if participant is None:
+            return Response({'error': capacity_message}, status=status.HTTP_409_CONFLICT)
         
         # Broadcast WebSocket update for new participant registration
         try:
@@ -1829,9 +2017,7 @@ class EventViewSet(viewsets.ModelViewSet):
             )
             
             # Notify dashboard users about participant count change
-            supervisor_ids = get_event_supervisors(event)
-            websocket_notifier.notify_event_update(
-                user_ids=supervisor_ids,
+            websocket_notifier.notify_event_dashboard(
                 event_id=str(event.id),
                 update_type='participant_registered',
                 data={'participant_id': str(participant.id)}
@@ -1841,7 +2027,23 @@ class EventViewSet(viewsets.ModelViewSet):
             print(f"WebSocket notification error during registration: {e}")
         
         serializer = SimplifiedEventParticipantSerializer(participant)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            {**serializer.data, 'message': capacity_message},
+            status=status.HTTP_202_ACCEPTED if participant.status == EventParticipant.ParticipantStatus.WAITLISTED else status.HTTP_201_CREATED
+        )
+    
+    @action(detail=True, methods=['get'], url_name="capacity", url_path="capacity")
+    def capacity(self, request, id=None):
+        '''
+        Registration caps, places held and waitlist size for the event.
+        '''
+        event = self.get_object()
+        if not has_event_permission(request.user, event, 'can_view_participants'):
+            return Response(
+                {'error': _('You do not have permission to view this event\'s capacity.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(get_registration_capacity_service().capacity_overview(event))
     
     @action(detail=True, methods=['delete'], url_name="remove-participant", url_path="remove-participant")
     def remove_participant(self, request, id=None):
@@ -2263,25 +2465,25 @@ class EventViewSet(viewsets.ModelViewSet):
             if area.startswith("cluster_"):
                 cluster_id = area[-1].upper()
                 print(cluster_id)
-                query_params.append(Q(user__area_from__unit__chapter__cluster__cluster_id=cluster_id))
+                query_params.append(Q(user__area_from__path_cluster_code=cluster_id))
             else:
                 query_params.append(
                     (Q(user__area_from__area_name=area) | Q(user__area_from__area_code=area) | 
-                    Q(user__area_from__unit__chapter__chapter_name=area.capitalize())) 
+                    Q(user__area_from__path_chapter_name=area.capitalize())) 
                 )
         participants = EventParticipant.objects.filter(
             (Q(user__event_attendance__stale=True) | Q(user__event_attendance=None)),
             event=id,
             *query_params,
-        ).distinct()
+        ).select_related('user__area_from').distinct()
         
         return Response([
             {
                 "full_name": f"{p.user.first_name} {p.user.last_name}",
                 "picture": p.user.profile_picture.url if p.user.profile_picture else None,
                 "area": p.user.area_from.area_name if p.user.area_from else None,
-                "chapter": p.user.area_from.unit.chapter.chapter_name if p.user.area_from and p.user.area_from.unit and p.user.area_from.unit.chapter else None,
-                "cluster": p.user.area_from.unit.chapter.cluster.cluster_id if p.user.area_from and p.user.area_from.unit and p.user.area_from.unit.chapter and p.user.area_from.unit.chapter.cluster else None
+                "chapter": p.user.area_from.path_chapter_name or None if p.user.area_from else None,
+                "cluster": p.user.area_from.path_cluster_code or None if p.user.area_from else None
             } for p in participants.all()
         ])
         
@@ -3107,6 +3309,18 @@ class EventViewSet(viewsets.ModelViewSet):
         elif cluster:
             participants = participants.filter(user__area_from__unit__chapter__cluster__cluster_id__icontains=cluster)
         
+        # Same figures as EventParticipant.total_outstanding, loaded once for all participants
+        from django.db.models import Prefetch
+        from apps.shop.models import EventCart, EventProductOrder
+        open_carts = EventCart.objects.filter(event=event, approved=False, submitted=False).prefetch_related(
+            Prefetch('orders', queryset=EventProductOrder.objects.filter(status=EventProductOrder.Status.PURCHASED), to_attr='purchased_orders')
+        )
+        cart_totals = defaultdict(lambda: Decimal('0.00'))
+        for cart in open_carts:
+            cart_totals[cart.user_id] += cart.total_amount
+        unverified_payment = event.event_payments.filter(verified=False).first()
+        unverified_amount = unverified_payment.amount if unverified_payment else 0
+        
         # Aggregate by Area
         location_data = defaultdict(lambda: {'area_name': '', 'outstanding_amount': Decimal('0.00'), 'participant_count': 0})
         
@@ -3117,9 +3331,7 @@ class EventViewSet(viewsets.ModelViewSet):
             area_name = participant.user.area_from.area_name
             
             # Calculate outstanding amount for this participant
-            # total_cost = participant.total_cost or Decimal('0.00')
-            # paid_amount = participant.paid_amount or Decimal('0.00')
-            outstanding = participant.total_outstanding
+            outstanding = cart_totals.get(participant.user_id, Decimal('0.00')) + unverified_amount
             
             if outstanding > 0:
                 location_data[area_name]['area_name'] = area_name
@@ -3159,9 +3371,9 @@ class EventViewSet(viewsets.ModelViewSet):
         - chapter: Filter by chapter (optional)
         - area: Filter by area (optional)
         """
-        from django.db.models import Count, Q
+        from django.db.models import Count
         from django.db.models.functions import TruncHour, TruncDate
-        from datetime import datetime, timedelta
+        from datetime import datetime, timezone as dt_timezone
         from collections import defaultdict
         
         # Get event directly without queryset filters
@@ -3211,15 +3423,10 @@ class EventViewSet(viewsets.ModelViewSet):
             event=event,
             check_in_time__date__gte=start_date,
             check_in_time__date__lte=end_date
-        ).select_related(
-            'user',
-            'user__area_from',
-            'user__area_from__unit',
-            'user__area_from__unit__chapter',
-            'user__area_from__unit__chapter__cluster'
-        )
+        ).order_by()
         
         # Apply location filters
+        location_filtered = bool(area or chapter or cluster)
         if area:
             attendance_records = attendance_records.filter(user__area_from__area_name__icontains=area)
         elif chapter:
@@ -3227,45 +3434,55 @@ class EventViewSet(viewsets.ModelViewSet):
         elif cluster:
             attendance_records = attendance_records.filter(user__area_from__unit__chapter__cluster__cluster_id__icontains=cluster)
         
-        # Aggregate based on granularity
+        # Aggregate based on granularity - buckets are computed in the database (UTC)
         trends_data = defaultdict(lambda: {'check_ins': 0, 'check_outs': 0})
+        utc = dt_timezone.utc
         
-        if granularity == 'hourly':
-            for record in attendance_records:
-                hour_key = record.check_in_time.strftime('%Y-%m-%d %H:00')
-                trends_data[hour_key]['check_ins'] += 1
-                
-                if record.check_out_time:
-                    checkout_hour_key = record.check_out_time.strftime('%Y-%m-%d %H:00')
-                    trends_data[checkout_hour_key]['check_outs'] += 1
-        
-        elif granularity == 'event_days':
-            for record in attendance_records:
-                day_index = record.day_index
-                if day_index:
-                    day_key = f"Day {day_index}"
-                    trends_data[day_key]['check_ins'] += 1
-                    
-                    if record.check_out_time:
-                        trends_data[day_key]['check_outs'] += 1
+        if granularity == 'event_days' and event.start_date:
+            # Day N = event start date + (N - 1), stored on each record (see EventDayAttendance.event_day)
+            rows = attendance_records.filter(day_index__isnull=False).values('day_index').annotate(
+                check_ins=Count('id'), check_outs=Count('check_out_time')
+            ).order_by('day_index')
+            
+            for row in rows:
+                trends_data[f"Day {row['day_index']}"]['check_ins'] += row['check_ins']
+                trends_data[f"Day {row['day_index']}"]['check_outs'] += row['check_outs']
         
-        else:  # daily (default)
-            for record in attendance_records:
-                day_key = record.check_in_time.strftime('%Y-%m-%d')
-                trends_data[day_key]['check_ins'] += 1
+        elif granularity != 'event_days':
+            hourly = granularity == 'hourly'
+            period_format = '%Y-%m-%d %H:00' if hourly else '%Y-%m-%d'
+            
+            if settings.ATTENDANCE_HOURLY_ROLLUP and not location_filtered:
+                rollups = EventAttendanceHourlyRollup.objects.filter(
+                    event=event, hour__date__gte=start_date, hour__date__lte=end_date
+                )
+                for rollup in rollups:
+                    period = rollup.hour.astimezone(utc).strftime(period_format)
+                    trends_data[period]['check_ins'] += rollup.check_ins
+                    trends_data[period]['check_outs'] += rollup.check_outs
+            else:
+                trunc = TruncHour if hourly else TruncDate
+                check_ins = attendance_records.annotate(
+                    period=trunc('check_in_time', tzinfo=utc)
+                ).values('period').annotate(total=Count('id'))
+                check_outs = attendance_records.filter(check_out_time__isnull=False).annotate(
+                    period=trunc('check_out_time', tzinfo=utc)
+                ).values('period').annotate(total=Count('id'))
                 
-                if record.check_out_time:
-                    checkout_day_key = record.check_out_time.strftime('%Y-%m-%d')
-                    trends_data[checkout_day_key]['check_outs'] += 1
+                for row in check_ins:
+                    trends_data[row['period'].strftime(period_format)]['check_ins'] += row['total']
+                for row in check_outs:
+                    trends_data[row['period'].strftime(period_format)]['check_outs'] += row['total']
         
-        # Convert to list and sort
+        # Convert to list (event days are already in day order)
+        periods = trends_data.keys() if granularity == 'event_days' else sorted(trends_data)
         data = [
             {
                 'period': k,
-                'check_ins': v['check_ins'],
-                'check_outs': v['check_outs']
+                'check_ins': trends_data[k]['check_ins'],
+                'check_outs': trends_data[k]['check_outs']
             }
-            for k, v in sorted(trends_data.items())
+            for k in periods
         ]
         
         result = {
@@ -3942,7 +4159,7 @@ class EventViewSet(viewsets.ModelViewSet):
             suggested_area = {
                 'id': str(request.user.area_from.id),
                 'name': request.user.area_from.area_name,
-                'chapter': request.user.area_from.unit.chapter.chapter_name if request.user.area_from.unit.chapter else None
+                'chapter': request.user.area_from.path_chapter_name or None
             }
         
         return Response({
@@ -4036,15 +4253,31 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        participant = EventParticipant.objects.create(
-            event=event,
-            user=user,
-            status=EventParticipant.ParticipantStatus.REGISTERED,
-            participant_type=participant_type
-        )
+        participant, capacity_message = get_registration_capacity_service().create_participant(event, user, participant_type)
+        if participant is None:
+            return Response({'error': capacity_message}, status=status.HTTP_409_CONFLICT)
         
         serializer = self.get_serializer(participant)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED if participant.status == EventParticipant.ParticipantStatus.WAITLISTED else status.HTTP_201_CREATED
+        )
+    
+    @action(detail=True, methods=['post'], url_name="accept-offer", url_path="accept-offer")
+    def accept_offer(self, request, event_pax_id=None):
+        '''
+        Accept a place offered from the waitlist before the offer expires.
+        '''
+        participant = self.get_object()
+        if participant.user_id != request.user.id:
+            return Response(
+                {'error': _('You can only accept your own waitlist offer.')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        participant, message = get_registration_capacity_service().accept_offer(participant.id)
+        if participant is None:
+            return Response({'error': message}, status=status.HTTP_409_CONFLICT)
+        return Response({'message': message, 'event_user_id': participant.event_pax_id})
     
     #TODO: add role to a service team member AND NOT a participant - low priority
     #TODO: cancel booking        
@@ -4097,27 +4330,23 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                 user=participant.user,
                 check_in_time=check_in_datetime,
             )
+            get_checkin_scan_service().refresh(event.id, [participant.id])
             
             # Broadcast WebSocket update for check-in
             try:
                 print(f"🔔 CHECK-IN API - Starting WebSocket notification for participant: {participant.user.first_name} {participant.user.last_name}")
                 print(f"🔔 CHECK-IN API - Event: {participant.event.name} (ID: {participant.event.id})")
                 
-                participant_data = serialize_participant_for_websocket(participant)
-                print(f"📊 CHECK-IN API - Serialized participant data for: {participant_data.get('user', {}).get('first_name', 'Unknown')}")
-                print(f"📊 CHECK-IN API - Checked in status: {participant_data.get('checked_in', False)}")
-                
+                # Serialized and sent with the next coalesced batch, off the request path
                 websocket_notifier.notify_checkin_update(
                     event_id=str(participant.event.id),
-                    participant_data=participant_data,
+                    participant_id=participant.id,
                     action='checkin',
                     source='automatic'  # Silent update for other clients; calling client handles its own notification
                 )
                 
                 # Notify dashboard users about participant count change
-                supervisor_ids = get_event_supervisors(participant.event)
-                websocket_notifier.notify_event_update(
-                    user_ids=supervisor_ids,
+                websocket_notifier.notify_event_dashboard(
                     event_id=str(participant.event.id),
                     update_type='participant_checked_in',
                     data={'participant_id': str(participant.id)}
@@ -4171,27 +4400,23 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
             first = checked_in.first()
             first.check_out_time = check_out_datetime
             first.save()
+            get_checkin_scan_service().refresh(participant.event_id, [participant.id])
             
             # Broadcast WebSocket update for check-out
             try:
                 print(f"🔔 CHECK-OUT API - Starting WebSocket notification for participant: {participant.user.first_name} {participant.user.last_name}")
                 print(f"🔔 CHECK-OUT API - Event: {participant.event.name} (ID: {participant.event.id})")
                 
-                participant_data = serialize_participant_for_websocket(participant)
-                print(f"📊 CHECK-OUT API - Serialized participant data for: {participant_data.get('user', {}).get('first_name', 'Unknown')}")
-                print(f"📊 CHECK-OUT API - Checked in status: {participant_data.get('checked_in', False)}")
-                
+                # Serialized and sent with the next coalesced batch, off the request path
                 websocket_notifier.notify_checkin_update(
                     event_id=str(participant.event.id),
-                    participant_data=participant_data,
+                    participant_id=participant.id,
                     action='checkout',
                     source='automatic'  # Silent update for other clients; calling client handles its own notification
                 )
                 
                 # Notify dashboard users about participant count change
-                supervisor_ids = get_event_supervisors(participant.event)
-                websocket_notifier.notify_event_update(
-                    user_ids=supervisor_ids,
+                websocket_notifier.notify_event_dashboard(
                     event_id=str(participant.event.id),
                     update_type='participant_checked_out',
                     data={'participant_id': str(participant.id)}
@@ -4208,6 +4433,11 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
         
         serializer = ParticipantManagementSerializer(participant)
         return Response(serializer.data)
+    
+    def perform_update(self, serializer):
+        participant = serializer.save()
+        # Status or badge changes must reach the check-in desk's scan index
+        get_checkin_scan_service().refresh(participant.event_id, [participant.id])
         
     def create(self, request, *args, **kwargs):
         """
@@ -4233,6 +4463,18 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
             
             participant = EventParticipant.objects.get(event_pax_id=event_user_id)
             
+            if participant.status == EventParticipant.ParticipantStatus.WAITLISTED:
+                # No payment is taken until a place is offered from the waitlist
+                return Response({
+                    "event_user_id": data["event_user_id"],
+                    "participant_id": str(participant.id),
+                    "is_paid": False,
+                    "waitlisted": True,
+                    "payment_method": None,
+                    "needs_verification": False,
+                    "requires_payment_completion": False,
+                }, status=status.HTTP_202_ACCEPTED)
+            
             # Check if there are any event payments created
             event_payments = data.get('event_payments', [])
             if not event_payments:
@@ -4435,6 +4677,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(participant)
         participant.status = EventParticipant.ParticipantStatus.CONFIRMED
+        participant.offer_expires_at = None  # confirming a place offered from the waitlist accepts it
         participant.save()
         return Response(serializer.data)
     
@@ -4451,6 +4694,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         participant.status = EventParticipant.ParticipantStatus.CONFIRMED
+        participant.offer_expires_at = None  # confirming a place offered from the waitlist accepts it
         participant.save()
         serializer = self.get_serializer(participant)
         return Response(serializer.data)
@@ -4563,7 +4807,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                 approved=False
             )
             
-            total_amount = 0
+            total_amount = Decimal('0')
             
             # Create orders for each product
             for order_data in orders_data:
@@ -4591,7 +4835,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                         raise ValueError(f"Quantity exceeds maximum order quantity of {product.maximum_order_quantity}")
                     
                     # Calculate price
-                    price_at_purchase = float(order_data['price_at_purchase'])
+                    price_at_purchase = round_money(order_data['price_at_purchase'])
                     if price_at_purchase < 0:
                         raise ValueError("Price cannot be negative")
                     
@@ -4629,7 +4873,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                     )
             
             # Update cart total
-            cart.total = total_amount
+            cart.total = round_money(total_amount)
             cart.save()
             
             # Send email notification in background
@@ -4712,7 +4956,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
                     order.quantity = quantity
             
             if 'price_at_purchase' in data:
-                price = float(data['price_at_purchase'])
+                price = round_money(data['price_at_purchase'])
                 if price < 0:
                     return Response(
                         {'error': _('Price cannot be negative.')},
@@ -4750,7 +4994,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
             
             # Recalculate cart total
             cart = order.cart
-            cart.total = sum(
+            cart.total = sum_money(
                 (o.price_at_purchase or 0) * o.quantity 
                 for o in cart.orders.all()
             )
@@ -4820,7 +5064,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
             
             # Recalculate cart total (excluding cancelled orders)
             cart = order.cart
-            cart.total = sum(
+            cart.total = sum_money(
                 (o.price_at_purchase or 0) * o.quantity 
                 for o in cart.orders.filter(status__in=[
                     EventProductOrder.Status.PENDING,
@@ -5049,9 +5293,8 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
         participant_name = participant_full_name
         event_name = participant.event.name
         
-        # Change participant status to CANCELLED instead of deleting
-        participant.status = EventParticipant.ParticipantStatus.CANCELLED
-        participant.save()
+        # Change participant status to CANCELLED instead of deleting (the freed place is offered to the waitlist)
+        get_registration_capacity_service().cancel(participant.id)
         
         print(f"🚫 Participant {participant.event_pax_id} status changed to CANCELLED")
         
@@ -5154,18 +5397,160 @@ class EventTalkViewSet(viewsets.ModelViewSet):
 
 class EventWorkshopViewSet(viewsets.ModelViewSet):
     '''
-    API endpoint for managing event workshops.
+    API endpoint for managing event workshops and enrolling participants in them.
+    
+    Enrolment endpoints (capacity, waitlist and clash rules in WorkshopEnrolmentService):
+    - POST {id}/enrol/                 {participant?}  enrol, or join the waitlist when full
+    - POST {id}/cancel-enrolment/      {participant?}  drop out; promotes the head of the waitlist
+    - GET  {id}/enrolments/            enrolled list and ordered waitlist (event staff)
+    - GET  capacity/?event=<id>        live remaining places for the schedule page
+    
+    `participant` defaults to the requesting user's participation in the workshop's event;
+    acting for someone else needs the can_edit_participants event permission.
+    
+    Creating, editing and deleting workshops and adding facilitators need the
+    can_edit_event_details permission on the workshop's event.
     '''
-    queryset = EventWorkshop.objects.all()
+    queryset = EventWorkshop.objects.select_related('event', 'primary_facilitator').prefetch_related('facilitators')
     serializer_class = EventWorkshopSerializer
+    permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['event', 'primary_facilitator', 'level', 'is_published', 'is_full']
+    filterset_fields = ['event', 'primary_facilitator', 'is_published', 'is_full']
     ordering_fields = ['start_time', 'end_time', 'max_participants']
     ordering = ['start_time']
     
+    def _check_can_edit(self, event):
+        if not has_event_permission(self.request.user, event, 'can_edit_event_details'):
+            raise exceptions.PermissionDenied(_('You do not have permission to manage workshops for this event'))
+    
+    def perform_create(self, serializer):
+        self._check_can_edit(serializer.validated_data['event'])
+        serializer.save()
+    
+    def perform_update(self, serializer):
+        self._check_can_edit(serializer.instance.event)
+        if 'event' in serializer.validated_data:
+            # Moving a workshop needs the permission on both events
+            self._check_can_edit(serializer.validated_data['event'])
+        # The serializer saves only the edited fields - the counters stay with the enrolment service
+        workshop = serializer.save()
+        # Raising capacity frees places for the waitlist
+        get_workshop_enrolment_service().fill_from_waitlist(workshop.id)
+        workshop.refresh_from_db(fields=['enrolled_count', 'waitlist_count', 'is_full'])
+    
+    def _resolve_participant(self, request, workshop):
+        '''
+        Participant the request acts for, or an error Response
+        '''
+        participant_id = request.data.get('participant')
+        if participant_id:
+            participant = EventParticipant.objects.filter(
+                Q(id=participant_id) if test_safe_uuid(str(participant_id)) else Q(event_pax_id=participant_id),
+                event_id=workshop.event_id,
+            ).first()
+            if participant is None:
+                return None, Response({'error': _('Participant not found for this event')}, status=status.HTTP_404_NOT_FOUND)
+            if participant.user_id != request.user.pk and not has_event_permission(
+                request.user, workshop.event, 'can_edit_participants'
+            ):
+                return None, Response(
+                    {'error': _('You do not have permission to manage other participants')},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            return participant, None
+        
+        participant = EventParticipant.objects.filter(event_id=workshop.event_id, user_id=request.user.pk).first()
+        if participant is None:
+            return None, Response({'error': _('You are not registered for this event')}, status=status.HTTP_404_NOT_FOUND)
+        return participant, None
+    
+    @action(detail=True, methods=['post'], url_path='enrol', permission_classes=[permissions.IsAuthenticated])
+    def enrol(self, request, pk=None):
+        workshop = self.get_object()
+        participant, error = self._resolve_participant(request, workshop)
+        if error:
+            return error
+        
+        enrolment, message, created = get_workshop_enrolment_service().enrol(workshop.id, participant.id)
+        if enrolment is None:
+            return Response({'error': message}, status=status.HTTP_409_CONFLICT)
+        
+        if not created:
+            response_status = status.HTTP_200_OK
+        elif enrolment.status == EventWorkshopEnrolment.EnrolmentStatus.ENROLLED:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_202_ACCEPTED
+        workshop.refresh_from_db(fields=['enrolled_count', 'waitlist_count', 'is_full'])
+        return Response({
+            'message': message,
+            'enrolment': EventWorkshopEnrolmentSerializer(enrolment).data,
+            'remaining_capacity': workshop.remaining_capacity,
+            'waitlist_count': workshop.waitlist_count,
+        }, status=response_status)
+    
+    @action(detail=True, methods=['post'], url_path='cancel-enrolment', permission_classes=[permissions.IsAuthenticated])
+    def cancel_enrolment(self, request, pk=None):
+        workshop = self.get_object()
+        participant, error = self._resolve_participant(request, workshop)
+        if error:
+            return error
+        
+        promoted, message = get_workshop_enrolment_service().cancel(workshop.id, participant.id)
+        workshop.refresh_from_db(fields=['enrolled_count', 'waitlist_count', 'is_full'])
+        return Response({
+            'message': message,
+            'promoted': EventWorkshopEnrolmentSerializer(promoted, many=True).data,
+            'remaining_capacity': workshop.remaining_capacity,
+            'waitlist_count': workshop.waitlist_count,
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'], url_path='enrolments', permission_classes=[permissions.IsAuthenticated])
+    def enrolments(self, request, pk=None):
+        workshop = self.get_object()
+        if not has_event_permission(request.user, workshop.event, 'can_view_participants'):
+            return Response(
+                {'error': _('You do not have permission to view workshop enrolments')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        service = get_workshop_enrolment_service()
+        enrolled = workshop.enrolments.filter(
+            status=EventWorkshopEnrolment.EnrolmentStatus.ENROLLED
+        ).select_related('participant__user').order_by('enrolled_at')
+        waitlist = service.waitlist(workshop).select_related('participant__user')
+        
+        waitlist_data = EventWorkshopEnrolmentSerializer(waitlist, many=True).data
+        for position, entry in enumerate(waitlist_data, start=1):
+            entry['waitlist_position'] = position
+        
+        return Response({
+            'workshop': workshop.id,
+            'max_participants': workshop.max_participants,
+            'remaining_capacity': workshop.remaining_capacity,
+            'enrolled': EventWorkshopEnrolmentSerializer(enrolled, many=True).data,
+            'waitlist': waitlist_data,
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], url_path='capacity', permission_classes=[permissions.AllowAny])
+    def capacity(self, request):
+        event_id = request.query_params.get('event')
+        if not event_id or not test_safe_uuid(event_id):
+            return Response({'error': _('A valid event query parameter is required')}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'event': event_id,
+            'workshops': get_workshop_enrolment_service().capacity_overview(event_id),
+        }, status=status.HTTP_200_OK)
+    
+    def perform_destroy(self, instance):
+        self._check_can_edit(instance.event)
+        instance.delete()
+    
     @action(detail=True, methods=['post'])
     def add_facilitator(self, request, pk=None):
         workshop = self.get_object()
+        self._check_can_edit(workshop.event)
         user_id = request.data.get('user_id')
         
         try:
@@ -5200,4 +5585,21 @@ class EventDayAttendanceViewSet(viewsets.ModelViewSet):
     ordering_fields = ["check_in_time", "check_out_time"]
     ordering = ["-check_in_time"]
     permission_classes = [permissions.IsAuthenticated]
-    
\ No newline at end of file
+    
+
+
+class WebsocketMetricsView(APIView):
+    """
+    Throttled messages, refused connections/bulk operations and idle closes on the
+    websockets for the last ?minutes= minutes (default 15). Staff only.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get('minutes', 15))
+        except ValueError:
+            return Response({
+                'detail': 'minutes must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_websocket_metrics(minutes), status=status.HTTP_200_OK)
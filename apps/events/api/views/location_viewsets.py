@@ -2,10 +2,12 @@ from rest_framework import viewsets, filters, permissions, response, status
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models.query import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
 from apps.events.models import CountryLocation, ClusterLocation, ChapterLocation, UnitLocation, AreaLocation
 from apps.events.api.serializers import *
+from core.location_hierarchy import area_summary, get_chapter_areas, resolve_location
 
 
 class CountryLocationViewSet(viewsets.ModelViewSet):
@@ -68,26 +70,14 @@ class ChapterLocationViewSet(viewsets.ModelViewSet):
         if not location_query:
             return response.Response({"detail": "location query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Try AreaLocation
-        area = AreaLocation.objects.select_related('unit__chapter').filter(
-            area_name__icontains=location_query
-        ).first()
-        if area and area.unit and area.unit.chapter:
-            serializer = ChapterLocationSerializer(area.unit.chapter)
-            data = serializer.data
-            data["area"] = area.area_name
-            data["related"] = self.get_simplified_helper_areas(area, ignore=[area.area_name])
-            return response.Response(data)
-
-        # Try SearchAreaSupportLocation
-        support = SearchAreaSupportLocation.objects.select_related('relative_area__unit__chapter').filter(
-            name__icontains=location_query
-        ).first()
-        if support and support.relative_area and support.relative_area.unit and support.relative_area.unit.chapter:
-            serializer = ChapterLocationSerializer(support.relative_area.unit.chapter)
+        # Try AreaLocation, then SearchAreaSupportLocation aliases, from the in-memory location index
+        area, alias = resolve_location(location_query)
+        if area and area['chapter_id']:
+            chapter = get_object_or_404(ChapterLocation, id=area['chapter_id'])
+            serializer = ChapterLocationSerializer(chapter)
             data = serializer.data
-            data["area"] = support.relative_area.area_name
-            data["related"] = self.get_simplified_helper_areas(support.relative_area, ignore=[support.name])
+            data["area"] = area["area_name"]
+            data["related"] = [name for name in area["aliases"] if name != (alias or area["area_name"])]
             return response.Response(data)
 
         # Try EventVenue
@@ -103,26 +93,12 @@ class ChapterLocationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_name="areas-from-chapter", url_path="areas-from-chapter")
     def get_areas_from_chapter(self, request):
         chapter_name = request.query_params.get("chapter_name")
-        print(chapter_name)
-        chapter = get_object_or_404(ChapterLocation, 
-                          Q(chapter_name=chapter_name) | Q(chapter_code=chapter_name) 
-                          | Q(chapter_id=chapter_name) 
-                          )
-        areas = []
-        for units in chapter.units.all():
-            areas.extend(units.areas.all())
-        
-        areas_serialized = SimplifiedAreaLocationSerializer(areas, many=True)
-        
-        return response.Response(areas_serialized.data, status=status.HTTP_200_OK)
-    
-    @staticmethod
-    def get_simplified_helper_areas(area: AreaLocation, ignore=None):
-        if not ignore:
-            ignore = []
-        serialized = SearchAreaSupportLocationSerializer(area.relative_search_areas.all(), many=True)
-        return [s.get("name") for s in serialized.data if s.get("name") not in ignore]
+        chapter, areas = get_chapter_areas(chapter_name)
+        if chapter is None:
+            raise Http404("No ChapterLocation matches the given query.")
         
+        return response.Response([area_summary(area) for area in areas], status=status.HTTP_200_OK)
+
 
 class UnitLocationViewSet(viewsets.ModelViewSet):
     queryset = UnitLocation.objects.all().select_related(
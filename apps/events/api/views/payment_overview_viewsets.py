@@ -31,6 +31,7 @@ from apps.events.api.serializers.payment_serializers import (
     DonationPaymentListSerializer
 )
 from core.event_permissions import has_event_permission
+from core.statistics import grouped_statistics
 
 
 class PaymentOverviewViewSet(viewsets.ViewSet):
@@ -76,31 +77,26 @@ class PaymentOverviewViewSet(viewsets.ViewSet):
             revenue_breakdown['event_registration_count'] + 
             revenue_breakdown['merchandise_count']
         )
-        verified_payments = EventPayment.objects.filter(
-            event=event,
-            verified=True,
-            status=EventPayment.PaymentStatus.SUCCEEDED
-        ).count()
-        verified_product_payments = ProductPayment.objects.filter(
-            cart__event=event,
-            approved=True,
-            status=ProductPayment.PaymentStatus.SUCCEEDED
-        ).count()
-        verified_payments += verified_product_payments
+        # Verified / pending counts: one query per payment table
+        event_payment_counts = grouped_statistics(
+            EventPayment.objects.filter(event=event),
+            groups={'state': {
+                'verified': Q(verified=True, status=EventPayment.PaymentStatus.SUCCEEDED),
+                'pending': Q(verified=False, status__in=[EventPayment.PaymentStatus.SUCCEEDED, EventPayment.PaymentStatus.PENDING]),
+            }},
+        )['groups']['state']
+        product_payment_counts = grouped_statistics(
+            ProductPayment.objects.filter(cart__event=event),
+            groups={'state': {
+                'verified': Q(approved=True, status=ProductPayment.PaymentStatus.SUCCEEDED),
+                'pending': Q(approved=False, status__in=[ProductPayment.PaymentStatus.SUCCEEDED, ProductPayment.PaymentStatus.PENDING]),
+            }},
+        )['groups']['state']
+        
+        verified_payments = event_payment_counts['verified']['count'] + product_payment_counts['verified']['count']
         
         # Pending payments
-        
-        pending_payments = EventPayment.objects.filter(
-            event=event,
-            verified=False,
-            status__in=[EventPayment.PaymentStatus.SUCCEEDED, EventPayment.PaymentStatus.PENDING]
-        ).count()
-        pending_product_payments = ProductPayment.objects.filter(
-            cart__event=event,
-            approved=False,
-            status__in=[ProductPayment.PaymentStatus.SUCCEEDED, ProductPayment.PaymentStatus.PENDING]
-        ).count()
-        pending_payments += pending_product_payments
+        pending_payments = event_payment_counts['pending']['count'] + product_payment_counts['pending']['count']
         
         # Calculate average payment
         average_payment = Decimal('0.00')
@@ -712,11 +708,35 @@ class PaymentOverviewViewSet(viewsets.ViewSet):
         participants = EventParticipant.objects.filter(event=event).select_related(
             'user',
             'user__area_from',
-            'user__area_from__unit',
-            'user__area_from__unit__chapter',
-            'user__area_from__unit__chapter__cluster'
         )
         
+        # Payment totals of every participant in one grouped query
+        payment_filter = Q(event=event)
+        if include_pending:
+            payment_filter &= Q(status__in=[
+                EventPayment.PaymentStatus.SUCCEEDED,
+                EventPayment.PaymentStatus.PENDING
+            ])
+        else:
+            payment_filter &= Q(status=EventPayment.PaymentStatus.SUCCEEDED)
+        
+        payments_by_participant = {
+            row['user_id']: row
+            for row in EventPayment.objects.filter(payment_filter).order_by().values('user_id').annotate(
+                count=Count('id'),
+                total=Coalesce(Sum('amount'), Decimal('0.00')),
+                verified_count=Count('id', filter=Q(verified=True)),
+                verified_amount=Coalesce(Sum('amount', filter=Q(verified=True)), Decimal('0.00')),
+                pending_count=Count('id', filter=Q(verified=False)),
+                pending_amount=Coalesce(Sum('amount', filter=Q(verified=False)), Decimal('0.00'))
+            )
+        }
+        no_payments = {
+            'count': 0, 'total': Decimal('0.00'),
+            'verified_count': 0, 'verified_amount': Decimal('0.00'),
+            'pending_count': 0, 'pending_amount': Decimal('0.00'),
+        }
+        
         location_data = {}
         
         for participant in participants:
@@ -727,13 +747,13 @@ class PaymentOverviewViewSet(viewsets.ViewSet):
             area_from = participant.user.area_from
             
             # Determine location based on group_by
-            if group_by == 'cluster' and area_from.unit and area_from.unit.chapter:
-                location_id = str(area_from.unit.chapter.cluster.cluster_id)
-                location_name = area_from.unit.chapter.cluster.cluster_id
+            if group_by == 'cluster' and area_from.path_cluster_id:
+                location_id = str(area_from.path_cluster_code)
+                location_name = area_from.path_cluster_code
                 location_type = 'cluster'
-            elif group_by == 'chapter' and area_from.unit:
-                location_id = str(area_from.unit.chapter.id)
-                location_name = area_from.unit.chapter.chapter_name
+            elif group_by == 'chapter' and area_from.path_chapter_id:
+                location_id = str(area_from.path_chapter_id)
+                location_name = area_from.path_chapter_name
                 location_type = 'chapter'
             else:  # area (default)
                 location_id = str(area_from.id)
@@ -756,24 +776,7 @@ class PaymentOverviewViewSet(viewsets.ViewSet):
             
             location_data[location_id]['total_participants'] += 1
             
-            # Get payments for this participant
-            event_filter = Q(user=participant, event=event)
-            if include_pending:
-                event_filter &= Q(status__in=[
-                    EventPayment.PaymentStatus.SUCCEEDED,
-                    EventPayment.PaymentStatus.PENDING
-                ])
-            else:
-                event_filter &= Q(status=EventPayment.PaymentStatus.SUCCEEDED)
-            
-            payments = EventPayment.objects.filter(event_filter).aggregate(
-                count=Count('id'),
-                total=Coalesce(Sum('amount'), Decimal('0.00')),
-                verified_count=Count('id', filter=Q(verified=True)),
-                verified_amount=Coalesce(Sum('amount', filter=Q(verified=True)), Decimal('0.00')),
-                pending_count=Count('id', filter=Q(verified=False)),
-                pending_amount=Coalesce(Sum('amount', filter=Q(verified=False)), Decimal('0.00'))
-            )
+            payments = payments_by_participant.get(participant.id, no_payments)
             
             location_data[location_id]['total_payments'] += payments['count']
             location_data[location_id]['total_amount'] += payments['total']
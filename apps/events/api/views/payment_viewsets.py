@@ -11,6 +11,7 @@ from apps.events.api.serializers import (
     DonationPaymentListSerializer,
 )
 from apps.events.email_utils import send_payment_verification_email
+from core.statistics import grouped_statistics, choice_buckets
 import threading
 
 
@@ -245,24 +246,24 @@ class DonationPaymentViewSet(viewsets.ModelViewSet):
         """
         queryset = self.get_queryset()
         
-        # Overall statistics
-        total_count = queryset.count()
-        total_amount = queryset.filter(
-            status=DonationPayment.PaymentStatus.SUCCEEDED
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        # Overall and per-status statistics in a single query
+        stats = grouped_statistics(
+            queryset,
+            amount_field='amount',
+            groups={'status': choice_buckets('status', DonationPayment.PaymentStatus.choices)},
+        )
+        total_count = stats['count']
+        total_amount = stats['groups']['status'][DonationPayment.PaymentStatus.SUCCEEDED]['amount']
         
-        # Statistics by status
-        status_stats = []
-        for status_choice in DonationPayment.PaymentStatus.choices:
-            status_value = status_choice[0]
-            status_label = status_choice[1]
-            status_donations = queryset.filter(status=status_value)
-            status_stats.append({
+        status_stats = [
+            {
                 "status": status_value,
                 "status_label": status_label,
-                "count": status_donations.count(),
-                "total_amount": status_donations.aggregate(total=Sum('amount'))['total'] or 0
-            })
+                "count": stats['groups']['status'][status_value]['count'],
+                "total_amount": stats['groups']['status'][status_value]['amount']
+            }
+            for status_value, status_label in DonationPayment.PaymentStatus.choices
+        ]
         
         # Statistics by event
         event_stats = queryset.values(
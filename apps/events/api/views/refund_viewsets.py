@@ -9,8 +9,9 @@ from django.db.models import Q, Sum, Count, F
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
 
-from apps.events.models import ParticipantRefund, EventParticipant, Event
+from apps.events.models import ParticipantRefund, EventParticipant, Event, RefundBatch
 from apps.events.api.serializers import (
     ParticipantRefundListSerializer,
     ParticipantRefundDetailSerializer,
@@ -19,7 +20,9 @@ from apps.events.api.serializers import (
 )
 from apps.events.email_utils import send_refund_processed_email
 from apps.events.services.refund_service import get_refund_service
+from apps.events.services.bulk_refund_service import get_bulk_refund_service
 from core.event_permissions import has_event_permission
+from core.statistics import grouped_statistics
 import threading
 
 
@@ -42,6 +45,8 @@ class ParticipantRefundViewSet(viewsets.ModelViewSet):
     
     Custom actions:
     - process_refund: Mark refund as processed and send confirmation email
+    - bulk_process: Queue all approved automatic refunds for an event (Celery + Stripe)
+    - bulk_batch_progress: Per-item progress of a bulk refund batch
     - pending_refunds: Get all pending refunds
     - refund_statistics: Get refund statistics for events
     """
@@ -309,6 +314,74 @@ class ParticipantRefundViewSet(viewsets.ModelViewSet):
                 'refund_id': str(refund.id)
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], url_name='bulk-process', url_path='bulk-process')
+    def bulk_process(self, request):
+        """
+        Queue all approved automatic refunds for an event to be processed through Stripe
+        in the background (e.g. after the event has been cancelled).
+
+        Request body:
+        {
+            "event_id": "<event uuid>",
+            "refund_ids": ["<refund uuid>", ...],  // optional, restricts the batch
+            "include_order_refunds": true          // optional, default true
+        }
+
+        Returns the batch progress; poll bulk-batches/<batch_id>/ for updates.
+        """
+        event_id = request.data.get('event_id')
+        if not event_id:
+            return Response({'error': _('event_id is required')}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            event = Event.objects.get(id=event_id)
+        except (Event.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': _('Event not found')}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check event permission
+        if not has_event_permission(request.user, event, 'can_process_refunds'):
+            return Response(
+                {'error': 'You do not have permission to process refunds for this event'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        bulk_service = get_bulk_refund_service()
+        batch, message = bulk_service.create_batch(
+            event,
+            user=request.user,
+            refund_ids=request.data.get('refund_ids'),
+            include_order_refunds=request.data.get('include_order_refunds', True),
+        )
+
+        if batch is None:
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch.refresh_from_db()
+        return Response({
+            'message': message,
+            'batch': bulk_service.get_progress(batch)
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_name='bulk-batch-progress', url_path='bulk-batches/(?P<batch_id>[^/.]+)')
+    def bulk_batch_progress(self, request, batch_id=None):
+        """
+        Get per-item progress for a bulk refund batch.
+
+        URL: /api/events/payments/refunds/bulk-batches/{batch_id}/
+        """
+        try:
+            batch = RefundBatch.objects.select_related('event').get(id=batch_id)
+        except (RefundBatch.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': _('Refund batch not found')}, status=status.HTTP_404_NOT_FOUND)
+
+        if not has_event_permission(request.user, batch.event, 'can_process_refunds'):
+            return Response(
+                {'error': 'You do not have permission to view refunds for this event'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return Response(get_bulk_refund_service().get_progress(batch))
+
     @action(detail=False, methods=['get'], url_name='pending-refunds', url_path='pending')
     def pending_refunds(self, request):
         """
@@ -348,79 +421,47 @@ class ParticipantRefundViewSet(viewsets.ModelViewSet):
         # Get event_id filter for order refunds
         event_id = request.query_params.get('event_id')
         
-        # Calculate participant refund statistics
-        participant_stats = queryset.aggregate(
-            total_refunds=Count('id'),
-            total_amount=Sum('refund_amount'),
-            pending_count=Count('id', filter=Q(
-                status__in=[
-                    ParticipantRefund.RefundStatus.PENDING,
-                    ParticipantRefund.RefundStatus.IN_PROGRESS
-                ]
-            )),
-            pending_amount=Sum('refund_amount', filter=Q(
-                status__in=[
-                    ParticipantRefund.RefundStatus.PENDING,
-                    ParticipantRefund.RefundStatus.IN_PROGRESS
-                ]
-            )),
-            processed_count=Count('id', filter=Q(status=ParticipantRefund.RefundStatus.PROCESSED)),
-            processed_amount=Sum('refund_amount', filter=Q(status=ParticipantRefund.RefundStatus.PROCESSED))
-        )
+        def refund_buckets(model):
+            return {
+                'pending': Q(status__in=[model.RefundStatus.PENDING, model.RefundStatus.IN_PROGRESS]),
+                'processed': Q(status=model.RefundStatus.PROCESSED),
+            }
         
-        # Calculate order refund statistics
+        def summarise(stats):
+            buckets = stats['groups']['state']
+            return {
+                'total_refunds': stats['count'],
+                'total_amount': stats['amount'],
+                'pending_count': buckets['pending']['count'],
+                'pending_amount': buckets['pending']['amount'],
+                'processed_count': buckets['processed']['count'],
+                'processed_amount': buckets['processed']['amount'],
+            }
+        
+        # Calculate participant refund statistics (one query)
+        participant_stats = summarise(grouped_statistics(
+            queryset, amount_field='refund_amount', groups={'state': refund_buckets(ParticipantRefund)}
+        ))
+        
+        # Calculate order refund statistics (one query)
         from apps.shop.models import OrderRefund
         order_queryset = OrderRefund.objects.all()
         if event_id:
             order_queryset = order_queryset.filter(event_id=event_id)
         
-        order_stats = order_queryset.aggregate(
-            total_refunds=Count('id'),
-            total_amount=Sum('refund_amount'),
-            pending_count=Count('id', filter=Q(
-                status__in=[
-                    OrderRefund.RefundStatus.PENDING,
-                    OrderRefund.RefundStatus.IN_PROGRESS
-                ]
-            )),
-            pending_amount=Sum('refund_amount', filter=Q(
-                status__in=[
-                    OrderRefund.RefundStatus.PENDING,
-                    OrderRefund.RefundStatus.IN_PROGRESS
-                ]
-            )),
-            processed_count=Count('id', filter=Q(status=OrderRefund.RefundStatus.PROCESSED)),
-            processed_amount=Sum('refund_amount', filter=Q(status=OrderRefund.RefundStatus.PROCESSED))
-        )
+        order_stats = summarise(grouped_statistics(
+            order_queryset, amount_field='refund_amount', groups={'state': refund_buckets(OrderRefund)}
+        ))
         
         # Combine statistics
         stats = {
-            # Combined totals
-            'total_refunds': (participant_stats['total_refunds'] or 0) + (order_stats['total_refunds'] or 0),
-            'total_amount': (participant_stats['total_amount'] or 0) + (order_stats['total_amount'] or 0),
-            'pending_count': (participant_stats['pending_count'] or 0) + (order_stats['pending_count'] or 0),
-            'pending_amount': (participant_stats['pending_amount'] or 0) + (order_stats['pending_amount'] or 0),
-            'processed_count': (participant_stats['processed_count'] or 0) + (order_stats['processed_count'] or 0),
-            'processed_amount': (participant_stats['processed_amount'] or 0) + (order_stats['processed_amount'] or 0),
-            # Participant refund breakdown
-            'participant_refunds': {
-                'total_refunds': participant_stats['total_refunds'] or 0,
-                'total_amount': participant_stats['total_amount'] or 0,
-                'pending_count': participant_stats['pending_count'] or 0,
-                'pending_amount': participant_stats['pending_amount'] or 0,
-                'processed_count': participant_stats['processed_count'] or 0,
-                'processed_amount': participant_stats['processed_amount'] or 0,
-            },
-            # Order refund breakdown
-            'order_refunds': {
-                'total_refunds': order_stats['total_refunds'] or 0,
-                'total_amount': order_stats['total_amount'] or 0,
-                'pending_count': order_stats['pending_count'] or 0,
-                'pending_amount': order_stats['pending_amount'] or 0,
-                'processed_count': order_stats['processed_count'] or 0,
-                'processed_amount': order_stats['processed_amount'] or 0,
-            }
+            key: participant_stats[key] + order_stats[key]
+            for key in participant_stats
         }
+        # Participant refund breakdown
+        stats['participant_refunds'] = participant_stats
+        # Order refund breakdown
+        stats['order_refunds'] = order_stats
         
         # Get breakdown by event if no specific event filter
         event_id = request.query_params.get('event_id')
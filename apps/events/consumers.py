@@ -1,8 +1,15 @@
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
-from apps.events.models import Event, EventParticipant, EventDayAttendance
+from apps.events.models import Event, EventParticipant, EventDayAttendance, EventServiceTeamMember
+from apps.events.services.checkin_scan_service import get_checkin_scan_service
+from apps.events.services.roster_service import clamp_page, get_roster_service
+from core.db_executor import db_pool, run_in_pool
+from core.query_profiling import QueryProfilingMixin
+from core.websocket_limits import (
+    SCOPE_EVENT, SCOPE_USER, ConnectionLimitsMixin, claim_operation, release_operation,
+)
 from django.utils import timezone
 from django.core.serializers.json import DjangoJSONEncoder
 import pytz
@@ -34,11 +41,30 @@ def convert_to_london_time(dt):
         return dt
 
 
-class EventCheckInConsumer(AsyncWebsocketConsumer):
+# Bulk message type -> (action, all participants)
+BULK_OPERATIONS = {
+    'bulk_checkin_filtered': ('checkin', False),
+    'bulk_checkout_filtered': ('checkout', False),
+    'bulk_checkin_all': ('checkin', True),
+    'bulk_checkout_all': ('checkout', True),
+}
+
+
+class EventCheckInConsumer(QueryProfilingMixin, ConnectionLimitsMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for live event check-in updates.
     Allows real-time monitoring of participant check-ins for specific events.
+
+    Hot paths (permission check, event data, participant paging) use the async ORM;
+    sync-only work runs in the bounded pools of core.db_executor - 'short' for
+    serialising and single check-ins, 'bulk' for bulk check-in/out - so a long bulk
+    operation can't hold up other connections.
+
+    Connections are capped per user and per event, rate limited and pinged (see
+    core.websocket_limits), and only one bulk check-in/out runs per event at a time.
     """
+    heavy_message_types = frozenset({'subscribe', 'get_participants', 'update_filters', *BULK_OPERATIONS})
+    profiled_message_types = heavy_message_types | {'scan', 'ping', 'pong'}
 
     async def connect(self):
         # Get event ID from URL route
@@ -65,6 +91,10 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
 
         print(f"✅ WebSocket Connect - User {user.username} has permission for event {self.event_id}")
 
+        if not await self.claim_connection_slots([(SCOPE_USER, user.id), (SCOPE_EVENT, self.event_id)]):
+            print(f"❌ WebSocket Connect FAILED - Too many connections for user {user.username} or event {self.event_id}")
+            return
+
         # Join event group
         await self.channel_layer.group_add(
             self.event_group_name,
@@ -74,11 +104,32 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
         print(f"📡 WebSocket Connect - Added to group {self.event_group_name}")
 
         await self.accept()
+        self.start_heartbeat()
+
+        # Roster subscription of this connection (see EventRosterService)
+        self.subscription = None
+        self.window_ids = []
+        self.roster_count = None
+        self.roster_version = 0
+
+        # The check-in screen opening means badges are about to be scanned
+        await self.load_scan_index()
+
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        if 'since_version' in query:
+            # Reconnecting client - it resumes with a subscribe message instead of reloading everything
+            await self.send(text_data=safe_json_dumps({
+                'type': 'resume_ready',
+                'event': await self.get_event_data(),
+                'version': await self.get_roster_version(),
+            }))
+            return
 
         # Send initial event data
         await self.send_initial_data()
 
     async def disconnect(self, close_code):
+        await self.release_connection()
         # Leave event group
         await self.channel_layer.group_discard(
             self.event_group_name,
@@ -92,64 +143,33 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
         try:
             text_data_json = json.loads(text_data)
             message_type = text_data_json.get('type')
+            if not await self.accept_message(message_type):
+                return
 
-            if message_type == 'get_participants':
-                # Handle filter parameters from client
-                filters = text_data_json.get('filters', {})
-                order_by = text_data_json.get('order_by', 'recent_updates')
-                page = text_data_json.get('page', 1)
-                page_size = text_data_json.get('page_size', 50)
-                print(f"🔍 WebSocket get_participants - Filters: {filters}")
-                await self.send_participants_data(filters, order_by, page, page_size)
-            elif message_type == 'update_filters':
-                # Handle filter updates
+            if message_type in ('subscribe', 'get_participants', 'update_filters'):
+                # (Re)register this connection's window - later changes arrive as roster_diff frames
                 filters = text_data_json.get('filters', {})
                 order_by = text_data_json.get('order_by', 'recent_updates')
-                page = text_data_json.get('page', 1)
-                page_size = text_data_json.get('page_size', 50)
+                page, page_size = clamp_page(text_data_json.get('page', 1), text_data_json.get('page_size', 50))
+                print(f"🔍 WebSocket {message_type} - Filters: {filters}")
+                self.subscription = {'filters': filters, 'order_by': order_by, 'page': page, 'page_size': page_size}
+                since_version = text_data_json.get('since_version')
+                known_ids = text_data_json.get('known_ids')
+                if message_type == 'subscribe' and isinstance(since_version, int) and isinstance(known_ids, list):
+                    if await self.resume_subscription([str(known_id) for known_id in known_ids], since_version):
+                        return
                 await self.send_participants_data(filters, order_by, page, page_size)
-            elif message_type == 'bulk_checkin_filtered':
-                # Bulk check-in for filtered participants
-                filters = text_data_json.get('filters', {})
-                result = await self.bulk_checkin(filters, all_participants=False)
+            elif message_type == 'scan':
+                # Single check-in by badge code (same as the REST scan endpoint)
+                result, message = await self.scan_badge(text_data_json.get('code'))
                 await self.send(text_data=safe_json_dumps({
-                    'type': 'bulk_checkin_result',
-                    'success': result['success'],
-                    'checked_in_count': result['checked_in_count'],
-                    'skipped_count': result['skipped_count'],
-                    'message': result['message']
-                }))
-            elif message_type == 'bulk_checkout_filtered':
-                # Bulk check-out for filtered participants
-                filters = text_data_json.get('filters', {})
-                result = await self.bulk_checkout(filters, all_participants=False)
-                await self.send(text_data=safe_json_dumps({
-                    'type': 'bulk_checkout_result',
-                    'success': result['success'],
-                    'checked_out_count': result['checked_out_count'],
-                    'skipped_count': result['skipped_count'],
-                    'message': result['message']
-                }))
-            elif message_type == 'bulk_checkin_all':
-                # Bulk check-in for all confirmed participants
-                result = await self.bulk_checkin({}, all_participants=True)
-                await self.send(text_data=safe_json_dumps({
-                    'type': 'bulk_checkin_result',
-                    'success': result['success'],
-                    'checked_in_count': result['checked_in_count'],
-                    'skipped_count': result['skipped_count'],
-                    'message': result['message']
-                }))
-            elif message_type == 'bulk_checkout_all':
-                # Bulk check-out for all checked-in participants
-                result = await self.bulk_checkout({}, all_participants=True)
-                await self.send(text_data=safe_json_dumps({
-                    'type': 'bulk_checkout_result',
-                    'success': result['success'],
-                    'checked_out_count': result['checked_out_count'],
-                    'skipped_count': result['skipped_count'],
-                    'message': result['message']
+                    'type': 'scan_result',
+                    'code': text_data_json.get('code'),
+                    'message': message,
+                    **result,
                 }))
+            elif message_type in BULK_OPERATIONS:
+                await self.run_bulk_operation(message_type, text_data_json.get('filters', {}))
             elif message_type == 'ping':
                 await self.send(text_data=json.dumps({
                     'type': 'pong',
@@ -161,6 +181,37 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
                 'message': 'Invalid JSON format'
             }))
 
+    async def run_bulk_operation(self, message_type, filters):
+        """
+        Run a bulk check-in/out and send its result - refused while another one is
+        running for the event (from any connection)
+        """
+        action, all_participants = BULK_OPERATIONS[message_type]
+        count_field = 'checked_in_count' if action == 'checkin' else 'checked_out_count'
+        operation = f'bulk:{self.event_id}'
+
+        if not await claim_operation(operation):
+            result = {
+                'success': False,
+                count_field: 0,
+                'skipped_count': 0,
+                'message': 'Another bulk check-in/out is already running for this event',
+            }
+        else:
+            try:
+                bulk_operation = self.bulk_checkin if action == 'checkin' else self.bulk_checkout
+                result = await bulk_operation({} if all_participants else filters, all_participants=all_participants)
+            finally:
+                await release_operation(operation)
+
+        await self.send(text_data=safe_json_dumps({
+            'type': f'bulk_{action}_result',
+            'success': result['success'],
+            count_field: result[count_field],
+            'skipped_count': result['skipped_count'],
+            'message': result['message']
+        }))
+
     async def checkin_update(self, event):
         """
         Handle check-in update messages from the group
@@ -177,7 +228,42 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
         }))
         
         print(f"✅ WebSocket SENT checkin_update to client")
-    
+
+    async def checkin_batch(self, event):
+        """
+        Handle coalesced check-in updates (see CheckInBroadcaster) - one frame per batch,
+        with at most one entry per participant holding their latest state.
+        Subscribed connections only get the part of the batch affecting their window.
+        """
+        if self.subscription is not None:
+            payloads = {update['participant']['id']: update['participant'] for update in event['updates']}
+            activity = [
+                {
+                    'participant_id': update['participant_id'],
+                    'action': update['action'],
+                    'source': update.get('source', 'automatic'),
+                    'timestamp': update['timestamp'],
+                }
+                for update in event['updates']
+            ]
+            await self.push_roster_changes(event.get('version'), set(payloads), payloads, activity)
+            return
+
+        await self.send(text_data=safe_json_dumps({
+            'type': 'checkin_batch',
+            'updates': [
+                {
+                    'participant': update['participant'],
+                    'action': update['action'],  # 'checkin' or 'checkout'
+                    'source': update.get('source', 'automatic'),
+                    'timestamp': update['timestamp'],
+                    'merged': update.get('merged', 1),  # updates for this participant folded into this one
+                }
+                for update in event['updates']
+            ],
+            'timestamp': event['timestamp']
+        }))
+
     async def bulk_action_summary(self, event):
         """
         Handle bulk action summary notifications.
@@ -191,6 +277,15 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
             'skipped_count': event.get('skipped_count', 0),
             'timestamp': event['timestamp']
         }))
+        # Any participant may have changed - refresh the rows this connection shows
+        await self.push_roster_changes(event.get('version'), None)
+
+    async def roster_changed(self, event):
+        """
+        Handle roster changes without a per-participant payload (e.g. a registration import)
+        """
+        changed = set(event['participant_ids']) if event.get('participant_ids') is not None else None
+        await self.push_roster_changes(event.get('version'), changed)
 
     async def participant_registered(self, event):
         """
@@ -199,6 +294,11 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
         participant_name = event['participant'].get('user', {}).get('first_name', 'Unknown')
         print(f"📤 WebSocket SENDING participant_registered - Group: {self.event_group_name}, Participant: {participant_name}")
         
+        if self.subscription is not None:
+            participant = event['participant']
+            await self.push_roster_changes(event.get('version'), {participant['id']}, {participant['id']: participant})
+            return
+        
         await self.send(text_data=safe_json_dumps({
             'type': 'participant_registered',
             'participant': event['participant'],
@@ -209,6 +309,7 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
         """
         Send initial event and participant data when client connects
         """
+        self.subscription = {'filters': {}, 'order_by': 'recent_updates', 'page': 1, 'page_size': 50}
         event_data = await self.get_event_data()
         participants_data = await self.get_participants_data()
         
@@ -224,7 +325,8 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
                 'has_next': participants_data['has_next'],
                 'has_previous': participants_data['has_previous']
             },
-            'filter_options': participants_data['filter_options']
+            'filter_options': participants_data['filter_options'],
+            'version': participants_data['version'],
         }))
 
     async def send_participants_data(self, filters=None, order_by='recent_updates', page=1, page_size=50):
@@ -244,402 +346,163 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
                 'has_next': participants_data['has_next'],
                 'has_previous': participants_data['has_previous']
             },
-            'filter_options': participants_data['filter_options']
+            'filter_options': participants_data['filter_options'],
+            'version': participants_data['version'],
         }))
 
-    @database_sync_to_async
-    def check_event_permission(self, user, event_id):
+    async def resume_subscription(self, known_ids, since_version):
+        """
+        Bring a reconnecting client from since_version up to date with a diff.
+        Returns False when the changes since then are no longer known (client needs a full reload).
+        """
+        result = await self.get_resume_diff(known_ids, since_version)
+        if result is None:
+            return False
+        diff, version = result
+        await self.send(text_data=safe_json_dumps({
+            'type': 'roster_diff',
+            'resumed': True,
+            'version': version,
+            'count': self.roster_count,
+            **diff,
+        }))
+        return True
+
+    async def push_roster_changes(self, version, changed_ids, payloads=None, activity=None):
+        """
+        Send the inserts/updates/removals a roster change causes in this connection's window.
+        changed_ids None means any participant may have changed.
+        """
+        if self.subscription is None:
+            return
+        previous_ids, previous_count = self.window_ids, self.roster_count
+        diff = await self.get_window_diff(changed_ids, payloads)
+        if version:
+            self.roster_version = max(self.roster_version, version)
+        if not (diff['inserts'] or diff['updates'] or diff['removals']) \
+                and diff['order'] == previous_ids and self.roster_count == previous_count:
+            return  # nothing this client shows has changed
+        await self.send(text_data=safe_json_dumps({
+            'type': 'roster_diff',
+            'version': self.roster_version,
+            'count': self.roster_count,
+            'activity': activity or [],
+            **diff,
+        }))
+
+    @db_pool('short')
+    def load_scan_index(self):
+        """Load the event's badges into the shared scan index (no-op while already loaded)"""
+        get_checkin_scan_service().load(self.event_id)
+
+    @db_pool('short')
+    def scan_badge(self, code):
+        """
+        Check in the holder of a badge (needs the check-in permission, like the REST endpoint)
+        """
+        from core.event_permissions import has_event_permission
+        event = Event.objects.get(id=self.event_id)
+        if not has_event_permission(self.scope['user'], event, 'can_access_checkin'):
+            return {'outcome': 'forbidden'}, 'You do not have permission to check in participants for this event.'
+        return get_checkin_scan_service().scan(event, code)
+
+    async def check_event_permission(self, user, event_id):
         """
         Check if user has permission to monitor this event
         """
-        try:
-            event = Event.objects.get(id=event_id)
-            
-            is_superuser = user.is_superuser
-            is_creator = event.created_by == user
-            is_service_team = event.service_team_members.filter(user=user).exists()
-            
-            has_permission = is_superuser or is_creator or is_service_team
-            
-            print(f"🔐 PERMISSION CHECK - User: {user.username} (ID: {user.id})")
-            print(f"   - Event: {event.name} (ID: {event.id})")
-            print(f"   - Is Superuser: {is_superuser}")
-            print(f"   - Is Creator: {is_creator} (Creator: {event.created_by.username if event.created_by else 'None'})")
-            print(f"   - Is Service Team: {is_service_team}")
-            print(f"   - FINAL PERMISSION: {has_permission}")
-            
-            return has_permission
-            
-        except Event.DoesNotExist:
+        event = await Event.objects.filter(id=event_id).only('id', 'name', 'created_by_id').afirst()
+        if event is None:
             print(f"❌ PERMISSION CHECK FAILED - Event {event_id} does not exist")
             return False
+        
+        is_superuser = user.is_superuser
+        is_creator = event.created_by_id == user.id
+        is_service_team = await EventServiceTeamMember.objects.filter(event_id=event.id, user_id=user.id).aexists()
+        
+        has_permission = is_superuser or is_creator or is_service_team
+        
+        print(f"🔐 PERMISSION CHECK - User: {user.username} (ID: {user.id})")
+        print(f"   - Event: {event.name} (ID: {event.id})")
+        print(f"   - Is Superuser: {is_superuser}")
+        print(f"   - Is Creator: {is_creator} (Creator ID: {event.created_by_id})")
+        print(f"   - Is Service Team: {is_service_team}")
+        print(f"   - FINAL PERMISSION: {has_permission}")
+        
+        return has_permission
 
-    @database_sync_to_async
-    def get_event_data(self):
+    async def get_event_data(self):
         """
         Get basic event information
         """
-        try:
-            event = Event.objects.get(id=self.event_id)
-            return {
-                'id': str(event.id),
-                'name': event.name,
-                'start_date': event.start_date.isoformat() if event.start_date else None,
-                'end_date': event.end_date.isoformat() if event.end_date else None,
-                'participant_count': EventParticipant.objects.filter(event=event).count()
-            }
-        except Event.DoesNotExist:
+        event = await Event.objects.filter(id=self.event_id).only('id', 'name', 'start_date', 'end_date').afirst()
+        if event is None:
             return None
-
-    @database_sync_to_async
-    def get_participants_data(self, filters=None, order_by='recent_updates', page=1, page_size=50):
+        return {
+            'id': str(event.id),
+            'name': event.name,
+            'start_date': event.start_date.isoformat() if event.start_date else None,
+            'end_date': event.end_date.isoformat() if event.end_date else None,
+            'participant_count': await EventParticipant.objects.filter(event_id=event.id).acount()
+        }
+
+    async def get_roster_version(self):
+        return await get_roster_service().aversion(self.event_id)
+
+    async def get_participants_data(self, filters=None, order_by='recent_updates', page=1, page_size=50):
         """
         Get current participants data with check-in status, filtering, ordering, and pagination
         """
-        from django.db.models import Q, Max
-        from django.core.paginator import Paginator
         import math
         
-        try:
-            event = Event.objects.get(id=self.event_id)
-            
-            # Base queryset with optimized joins
-            # IMPORTANT: Exclude cancelled participants by default
-            participants = EventParticipant.objects.filter(
-                event=event
-            ).exclude(
-                status='CANCELLED'
-            ).select_related(
-                'user', 'user__area_from', 'user__area_from__unit__chapter', 
-                'user__area_from__unit__chapter__cluster'
-            ).prefetch_related(
-                'participant_event_payments', 'user__product_payments', 
-                'user__carts', 'event_question_answers'
-            )
-            
-            # Apply filters if provided
-            if filters:
-                filter_conditions = Q()
-                
-                # Search filter
-                if filters.get('search'):
-                    search_term = filters['search']
-                    filter_conditions &= (
-                        Q(user__first_name__icontains=search_term) |
-                        Q(user__last_name__icontains=search_term) |
-                        Q(user__primary_email__icontains=search_term) |
-                        Q(user__member_id__icontains=search_term) |
-                        Q(event_pax_id__icontains=search_term)
-                    )
-                
-                # Area filter
-                if filters.get('area'):
-                    area_term = filters['area']
-                    filter_conditions &= (
-                        Q(user__area_from__area_name__icontains=area_term) |
-                        Q(user__area_from__area_code__icontains=area_term)
-                    )
-                
-                # Chapter filter
-                if filters.get('chapter'):
-                    filter_conditions &= Q(user__area_from__unit__chapter__chapter_name__icontains=filters['chapter'])
-                
-                # Cluster filter  
-                if filters.get('cluster'):
-                    filter_conditions &= Q(user__area_from__unit__chapter__cluster__cluster_id__icontains=filters['cluster'])
-                
-                # Status filter
-                if filters.get('status'):
-                    status_upper = filters['status'].upper()
-                    if status_upper in ['REGISTERED', 'CONFIRMED', 'CANCELLED']:
-                        filter_conditions &= Q(status__iexact=status_upper)
-                    elif status_upper == 'CHECKED_IN':
-                        # Participants checked in today
-                        from datetime import date
-                        today = date.today()
-                        filter_conditions &= (
-                            Q(user__event_attendance__check_in_time__date=today) &
-                            Q(user__event_attendance__check_in_time__isnull=False) &
-                            Q(user__event_attendance__check_out_time__isnull=True)
-                        )
-                    elif status_upper == 'NOT_CHECKED_IN':
-                        # Participants not checked in today
-                        from datetime import date
-                        today = date.today()
-                        filter_conditions &= ~Q(
-                            user__event_attendance__check_in_time__date=today,
-                            user__event_attendance__check_in_time__isnull=False
-                        )
-                    elif status_upper == 'PENDING_PAYMENT':
-                        filter_conditions &= Q(verified=False)
-                
-                # Identity filter (email/member ID)
-                if filters.get('identity'):
-                    identity_term = filters['identity']
-                    filter_conditions &= (
-                        Q(user__primary_email__icontains=identity_term) |
-                        Q(user__member_id__icontains=identity_term) |
-                        Q(user__first_name__icontains=identity_term) |
-                        Q(user__last_name__icontains=identity_term) |
-                        Q(event_pax_id__icontains=identity_term)
-                    )
-                
-                # Bank reference filter#
-                if filters.get('bank_reference'):
-                    filter_conditions &= Q(participant_event_payments__bank_reference__icontains=filters['bank_reference'])
-                    filter_conditions |= Q(user__product_payments__bank_reference__icontains=filters['bank_reference'])
-                
-                # Outstanding payments filter
-                if filters.get('outstanding_payments'):
-                    if filters['outstanding_payments'].lower() == 'true':
-                        filter_conditions &= Q(verified=False)  # Has outstanding payments
-                    elif filters['outstanding_payments'].lower() == 'false':
-                        filter_conditions &= Q(verified=True)   # No outstanding payments
-                
-                # Emergency contact name filter
-                if filters.get('emergency_contact_name'):
-                    emergency_name = filters['emergency_contact_name']
-                    filter_conditions &= (
-                        Q(user__community_user_emergency_contacts__first_name__icontains=emergency_name) |
-                        Q(user__community_user_emergency_contacts__last_name__icontains=emergency_name) |
-                        Q(user__community_user_emergency_contacts__preferred_name__icontains=emergency_name)
-                    )
-
-                # Emergency contacts filter
-                if filters.get('emergency_contact_relationship'):
-                    filter_conditions &= Q(
-                        user__community_user_emergency_contacts__contact_relationship__icontains=filters['emergency_contact_relationship']
-                    )
-                
-                # Has emergency contact filter
-                if filters.get('has_emergency_contact'):
-                    has_contact = filters['has_emergency_contact'].lower() == 'true'
-                    if has_contact:
-                        filter_conditions &= Q(user__community_user_emergency_contacts__isnull=False)
-                    else:
-                        filter_conditions &= Q(user__community_user_emergency_contacts__isnull=True)
-                
-                # Allergy filter
-                if filters.get('allergy_name'):
-                    filter_conditions &= Q(
-                        user__user_allergies__allergy__name__icontains=filters['allergy_name']
-                    )
-                
-                # Allergy severity filter
-                if filters.get('allergy_severity'):
-                    filter_conditions &= Q(
-                        user__user_allergies__severity__iexact=filters['allergy_severity']
-                    )
-                
-                # Has allergies filter
-                if filters.get('has_allergies'):
-                    has_allergies = filters['has_allergies'].lower() == 'true'
-                    if has_allergies:
-                        filter_conditions &= Q(user__user_allergies__isnull=False)
-                    else:
-                        filter_conditions &= Q(user__user_allergies__isnull=True)
-                
-                # Medical condition filter
-                if filters.get('medical_condition_name'):
-                    filter_conditions &= Q(
-                        user__user_medical_conditions__condition__name__icontains=filters['medical_condition_name']
-                    )
-                
-                # Medical condition severity filter
-                if filters.get('medical_condition_severity'):
-                    filter_conditions &= Q(
-                        user__user_medical_conditions__severity__iexact=filters['medical_condition_severity']
-                    )
-                
-                # Has medical conditions filter
-                if filters.get('has_medical_conditions'):
-                    has_conditions = filters['has_medical_conditions'].lower() == 'true'
-                    if has_conditions:
-                        filter_conditions &= Q(user__user_medical_conditions__isnull=False)
-                    else:
-                        filter_conditions &= Q(user__user_medical_conditions__isnull=True)
-
-                # Extra question filters
-                if filters.get('question_filters'):
-                    print(f"🔍 Processing question_filters: {filters['question_filters']}")
-                    for question_filter in filters['question_filters']:
-                        print(f"🔍 Processing single question_filter: {question_filter} (type: {type(question_filter)})")
-                        question_id = question_filter.get('question_id')
-                        question_value = question_filter.get('value')
-                        question_type = question_filter.get('question_type')
-                        
-                        if not question_id or not question_value:
-                            continue
-                            
-                        # Get the question to understand its type
-                        from apps.events.models import ExtraQuestion, QuestionAnswer
-                        try:
-                            question = ExtraQuestion.objects.get(id=question_id)
-                        except ExtraQuestion.DoesNotExist:
-                            continue
-                        
-                        # Build filter conditions based on question type
-                        if question.question_type in ['TEXT', 'TEXTAREA', 'INTEGER']:
-                            # Text search in answer_text
-                            filter_conditions &= Q(
-                                event_question_answers__question=question,
-                                event_question_answers__answer_text__icontains=question_value
-                            )
-                        elif question.question_type == 'BOOLEAN':
-                            # Boolean matching
-                            boolean_value = question_value.lower() in ['true', 'yes', '1']
-                            filter_conditions &= Q(
-                                event_question_answers__question=question,
-                                event_question_answers__answer_text__iexact=str(boolean_value).lower()
-                            )
-                        elif question.question_type in ['CHOICE', 'MULTICHOICE']:
-                            # Choice matching - check both selected choices and answer_text
-                            filter_conditions &= Q(
-                                event_question_answers__question=question
-                            ) & (
-                                Q(event_question_answers__selected_choices__text__icontains=question_value) |
-                                Q(event_question_answers__selected_choices__value__icontains=question_value) |
-                                Q(event_question_answers__answer_text__icontains=question_value)
-                            )
-                
-                participants = participants.filter(filter_conditions).distinct()
-            
-            # Apply ordering
-            if order_by == 'recent_updates':
-                participants = participants.annotate(
-                    latest_checkin=Max('user__event_attendance__check_in_time')
-                ).order_by('-latest_checkin', '-registration_date')
-            elif order_by == 'name':
-                participants = participants.order_by('user__first_name', 'user__last_name')
-            elif order_by == 'registration_date':
-                participants = participants.order_by('-registration_date')
-            
-            # Get total count before pagination
-            total_count = participants.count()
-            
-            # Calculate pagination
-            total_pages = math.ceil(total_count / page_size) if page_size > 0 else 1
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            
-            # Apply pagination
-            paginated_participants = participants[start_index:end_index]
-            
-            # Collect filter options from all participants (not just paginated)
-            # Also exclude cancelled participants from filter options
-            all_participants = EventParticipant.objects.filter(
-                event=event
-            ).exclude(
-                status='CANCELLED'
-            ).select_related(
-                'user__area_from__unit__chapter__cluster'
-            ).prefetch_related(
-                'user__community_user_emergency_contacts',
-                'user__user_allergies__allergy',
-                'user__user_medical_conditions__condition'
-            )
-            
-            areas = set()
-            chapters = set() 
-            clusters = set()
-            emergency_contact_names = set()
-            emergency_contact_relationships = set()
-            allergy_names = set()
-            allergy_severities = set()
-            medical_condition_names = set()
-            medical_condition_severities = set()
-            
-            print(f"🔍 Collecting filter options from {all_participants.count()} participants")
-            
-            for p in all_participants:
-                if hasattr(p.user, 'area_from') and p.user.area_from:
-                    if p.user.area_from.area_name:
-                        areas.add(p.user.area_from.area_name)
-                    if hasattr(p.user.area_from, 'unit') and p.user.area_from.unit:
-                        if hasattr(p.user.area_from.unit, 'chapter') and p.user.area_from.unit.chapter:
-                            if p.user.area_from.unit.chapter.chapter_name:
-                                chapters.add(p.user.area_from.unit.chapter.chapter_name)
-                            if hasattr(p.user.area_from.unit.chapter, 'cluster') and p.user.area_from.unit.chapter.cluster:
-                                if p.user.area_from.unit.chapter.cluster.cluster_id:
-                                    clusters.add(p.user.area_from.unit.chapter.cluster.cluster_id)
-                
-                # Collect emergency contact names and relationships
-                for contact in p.user.community_user_emergency_contacts.all():
-                    # Collect contact names for autocomplete
-                    if contact.first_name and contact.last_name:
-                        full_name = f"{contact.first_name} {contact.last_name}"
-                        emergency_contact_names.add(full_name)
-                    if contact.preferred_name:
-                        emergency_contact_names.add(contact.preferred_name)
-                    
-                    # Collect relationships
-                    if contact.contact_relationship:
-                        emergency_contact_relationships.add(contact.get_contact_relationship_display())
-                
-                # Collect allergy information
-                for allergy in p.user.user_allergies.all():
-                    if allergy.allergy and allergy.allergy.name:
-                        allergy_names.add(allergy.allergy.name)
-                    if allergy.severity:
-                        allergy_severities.add(allergy.get_severity_display())
-                
-                # Collect medical condition information
-                for condition in p.user.user_medical_conditions.all():
-                    if condition.condition and condition.condition.name:
-                        medical_condition_names.add(condition.condition.name)
-                    if condition.severity:
-                        medical_condition_severities.add(condition.get_severity_display())
-            
-            # Serialize participants using existing WebSocket serializer
-            from apps.events.websocket_utils import serialize_participant_for_websocket
-            participants_list = []
-            for participant in paginated_participants:
-                participant_data = serialize_participant_for_websocket(participant)
-                participants_list.append(participant_data)
-            
-            return {
-                'results': participants_list,
-                'count': total_count,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_previous': page > 1,
-                'filter_options': {
-                    'areas': sorted(list(areas)),
-                    'chapters': sorted(list(chapters)),
-                    'clusters': sorted(list(clusters)),
-                    'emergency_contact_names': sorted(list(emergency_contact_names)),
-                    'emergency_contact_relationships': sorted(list(emergency_contact_relationships)),
-                    'allergy_names': sorted(list(allergy_names)),
-                    'allergy_severities': sorted(list(allergy_severities)),
-                    'medical_condition_names': sorted(list(medical_condition_names)),
-                    'medical_condition_severities': sorted(list(medical_condition_severities))
-                }
-            }
-            
-            print(f"🔍 Filter options collected - Areas: {len(areas)}, Chapters: {len(chapters)}, Clusters: {len(clusters)}")
-            
-            return result
-        except Event.DoesNotExist:
-            return {
-                'results': [],
-                'count': 0,
-                'total_pages': 0,
-                'has_next': False,
-                'has_previous': False,
-                'filter_options': {
-                    'areas': [],
-                    'chapters': [],
-                    'clusters': [],
-                    'emergency_contact_names': [],
-                    'emergency_contact_relationships': [],
-                    'allergy_names': [],
-                    'allergy_severities': [],
-                    'medical_condition_names': [],
-                    'medical_condition_severities': []
-                }
-            }
+        service = get_roster_service()
+        # Read the version first, so a change made while the page is built is sent again rather than missed
+        version = await service.aversion(self.event_id)
+        window_ids, total_count = await service.awindow(self.event_id, filters, order_by, page, page_size)
+        payloads = await run_in_pool('short', service.serialize, window_ids)
+        filter_options = await run_in_pool('short', service.filter_options, self.event_id)
+        self.window_ids = [participant_id for participant_id in window_ids if participant_id in payloads]
+        self.roster_count = total_count
+        self.roster_version = version
+        
+        total_pages = math.ceil(total_count / page_size) if page_size > 0 else 1
+        return {
+            'results': [payloads[participant_id] for participant_id in self.window_ids],
+            'count': total_count,
+            'total_pages': total_pages,
+            'has_next': page < total_pages,
+            'has_previous': page > 1,
+            'filter_options': filter_options,
+            'version': version,
+        }
+
+    async def get_window_diff(self, changed_ids, payloads=None):
+        """
+        Re-read this connection's window (IDs only) and diff it against what the client shows
+        """
+        service = get_roster_service()
+        subscription = self.subscription
+        window_ids, count = await service.awindow(
+            self.event_id, subscription['filters'], subscription['order_by'], subscription['page'], subscription['page_size'],
+        )
+        changed = set(window_ids) if changed_ids is None else changed_ids
+        diff = await run_in_pool('short', service.diff, self.window_ids, window_ids, changed, payloads)
+        self.window_ids, self.roster_count = window_ids, count
+        return diff
+
+    async def get_resume_diff(self, known_ids, since_version):
+        service = get_roster_service()
+        changed, version = await run_in_pool('short', service.changes_since, self.event_id, since_version)
+        if changed is None:
+            return None
+        subscription = self.subscription
+        window_ids, count = await service.awindow(
+            self.event_id, subscription['filters'], subscription['order_by'], subscription['page'], subscription['page_size'],
+        )
+        diff = await run_in_pool('short', service.diff, known_ids, window_ids, changed)
+        self.window_ids, self.roster_count, self.roster_version = window_ids, count, version
+        return diff, version
     
-    @database_sync_to_async
+    @db_pool('bulk')
     def bulk_checkin(self, filters=None, all_participants=False):
         """
         Perform bulk check-in operation
@@ -727,6 +590,7 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
             
             # Send SINGLE batched notification instead of individual ones
             if checked_in_count > 0:
+                get_checkin_scan_service().refresh(event.id)
                 websocket_notifier.notify_bulk_checkin_update(
                     event_id=str(event.id),
                     checked_in_count=checked_in_count,
@@ -758,7 +622,7 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
                 'message': f'Error: {str(e)}'
             }
     
-    @database_sync_to_async
+    @db_pool('bulk')
     def bulk_checkout(self, filters=None, all_participants=False):
         """
         Perform bulk check-out operation
@@ -842,6 +706,7 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
             
             # Send SINGLE batched notification instead of individual ones
             if checked_out_count > 0:
+                get_checkin_scan_service().refresh(event.id)
                 websocket_notifier.notify_bulk_checkout_update(
                     event_id=str(event.id),
                     checked_out_count=checked_out_count,
@@ -874,11 +739,16 @@ class EventCheckInConsumer(AsyncWebsocketConsumer):
             }
 
 
-class EventDashboardConsumer(AsyncWebsocketConsumer):
+class EventDashboardConsumer(QueryProfilingMixin, ConnectionLimitsMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for general event dashboard updates.
     Provides real-time updates for multiple events that user has access to.
+    Each connection joins one group per event it supervises (event_dashboard_<event_id>),
+    so an event change is a single group_send whatever the number of supervisors.
+    Connections count towards the per-user cap and are rate limited like the check-in ones.
     """
+    heavy_message_types = frozenset({'get_events'})
+    profiled_message_types = heavy_message_types | {'ping', 'pong'}
 
     async def connect(self):
         self.user = self.scope["user"]
@@ -886,8 +756,12 @@ class EventDashboardConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        # Create a user-specific group for dashboard updates
+        if not await self.claim_connection_slots([(SCOPE_USER, self.user.id)]):
+            return
+
+        # Create a user-specific group for updates meant for this user only (e.g. exports)
         self.dashboard_group_name = f'user_dashboard_{self.user.id}'
+        self.event_group_names = set()
 
         # Join dashboard group
         await self.channel_layer.group_add(
@@ -895,14 +769,37 @@ class EventDashboardConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
+        # Joined before accepting, so no update is missed once the client is connected
+        await self.join_event_groups()
         await self.accept()
+        self.start_heartbeat()
 
     async def disconnect(self, close_code):
-        # Leave dashboard group
-        await self.channel_layer.group_discard(
-            self.dashboard_group_name,
-            self.channel_name
-        )
+        await self.release_connection()
+        if not hasattr(self, 'dashboard_group_name'):
+            return
+        # Leave dashboard groups
+        for group_name in [self.dashboard_group_name, *self.event_group_names]:
+            await self.channel_layer.group_discard(
+                group_name,
+                self.channel_name
+            )
+
+    async def join_event_groups(self):
+        """
+        Join the groups of the events this user supervises, leaving those it no longer does.
+
+        Returns:
+            list: Supervised event IDs
+        """
+        event_ids = await self.get_supervised_event_ids()
+        group_names = {f'event_dashboard_{event_id}' for event_id in event_ids}
+        for group_name in group_names - self.event_group_names:
+            await self.channel_layer.group_add(group_name, self.channel_name)
+        for group_name in self.event_group_names - group_names:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+        self.event_group_names = group_names
+        return event_ids
 
     async def receive(self, text_data):
         """
@@ -911,6 +808,8 @@ class EventDashboardConsumer(AsyncWebsocketConsumer):
         try:
             text_data_json = json.loads(text_data)
             message_type = text_data_json.get('type')
+            if not await self.accept_message(message_type):
+                return
 
             if message_type == 'get_events':
                 await self.send_user_events()
@@ -941,42 +840,36 @@ class EventDashboardConsumer(AsyncWebsocketConsumer):
         """
         Send list of events user has access to
         """
-        events_data = await self.get_user_events()
+        # Re-sync groups too, so events the user was added to since connecting start streaming
+        event_ids = await self.join_event_groups()
+        events_data = await self.get_user_events(event_ids)
         
         await self.send(text_data=json.dumps({
             'type': 'user_events',
             'events': events_data
         }))
 
-    @database_sync_to_async
-    def get_user_events(self):
+    @db_pool('short')
+    def get_supervised_event_ids(self):
+        from apps.events.websocket_utils import get_supervised_event_ids
+        return get_supervised_event_ids(self.user)
+
+    async def get_user_events(self, event_ids):
         """
-        Get events that user has access to monitor
+        Get events that user has access to monitor, with their cached dashboard counts
         """
-        from django.db import models
-        
-        events = Event.objects.filter(
-            models.Q(created_by=self.user) |
-            models.Q(service_team_members__user=self.user)
-        ).distinct()
+        events = Event.objects.filter(id__in=event_ids).only('id', 'name', 'start_date', 'end_date')
+        counts = await run_in_pool('short', get_roster_service().dashboard_counts, event_ids)
         
         events_list = []
-        for event in events:
-            # Get checked in count using EventDayAttendance model
-            checked_in_count = EventDayAttendance.objects.filter(
-                event=event,
-                check_in_time__isnull=False,
-                day_date=event.start_date.date() if event.start_date else None
-            ).count()
-            
+        async for event in events:
             event_data = {
                 'id': str(event.id),
                 'name': event.name,
                 'start_date': event.start_date.isoformat() if event.start_date else None,
                 'end_date': event.end_date.isoformat() if event.end_date else None,
-                'participant_count': EventParticipant.objects.filter(event=event).count(),
-                'checked_in_count': checked_in_count
+                **counts[str(event.id)],
             }
             events_list.append(event_data)
         
-        return events_list
\ No newline at end of file
+        return events_list
@@ -41,12 +41,13 @@ def generate_qr_code(data):
     return img_io
 
 
-def send_booking_confirmation_email(participant):
+def send_booking_confirmation_email(participant, connection=None):
     """
     Send a booking confirmation email to a participant with their QR code.
     
     Args:
         participant (EventParticipant): The participant instance
+        connection: Optional open mail connection, reused when sending many confirmations
     
     Returns:
         bool: True if email sent successfully, False otherwise
@@ -94,7 +95,8 @@ def send_booking_confirmation_email(participant):
             subject=subject,
             body=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[recipient_email]
+            to=[recipient_email],
+            connection=connection,
         )
         email.attach_alternative(html_message, "text/html")
         
@@ -471,3 +473,51 @@ def send_refund_processed_email(refund):
         print(f"❌ Full traceback: {traceback.format_exc()}")
         return False
 
+
+
+def send_export_ready_email(export):
+    """
+    Send email to the organiser who requested a background export once its file is stored.
+    
+    Args:
+        export (EventExport): The completed export
+    
+    Returns:
+        bool: True if email sent successfully, False otherwise
+    """
+    try:
+        user = export.requested_by
+        if not user or not user.primary_email:
+            print(f"⚠️ No email address for export {export.id}")
+            return False
+        
+        context = {
+            'user': user,
+            'event_name': export.event.name,
+            'export_label': export.get_export_type_display().lower(),
+            'file_format': export.get_file_format_display(),
+            'row_count': export.row_count,
+            'file_url': export.file.url if export.file else None,
+            'year': datetime.now().year,
+        }
+        
+        subject = f'Export Ready - {export.event.name}'
+        html_message = render_to_string('emails/export_ready.html', context)
+        plain_message = strip_tags(html_message)
+        
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.primary_email]
+        )
+        email.attach_alternative(html_message, "text/html")
+        email.send(fail_silently=False)
+        
+        print(f"✅ Export ready email sent to {user.primary_email}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Failed to send export ready email: {e}")
+        print(f"❌ Full traceback: {traceback.format_exc()}")
+        return False
@@ -0,0 +1,91 @@
+"""
+Management command to release lapsed waitlist offers and refill free places.
+
+Runs immediately (without Celery). Use --schedule to create/update the
+Celery Beat periodic task instead, or --recount to resynchronise the
+registration counters with the participants actually holding places.
+
+Usage:
+    python manage.py expire_waitlist_offers
+    python manage.py expire_waitlist_offers --schedule
+    python manage.py expire_waitlist_offers --recount [--event <event-uuid>]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django_celery_beat.models import PeriodicTask, IntervalSchedule
+
+from apps.events.models import Event
+from apps.events.services.registration_capacity_service import get_registration_capacity_service
+from apps.events.tasks import expire_waitlist_offers
+
+
+class Command(BaseCommand):
+    help = 'Release waitlist offers that were not accepted in time and offer free places to waitlists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Create or update the Celery Beat task (every 15 minutes) instead of running now',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Resynchronise registration counters from participants instead of expiring offers',
+        )
+        parser.add_argument(
+            '--event',
+            type=str,
+            help='With --recount, only this event (UUID); defaults to every event with counters',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            self._schedule()
+            return
+        if options['recount']:
+            self._recount(options['event'])
+            return
+
+        result = expire_waitlist_offers.apply().get()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {result['expired']} offers lapsed, {result['offers']} places offered"
+        ))
+
+    def _recount(self, event_id):
+        events = Event.objects.filter(registration_counters__isnull=False).distinct()
+        if event_id:
+            events = Event.objects.filter(id=event_id)
+            if not events.exists():
+                raise CommandError(f"Event {event_id} not found")
+
+        service = get_registration_capacity_service()
+        for event in events:
+            held = service.recount(event)
+            self.stdout.write(f"  {event.event_code}: {held.get('', 0)} places held")
+        self.stdout.write(self.style.SUCCESS('✓ Registration counters resynchronised'))
+
+    def _schedule(self):
+        schedule, _ = IntervalSchedule.objects.get_or_create(
+            every=15,
+            period=IntervalSchedule.MINUTES,
+        )
+
+        task, created = PeriodicTask.objects.update_or_create(
+            name='Expire Waitlist Offers',
+            defaults={
+                'task': 'events.expire_waitlist_offers',
+                'interval': schedule,
+                'crontab': None,
+                'enabled': True,
+                'description': (
+                    'Releases waitlist offers that were not accepted within the event offer window '
+                    'and offers free places to the next participants on each waitlist.'
+                ),
+            }
+        )
+
+        verb = 'Created' if created else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} periodic task: {task.name}'))
+        self.stdout.write(f'  Task Function: {task.task}')
+        self.stdout.write(f'  Schedule: Every {schedule.every} {schedule.period}')
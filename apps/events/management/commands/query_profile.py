@@ -0,0 +1,58 @@
+"""
+Management command to show the sampled query profile of the API and websockets
+(see core/query_profiling.py - needs QUERY_PROFILING_SAMPLE_RATE > 0 to collect samples).
+
+Usage:
+    python manage.py query_profile
+    python manage.py query_profile --order-by queries --limit 10
+    python manage.py query_profile --endpoint EventViewSet.participants
+    python manage.py query_profile --json
+    python manage.py query_profile --reset
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.query_profiling import get_query_profile, get_sample_rate, reset_query_profile
+
+
+class Command(BaseCommand):
+    help = 'Show per-endpoint query counts, DB/wall time percentiles and likely N+1 queries from sampled requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', type=str, help='Only this endpoint (e.g. EventViewSet.participants)')
+        parser.add_argument(
+            '--order-by', choices=['wall_ms', 'queries', 'db_ms'], default='wall_ms',
+            help='Rank endpoints by the p95 of this measure (default: wall_ms)',
+        )
+        parser.add_argument('--limit', type=int, default=20, help='Number of endpoints to show (default: 20)')
+        parser.add_argument('--json', action='store_true', help='Print the raw aggregates as JSON')
+        parser.add_argument('--reset', action='store_true', help='Delete all collected samples')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_query_profile()
+            self.stdout.write(self.style.SUCCESS('✓ Query profile samples deleted'))
+            return
+
+        profile = get_query_profile(options['endpoint'], options['order_by'])[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(profile, indent=2))
+            return
+
+        if not profile:
+            self.stdout.write(f"No samples yet (QUERY_PROFILING_SAMPLE_RATE = {get_sample_rate()})")
+            return
+
+        self.stdout.write(
+            f"{'endpoint':<55} {'samples':>7} {'queries p50/p95':>16} {'db ms p95':>10} {'wall ms p50/p95':>18} {'N+1':>5}"
+        )
+        for row in profile:
+            self.stdout.write(
+                f"{row['endpoint'][:55]:<55} {row['samples']:>7} "
+                f"{row['queries']['p50']:>7}/{row['queries']['p95']:<8} {row['db_ms']['p95']:>10} "
+                f"{row['wall_ms']['p50']:>8}/{row['wall_ms']['p95']:<9} {row['n_plus_one']:>5}"
+            )
+            for duplicate in row['duplicates'] if row['n_plus_one'] else []:
+                self.stdout.write(f"    {duplicate['count']}x {duplicate['sql'][:150]}")
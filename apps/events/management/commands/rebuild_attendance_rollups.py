@@ -0,0 +1,38 @@
+"""
+Management command to (re)build the hourly attendance rollup table.
+
+Run once after enabling ATTENDANCE_HOURLY_ROLLUP to backfill existing check-ins,
+or after attendance records were deleted/edited outside the check-in flows.
+
+Usage:
+    python manage.py rebuild_attendance_rollups
+    python manage.py rebuild_attendance_rollups --event <event-uuid>
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.models import Event, EventAttendanceHourlyRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly check-in/check-out rollups from EventDayAttendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event',
+            type=str,
+            help='Only rebuild this event (UUID); defaults to every event with attendance',
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.filter(attendance_records__isnull=False).distinct()
+        if options['event']:
+            events = Event.objects.filter(id=options['event'])
+            if not events.exists():
+                raise CommandError(f"Event {options['event']} not found")
+
+        for event in events:
+            buckets = EventAttendanceHourlyRollup.rebuild(event)
+            self.stdout.write(f"  {event.event_code}: {buckets} hourly buckets")
+
+        self.stdout.write(self.style.SUCCESS('✓ Attendance rollups rebuilt'))
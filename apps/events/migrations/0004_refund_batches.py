@@ -0,0 +1,60 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:29
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_alter_eventrole_role_name'),
+        ('shop', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefundBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('COMPLETED_WITH_ERRORS', 'Completed With Errors')], default='RUNNING', max_length=30, verbose_name='batch status')),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('succeeded_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batches', to=settings.AUTH_USER_MODEL, verbose_name='created by')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refund_batches', to='events.event', verbose_name='event')),
+            ],
+            options={
+                'verbose_name': 'Refund Batch',
+                'verbose_name_plural': 'Refund Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RefundBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('PROCESSING', 'Processing'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='QUEUED', max_length=20, verbose_name='item status')),
+                ('idempotency_key', models.CharField(max_length=255, unique=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('stripe_refund_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='events.refundbatch', verbose_name='batch')),
+                ('order_refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='batch_items', to='shop.orderrefund', verbose_name='order refund')),
+                ('participant_refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='batch_items', to='events.participantrefund', verbose_name='participant refund')),
+            ],
+            options={
+                'verbose_name': 'Refund Batch Item',
+                'verbose_name_plural': 'Refund Batch Items',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['batch', 'status'], name='events_refu_batch_i_c4ee29_idx')],
+            },
+        ),
+    ]
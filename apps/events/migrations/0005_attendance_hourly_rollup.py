@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_refund_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventAttendanceHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='hour (UTC)')),
+                ('check_ins', models.PositiveIntegerField(default=0, verbose_name='check-ins')),
+                ('check_outs', models.PositiveIntegerField(default=0, verbose_name='check-outs')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_hourly_rollups', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Event Attendance Hourly Rollup',
+                'verbose_name_plural': 'Event Attendance Hourly Rollups',
+                'ordering': ['hour'],
+                'constraints': [models.UniqueConstraint(fields=('event', 'hour'), name='unique_event_attendance_hour')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_area_paths(apps, schema_editor):
+    AreaLocation = apps.get_model('events', 'AreaLocation')
+    areas = list(AreaLocation.objects.select_related('unit__chapter__cluster__world_location'))
+    for area in areas:
+        unit = area.unit
+        chapter = unit.chapter
+        cluster = chapter.cluster
+        country = cluster.world_location
+        area.path_chapter = chapter
+        area.path_cluster = cluster
+        area.path_country = country
+        area.path_chapter_name = chapter.chapter_name
+        area.path_cluster_code = cluster.cluster_id
+        area.path_country_name = country.country.name if country.country else ''
+        # Same label AreaLocation.__str__ used to build by walking the hierarchy
+        area.path_display = (
+            f"{country.general_sector} -> {country.specific_sector} -> {country.country}"
+            f" -> Cluster {cluster.cluster_id} -> {chapter.chapter_name}"
+            f" -> UNIT {unit.unit_name} -> {area.area_name}"
+        )
+    AreaLocation.objects.bulk_update(areas, [
+        'path_chapter', 'path_cluster', 'path_country',
+        'path_chapter_name', 'path_cluster_code', 'path_country_name', 'path_display',
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_attendance_hourly_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_chapter',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.chapterlocation'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_chapter_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=150, verbose_name='path-chapter-name'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_cluster',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.clusterlocation'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_cluster_code',
+            field=models.CharField(blank=True, default='', editable=False, max_length=2, verbose_name='path-cluster-code'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_country',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.countrylocation'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_country_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='path-country-name'),
+        ),
+        migrations.AddField(
+            model_name='arealocation',
+            name='path_display',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='path-display'),
+        ),
+        migrations.RunPython(populate_area_paths, migrations.RunPython.noop),
+    ]
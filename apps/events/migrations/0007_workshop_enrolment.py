@@ -0,0 +1,64 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:03
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_area_location_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventWorkshopEnrolment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('ENROLLED', 'Enrolled'), ('WAITLISTED', 'Waitlisted'), ('CANCELLED', 'Cancelled')], default='ENROLLED', max_length=20, verbose_name='status')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('enrolled_at', models.DateTimeField(blank=True, null=True, verbose_name='enrolled at')),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True, verbose_name='cancelled at')),
+            ],
+            options={
+                'verbose_name': 'Event Workshop Enrolment',
+                'verbose_name_plural': 'Event Workshop Enrolments',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='eventworkshop',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='enrolled participants'),
+        ),
+        migrations.AddField(
+            model_name='eventworkshop',
+            name='waitlist_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='waitlisted participants'),
+        ),
+        migrations.AddIndex(
+            model_name='eventworkshop',
+            index=models.Index(fields=['event', 'start_time'], name='events_even_event_i_8dcc98_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventworkshopenrolment',
+            name='participant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workshop_enrolments', to='events.eventparticipant'),
+        ),
+        migrations.AddField(
+            model_name='eventworkshopenrolment',
+            name='workshop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrolments', to='events.eventworkshop'),
+        ),
+        migrations.AddIndex(
+            model_name='eventworkshopenrolment',
+            index=models.Index(fields=['workshop', 'status', 'created_at'], name='events_even_worksho_5bc0ea_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventworkshopenrolment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'CANCELLED'), _negated=True), fields=('workshop', 'participant'), name='unique_active_workshop_enrolment'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:10
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_waitlisted_at(apps, schema_editor):
+    # Existing waitlisted participants keep their registration order on the waitlist
+    EventParticipant = apps.get_model('events', 'EventParticipant')
+    EventParticipant.objects.filter(status='WAITLISTED', waitlisted_at__isnull=True).update(
+        waitlisted_at=F('registration_date')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_workshop_enrolment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRegistrationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant_type', models.CharField(blank=True, default='', max_length=20, verbose_name='participant type')),
+                ('held', models.PositiveIntegerField(default=0, verbose_name='places held')),
+            ],
+            options={
+                'verbose_name': 'Event Registration Counter',
+                'verbose_name_plural': 'Event Registration Counters',
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='participant_type_caps',
+            field=models.JSONField(blank=True, default=dict, help_text='Optional cap per participant type E.g. {"PARTICIPANT": 200, "VOLUNTEER": 20}', verbose_name='participant type caps'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_enabled',
+            field=models.BooleanField(default=True, help_text='When the event is full, new registrations join a waitlist instead of being rejected', verbose_name='waitlist enabled'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_offer_hours',
+            field=models.PositiveIntegerField(default=48, help_text='How long a waitlisted participant has to accept a freed place before it passes to the next in line', validators=[django.core.validators.MinValueValidator(1)], verbose_name='waitlist offer window (hours)'),
+        ),
+        migrations.AddField(
+            model_name='eventparticipant',
+            name='offer_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Set when a place is offered from the waitlist; the place is released if not accepted by then', null=True, verbose_name='waitlist offer expires at'),
+        ),
+        migrations.AddField(
+            model_name='eventparticipant',
+            name='waitlisted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='waitlisted at'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='maximum_attendees',
+            field=models.IntegerField(blank=True, default=0, help_text='Registration cap for the whole event, 0 or empty for unlimited', null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='maximum attendees'),
+        ),
+        migrations.AddIndex(
+            model_name='eventparticipant',
+            index=models.Index(fields=['event', 'status', 'waitlisted_at'], name='participant_waitlist_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventregistrationcounter',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_counters', to='events.event'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventregistrationcounter',
+            constraint=models.UniqueConstraint(fields=('event', 'participant_type'), name='unique_event_registration_counter'),
+        ),
+        migrations.RunPython(backfill_waitlisted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:22
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_registration_capacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('export_type', models.CharField(choices=[('participants', 'Participant Roster'), ('payments', 'Payment Ledger'), ('merch', 'Merch Pick List')], max_length=20, verbose_name='export type')),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], default='csv', max_length=4, verbose_name='file format')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='filters')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='QUEUED', max_length=10, verbose_name='status')),
+                ('file', models.FileField(blank=True, null=True, upload_to='event-exports/', verbose_name='file')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='rows written')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to='events.event')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='event_exports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Event Export',
+                'verbose_name_plural': 'Event Exports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
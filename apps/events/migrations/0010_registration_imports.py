@@ -0,0 +1,67 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:31
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_exports'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationImport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='file name')),
+                ('file_hash', models.CharField(max_length=64, verbose_name='file SHA-256')),
+                ('status', models.CharField(choices=[('VALIDATED', 'Validated'), ('IMPORTING', 'Importing'), ('COMPLETED', 'Completed')], default='VALIDATED', max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('valid_rows', models.PositiveIntegerField(default=0)),
+                ('invalid_rows', models.PositiveIntegerField(default=0)),
+                ('imported_rows', models.PositiveIntegerField(default=0)),
+                ('skipped_rows', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_imports', to='events.event')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registration_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Registration Import',
+                'verbose_name_plural': 'Registration Imports',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistrationImportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('data', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('VALID', 'Valid'), ('INVALID', 'Invalid'), ('IMPORTED', 'Imported'), ('SKIPPED', 'Skipped')], default='VALID', max_length=10)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('warnings', models.JSONField(blank=True, default=list)),
+                ('participant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_rows', to='events.eventparticipant')),
+                ('registration_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='events.registrationimport')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Registration Import Row',
+                'verbose_name_plural': 'Registration Import Rows',
+                'ordering': ['row_number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='registrationimport',
+            constraint=models.UniqueConstraint(fields=('event', 'file_hash'), name='unique_event_registration_import'),
+        ),
+        migrations.AddConstraint(
+            model_name='registrationimportrow',
+            constraint=models.UniqueConstraint(fields=('registration_import', 'row_number'), name='unique_registration_import_row'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_registration_imports'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInSyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, verbose_name='idempotency key')),
+                ('device_id', models.CharField(max_length=100, verbose_name='device')),
+                ('action', models.CharField(choices=[('check_in', 'Check-in'), ('check_out', 'Check-out')], max_length=10, verbose_name='action')),
+                ('client_time', models.DateTimeField(verbose_name='recorded at (device time)')),
+                ('outcome', models.CharField(choices=[('APPLIED', 'Applied'), ('MERGED', 'Merged with an existing check-in'), ('DEFERRED', 'Waiting for its check-in'), ('IGNORED', 'Ignored (already checked out or superseded)'), ('REJECTED', 'Rejected')], max_length=10, verbose_name='outcome')),
+                ('detail', models.CharField(blank=True, max_length=255, verbose_name='detail')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Check-In Sync Operation',
+                'verbose_name_plural': 'Check-In Sync Operations',
+                'ordering': ['client_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='eventdayattendance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='last updated'),
+        ),
+        migrations.AddIndex(
+            model_name='eventdayattendance',
+            index=models.Index(fields=['event', 'updated_at'], name='events_even_event_i_e50c92_idx'),
+        ),
+        migrations.AddField(
+            model_name='checkinsyncoperation',
+            name='attendance',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_operations', to='events.eventdayattendance'),
+        ),
+        migrations.AddField(
+            model_name='checkinsyncoperation',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkin_sync_operations', to='events.event'),
+        ),
+        migrations.AddField(
+            model_name='checkinsyncoperation',
+            name='participant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkin_sync_operations', to='events.eventparticipant'),
+        ),
+        migrations.AddIndex(
+            model_name='checkinsyncoperation',
+            index=models.Index(fields=['event', 'participant', 'outcome'], name='events_chec_event_i_cc8ce3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='checkinsyncoperation',
+            constraint=models.UniqueConstraint(fields=('event', 'idempotency_key'), name='unique_checkin_sync_operation'),
+        ),
+    ]
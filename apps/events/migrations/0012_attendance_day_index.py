@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:14
+
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, Value
+from django.db.models.functions import ExtractDay, Greatest, TruncDate
+
+
+def backfill_event_days(apps, schema_editor):
+    # Same numbering as EventDayAttendance.event_day - one update per event
+    Event = apps.get_model('events', 'Event')
+    EventDayAttendance = apps.get_model('events', 'EventDayAttendance')
+    day_date = TruncDate('check_in_time', tzinfo=dt_timezone.utc)
+    for event_id, start_date in Event.objects.filter(attendance_records__isnull=False).distinct().values_list('id', 'start_date'):
+        records = EventDayAttendance.objects.filter(event_id=event_id)
+        if start_date is None:
+            records.update(day_date=day_date)
+            continue
+        day_offset = ExtractDay(ExpressionWrapper(
+            day_date - Value(start_date.astimezone(dt_timezone.utc).date(), output_field=models.DateField()),
+            output_field=models.DurationField()
+        ))
+        records.update(day_date=day_date, day_index=Greatest(day_offset + 1, Value(1)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_checkin_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventdayattendance',
+            name='day_date',
+            field=models.DateField(blank=True, editable=False, help_text='(UTC) date of the check-in', null=True, verbose_name='day date'),
+        ),
+        migrations.AddField(
+            model_name='eventdayattendance',
+            name='day_index',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text='1-based day of the event - Day 1 = event start date', null=True, verbose_name='day index'),
+        ),
+        migrations.AddIndex(
+            model_name='eventdayattendance',
+            index=models.Index(fields=['event', 'day_date'], name='events_even_event_i_d40585_idx'),
+        ),
+        migrations.RunPython(backfill_event_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:40
+
+from django.db import migrations
+
+from core.identifiers import event_pax_reservations
+
+
+def seed_event_pax_sequences(apps, schema_editor):
+    # Participant IDs were numbered per event, but events can share a code - renumber per code,
+    # continuing after the highest ID already issued with it
+    EventParticipant = apps.get_model('events', 'EventParticipant')
+    IdentifierSequence = apps.get_model('users', 'IdentifierSequence')
+
+    values = {}
+    for event_pax_id in EventParticipant.objects.values_list('event_pax_id', flat=True).iterator(chunk_size=2000):
+        for scope, value in event_pax_reservations(event_pax_id).items():
+            values[scope] = max(values.get(scope, 0), value)
+
+    IdentifierSequence.objects.filter(scope__startswith='event_pax:').delete()
+    IdentifierSequence.objects.bulk_create(
+        [IdentifierSequence(scope=scope, last_value=value) for scope, value in values.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_attendance_day_index'),
+        ('users', '0003_identifier_sequences'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_event_pax_sequences, migrations.RunPython.noop),
+    ]
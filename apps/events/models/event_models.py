@@ -1,5 +1,9 @@
-from datetime import timedelta
-from django.db import models
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, Value
+from django.db.models.functions import ExtractDay, Greatest, TruncDate
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.core import validators
 from django.conf import settings
 from django.forms import ValidationError
@@ -9,6 +13,7 @@ from django.utils.text import slugify
 from .location_models import (
     AreaLocation, ChapterLocation, EventVenue)
 from .organsiation_models import Organisation
+from core.identifiers import assign_event_pax_ids
 import uuid
 
 MAX_LENGTH_EVENT_NAME_CODE = 5
@@ -128,7 +133,20 @@ class Event(models.Model):
     ])
     maximum_attendees = models.IntegerField(_("maximum attendees"), blank=True, null=True, default=0, validators=[
         validators.MinValueValidator(0)
-    ])
+    ], help_text=_("Registration cap for the whole event, 0 or empty for unlimited"))
+    # Registration capacity - enforced by RegistrationCapacityService
+    participant_type_caps = models.JSONField(
+        _("participant type caps"), default=dict, blank=True,
+        help_text=_("Optional cap per participant type E.g. {\"PARTICIPANT\": 200, \"VOLUNTEER\": 20}")
+    )
+    waitlist_enabled = models.BooleanField(
+        _("waitlist enabled"), default=True,
+        help_text=_("When the event is full, new registrations join a waitlist instead of being rejected")
+    )
+    waitlist_offer_hours = models.PositiveIntegerField(
+        _("waitlist offer window (hours)"), default=48, validators=[validators.MinValueValidator(1)],
+        help_text=_("How long a waitlisted participant has to accept a freed place before it passes to the next in line")
+    )
     # marks users that are able to view this event
     supervising_youth_heads = models.ManyToManyField(
         settings.AUTH_USER_MODEL, blank=True,  
@@ -330,14 +348,29 @@ class Event(models.Model):
     )
     
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored start date so save() can renumber attendance days when it moves
+        instance._loaded_start_date = instance.__dict__.get('start_date')
+        return instance
+    
     def save(self, *args, **kwargs):
         self.name = self.name.strip().replace(" ", "-") if self.name else None
         if not self.event_code:
             if not self.name_code:
                 self.name_code = self.name.upper()[:MAX_LENGTH_EVENT_NAME_CODE]
             self.event_code = f"{self.get_event_type_display()}{str(self.start_date.year)}{self.name_code}"
+        
+        start_moved = not self._state.adding and 'start_date' in self.__dict__ and \
+            getattr(self, '_loaded_start_date', self.start_date) != self.start_date
                     
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        
+        if start_moved:
+            EventDayAttendance.refresh_event_days(self)
+        self._loaded_start_date = self.start_date
+        return result
     
     def __str__(self):
         event_type = self.get_event_type_display()
@@ -1189,6 +1222,13 @@ class EventParticipant(models.Model):
         help_text=_("Defines if this participant is visible in participant lists")
     ) # when a user is banned or blacklisted from an event, set this to false to hide them from lists, delete later if needed
     
+    # Waitlist - see RegistrationCapacityService
+    waitlisted_at = models.DateTimeField(_("waitlisted at"), blank=True, null=True)
+    offer_expires_at = models.DateTimeField(
+        _("waitlist offer expires at"), blank=True, null=True,
+        help_text=_("Set when a place is offered from the waitlist; the place is released if not accepted by then")
+    )
+    
     class Meta:
         verbose_name = _("Event Participant")
         verbose_name_plural = _("Event Participants")
@@ -1200,21 +1240,17 @@ class EventParticipant(models.Model):
                 name="unique_event_user_participation"
             ),
         ]
+        indexes = [
+            models.Index(fields=["event", "status", "waitlisted_at"], name="participant_waitlist_idx"),
+        ]
     
     def __str__(self):
         return f"{self.user} - {self.event} ({self.get_status_display()})"
 
     def save(self, *args, **kwargs):
-        if not self.id:
-            super().save(*args, **kwargs)
-            
         if not self.event_pax_id:
-            self.event_pax_id = f"{self.event.event_code}-{self.id}".upper()
-            while EventParticipant.objects.filter(event_pax_id=self.event_pax_id).exists():
-                self.id = uuid.uuid4()
-                self.event_pax_id = f"{self.event.event_code}-{self.id}".upper()
-            if len(self.event_pax_id) > 20:
-                self.event_pax_id = self.event_pax_id[:20]                  
+            # E.g. YYC2026ANCRD-000F, from the event's sequence (see core.identifiers)
+            assign_event_pax_ids([self])
         super().save(*args, **kwargs)
         
     @property
@@ -1227,6 +1263,32 @@ class EventParticipant(models.Model):
         return total
     
 
+class EventRegistrationCounter(models.Model):
+    '''
+    Places held at an event, overall (participant_type '') and per participant type.
+    Only changed through conditional UPDATEs in RegistrationCapacityService, and
+    kept off the Event row so that saving an event never overwrites it.
+    '''
+    OVERALL = ""
+    
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name="registration_counters")
+    participant_type = models.CharField(_("participant type"), max_length=20, blank=True, default=OVERALL)
+    held = models.PositiveIntegerField(_("places held"), default=0)
+    
+    class Meta:
+        verbose_name = _("Event Registration Counter")
+        verbose_name_plural = _("Event Registration Counters")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["event", "participant_type"],
+                name="unique_event_registration_counter"
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} - {self.participant_type or 'overall'}: {self.held}"
+
+
 # EVENT PROPER MODELS
 
 class EventTalk(models.Model):
@@ -1281,7 +1343,9 @@ class EventTalk(models.Model):
 
 class EventWorkshop(models.Model):
     '''
-    !NOT IN USE
+    Breakout workshop within an event. Participants enrol through
+    WorkshopEnrolmentService, which enforces max_participants and keeps the
+    enrolled/waitlist counters below in step with EventWorkshopEnrolment rows.
     '''
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -1324,18 +1388,67 @@ class EventWorkshop(models.Model):
     is_published = models.BooleanField(_("is published"), default=True)
     is_full = models.BooleanField(_("is full"), default=False)
     
+    # Enrolment counters (only changed while the workshop row is locked, see WorkshopEnrolmentService)
+    enrolled_count = models.PositiveIntegerField(_("enrolled participants"), default=0, editable=False)
+    waitlist_count = models.PositiveIntegerField(_("waitlisted participants"), default=0, editable=False)
+    
     class Meta:
         verbose_name = _("Event Workshop")
         verbose_name_plural = _("Event Workshops")
         ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['event', 'start_time']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.event.name}"
     
     @property
     def current_participant_count(self):
-        # This would typically be implemented with a through model for workshop participants
-        return 0  # Placeholder - you'd implement actual counting logic
+        return self.enrolled_count
+    
+    @property
+    def remaining_capacity(self):
+        return max(self.max_participants - self.enrolled_count, 0)
+
+
+class EventWorkshopEnrolment(models.Model):
+    '''
+    A participant's place in a workshop: enrolled, or waiting for a place.
+    The waitlist is ordered by created_at; cancelled rows are kept for history.
+    '''
+    class EnrolmentStatus(models.TextChoices):
+        ENROLLED = "ENROLLED", _("Enrolled")
+        WAITLISTED = "WAITLISTED", _("Waitlisted")
+        CANCELLED = "CANCELLED", _("Cancelled")
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    workshop = models.ForeignKey("EventWorkshop", on_delete=models.CASCADE, related_name="enrolments")
+    participant = models.ForeignKey("EventParticipant", on_delete=models.CASCADE, related_name="workshop_enrolments")
+    status = models.CharField(_("status"), max_length=20, 
+                              choices=EnrolmentStatus.choices, default=EnrolmentStatus.ENROLLED)
+    
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    enrolled_at = models.DateTimeField(_("enrolled at"), blank=True, null=True)
+    cancelled_at = models.DateTimeField(_("cancelled at"), blank=True, null=True)
+    
+    class Meta:
+        verbose_name = _("Event Workshop Enrolment")
+        verbose_name_plural = _("Event Workshop Enrolments")
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workshop', 'participant'],
+                condition=~models.Q(status="CANCELLED"),
+                name="unique_active_workshop_enrolment"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['workshop', 'status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.participant} - {self.workshop.title} ({self.get_status_display()})"
 
 class EventDayAttendance (models.Model):
     '''
@@ -1349,6 +1462,13 @@ class EventDayAttendance (models.Model):
     check_out_time = models.DateTimeField(_("check-out timestamp"), blank=True, null=True)
     
     stale = models.BooleanField(editable=False, default=False, help_text=_("marks this attendance object as stale and can no longer be updated"))
+    # Offline check-in desks pull the records changed since their last sync (see CheckInSyncService)
+    updated_at = models.DateTimeField(_("last updated"), auto_now=True)
+    
+    # Stored so attendance can be filtered, grouped and ordered by event day in the database.
+    # Kept up to date by save(), set_event_day() for bulk writes and refresh_event_days() when the event start moves
+    day_date = models.DateField(_("day date"), editable=False, blank=True, null=True, help_text=_("(UTC) date of the check-in"))
+    day_index = models.PositiveSmallIntegerField(_("day index"), editable=False, blank=True, null=True, help_text=_("1-based day of the event - Day 1 = event start date"))
     
     class Meta:
         verbose_name = _("Event Day Attendance")
@@ -1357,59 +1477,42 @@ class EventDayAttendance (models.Model):
         indexes = [
             models.Index(fields=['event', 'user', 'check_in_time']),
             models.Index(fields=['event', 'check_in_time']),
+            models.Index(fields=['event', 'updated_at']),
+            models.Index(fields=['event', 'day_date']),
         ]
     
     def __str__(self):
         return f"Attendance: {self.user} - {self.event.name} - {self.check_in_time}"
     
-    @property
-    def day_index(self):
+    @staticmethod
+    def event_day(check_in_time, event_start):
         """
-        Calculate 1-based day index from event start date.
-        Day 1 = event start date, Day 2 = start + 1 day, etc.
+        (day_date, day_index) of a check-in, in UTC like the live dashboard trends.
+        Day 1 = event start date, Day 2 = start + 1 day, etc. - check-ins before the start count towards Day 1.
         """
-        if not self.check_in_time or not self.event.start_date:
-            return None
-        
-        # Extract date from check_in_time (should be datetime)
-        from datetime import datetime, date, time
-        if isinstance(self.check_in_time, datetime):
-            check_in_date = self.check_in_time.date()
-        elif isinstance(self.check_in_time, date):
-            check_in_date = self.check_in_time
-        elif isinstance(self.check_in_time, time):
-            # Old data format - time only, assume today's date for calculation
-            return 1
-        else:
-            return None
-        
-        # Extract date from event start_date
-        if isinstance(self.event.start_date, datetime):
-            event_start = self.event.start_date.date()
-        elif isinstance(self.event.start_date, date):
-            event_start = self.event.start_date
-        else:
-            return None
-        
-        delta = (check_in_date - event_start).days
-        return max(1, delta + 1)
-    
-    @property
-    def day_date(self):
-        """The date of this attendance record"""
-        if not self.check_in_time:
-            return None
-        
-        from datetime import datetime, date, time
-        if isinstance(self.check_in_time, datetime):
-            return self.check_in_time.date()
-        elif isinstance(self.check_in_time, date):
-            return self.check_in_time
-        elif isinstance(self.check_in_time, time):
-            # Old data format - time only, return today's date
-            from datetime import date as date_today
-            return date_today.today()
-        return None
+        if not check_in_time:
+            return None, None
+        day_date = check_in_time.astimezone(dt_timezone.utc).date()
+        if not event_start:
+            return day_date, None
+        delta = (day_date - event_start.astimezone(dt_timezone.utc).date()).days
+        return day_date, max(1, delta + 1)
+    
+    def set_event_day(self, event_start=None):
+        """Set day_date/day_index from check_in_time (for writes that bypass save(), e.g. bulk_create)"""
+        self.day_date, self.day_index = self.event_day(self.check_in_time, event_start or self.event.start_date)
+    
+    @classmethod
+    def refresh_event_days(cls, event):
+        """Recompute day_date/day_index of all of an event's attendance records in one update (after its start date moved)"""
+        day_date = TruncDate('check_in_time', tzinfo=dt_timezone.utc)
+        if not event.start_date:
+            return cls.objects.filter(event=event).update(day_date=day_date, day_index=None)
+        event_start = event.start_date.astimezone(dt_timezone.utc).date()
+        day_offset = ExtractDay(ExpressionWrapper(
+            day_date - Value(event_start, output_field=models.DateField()), output_field=models.DurationField()
+        ))
+        return cls.objects.filter(event=event).update(day_date=day_date, day_index=Greatest(day_offset + 1, Value(1)))
 
     @property
     def duration(self):
@@ -1444,6 +1547,13 @@ class EventDayAttendance (models.Model):
             if self.check_out_time <= self.check_in_time:
                 raise ValidationError(_("Check-out must be after check-in"))
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored check-out so save() can tell when a check-out happens
+        instance._loaded_check_out_time = instance.__dict__.get('check_out_time')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Run validation
         self.full_clean()
@@ -1451,5 +1561,201 @@ class EventDayAttendance (models.Model):
         # Mark as stale if finished
         if self.is_finished:
             self.stale = True
+        
+        is_new = self._state.adding
+        checked_out = self.check_out_time is not None and getattr(self, '_loaded_check_out_time', None) is None
+        
+        self.set_event_day()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'check_in_time' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'day_date', 'day_index'}
                 
-        return super().save(*args, **kwargs)
\ No newline at end of file
+        result = super().save(*args, **kwargs)
+        
+        if getattr(settings, 'ATTENDANCE_HOURLY_ROLLUP', False):
+            if is_new:
+                EventAttendanceHourlyRollup.record(self.event_id, self.check_in_time, check_ins=1)
+            if checked_out:
+                EventAttendanceHourlyRollup.record(self.event_id, self.check_out_time, check_outs=1)
+        self._loaded_check_out_time = self.check_out_time
+        
+        return result
+
+
+class EventAttendanceHourlyRollup(models.Model):
+    '''
+    Check-in/check-out counts per event per (UTC) hour, kept up to date by EventDayAttendance writes
+    when settings.ATTENDANCE_HOURLY_ROLLUP is enabled. Lets attendance trend charts for large
+    multi-day events be drawn without scanning every attendance record.
+    '''
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name="attendance_hourly_rollups")
+    hour = models.DateTimeField(_("hour (UTC)"))
+    check_ins = models.PositiveIntegerField(_("check-ins"), default=0)
+    check_outs = models.PositiveIntegerField(_("check-outs"), default=0)
+    
+    class Meta:
+        verbose_name = _("Event Attendance Hourly Rollup")
+        verbose_name_plural = _("Event Attendance Hourly Rollups")
+        ordering = ['hour']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'hour'], name='unique_event_attendance_hour'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} @ {self.hour:%Y-%m-%d %H:00}: {self.check_ins} in / {self.check_outs} out"
+    
+    @staticmethod
+    def truncate_hour(value):
+        return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    
+    @classmethod
+    def record(cls, event_id, when, check_ins=0, check_outs=0):
+        """Atomically add check-ins/check-outs to the bucket containing `when`"""
+        if not isinstance(when, datetime):
+            return
+        hour = cls.truncate_hour(when)
+        rollup, created = cls.objects.get_or_create(
+            event_id=event_id, hour=hour,
+            defaults={'check_ins': check_ins, 'check_outs': check_outs},
+        )
+        if not created:
+            cls.objects.filter(pk=rollup.pk).update(
+                check_ins=models.F('check_ins') + check_ins,
+                check_outs=models.F('check_outs') + check_outs,
+            )
+    
+    @classmethod
+    def rebuild(cls, event):
+        """
+        Recompute every bucket of an event from its attendance records (backfill, or after deletes).
+        
+        Returns:
+            int: Number of hourly buckets written
+        """
+        from django.db import transaction
+        from django.db.models import Count
+        from django.db.models.functions import TruncHour
+        
+        records = EventDayAttendance.objects.filter(event=event).order_by()
+        buckets = {}
+        check_ins = records.annotate(bucket=TruncHour('check_in_time', tzinfo=dt_timezone.utc)).values('bucket').annotate(total=Count('id'))
+        for row in check_ins:
+            buckets.setdefault(row['bucket'], [0, 0])[0] = row['total']
+        check_outs = records.filter(check_out_time__isnull=False).annotate(
+            bucket=TruncHour('check_out_time', tzinfo=dt_timezone.utc)
+        ).values('bucket').annotate(total=Count('id'))
+        for row in check_outs:
+            buckets.setdefault(row['bucket'], [0, 0])[1] = row['total']
+        
+        with transaction.atomic():
+            cls.objects.filter(event=event).delete()
+            cls.objects.bulk_create([
+                cls(event=event, hour=hour, check_ins=ins, check_outs=outs)
+                for hour, (ins, outs) in buckets.items()
+            ])
+        return len(buckets)
+
+
+class CheckInSyncOperation(models.Model):
+    '''
+    A check-in or check-out recorded offline by a check-in desk and uploaded in a sync batch.
+    The idempotency key makes re-uploading a batch safe; the outcome records how it was
+    resolved against the attendance recorded by other desks (see CheckInSyncService).
+    '''
+    class Action(models.TextChoices):
+        CHECK_IN = "check_in", _("Check-in")
+        CHECK_OUT = "check_out", _("Check-out")
+
+    class Outcome(models.TextChoices):
+        APPLIED = "APPLIED", _("Applied")
+        MERGED = "MERGED", _("Merged with an existing check-in")
+        DEFERRED = "DEFERRED", _("Waiting for its check-in")
+        IGNORED = "IGNORED", _("Ignored (already checked out or superseded)")
+        REJECTED = "REJECTED", _("Rejected")
+
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name="checkin_sync_operations")
+    idempotency_key = models.CharField(_("idempotency key"), max_length=100)
+    device_id = models.CharField(_("device"), max_length=100)
+    participant = models.ForeignKey(
+        "EventParticipant", on_delete=models.CASCADE, null=True, blank=True, related_name="checkin_sync_operations"
+    )
+    action = models.CharField(_("action"), max_length=10, choices=Action.choices)
+    client_time = models.DateTimeField(_("recorded at (device time)"))
+    outcome = models.CharField(_("outcome"), max_length=10, choices=Outcome.choices)
+    detail = models.CharField(_("detail"), max_length=255, blank=True)
+    attendance = models.ForeignKey(
+        "EventDayAttendance", on_delete=models.SET_NULL, null=True, blank=True, related_name="sync_operations"
+    )
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Check-In Sync Operation")
+        verbose_name_plural = _("Check-In Sync Operations")
+        ordering = ['client_time']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'idempotency_key'], name='unique_checkin_sync_operation'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'participant', 'outcome']),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id}: {self.action} {self.participant_id} @ {self.client_time} ({self.outcome})"
+
+
+class EventExport(models.Model):
+    '''
+    A participant roster, payment ledger or merch pick list generated in the background
+    (see apps.events.services.export_service) and written to the default storage.
+    '''
+    class ExportType(models.TextChoices):
+        PARTICIPANTS = "participants", _("Participant Roster")
+        PAYMENTS = "payments", _("Payment Ledger")
+        MERCH = "merch", _("Merch Pick List")
+
+    class FileFormat(models.TextChoices):
+        CSV = "csv", _("CSV")
+        XLSX = "xlsx", _("Excel (XLSX)")
+
+    class ExportStatus(models.TextChoices):
+        QUEUED = "QUEUED", _("Queued")
+        RUNNING = "RUNNING", _("Running")
+        COMPLETED = "COMPLETED", _("Completed")
+        FAILED = "FAILED", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name="exports")
+    export_type = models.CharField(_("export type"), max_length=20, choices=ExportType.choices)
+    file_format = models.CharField(_("file format"), max_length=4, choices=FileFormat.choices, default=FileFormat.CSV)
+    filters = models.JSONField(_("filters"), default=dict, blank=True)
+    status = models.CharField(_("status"), max_length=10, choices=ExportStatus.choices, default=ExportStatus.QUEUED)
+    file = models.FileField(_("file"), upload_to='event-exports/', blank=True, null=True)
+    row_count = models.PositiveIntegerField(_("rows written"), default=0)
+    error = models.TextField(_("error"), blank=True, null=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="event_exports"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Event Export")
+        verbose_name_plural = _("Event Exports")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.event_id} - {self.get_export_type_display()} ({self.file_format}) - {self.get_status_display()}"
+
+
+@receiver(post_delete, sender=EventParticipant)
+def event_participant_deleted(sender, instance, **kwargs):
+    # A deleted registration that held a place gives it back to the waitlist
+    if instance.status not in (
+        EventParticipant.ParticipantStatus.REGISTERED,
+        EventParticipant.ParticipantStatus.CONFIRMED,
+        EventParticipant.ParticipantStatus.ATTENDED,
+    ):
+        return
+    from apps.events.services.registration_capacity_service import get_registration_capacity_service
+    event_id, participant_type = instance.event_id, instance.participant_type
+    transaction.on_commit(lambda: get_registration_capacity_service().release_deleted(event_id, participant_type))
@@ -3,8 +3,12 @@ from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 from django.utils.text import slugify
 from django.core import validators
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 import uuid
 
+from core.location_hierarchy import invalidate_location_hierarchy
+
 
 class GeneralSectorType(models.TextChoices):
     EUROPE = "EUROPE", _("Europe")
@@ -69,6 +73,12 @@ class CountryLocation (models.Model):
     general_sector = models.CharField(verbose_name="general world sector", choices=GeneralSectorType)
     specific_sector = models.CharField(verbose_name="specific world sector", choices=SpecificSectorType)
     
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if not is_new:
+            AreaLocation.refresh_paths(AreaLocation.objects.filter(unit__chapter__cluster__world_location=self))
+    
     def __str__(self):
         return f"{self.general_sector} -> {self.specific_sector} -> {self.country}"
     
@@ -85,8 +95,11 @@ class ClusterLocation (models.Model):
     established_date = models.DateField(verbose_name="established-date", blank=True, null=True, auto_now_add=True)
     
     def save(self, *args, **kwargs):
+        is_new = self._state.adding
         self.cluster_id = slugify(self.cluster_id).upper().strip()
-        return super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
+        if not is_new:
+            AreaLocation.refresh_paths(AreaLocation.objects.filter(unit__chapter__cluster=self))
   
     def __str__(self):
         return f"{str(self.world_location)} -> Cluster {self.cluster_id}"
@@ -120,6 +133,7 @@ class ChapterLocation (models.Model):
         unique_together = ("chapter_name", "cluster")
         
     def save(self, *args, **kwargs):
+        is_new = self._state.adding
         if not self.chapter_id:
             super().save(*args, **kwargs)
             chapter_id = slugify(self.chapter_code).upper() # SOE-D20FAG2FSDS
@@ -127,6 +141,8 @@ class ChapterLocation (models.Model):
             
         self.chapter_name = slugify(self.chapter_name.capitalize().strip())
         super().save(*args, **kwargs)
+        if not is_new:
+            AreaLocation.refresh_paths(AreaLocation.objects.filter(unit__chapter=self))
     
     def __str__(self):
         return f"{self.cluster} -> {self.chapter_name}"
@@ -149,8 +165,11 @@ class UnitLocation (models.Model):
         if not self.unit_id: # E.G. D-SOUTHEAST-D20FAG2FSDS
             unit_id = slugify(self.unit_name + "-" + self.chapter.chapter_name).upper() 
             self.unit_id = unit_id + str(self.id)[:MAX_LENGTH_LOCATION_ID - len(unit_id)]
+        is_new = self._state.adding
         self.unit_name = slugify(self.unit_name).upper().strip()
         super().save(*args, **kwargs)
+        if not is_new:
+            AreaLocation.refresh_paths(AreaLocation.objects.filter(unit=self))
     
     def __str__(self):
         return f"{self.chapter} -> UNIT {self.unit_name}"
@@ -177,6 +196,22 @@ class AreaLocation (models.Model):
     parish_communities = models.IntegerField(verbose_name="number-of-parish-communities", default=0, help_text="Number of parish communities in this area", 
                                              validators=[validators.MinValueValidator(0)]
                                              )    
+    
+    # Materialized ancestry (unit -> chapter -> cluster -> country), maintained on save of the area
+    # or any ancestor so reports can group/label areas without walking the hierarchy
+    path_chapter = models.ForeignKey(ChapterLocation, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
+    path_cluster = models.ForeignKey(ClusterLocation, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
+    path_country = models.ForeignKey(CountryLocation, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
+    path_chapter_name = models.CharField(verbose_name="path-chapter-name", max_length=150, blank=True, default="", editable=False)
+    path_cluster_code = models.CharField(verbose_name="path-cluster-code", max_length=2, blank=True, default="", editable=False)
+    path_country_name = models.CharField(verbose_name="path-country-name", max_length=100, blank=True, default="", editable=False)
+    path_display = models.TextField(verbose_name="path-display", blank=True, default="", editable=False)
+    
+    PATH_FIELDS = [
+        "path_chapter", "path_cluster", "path_country",
+        "path_chapter_name", "path_cluster_code", "path_country_name", "path_display",
+    ]
+    
     class Meta:
         unique_together = ("area_name", "unit")
         
@@ -187,10 +222,47 @@ class AreaLocation (models.Model):
             area_id = slugify(self.area_code + "-" + self.unit.chapter.chapter_name).upper() # E.G. FRM-SOUTHEAST-D20FAG2FSDS
             self.area_id = area_id + str(self.id)[:MAX_LENGTH_LOCATION_ID - len(area_id)]
         self.area_name = slugify(self.area_name).capitalize().strip()
+        self.build_path()
         super().save(*args, **kwargs)
+        invalidate_location_hierarchy()
     
     def __str__(self):
-        return f"{self.unit} -> {self.area_name}"
+        return self.path_display or f"{self.unit} -> {self.area_name}"
+    
+    def build_path(self):
+        """Populate the materialized path fields from the unit's ancestry"""
+        unit = self.unit
+        chapter = unit.chapter
+        cluster = chapter.cluster
+        country = cluster.world_location
+        
+        self.path_chapter = chapter
+        self.path_cluster = cluster
+        self.path_country = country
+        self.path_chapter_name = chapter.chapter_name
+        self.path_cluster_code = cluster.cluster_id
+        self.path_country_name = country.country.name if country.country else ""
+        self.path_display = (
+            f"{country} -> Cluster {cluster.cluster_id} -> {chapter.chapter_name}"
+            f" -> UNIT {unit.unit_name} -> {self.area_name}"
+        )
+    
+    @classmethod
+    def refresh_paths(cls, queryset=None):
+        """
+        Rebuild the materialized path of many areas (after an ancestor was renamed or re-parented).
+        
+        Returns:
+            int: Number of areas refreshed
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        areas = list(queryset.select_related("unit__chapter__cluster__world_location"))
+        for area in areas:
+            area.build_path()
+        if areas:
+            cls.objects.bulk_update(areas, cls.PATH_FIELDS, batch_size=500)
+        invalidate_location_hierarchy()
+        return len(areas)
     
 # a unit have areas such as Frimley, Horsham, Worthing, Oxford which are active main areas, but dorking, redhill would be extra searches that would be under the specific
 # area. 
@@ -205,7 +277,9 @@ class SearchAreaSupportLocation (models.Model):
     
     def save(self, *args, **kwargs):
         self.name = slugify(self.name.capitalize().strip())
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        invalidate_location_hierarchy()
+        return result
 
 class EventVenue (models.Model):
     '''
@@ -246,3 +320,12 @@ class EventVenue (models.Model):
         self.name = slugify(self.name.capitalize().strip())
         return super().save(force_insert=force_insert, force_update=force_update, using=using, update_fields=update_fields)
 
+
+@receiver(post_delete, sender=CountryLocation)
+@receiver(post_delete, sender=ClusterLocation)
+@receiver(post_delete, sender=ChapterLocation)
+@receiver(post_delete, sender=UnitLocation)
+@receiver(post_delete, sender=AreaLocation)
+@receiver(post_delete, sender=SearchAreaSupportLocation)
+def location_deleted(sender, **kwargs):
+    invalidate_location_hierarchy()
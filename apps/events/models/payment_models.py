@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -369,13 +371,16 @@ class EventPayment(models.Model):
         self.paid_at = timezone.now()
         self.save()
         
-    def save(self, *args, **kwargs):
+    def assign_references(self):
+        """Tracking number and bank reference - done on save, call before bulk_create"""
         if self.event_payment_tracking_number is None:
             self.event_payment_tracking_number = f"{self.event.event_code}-PAY-{uuid.uuid4()}".upper()
             
         if not self.bank_reference:
             self.bank_reference = f"{self.event.event_code[:5]}{str(uuid.uuid4())[:8].upper()}"
-            
+        
+    def save(self, *args, **kwargs):
+        self.assign_references()
         return super().save(*args, **kwargs)
 
     class Meta:
@@ -601,7 +606,12 @@ class ParticipantRefund(models.Model):
         return OrderRefund.objects.filter(participant_refund=self).aggregate(
             total=models.Sum('refund_amount')
         )['total'] or 0
-    
+
+    @property
+    def stripe_payment_intent(self):
+        """Stripe PaymentIntent of the original event payment (refunds are issued against it)"""
+        return self.event_payment.stripe_payment_intent if self.event_payment else None
+
     def save(self, *args, **kwargs):
         # Auto-generate refund reference if not set
         if not self.refund_reference:
@@ -699,13 +709,16 @@ class DonationPayment(models.Model):
         self.paid_at = timezone.now()
         self.save()
         
-    def save(self, *args, **kwargs):
+    def assign_references(self):
+        """Tracking number and bank reference - done on save, call before bulk_create"""
         if self.event_payment_tracking_number is None:
             self.event_payment_tracking_number = f"{self.event.event_code}-PAY-{uuid.uuid4()}".upper()
             
         if not self.bank_reference:
             self.bank_reference = f"{self.event.event_code[:5]}{str(uuid.uuid4())[:8].upper()}"
-            
+        
+    def save(self, *args, **kwargs):
+        self.assign_references()
         return super().save(*args, **kwargs)
 
     class Meta:
@@ -713,4 +726,136 @@ class DonationPayment(models.Model):
         verbose_name_plural = _("Donation Payments")
 
     def __str__(self):
-        return f"{self.user} - {self.event} - {self.get_status_display()}"
\ No newline at end of file
+        return f"{self.user} - {self.event} - {self.get_status_display()}"
+
+class RefundBatch(models.Model):
+    """
+    A group of automatic refunds submitted to Stripe together (e.g. after an event is cancelled).
+    Each refund is processed by its own Celery job; the batch tracks overall progress.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    class BatchStatus(models.TextChoices):
+        RUNNING = "RUNNING", _("Running")
+        COMPLETED = "COMPLETED", _("Completed")
+        COMPLETED_WITH_ERRORS = "COMPLETED_WITH_ERRORS", _("Completed With Errors")
+
+    event = models.ForeignKey(
+        "Event",
+        on_delete=models.CASCADE,
+        related_name="refund_batches",
+        verbose_name=_("event")
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="refund_batches",
+        verbose_name=_("created by")
+    )
+    status = models.CharField(
+        max_length=30,
+        choices=BatchStatus.choices,
+        default=BatchStatus.RUNNING,
+        verbose_name=_("batch status")
+    )
+
+    # Progress counters (updated atomically by the item jobs)
+    total_items = models.PositiveIntegerField(default=0)
+    succeeded_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Refund Batch")
+        verbose_name_plural = _("Refund Batches")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.event} - {self.succeeded_count + self.failed_count}/{self.total_items} - {self.get_status_display()}"
+
+
+class RefundBatchItem(models.Model):
+    """
+    A single refund inside a RefundBatch. Links to either a ParticipantRefund (event registration)
+    or an OrderRefund (merchandise) and records the Stripe idempotency key used for every attempt.
+    """
+
+    class ItemStatus(models.TextChoices):
+        QUEUED = "QUEUED", _("Queued")
+        PROCESSING = "PROCESSING", _("Processing")
+        SUCCEEDED = "SUCCEEDED", _("Succeeded")
+        FAILED = "FAILED", _("Failed")
+
+    batch = models.ForeignKey(
+        RefundBatch,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name=_("batch")
+    )
+    participant_refund = models.ForeignKey(
+        ParticipantRefund,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="batch_items",
+        verbose_name=_("participant refund")
+    )
+    order_refund = models.ForeignKey(
+        "shop.OrderRefund",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="batch_items",
+        verbose_name=_("order refund")
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=ItemStatus.choices,
+        default=ItemStatus.QUEUED,
+        verbose_name=_("item status")
+    )
+
+    # Re-sent on every retry so Stripe never creates the same refund twice
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    stripe_refund_id = models.CharField(max_length=255, blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Refund Batch Item")
+        verbose_name_plural = _("Refund Batch Items")
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['batch', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.refund.refund_reference if self.refund else self.idempotency_key} - {self.get_status_display()}"
+
+    @property
+    def refund(self):
+        """The ParticipantRefund or OrderRefund this item submits"""
+        return self.participant_refund or self.order_refund
+
+
+@receiver(post_save, sender=ParticipantRefund)
+def participant_refund_saved(sender, instance, **kwargs):
+    # A refunded registration no longer holds a place - cancel it (no-op if already cancelled)
+    # so the place goes to the waitlist. Duplicate-payment refunds keep the registration.
+    if (
+        instance.status != ParticipantRefund.RefundStatus.PROCESSED
+        or instance.refund_reason == ParticipantRefund.RefundReason.DUPLICATE_PAYMENT
+    ):
+        return
+    from apps.events.services.registration_capacity_service import get_registration_capacity_service
+    participant_id = instance.participant_id
+    transaction.on_commit(lambda: get_registration_capacity_service().cancel(participant_id))
@@ -120,4 +120,80 @@ class ParticipantQuestion(models.Model):
         default=PriorityChoices.MEDIUM,
     )
     def __str__(self):
-        return f"Question from {self.participant}: {self.question_subject}"
\ No newline at end of file
+        return f"Question from {self.participant}: {self.question_subject}"
+
+class RegistrationImport(models.Model):
+    '''
+    A spreadsheet of offline registrations uploaded for an event. Uploading validates every row
+    (dry run); committing registers the valid rows in batches (see apps.events.services.registration_import_service).
+    Re-uploading the same file returns the same import, and committing again only picks up rows not yet imported.
+    '''
+    class ImportStatus(models.TextChoices):
+        VALIDATED = "VALIDATED", _("Validated")
+        IMPORTING = "IMPORTING", _("Importing")
+        COMPLETED = "COMPLETED", _("Completed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name="registration_imports")
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="registration_imports"
+    )
+    file_name = models.CharField(_("file name"), max_length=255, blank=True)
+    file_hash = models.CharField(_("file SHA-256"), max_length=64)
+    status = models.CharField(max_length=20, choices=ImportStatus.choices, default=ImportStatus.VALIDATED)
+
+    total_rows = models.PositiveIntegerField(default=0)
+    valid_rows = models.PositiveIntegerField(default=0)
+    invalid_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    skipped_rows = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Registration Import")
+        verbose_name_plural = _("Registration Imports")
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'file_hash'], name='unique_event_registration_import'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} - {self.file_name} ({self.imported_rows}/{self.total_rows})"
+
+
+class RegistrationImportRow(models.Model):
+    '''
+    One spreadsheet row of a RegistrationImport with its validation result and, once imported,
+    the participant it created.
+    '''
+    class RowStatus(models.TextChoices):
+        VALID = "VALID", _("Valid")
+        INVALID = "INVALID", _("Invalid")
+        IMPORTED = "IMPORTED", _("Imported")
+        SKIPPED = "SKIPPED", _("Skipped")
+
+    registration_import = models.ForeignKey("RegistrationImport", on_delete=models.CASCADE, related_name="rows")
+    row_number = models.PositiveIntegerField()
+    data = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=RowStatus.choices, default=RowStatus.VALID)
+    errors = models.JSONField(default=list, blank=True)
+    warnings = models.JSONField(default=list, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    participant = models.ForeignKey(
+        "EventParticipant", on_delete=models.SET_NULL, null=True, blank=True, related_name="import_rows"
+    )
+
+    class Meta:
+        verbose_name = _("Registration Import Row")
+        verbose_name_plural = _("Registration Import Rows")
+        ordering = ['row_number']
+        constraints = [
+            models.UniqueConstraint(fields=['registration_import', 'row_number'], name='unique_registration_import_row'),
+        ]
+
+    def __str__(self):
+        return f"Row {self.row_number} - {self.get_status_display()}"
@@ -0,0 +1,259 @@
+"""
+Bulk Refund Service
+Submits many automatic refunds to Stripe in the background (e.g. after an event is cancelled).
+
+Each refund becomes a RefundBatchItem processed by its own Celery job:
+- The Stripe call carries a per-item idempotency key, so retries never refund twice
+- Rate limits and connection errors are retried with exponential backoff
+- Declines and invalid requests fail the item (and the refund) permanently
+- Batch counters are updated atomically so progress can be polled while jobs run
+"""
+import stripe
+import logging
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from apps.events.models import ParticipantRefund, RefundBatch, RefundBatchItem
+from apps.events.services.refund_service import get_refund_service
+from apps.shop.models import OrderRefund
+from apps.shop.services.order_refund_service import get_order_refund_service
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableRefundError(Exception):
+    """Raised when a Stripe call failed transiently and the item job should be retried"""
+    pass
+
+
+class BulkRefundService:
+    """Service for creating refund batches and processing their items against Stripe"""
+
+    # Stripe errors that are safe to retry with the same idempotency key
+    RETRYABLE_ERRORS = (stripe.RateLimitError, stripe.APIConnectionError)
+
+    ACTIVE_ITEM_STATUSES = [RefundBatchItem.ItemStatus.QUEUED, RefundBatchItem.ItemStatus.PROCESSING]
+
+    def __init__(self, stripe_client=None):
+        self.stripe = stripe_client or stripe
+
+    def create_batch(self, event, user=None, refund_ids=None, include_order_refunds=True):
+        """
+        Create a batch for all approved automatic refunds of an event and enqueue one job per refund.
+
+        Approved refunds are PENDING refunds configured for automatic (Stripe) processing.
+        Refunds already queued in another running batch are skipped.
+
+        Args:
+            event: Event instance
+            user: User starting the batch
+            refund_ids: Optional list of ParticipantRefund/OrderRefund IDs to restrict the batch to
+            include_order_refunds: Also refund merchandise orders for the event
+
+        Returns:
+            tuple: (batch: RefundBatch | None, message: str)
+        """
+        active_items = Q(batch_items__status__in=self.ACTIVE_ITEM_STATUSES)
+
+        participant_refunds = ParticipantRefund.objects.filter(
+            event=event,
+            status=ParticipantRefund.RefundStatus.PENDING,
+            is_automatic_refund=True,
+        ).exclude(active_items)
+        order_refunds = OrderRefund.objects.filter(
+            event=event,
+            status=OrderRefund.RefundStatus.PENDING,
+            is_automatic_refund=True,
+        ).exclude(active_items)
+
+        if refund_ids:
+            participant_refunds = participant_refunds.filter(id__in=refund_ids)
+            order_refunds = order_refunds.filter(id__in=refund_ids)
+        if not include_order_refunds:
+            order_refunds = order_refunds.none()
+
+        participant_refunds = list(participant_refunds)
+        order_refunds = list(order_refunds)
+        total = len(participant_refunds) + len(order_refunds)
+
+        if total == 0:
+            return None, "No approved automatic refunds to process for this event"
+
+        with transaction.atomic():
+            batch = RefundBatch.objects.create(event=event, created_by=user, total_items=total)
+            items = [
+                RefundBatchItem(batch=batch, participant_refund=refund, idempotency_key=self._idempotency_key(batch, refund))
+                for refund in participant_refunds
+            ] + [
+                RefundBatchItem(batch=batch, order_refund=refund, idempotency_key=self._idempotency_key(batch, refund))
+                for refund in order_refunds
+            ]
+            RefundBatchItem.objects.bulk_create(items)
+
+            item_ids = list(batch.items.values_list('id', flat=True))
+            transaction.on_commit(lambda: self._enqueue(item_ids))
+
+        logger.info(f"📦 Refund batch {batch.id} created for {event.event_code} with {total} refunds")
+        return batch, f"{total} refunds queued for processing"
+
+    def process_item(self, item_id, final_attempt=False):
+        """
+        Submit one batch item to Stripe.
+
+        Safe to call repeatedly: finished items are skipped, and an item that was interrupted
+        mid-call is re-sent with the same idempotency key.
+
+        Args:
+            item_id: RefundBatchItem ID
+            final_attempt: Fail the item instead of raising RetryableRefundError
+
+        Returns:
+            str: Final (or current) item status
+
+        Raises:
+            RetryableRefundError: Stripe call failed transiently; retry later
+        """
+        with transaction.atomic():
+            item = RefundBatchItem.objects.select_for_update(of=('self',)).select_related(
+                'participant_refund__event_payment', 'participant_refund__event', 'participant_refund__participant',
+                'order_refund__payment', 'order_refund__event', 'order_refund__cart',
+            ).get(id=item_id)
+
+            if item.status not in self.ACTIVE_ITEM_STATUSES:
+                return item.status
+
+            refund = item.refund
+            service = self._service_for(item)
+
+            if item.status == RefundBatchItem.ItemStatus.QUEUED:
+                valid, message = service.validate_automatic_refund(refund)
+                if not valid:
+                    self._fail_item(item, message, refund=None)
+                    return item.status
+
+                refund.status = refund.RefundStatus.IN_PROGRESS
+                refund.save()
+                item.status = RefundBatchItem.ItemStatus.PROCESSING
+
+            item.attempts += 1
+            item.save()
+
+        try:
+            stripe_refund = service.create_stripe_refund(
+                refund,
+                idempotency_key=item.idempotency_key,
+                stripe_client=self.stripe,
+            )
+        except self.RETRYABLE_ERRORS as e:
+            if final_attempt:
+                self._fail_item(item, f"Gave up after {item.attempts} attempts: {e}", refund=refund)
+                return item.status
+            item.last_error = str(e)
+            item.save(update_fields=['last_error', 'updated_at'])
+            logger.warning(f"⏳ Stripe temporarily unavailable for refund {refund.refund_reference} (attempt {item.attempts}): {e}")
+            raise RetryableRefundError(str(e)) from e
+        except stripe.StripeError as e:
+            self._fail_item(item, str(e), refund=refund)
+            logger.error(f"❌ Stripe rejected refund {refund.refund_reference}: {e}")
+            return item.status
+
+        if stripe_refund.get('status') == 'failed':
+            self._fail_item(item, stripe_refund.get('failure_reason') or 'Refund failed', refund=refund)
+            return item.status
+
+        item.status = RefundBatchItem.ItemStatus.SUCCEEDED
+        item.stripe_refund_id = stripe_refund['id']
+        item.last_error = None
+        item.completed_at = timezone.now()
+        item.save()
+        self._record_outcome(item.batch_id, succeeded=True)
+
+        logger.info(f"⏳ Stripe refund {refund.refund_reference} initiated by batch {item.batch_id}. Awaiting manual verification.")
+        return item.status
+
+    def get_progress(self, batch):
+        """
+        Summarise a batch for progress polling.
+
+        Returns:
+            dict: Batch counters plus per-item status
+        """
+        items = batch.items.select_related('participant_refund', 'order_refund')
+        processed = batch.succeeded_count + batch.failed_count
+
+        return {
+            'batch_id': str(batch.id),
+            'event_id': str(batch.event_id),
+            'status': batch.status,
+            'total_items': batch.total_items,
+            'processed': processed,
+            'succeeded': batch.succeeded_count,
+            'failed': batch.failed_count,
+            'pending': batch.total_items - processed,
+            'percent_complete': round(processed / batch.total_items * 100, 1) if batch.total_items else 100.0,
+            'created_at': batch.created_at,
+            'completed_at': batch.completed_at,
+            'items': [
+                {
+                    'id': item.id,
+                    'refund_type': 'participant' if item.participant_refund_id else 'order',
+                    'refund_id': str(item.refund.id),
+                    'refund_reference': item.refund.refund_reference,
+                    'amount': str(item.refund.refund_amount),
+                    'status': item.status,
+                    'attempts': item.attempts,
+                    'stripe_refund_id': item.stripe_refund_id,
+                    'last_error': item.last_error,
+                }
+                for item in items
+            ],
+        }
+
+    def _enqueue(self, item_ids):
+        # Import here to avoid circular imports
+        from apps.events.tasks import process_refund_batch_item
+
+        for item_id in item_ids:
+            process_refund_batch_item.delay(item_id)
+
+    def _fail_item(self, item, reason, refund=None):
+        """Mark an item (and its refund, if it reached Stripe) as failed"""
+        if refund is not None:
+            refund.status = refund.RefundStatus.FAILED
+            refund.stripe_failure_reason = reason
+            refund.save()
+
+        item.status = RefundBatchItem.ItemStatus.FAILED
+        item.last_error = reason
+        item.completed_at = timezone.now()
+        item.save()
+        self._record_outcome(item.batch_id, succeeded=False)
+
+    def _record_outcome(self, batch_id, succeeded):
+        """Atomically bump the batch counters and close the batch once every item finished"""
+        counter = 'succeeded_count' if succeeded else 'failed_count'
+        RefundBatch.objects.filter(id=batch_id).update(**{counter: F(counter) + 1})
+
+        finished = RefundBatch.objects.filter(
+            id=batch_id,
+            status=RefundBatch.BatchStatus.RUNNING,
+            total_items__lte=F('succeeded_count') + F('failed_count'),
+        )
+        finished.filter(failed_count=0).update(status=RefundBatch.BatchStatus.COMPLETED, completed_at=timezone.now())
+        finished.filter(failed_count__gt=0).update(
+            status=RefundBatch.BatchStatus.COMPLETED_WITH_ERRORS, completed_at=timezone.now()
+        )
+
+    def _service_for(self, item):
+        return get_refund_service() if item.participant_refund_id else get_order_refund_service()
+
+    @staticmethod
+    def _idempotency_key(batch, refund):
+        # Unique per batch so a refund that failed and is re-batched gets a fresh Stripe request
+        return f"refund-batch-{batch.id}-{refund.refund_reference}"
+
+
+# Convenience function for quick access
+def get_bulk_refund_service(stripe_client=None):
+    """Get instance of BulkRefundService"""
+    return BulkRefundService(stripe_client)
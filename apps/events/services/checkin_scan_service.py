@@ -0,0 +1,252 @@
+"""
+Check-In Scan Service
+Badge scan index behind the check-in desk's scan endpoint.
+
+- When check-in opens (the check-in screen connects, or the first badge is scanned) the
+  event's participants are loaded into the shared cache in one pass: one entry per badge
+  code (event pax ID and secondary reference) with the participant ID, name, status and
+  today's open attendance
+- A scan resolves the badge from the cache and records the check-in with a single
+  attendance insert (plus the ATTENDED status update on a participant's first arrival).
+  Duplicate scans, cancelled registrations and badges of another event are reported
+  without loading the participant
+- Check-ins/outs, cancellations and participant edits made elsewhere refresh the affected
+  entries; bulk actions drop the index so it is reloaded on the next scan
+- Badge keys include a generation that changes on every reload, so entries of a dropped
+  index can never be read again
+"""
+import logging
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.events.models import EventDayAttendance, EventParticipant
+
+logger = logging.getLogger(__name__)
+
+ParticipantStatus = EventParticipant.ParticipantStatus
+
+SCAN_LOCK_TTL = 10  # seconds a badge stays claimed by the desk recording it
+MAX_CODE_LENGTH = 100
+
+# Scan outcomes
+CHECKED_IN = 'checked_in'
+ALREADY_CHECKED_IN = 'already_checked_in'
+WRONG_EVENT = 'wrong_event'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+NOT_STARTED = 'not_started'
+
+REFUSED_STATUSES = (ParticipantStatus.CANCELLED, ParticipantStatus.WAITLISTED)
+
+ENTRY_FIELDS = (
+    'id', 'event_id', 'event_pax_id', 'secondary_reference_id', 'user_id',
+    'user__first_name', 'user__last_name', 'status',
+)
+
+
+def get_scan_index_ttl():
+    """How long (seconds) a loaded scan index lives in the cache"""
+    return getattr(settings, 'CHECKIN_SCAN_INDEX_TTL', 60 * 60 * 24)
+
+
+def _index_key(event_id):
+    return f"scan:index:{event_id}"
+
+
+def _badge_key(event_id, generation, code):
+    return f"scan:badge:{event_id}:{generation}:{code}"
+
+
+def _lock_key(event_id, participant_id):
+    return f"scan:lock:{event_id}:{participant_id}"
+
+
+class CheckInScanService:
+    """Service for cache-backed badge scanning at the check-in desk"""
+
+    def load(self, event_id):
+        """
+        Load an event's badges into the cache, unless they are already loaded.
+
+        Returns:
+            dict: Index metadata (generation, badges, loaded_at)
+        """
+        meta = cache.get(_index_key(event_id))
+        if meta is not None:
+            return meta
+
+        generation = uuid.uuid4().hex[:12]
+        rows = EventParticipant.objects.filter(event_id=event_id).order_by().values(*ENTRY_FIELDS)
+        entries = self._entries(event_id, generation, list(rows), whole_event=True)
+        ttl = get_scan_index_ttl()
+        cache.set_many(entries, ttl)
+        meta = {'generation': generation, 'badges': len(entries), 'loaded_at': timezone.now()}
+        cache.set(_index_key(event_id), meta, ttl)
+        logger.info(f"📇 Scan index loaded for event {event_id}: {len(entries)} badges")
+        return meta
+
+    def refresh(self, event_id, participant_ids=None):
+        """
+        Bring the entries of changed participants up to date. Does nothing while the
+        event's index is not loaded.
+
+        Args:
+            event_id: Event ID
+            participant_ids: IDs of changed participants, or None to drop the whole index
+        """
+        meta = cache.get(_index_key(event_id))
+        if meta is None:
+            return
+        if participant_ids is None:
+            cache.delete(_index_key(event_id))
+            return
+        rows = EventParticipant.objects.filter(event_id=event_id, id__in=list(participant_ids)).order_by().values(*ENTRY_FIELDS)
+        cache.set_many(self._entries(event_id, meta['generation'], list(rows)), get_scan_index_ttl())
+
+    def scan(self, event, code):
+        """
+        Check in the holder of a badge.
+
+        Args:
+            event: Event the desk is checking people into
+            code: Scanned badge code (event pax ID or secondary reference)
+
+        Returns:
+            tuple: (result: dict, message: str) - result['outcome'] is one of CHECKED_IN,
+                   ALREADY_CHECKED_IN, WRONG_EVENT, NOT_FOUND, NOT_ALLOWED, NOT_STARTED
+        """
+        code = (code or '').strip()
+        now = timezone.now()
+        if event.start_date and now < event.start_date:
+            return {'outcome': NOT_STARTED}, "Check-in has not opened - the event has not yet started"
+        if not code or len(code) > MAX_CODE_LENGTH:
+            return {'outcome': NOT_FOUND}, "Badge not recognised"
+
+        meta = self.load(event.id)
+        entry = cache.get(_badge_key(event.id, meta['generation'], code))
+        if entry is None:
+            entry, other_event = self._lookup(event, meta['generation'], code)
+            if other_event is not None:
+                return {'outcome': WRONG_EVENT, 'event': other_event}, f"Badge belongs to {other_event['name']}"
+            if entry is None:
+                return {'outcome': NOT_FOUND}, "Badge not recognised"
+
+        if entry['status'] in REFUSED_STATUSES or not entry['user_id']:
+            return {'outcome': NOT_ALLOWED, 'participant': self._describe(entry)}, \
+                f"Registration is {entry['status'].lower()} - cannot check in"
+
+        today = timezone.localdate(now).isoformat()
+        if entry['attendance_day'] == today:
+            return {'outcome': ALREADY_CHECKED_IN, 'participant': self._describe(entry)}, "Already checked in"
+
+        # Two desks scanning the same badge at once: only one records it
+        lock = _lock_key(event.id, entry['participant_id'])
+        if not cache.add(lock, 1, SCAN_LOCK_TTL):
+            return {'outcome': ALREADY_CHECKED_IN, 'participant': self._describe(entry)}, "Already checked in"
+        try:
+            # Re-read under the lock: another desk may have recorded this badge since it was read above
+            entry = cache.get(_badge_key(event.id, meta['generation'], code)) or entry
+            if entry['attendance_day'] == today:
+                return {'outcome': ALREADY_CHECKED_IN, 'participant': self._describe(entry)}, "Already checked in"
+            with transaction.atomic():
+                if entry['status'] != ParticipantStatus.ATTENDED:
+                    updated = EventParticipant.objects.filter(id=entry['participant_id']).exclude(
+                        status__in=REFUSED_STATUSES
+                    ).update(status=ParticipantStatus.ATTENDED, attended_date=now)
+                    if not updated:
+                        # Cancelled (or removed) since the index was loaded
+                        self.refresh(event.id, [entry['participant_id']])
+                        return {'outcome': NOT_ALLOWED, 'participant': self._describe(entry)}, \
+                            "Registration is no longer active - cannot check in"
+                attendance = EventDayAttendance(event=event, user_id=entry['user_id'], check_in_time=timezone.localtime(now))
+                attendance.save()
+
+            entry = {**entry, 'status': ParticipantStatus.ATTENDED, 'attendance_id': str(attendance.id), 'attendance_day': today}
+            ttl = get_scan_index_ttl()
+            cache.set_many({_badge_key(event.id, meta['generation'], badge): entry for badge in entry['codes']}, ttl)
+        finally:
+            cache.delete(lock)
+
+        logger.info(f"✅ {entry['event_pax_id']} checked in by scan")
+        self._notify(event.id, entry['participant_id'])
+        return {'outcome': CHECKED_IN, 'participant': self._describe(entry)}, "Checked in"
+
+    def _notify(self, event_id, participant_id):
+        from apps.events.websocket_utils import websocket_notifier
+        try:
+            # Serialized and sent with the next coalesced batch, off the request path
+            websocket_notifier.notify_checkin_update(
+                event_id=str(event_id), participant_id=participant_id, action='checkin', source='automatic',
+            )
+            websocket_notifier.notify_event_dashboard(event_id, 'participant_checked_in', {'participant_id': participant_id})
+        except Exception as e:
+            logger.error(f"❌ Scan check-in notification failed: {e}")
+
+    def _lookup(self, event, generation, code):
+        """
+        Resolve a badge missing from the index with one query over all events.
+
+        Returns:
+            tuple: (entry: dict | None, other_event: dict | None)
+        """
+        rows = list(
+            EventParticipant.objects.filter(Q(event_pax_id=code) | Q(secondary_reference_id=code))
+            .values(*ENTRY_FIELDS, 'event__name')[:10]
+        )
+        own = [row for row in rows if row['event_id'] == event.id]
+        if own:
+            # Registered after the index was loaded
+            entries = self._entries(event.id, generation, own)
+            cache.set_many(entries, get_scan_index_ttl())
+            return entries[_badge_key(event.id, generation, code)], None
+        if rows:
+            return None, {'id': str(rows[0]['event_id']), 'name': rows[0]['event__name']}
+        return None, None
+
+    def _entries(self, event_id, generation, rows, whole_event=False):
+        """Cache entries (badge key -> entry) for participant rows, with today's open attendance"""
+        today = timezone.localdate()
+        open_attendance = EventDayAttendance.objects.filter(
+            event_id=event_id,
+            check_in_time__date=today,
+            check_out_time=None,
+        ).order_by()
+        if not whole_event:
+            open_attendance = open_attendance.filter(user_id__in=[row['user_id'] for row in rows if row['user_id']])
+        attendance_ids = dict(open_attendance.values_list('user_id', 'id'))
+
+        entries = {}
+        for row in rows:
+            attendance_id = attendance_ids.get(row['user_id'])
+            codes = [badge for badge in (row['event_pax_id'], row['secondary_reference_id']) if badge]
+            entry = {
+                'participant_id': str(row['id']),
+                'event_pax_id': row['event_pax_id'],
+                'codes': codes,
+                'user_id': row['user_id'],
+                'name': f"{row['user__first_name'] or ''} {row['user__last_name'] or ''}".strip(),
+                'status': row['status'],
+                'attendance_id': str(attendance_id) if attendance_id else None,
+                'attendance_day': today.isoformat() if attendance_id else None,
+            }
+            for badge in codes:
+                entries[_badge_key(event_id, generation, badge)] = entry
+        return entries
+
+    @staticmethod
+    def _describe(entry):
+        return {
+            'id': entry['participant_id'],
+            'event_pax_id': entry['event_pax_id'],
+            'name': entry['name'],
+            'status': entry['status'],
+            'attendance_id': entry['attendance_id'],
+        }
+
+
+def get_checkin_scan_service():
+    """Get the check-in scan service"""
+    return CheckInScanService()
@@ -0,0 +1,411 @@
+"""
+Check-In Sync Service
+Offline-tolerant check-in for desks at venues with unreliable connectivity.
+
+- A desk downloads a signed roster snapshot (participants, badge codes and today's
+  attendance) with a sync token
+- While offline it records check-ins/check-outs locally, each with the device time and an
+  idempotency key, and uploads them in batches together with its last sync token
+- A batch is applied set-based: one query each for already-seen keys, the participants
+  and their attendance on the affected days, then bulk inserts/updates. Re-uploading a
+  batch (e.g. after a timeout) returns the original outcomes without applying anything twice
+- Conflicts are resolved deterministically, in device-time order per participant and day:
+  - a check-in while already checked in (another desk got there first) merges into the
+    existing record, keeping the earliest check-in time
+  - a check-out with no check-in before it is deferred, and applied once that check-in
+    is uploaded by another desk
+  - a check-out while already checked out is ignored
+- The response carries the outcome of each operation, the attendance records changed by
+  other desks since the client's sync token, and the next sync token
+"""
+import hashlib
+import json
+import logging
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.events.models import CheckInSyncOperation, EventAttendanceHourlyRollup, EventDayAttendance, EventParticipant
+from apps.events.services.checkin_scan_service import REFUSED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+Action = CheckInSyncOperation.Action
+Outcome = CheckInSyncOperation.Outcome
+
+SYNC_TOKEN_SALT = 'events.checkin_sync.token'
+SNAPSHOT_SALT = 'events.checkin_sync.snapshot'
+MAX_SYNC_BATCH = 500
+MAX_DELTA_RECORDS = 2000  # further behind than this, a new snapshot is cheaper
+CURSOR_SLACK = timedelta(seconds=60)  # re-send recent changes in case a write committed late
+ACTION_ORDER = {Action.CHECK_IN: 0, Action.CHECK_OUT: 1}
+
+
+def get_sync_token_max_age():
+    """How long (seconds) a desk can stay offline before it needs a new snapshot"""
+    return getattr(settings, 'CHECKIN_SYNC_TOKEN_MAX_AGE', 60 * 60 * 24 * 7)
+
+
+class CheckInSyncService:
+    """Service for offline check-in snapshots and sync batches"""
+
+    def snapshot(self, event):
+        """
+        Roster snapshot for an offline desk.
+
+        Returns:
+            dict: participants, today's attendance, sync_token and signature (HMAC of the rest)
+        """
+        started_at = timezone.now()
+        participants = list(
+            EventParticipant.objects.filter(event=event).order_by('event_pax_id').values(
+                'id', 'event_pax_id', 'secondary_reference_id', 'user_id', 'user__first_name', 'user__last_name', 'status'
+            )
+        )
+        participant_by_user = {row['user_id']: row['id'] for row in participants if row['user_id']}
+        attendance = EventDayAttendance.objects.filter(
+            event=event, check_in_time__date=timezone.localdate(started_at)
+        ).order_by('check_in_time').values('id', 'user_id', 'check_in_time', 'check_out_time', 'updated_at')
+
+        snapshot = {
+            'event': str(event.id),
+            'generated_at': started_at,
+            'participants': [
+                {
+                    'id': str(row['id']),
+                    'event_pax_id': row['event_pax_id'],
+                    'secondary_reference_id': row['secondary_reference_id'],
+                    'name': f"{row['user__first_name'] or ''} {row['user__last_name'] or ''}".strip(),
+                    'status': row['status'],
+                }
+                for row in participants
+            ],
+            'attendance': self._serialize_records(attendance, participant_by_user),
+            'sync_token': self._make_token(event.id, started_at - CURSOR_SLACK),
+        }
+        # Round-trip through JSON so the signature covers exactly what the desk receives
+        snapshot = json.loads(json.dumps(snapshot, cls=DjangoJSONEncoder))
+        snapshot['signature'] = self.sign_snapshot(snapshot)
+        return snapshot
+
+    def sign_snapshot(self, snapshot):
+        """HMAC of a snapshot (without its signature) - lets a stored snapshot be checked for tampering"""
+        content = {key: value for key, value in snapshot.items() if key != 'signature'}
+        digest = hashlib.sha256(json.dumps(content, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+        return signing.Signer(salt=SNAPSHOT_SALT).signature(digest)
+
+    def sync(self, event, device_id, sync_token, operations):
+        """
+        Apply a batch of offline check-ins/check-outs from one desk.
+
+        Args:
+            event: Event the desk checks people into
+            device_id: Identifier of the desk
+            sync_token: Token from the snapshot or the desk's previous sync
+            operations: [{key, participant_id, action, client_time}] in any order
+
+        Returns:
+            tuple: (result: dict | None, message: str) - result holds per-operation outcomes,
+                   changes by other desks (or snapshot_required) and the next sync_token
+        """
+        cursor, message = self._read_token(event.id, sync_token)
+        if cursor is None:
+            return None, message
+        operations, message = self._parse(operations)
+        if operations is None:
+            return None, message
+        device_id = str(device_id or '')[:100]
+        if not device_id:
+            return None, "device_id is required"
+
+        started_at = timezone.now()
+        with transaction.atomic():
+            outcomes, written, changed_participants = self._apply(event, device_id, operations, started_at)
+
+        if changed_participants:
+            from apps.events.services.checkin_scan_service import get_checkin_scan_service
+            from apps.events.websocket_utils import websocket_notifier
+            ids = [str(participant_id) for participant_id in changed_participants]
+            transaction.on_commit(lambda: get_checkin_scan_service().refresh(event.id, ids))
+            websocket_notifier.notify_roster_changed(event.id, ids)
+            websocket_notifier.notify_event_dashboard(event.id, 'attendance_synced', {'participant_ids': ids})
+
+        changes = list(
+            EventDayAttendance.objects.filter(event=event, updated_at__gt=cursor).exclude(id__in=written)
+            .order_by('updated_at').values('id', 'user_id', 'check_in_time', 'check_out_time', 'updated_at')[:MAX_DELTA_RECORDS + 1]
+        )
+        snapshot_required = len(changes) > MAX_DELTA_RECORDS
+        if snapshot_required:
+            changes = []
+        participant_by_user = dict(
+            EventParticipant.objects.filter(event=event, user_id__in={row['user_id'] for row in changes})
+            .values_list('user_id', 'id')
+        ) if changes else {}
+
+        counts = Counter(outcome['outcome'] for outcome in outcomes)
+        logger.info(f"🔄 Check-in sync from {device_id} for event {event.id}: {dict(counts)}")
+        return {
+            'results': outcomes,
+            'changes': self._serialize_records(changes, participant_by_user),
+            'snapshot_required': snapshot_required,
+            'sync_token': self._make_token(event.id, started_at - CURSOR_SLACK),
+        }, f"{len(operations)} operations synced"
+
+    def _apply(self, event, device_id, operations, now):
+        """
+        Resolve and write a batch. Runs inside a transaction.
+
+        Returns:
+            tuple: (outcomes: list[dict], written attendance IDs: set, changed participant IDs: set)
+        """
+        # Concurrent uploads touching the same participants wait for each other here
+        participants = {
+            str(row['id']): row for row in EventParticipant.objects.select_for_update().filter(
+                event=event, id__in={operation['participant_id'] for operation in operations if operation['participant_id']}
+            ).order_by('id').values('id', 'user_id', 'status')
+        }
+        seen = {
+            row['idempotency_key']: row for row in CheckInSyncOperation.objects.filter(
+                event=event, idempotency_key__in=[operation['key'] for operation in operations]
+            ).values('idempotency_key', 'outcome', 'attendance_id', 'detail')
+        }
+
+        outcomes = {}
+        new_operations = []
+        for operation in operations:
+            key = operation['key']
+            if key in seen:
+                row = seen[key]
+                outcomes[key] = self._outcome(key, row['outcome'], row['attendance_id'], row['detail'], replayed=True)
+                continue
+            participant = participants.get(operation['participant_id'])
+            if participant is None or not participant['user_id']:
+                outcomes[key] = self._outcome(key, Outcome.REJECTED, detail="Unknown participant")
+            elif operation['action'] == Action.CHECK_IN and participant['status'] in REFUSED_STATUSES:
+                outcomes[key] = self._outcome(key, Outcome.REJECTED, detail=f"Registration is {participant['status'].lower()}")
+            else:
+                operation['participant'] = participant
+                new_operations.append(operation)
+
+        # Check-outs uploaded earlier that are still waiting for their check-in
+        deferred = list(CheckInSyncOperation.objects.filter(
+            event=event, outcome=Outcome.DEFERRED,
+            participant_id__in={operation['participant']['id'] for operation in new_operations},
+        ))
+
+        groups = defaultdict(list)
+        for operation in new_operations:
+            groups[(operation['participant']['user_id'], timezone.localdate(operation['client_time']))].append(operation)
+        for operation in deferred:
+            participant = participants[str(operation.participant_id)]
+            groups[(participant['user_id'], timezone.localdate(operation.client_time))].append({
+                'key': operation.idempotency_key, 'action': operation.action, 'client_time': operation.client_time,
+                'participant': participant, 'deferred': operation,
+            })
+
+        records = defaultdict(list)
+        if groups:
+            for record in EventDayAttendance.objects.filter(
+                event=event,
+                user_id__in={user_id for user_id, _ in groups},
+                check_in_time__date__in={day for _, day in groups},
+            ):
+                records[(record.user_id, timezone.localdate(record.check_in_time))].append(record)
+
+        created, updated = [], {}
+        changed_participants, checked_in = set(), set()
+        resolved = []
+        for group, sequence in groups.items():
+            sequence.sort(key=lambda operation: (operation['client_time'], ACTION_ORDER[operation['action']], operation['key']))
+            day_records = records[group]
+            for operation in sequence:
+                outcome, record, detail = self._resolve(operation, day_records, event, now)
+                if record is not None and outcome in (Outcome.APPLIED, Outcome.MERGED):
+                    if record._state.adding:
+                        if record not in created:
+                            created.append(record)
+                    else:
+                        updated[record.pk] = record
+                    changed_participants.add(operation['participant']['id'])
+                    if operation['action'] == Action.CHECK_IN:
+                        checked_in.add(operation['participant']['id'])
+                if 'deferred' in operation:
+                    if outcome != Outcome.DEFERRED:
+                        deferred_operation = operation['deferred']
+                        deferred_operation.outcome, deferred_operation.attendance, deferred_operation.detail = outcome, record, detail
+                        resolved.append(deferred_operation)
+                    continue
+                outcomes[operation['key']] = self._outcome(operation['key'], outcome, record.pk if record else None, detail)
+                operation['record'] = record
+
+        for record in created + list(updated.values()):
+            record.stale = record.is_finished
+            record.updated_at = now
+            record.set_event_day(event.start_date)
+        EventDayAttendance.objects.bulk_create(created)
+        EventDayAttendance.objects.bulk_update(
+            list(updated.values()), ['check_in_time', 'check_out_time', 'stale', 'updated_at', 'day_date', 'day_index']
+        )
+        CheckInSyncOperation.objects.bulk_update(resolved, ['outcome', 'attendance', 'detail'])
+        if checked_in:
+            EventParticipant.objects.filter(id__in=checked_in).exclude(
+                status=EventParticipant.ParticipantStatus.ATTENDED
+            ).update(status=EventParticipant.ParticipantStatus.ATTENDED, attended_date=now)
+
+        CheckInSyncOperation.objects.bulk_create([
+            CheckInSyncOperation(
+                event=event,
+                idempotency_key=operation['key'],
+                device_id=device_id,
+                participant_id=participants[operation['participant_id']]['id'] if operation['participant_id'] in participants else None,
+                action=operation['action'],
+                client_time=operation['client_time'],
+                outcome=outcomes[operation['key']]['outcome'],
+                detail=outcomes[operation['key']]['detail'][:255],
+                attendance=operation.get('record'),
+            )
+            for operation in operations if not outcomes[operation['key']]['replayed']
+        ], ignore_conflicts=True)
+
+        if getattr(settings, 'ATTENDANCE_HOURLY_ROLLUP', False):
+            self._record_rollups(event, created, updated.values())
+
+        written = {record.pk for record in created} | set(updated)
+        return [outcomes[operation['key']] for operation in operations], written, changed_participants
+
+    def _resolve(self, operation, day_records, event, now):
+        """
+        Apply one operation to a participant's attendance records for a day (changed in place).
+
+        Returns:
+            tuple: (outcome, record | None, detail)
+        """
+        at = operation['client_time']
+        if operation['action'] == Action.CHECK_IN:
+            for record in day_records:
+                if record.check_in_time <= at and (record.check_out_time is None or at < record.check_out_time):
+                    return Outcome.MERGED, record, "Already checked in"
+            for record in day_records:
+                if record.check_out_time is None and record.check_in_time > at:
+                    # Checked in at two desks - the earliest check-in wins
+                    record.check_in_time = at
+                    return Outcome.MERGED, record, "Checked in at another desk - kept the earlier time"
+            record = EventDayAttendance(event=event, user_id=operation['participant']['user_id'], check_in_time=at)
+            day_records.append(record)
+            return Outcome.APPLIED, record, ""
+
+        earlier = [record for record in day_records if record.check_in_time < at]
+        open_records = [record for record in earlier if record.check_out_time is None]
+        if open_records:
+            record = max(open_records, key=lambda record: record.check_in_time)
+            record.check_out_time = at
+            return Outcome.APPLIED, record, ""
+        if earlier:
+            return Outcome.IGNORED, max(earlier, key=lambda record: record.check_in_time), "Already checked out"
+        return Outcome.DEFERRED, None, "No check-in before this check-out yet"
+
+    def _record_rollups(self, event, created, updated):
+        """Add the batch's check-ins/check-outs to the hourly rollups, one write per hour"""
+        check_ins = Counter(EventAttendanceHourlyRollup.truncate_hour(record.check_in_time) for record in created)
+        check_outs = Counter(
+            EventAttendanceHourlyRollup.truncate_hour(record.check_out_time)
+            for record in list(created) + list(updated)
+            if record.check_out_time and getattr(record, '_loaded_check_out_time', None) is None
+        )
+        for hour in set(check_ins) | set(check_outs):
+            EventAttendanceHourlyRollup.record(event.id, hour, check_ins=check_ins[hour], check_outs=check_outs[hour])
+
+    def _parse(self, operations):
+        """
+        Validate an uploaded batch.
+
+        Returns:
+            tuple: (operations: list | None, message: str)
+        """
+        if not isinstance(operations, list) or not operations:
+            return None, "operations must be a non-empty list"
+        if len(operations) > MAX_SYNC_BATCH:
+            return None, f"At most {MAX_SYNC_BATCH} operations per batch"
+
+        now = timezone.now()
+        parsed, keys = [], set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                return None, f"Operation {index} is not an object"
+            key = str(operation.get('key') or '').strip()
+            if not key or len(key) > 100:
+                return None, f"Operation {index} needs an idempotency key (at most 100 characters)"
+            if key in keys:
+                continue
+            action = operation.get('action')
+            if action not in Action.values:
+                return None, f"Operation {index} has an unknown action"
+            client_time = parse_datetime(str(operation.get('client_time') or ''))
+            if client_time is None:
+                return None, f"Operation {index} has an invalid client_time"
+            if timezone.is_naive(client_time):
+                client_time = timezone.make_aware(client_time)
+            try:
+                participant_id = str(uuid.UUID(str(operation.get('participant_id'))))
+            except ValueError:
+                participant_id = None  # rejected as an unknown participant
+            keys.add(key)
+            parsed.append({
+                'key': key,
+                'participant_id': participant_id,
+                'action': action,
+                # A desk clock running fast can't record attendance in the future
+                'client_time': timezone.localtime(min(client_time, now)),
+            })
+        return parsed, "OK"
+
+    def _make_token(self, event_id, cursor):
+        return signing.dumps({'event': str(event_id), 'cursor': cursor.isoformat()}, salt=SYNC_TOKEN_SALT)
+
+    def _read_token(self, event_id, token):
+        """
+        Returns:
+            tuple: (cursor: datetime | None, message: str)
+        """
+        try:
+            data = signing.loads(str(token or ''), salt=SYNC_TOKEN_SALT, max_age=get_sync_token_max_age())
+        except signing.SignatureExpired:
+            return None, "Sync token has expired - download a new snapshot"
+        except signing.BadSignature:
+            return None, "Invalid sync token"
+        if data.get('event') != str(event_id):
+            return None, "Sync token belongs to another event"
+        return parse_datetime(data['cursor']), "OK"
+
+    @staticmethod
+    def _outcome(key, outcome, attendance_id=None, detail="", replayed=False):
+        return {
+            'key': key,
+            'outcome': outcome,
+            'attendance_id': str(attendance_id) if attendance_id else None,
+            'detail': detail,
+            'replayed': replayed,
+        }
+
+    @staticmethod
+    def _serialize_records(rows, participant_by_user):
+        return [
+            {
+                'id': str(row['id']),
+                'participant_id': str(participant_by_user[row['user_id']]) if row['user_id'] in participant_by_user else None,
+                'check_in_time': row['check_in_time'],
+                'check_out_time': row['check_out_time'],
+                'updated_at': row['updated_at'],
+            }
+            for row in rows
+        ]
+
+
+def get_checkin_sync_service():
+    """Get the check-in sync service"""
+    return CheckInSyncService()
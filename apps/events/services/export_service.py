@@ -0,0 +1,444 @@
+"""
+Event Export Service
+Exports participant rosters, payment ledgers and merch pick lists as CSV or XLSX.
+
+- Rows are read with QuerySet.iterator(chunk_size=...), which on PostgreSQL uses a
+  server-side cursor; related rows (allergies, emergency contacts, answers, ...) are
+  prefetched per chunk, so memory stays flat however many participants an event has
+- CSV downloads are streamed to the client while rows are read. XLSX files are
+  zip archives, so they are written (openpyxl write-only mode) to a temporary file first
+- Exports above EVENT_EXPORT_SYNC_ROW_LIMIT rows (or requested with ?background=true)
+  run as a Celery job that writes an EventExport file to the default storage; the
+  requester is notified on their dashboard websocket and by email when it is ready
+
+Access mirrors the event dashboard: rosters need can_view_participants, the
+payment ledger can_view_payments and the merch pick list can_view_merch.
+"""
+import csv
+import io
+import logging
+import tempfile
+from datetime import datetime
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from apps.events.models import EventExport, EventPayment
+from apps.shop.models import EventProductOrder, ProductPayment
+from apps.users.models import EmergencyContact
+from core.event_permissions import has_event_permission
+
+logger = logging.getLogger(__name__)
+
+ExportType = EventExport.ExportType
+FileFormat = EventExport.FileFormat
+ExportStatus = EventExport.ExportStatus
+
+EXPORT_CHUNK_SIZE = 500
+
+# Leading characters that make a spreadsheet read a text cell as a formula
+FORMULA_TRIGGERS = ('=', '+', '-', '@', '\t', '\r')
+
+
+def get_sync_row_limit():
+    """Largest export served directly from the request; bigger ones run in the background"""
+    return getattr(settings, 'EVENT_EXPORT_SYNC_ROW_LIMIT', 10000)
+
+
+class ExportFormatUnavailable(Exception):
+    """Raised when XLSX is requested but openpyxl is not installed"""
+    pass
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+class EventExportService:
+    """Service for building event exports and running background export jobs"""
+
+    PERMISSIONS = {
+        ExportType.PARTICIPANTS: 'can_view_participants',
+        ExportType.PAYMENTS: 'can_view_payments',
+        ExportType.MERCH: 'can_view_merch',
+    }
+
+    CONTENT_TYPES = {
+        FileFormat.CSV: 'text/csv',
+        FileFormat.XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    def can_export(self, user, event, export_type):
+        """Same permission the dashboard requires to view this data"""
+        return has_event_permission(user, event, self.PERMISSIONS[export_type])
+
+    def parse_filters(self, query_params):
+        """
+        Filters supported by every export: ?status= (repeatable) and, for rosters, ?participant_type=
+
+        Returns:
+            dict: JSON-serialisable filters (stored on EventExport for background jobs)
+        """
+        filters = {}
+        statuses = [value.strip() for value in query_params.getlist('status') if value.strip()]
+        if statuses:
+            filters['status'] = statuses
+        participant_type = query_params.get('participant_type')
+        if participant_type:
+            filters['participant_type'] = participant_type.upper()
+        return filters
+
+    def count(self, event, export_type, filters=None):
+        """Number of data rows the export will contain"""
+        return sum(queryset.count() for queryset in self._querysets(event, export_type, filters or {}))
+
+    def rows(self, event, export_type, filters=None):
+        """Header row followed by one row per record, read in chunks"""
+        builder = {
+            ExportType.PARTICIPANTS: self._participant_rows,
+            ExportType.PAYMENTS: self._payment_rows,
+            ExportType.MERCH: self._merch_rows,
+        }[export_type]
+        for row in builder(event, filters or {}):
+            yield [self._cell(value) for value in row]
+
+    def stream_csv(self, event, export_type, filters=None):
+        """CSV lines for a StreamingHttpResponse (UTF-8 BOM first, so Excel reads names correctly)"""
+        writer = csv.writer(_Echo())
+        yield '\ufeff'
+        for row in self.rows(event, export_type, filters):
+            yield writer.writerow(row)
+
+    def write(self, event, export_type, file_format, fileobj, filters=None):
+        """
+        Write a whole export to a binary file object.
+
+        Returns:
+            int: Number of data rows written
+
+        Raises:
+            ExportFormatUnavailable: XLSX requested without openpyxl installed
+        """
+        rows = self.rows(event, export_type, filters)
+        written = -1  # the header is not a data row
+
+        if file_format == FileFormat.XLSX:
+            workbook = self._xlsx_workbook()
+            sheet = workbook.create_sheet(title=ExportType(export_type).label[:31])
+            for row in rows:
+                sheet.append(row)
+                written += 1
+            workbook.save(fileobj)
+            return written
+
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        writer = csv.writer(text)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        text.flush()
+        text.detach()
+        return written
+
+    def write_tempfile(self, event, export_type, file_format, filters=None):
+        """
+        Write an export to a temporary file (removed when closed), rewound for reading.
+
+        Returns:
+            tuple: (file, rows_written: int)
+        """
+        tmp = tempfile.TemporaryFile()
+        try:
+            written = self.write(event, export_type, file_format, tmp, filters)
+        except Exception:
+            tmp.close()
+            raise
+        tmp.seek(0)
+        return tmp, written
+
+    def filename(self, event, export_type, file_format):
+        return f"{event.event_code}-{export_type}-{timezone.localtime():%Y%m%d-%H%M}.{file_format}"
+
+    def start(self, event, export_type, file_format, filters=None, user=None):
+        """
+        Queue a background export job.
+
+        Returns:
+            tuple: (export: EventExport, message: str)
+        """
+        with transaction.atomic():
+            export = EventExport.objects.create(
+                event=event,
+                export_type=export_type,
+                file_format=file_format,
+                filters=filters or {},
+                requested_by=user if user and user.is_authenticated else None,
+            )
+            transaction.on_commit(lambda: self._enqueue(export.id))
+
+        logger.info(f"📤 {ExportType(export_type).label} export {export.id} queued for {event.event_code}")
+        return export, "Export started - you will be notified when the file is ready"
+
+    def run(self, export_id):
+        """
+        Generate a queued export and store the file. Safe to call again after a failure.
+
+        Returns:
+            str: Final export status
+        """
+        export = EventExport.objects.select_related('event', 'requested_by').get(pk=export_id)
+        if export.status == ExportStatus.COMPLETED:
+            return export.status
+
+        export.status = ExportStatus.RUNNING
+        export.error = None
+        export.save(update_fields=['status', 'error'])
+
+        try:
+            tmp, written = self.write_tempfile(export.event, export.export_type, export.file_format, export.filters)
+            with tmp:
+                export.file.save(
+                    self.filename(export.event, export.export_type, export.file_format), File(tmp), save=False
+                )
+        except Exception as exc:
+            export.status = ExportStatus.FAILED
+            export.error = str(exc)
+            export.save(update_fields=['status', 'error'])
+            logger.error(f"❌ Export {export.id} failed: {exc}")
+            raise
+
+        export.row_count = written
+        export.status = ExportStatus.COMPLETED
+        export.completed_at = timezone.now()
+        export.save(update_fields=['file', 'row_count', 'status', 'completed_at'])
+        logger.info(f"✅ Export {export.id} ready ({written} rows)")
+
+        self._notify(export)
+        return export.status
+
+    def describe(self, export):
+        """Status payload for the API"""
+        return {
+            'id': str(export.id),
+            'event': str(export.event_id),
+            'export_type': export.export_type,
+            'file_format': export.file_format,
+            'filters': export.filters,
+            'status': export.status,
+            'row_count': export.row_count,
+            'file_url': export.file.url if export.file else None,
+            'error': export.error,
+            'created_at': export.created_at,
+            'completed_at': export.completed_at,
+        }
+
+    def _enqueue(self, export_id):
+        from apps.events.tasks import generate_event_export
+        generate_event_export.delay(str(export_id))
+
+    def _notify(self, export):
+        user = export.requested_by
+        if user is None:
+            return
+        from apps.events.email_utils import send_export_ready_email
+        from apps.events.websocket_utils import websocket_notifier
+        try:
+            websocket_notifier.notify_event_update([user.id], export.event_id, 'export_ready', self.describe(export))
+        except Exception as exc:
+            logger.warning(f"⚠️ Could not push export {export.id} to dashboard: {exc}")
+        send_export_ready_email(export)
+
+    def _xlsx_workbook(self):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ExportFormatUnavailable("XLSX exports need the openpyxl package - use CSV instead")
+        return Workbook(write_only=True)
+
+    def _cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if timezone.is_aware(value) else value.strftime('%Y-%m-%d %H:%M')
+        if isinstance(value, bool):
+            return 'Yes' if value else 'No'
+        if isinstance(value, str) and value[:1] in FORMULA_TRIGGERS:
+            # Never let free text be evaluated as a spreadsheet formula
+            return f"'{value}"
+        return value
+
+    def _querysets(self, event, export_type, filters):
+        statuses = filters.get('status')
+
+        if export_type == ExportType.PARTICIPANTS:
+            participants = event.participants.all()
+            if statuses:
+                participants = participants.filter(status__in=[value.upper() for value in statuses])
+            if filters.get('participant_type'):
+                participants = participants.filter(participant_type=filters['participant_type'])
+            return [participants]
+
+        if export_type == ExportType.PAYMENTS:
+            event_payments = EventPayment.objects.filter(event=event)
+            product_payments = ProductPayment.objects.filter(cart__event=event)
+            if statuses:
+                event_payments = event_payments.filter(status__in=[value.upper() for value in statuses])
+                product_payments = product_payments.filter(status__in=[value.upper() for value in statuses])
+            return [event_payments, product_payments]
+
+        orders = EventProductOrder.objects.filter(cart__event=event, cart__submitted=True)
+        if statuses:
+            orders = orders.filter(status__in=[value.lower() for value in statuses])
+        else:
+            orders = orders.exclude(status__in=[EventProductOrder.Status.CANCELLED, EventProductOrder.Status.REFUNDED])
+        return [orders]
+
+    def _participant_rows(self, event, filters):
+        questions = list(event.extra_questions.order_by('order', 'question_name').values_list('id', 'question_name'))
+        yield [
+            'Participant ID', 'Status', 'Participant Type', 'First Name', 'Last Name', 'Preferred Name',
+            'Gender', 'Age', 'Email', 'Phone', 'Area', 'Chapter', 'Registered', 'Paid', 'Verified',
+            'Allergies', 'Medical Conditions', 'Accessibility Requirements', 'Special Requests',
+            'Emergency Contact', 'Emergency Relationship', 'Emergency Phone',
+            *[name for _id, name in questions],
+        ]
+
+        [participants] = self._querysets(event, ExportType.PARTICIPANTS, filters)
+        participants = participants.select_related('user', 'user__area_from').prefetch_related(
+            'user__user_allergies__allergy',
+            'user__user_medical_conditions__condition',
+            Prefetch(
+                'user__community_user_emergency_contacts',
+                queryset=EmergencyContact.objects.order_by('-is_primary', 'last_name'),
+            ),
+            'event_question_answers__selected_choices',
+        ).order_by('user__last_name', 'user__first_name', 'id')
+
+        for participant in participants.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            user = participant.user
+            area = user.area_from
+            contact = next(iter(user.community_user_emergency_contacts.all()), None)
+            answers = {answer.question_id: self._answer_text(answer) for answer in participant.event_question_answers.all()}
+            yield [
+                participant.event_pax_id,
+                participant.get_status_display(),
+                participant.get_participant_type_display(),
+                user.first_name,
+                user.last_name,
+                user.preferred_name,
+                user.get_gender_display() if user.gender else None,
+                user.age,
+                user.primary_email,
+                user.phone_number,
+                area.area_name if area else None,
+                area.path_chapter_name if area else None,
+                participant.registration_date,
+                participant.paid_amount,
+                participant.verified,
+                '; '.join(
+                    self._with_severity(link.allergy.name, link.get_severity_display(), link.instructions)
+                    for link in user.user_allergies.all()
+                ),
+                '; '.join(
+                    self._with_severity(link.condition.name, link.get_severity_display(), link.instructions)
+                    for link in user.user_medical_conditions.all()
+                ),
+                participant.accessibility_requirements,
+                participant.special_requests,
+                f"{contact.first_name} {contact.last_name}" if contact else None,
+                contact.get_contact_relationship_display() if contact and contact.contact_relationship else None,
+                (contact.phone_number or contact.secondary_phone) if contact else None,
+                *[answers.get(question_id) for question_id, _name in questions],
+            ]
+
+    def _payment_rows(self, event, filters):
+        yield [
+            'Type', 'Reference', 'Bank Reference', 'Participant / Order', 'First Name', 'Last Name', 'Email',
+            'Package', 'Method', 'Amount', 'Currency', 'Status', 'Verified', 'Created', 'Paid',
+        ]
+
+        event_payments, product_payments = self._querysets(event, ExportType.PAYMENTS, filters)
+        event_payments = event_payments.select_related('user', 'user__user', 'package', 'method').order_by('created_at', 'id')
+        for payment in event_payments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            participant = payment.user
+            user = participant.user if participant else None
+            yield [
+                'Registration',
+                payment.event_payment_tracking_number,
+                payment.bank_reference,
+                participant.event_pax_id if participant else None,
+                user.first_name if user else None,
+                user.last_name if user else None,
+                user.primary_email if user else None,
+                payment.package.name if payment.package else None,
+                payment.method.get_method_display() if payment.method else None,
+                payment.amount,
+                payment.currency.upper(),
+                payment.get_status_display(),
+                payment.verified,
+                payment.created_at,
+                payment.paid_at,
+            ]
+
+        product_payments = product_payments.select_related('user', 'cart', 'package', 'method').order_by('created_at', 'pk')
+        for payment in product_payments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            user = payment.user
+            yield [
+                'Merch',
+                payment.payment_reference_id,
+                payment.bank_reference,
+                payment.cart.order_reference_id if payment.cart else None,
+                payment.first_name or (user.first_name if user else None),
+                payment.last_name or (user.last_name if user else None),
+                payment.email or (user.primary_email if user else None),
+                payment.package.name if payment.package else None,
+                payment.method.get_method_display() if payment.method else None,
+                payment.amount,
+                payment.currency.upper(),
+                payment.get_status_display(),
+                payment.approved,
+                payment.created_at,
+                payment.paid_at,
+            ]
+
+    def _merch_rows(self, event, filters):
+        yield [
+            'Product', 'Size', 'Quantity', 'Order', 'First Name', 'Last Name', 'Email', 'Phone',
+            'Order Status', 'Cart Approved', 'Ordered',
+        ]
+
+        [orders] = self._querysets(event, ExportType.MERCH, filters)
+        orders = orders.select_related('product', 'size', 'cart', 'cart__user').order_by(
+            'product__title', 'size__size', 'cart__order_reference_id', 'id'
+        )
+        for order in orders.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            user = order.cart.user
+            yield [
+                order.product.title,
+                order.size.get_size_display() if order.size else None,
+                order.quantity,
+                order.cart.order_reference_id,
+                user.first_name,
+                user.last_name,
+                user.primary_email,
+                user.phone_number,
+                order.get_status_display(),
+                order.cart.approved,
+                order.added,
+            ]
+
+    def _answer_text(self, answer):
+        choices = [choice.text for choice in answer.selected_choices.all()]
+        return ', '.join(choices) if choices else answer.answer_text
+
+    def _with_severity(self, name, severity, instructions):
+        label = f"{name} ({severity})"
+        return f"{label}: {instructions}" if instructions else label
+
+
+def get_export_service():
+    """Get event export service instance"""
+    return EventExportService()
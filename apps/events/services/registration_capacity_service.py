@@ -0,0 +1,365 @@
+"""
+Registration Capacity Service
+Enforces event registration caps and runs the event waitlist.
+
+- Event.maximum_attendees caps the whole event (0/empty = unlimited) and
+  Event.participant_type_caps optionally caps individual participant types
+- A place is claimed with a conditional UPDATE on EventRegistrationCounter
+  (held < cap), so parallel registrations can never oversell; the counter rows
+  stay locked until the registering transaction commits or rolls back
+- Registrations arriving when the event is full join the waitlist (WAITLISTED).
+  A place freed by a cancellation, refund or raised cap is offered to the head
+  of the waitlist, who has Event.waitlist_offer_hours to accept it before the
+  offer lapses and passes to the next in line
+
+Counters are always taken overall first, then per type, to avoid deadlocks.
+Counter rows are created on first use, seeded from the participants that
+currently hold a place.
+"""
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from apps.events.models import Event, EventParticipant, EventRegistrationCounter
+from apps.events.services.checkin_scan_service import get_checkin_scan_service
+
+logger = logging.getLogger(__name__)
+
+ParticipantStatus = EventParticipant.ParticipantStatus
+OVERALL = EventRegistrationCounter.OVERALL
+
+
+class _CapacityReached(Exception):
+    def __init__(self, scope):
+        self.scope = scope
+
+
+class RegistrationCapacityService:
+    """Service for claiming event places and promoting from the waitlist"""
+
+    HOLDING_STATUSES = [ParticipantStatus.REGISTERED, ParticipantStatus.CONFIRMED, ParticipantStatus.ATTENDED]
+
+    def register(self, event, participant_type):
+        """
+        Take a place for a new registration, or decide it joins the waitlist.
+        Must be called inside the transaction that creates the participant.
+
+        Args:
+            event: Event instance
+            participant_type: EventParticipant.ParticipantType value
+
+        Returns:
+            tuple: (status: ParticipantStatus | None, message: str) - None means the event is full
+        """
+        full_scope = self._claim(event, participant_type)
+        if full_scope is None:
+            return ParticipantStatus.REGISTERED, "Place reserved"
+
+        message = self._full_message(full_scope)
+        if not event.waitlist_enabled:
+            return None, message
+        return ParticipantStatus.WAITLISTED, f"{message} - added to the waitlist"
+
+    def register_batch(self, event, participant_types):
+        """
+        Take places for a batch of new registrations in one pass (bulk imports).
+        Counter rows are locked once and bumped once per scope instead of per row.
+        Must be called inside the transaction that creates the participants.
+
+        Args:
+            event: Event instance
+            participant_types: list of EventParticipant.ParticipantType values, in priority order
+
+        Returns:
+            list[tuple]: (status: ParticipantStatus | None, message: str) for each entry
+        """
+        scopes = [OVERALL, *sorted(set(participant_types))]
+        self._ensure_counters(event, scopes)
+        counters = {
+            counter.participant_type: counter
+            for counter in EventRegistrationCounter.objects.select_for_update().filter(
+                event=event, participant_type__in=scopes,
+            ).order_by('participant_type')
+        }
+
+        taken = dict.fromkeys(scopes, 0)
+        results = []
+        for participant_type in participant_types:
+            full_scope = None
+            for scope in (OVERALL, participant_type):
+                cap = self._cap(event, scope)
+                if cap is not None and counters[scope].held + taken[scope] >= cap:
+                    full_scope = scope
+                    break
+            if full_scope is None:
+                taken[OVERALL] += 1
+                taken[participant_type] += 1
+                results.append((ParticipantStatus.REGISTERED, "Place reserved"))
+                continue
+            message = self._full_message(full_scope)
+            if not event.waitlist_enabled:
+                results.append((None, message))
+            else:
+                results.append((ParticipantStatus.WAITLISTED, f"{message} - added to the waitlist"))
+
+        for scope, count in taken.items():
+            if count:
+                EventRegistrationCounter.objects.filter(pk=counters[scope].pk).update(held=F('held') + count)
+        return results
+
+    def create_participant(self, event, user, participant_type):
+        """
+        Register a user, on the waitlist if the event is full.
+
+        Returns:
+            tuple: (participant: EventParticipant | None, message: str) - None if full with no waitlist
+        """
+        with transaction.atomic():
+            registration_status, message = self.register(event, participant_type)
+            if registration_status is None:
+                return None, message
+            participant = EventParticipant.objects.create(
+                event=event,
+                user=user,
+                status=registration_status,
+                participant_type=participant_type,
+                waitlisted_at=timezone.now() if registration_status == ParticipantStatus.WAITLISTED else None,
+            )
+        return participant, message
+
+    def cancel(self, participant_id):
+        """
+        Cancel a registration (or waitlist place) and offer any freed place to the waitlist.
+
+        Returns:
+            tuple: (offers: list[EventParticipant], message: str)
+        """
+        with transaction.atomic():
+            participant = EventParticipant.objects.select_for_update().select_related('event').get(pk=participant_id)
+            if participant.status == ParticipantStatus.CANCELLED:
+                return [], "Registration is already cancelled"
+
+            held_place = participant.status in self.HOLDING_STATUSES
+            participant.status = ParticipantStatus.CANCELLED
+            participant.offer_expires_at = None
+            participant.save(update_fields=['status', 'offer_expires_at'])
+
+            offers = self._free_place(participant.event, participant.participant_type) if held_place else []
+
+        self._refresh_badges(participant.event_id, [participant, *offers])
+        logger.info(f"🚫 {participant.event_pax_id} cancelled ({len(offers)} waitlist offers made)")
+        return offers, "Registration cancelled"
+
+    def release_deleted(self, event_id, participant_type):
+        """
+        Give back the place of a deleted participant that was holding one.
+
+        Returns:
+            list[EventParticipant]: Waitlist offers made
+        """
+        with transaction.atomic():
+            event = Event.objects.filter(pk=event_id).first()
+            if event is None:
+                return []
+            offers = self._free_place(event, participant_type)
+        self._refresh_badges(event_id, offers)
+        return offers
+
+    def accept_offer(self, participant_id):
+        """
+        Accept a place offered from the waitlist before the offer expires.
+
+        Returns:
+            tuple: (participant: EventParticipant | None, message: str)
+        """
+        with transaction.atomic():
+            participant = EventParticipant.objects.select_for_update().get(pk=participant_id)
+            if participant.offer_expires_at is None or participant.status != ParticipantStatus.REGISTERED:
+                return None, "No waitlist offer to accept"
+            if participant.offer_expires_at <= timezone.now():
+                return None, "The waitlist offer has expired"
+
+            participant.offer_expires_at = None
+            participant.save(update_fields=['offer_expires_at'])
+
+        logger.info(f"✅ {participant.event_pax_id} accepted waitlist offer")
+        return participant, "Place accepted"
+
+    def expire_offers(self):
+        """
+        Cancel lapsed waitlist offers and pass each place on to the next in line.
+
+        Returns:
+            dict: {'expired': int, 'offers': int}
+        """
+        lapsed_ids = list(EventParticipant.objects.filter(
+            status=ParticipantStatus.REGISTERED, offer_expires_at__lte=timezone.now(),
+        ).values_list('id', flat=True))
+
+        expired = offered = 0
+        for participant_id in lapsed_ids:
+            with transaction.atomic():
+                participant = EventParticipant.objects.select_for_update().select_related('event').get(pk=participant_id)
+                # Accepted or cancelled since the scan
+                if participant.status != ParticipantStatus.REGISTERED or participant.offer_expires_at is None:
+                    continue
+                participant.status = ParticipantStatus.CANCELLED
+                participant.offer_expires_at = None
+                participant.save(update_fields=['status', 'offer_expires_at'])
+                offers = self._free_place(participant.event, participant.participant_type)
+
+            self._refresh_badges(participant.event_id, [participant, *offers])
+            logger.info(f"⌛ Waitlist offer for {participant.event_pax_id} lapsed")
+            expired += 1
+            offered += len(offers)
+        return {'expired': expired, 'offers': offered}
+
+    def fill_from_waitlist(self, event_id):
+        """
+        Offer any free places to the waitlist (e.g. after a cap was raised).
+
+        Returns:
+            list[EventParticipant]: Waitlist offers made
+        """
+        with transaction.atomic():
+            event = Event.objects.get(pk=event_id)
+            offers = self._offer_places(event)
+        self._refresh_badges(event_id, offers)
+        return offers
+
+    def waitlist(self, event):
+        """Waitlisted participants in promotion order"""
+        return event.participants.filter(status=ParticipantStatus.WAITLISTED).order_by('waitlisted_at', 'registration_date')
+
+    def capacity_overview(self, event):
+        """
+        Caps, places held and waitlist size for an event.
+
+        Returns:
+            dict: {'maximum_attendees', 'held', 'remaining', 'waitlisted', 'offers_pending',
+                   'participant_types': {type: {'cap', 'held', 'remaining'}}}
+        """
+        held = self.held_counts(event)
+        counters = dict(event.registration_counters.values_list('participant_type', 'held'))
+        waitlist = event.participants.filter(status=ParticipantStatus.WAITLISTED).count()
+        offers = event.participants.filter(
+            status=ParticipantStatus.REGISTERED, offer_expires_at__isnull=False,
+        ).count()
+
+        def remaining(cap, taken):
+            return max(cap - taken, 0) if cap is not None else None
+
+        overall_cap = self._cap(event, OVERALL)
+        overall_held = counters.get(OVERALL, held.get(OVERALL, 0))
+        types = {}
+        for participant_type in EventParticipant.ParticipantType.values:
+            cap = self._cap(event, participant_type)
+            taken = counters.get(participant_type, held.get(participant_type, 0))
+            if cap is not None or taken:
+                types[participant_type] = {'cap': cap, 'held': taken, 'remaining': remaining(cap, taken)}
+
+        return {
+            'maximum_attendees': overall_cap,
+            'held': overall_held,
+            'remaining': remaining(overall_cap, overall_held),
+            'waitlisted': waitlist,
+            'offers_pending': offers,
+            'participant_types': types,
+        }
+
+    def held_counts(self, event):
+        """Places actually held, counted from participants: {participant_type: n, '': total}"""
+        rows = event.participants.filter(status__in=self.HOLDING_STATUSES).values('participant_type').annotate(
+            held=Count('id')
+        )
+        counts = {row['participant_type']: row['held'] for row in rows}
+        counts[OVERALL] = sum(counts.values())
+        return counts
+
+    def recount(self, event):
+        """Resynchronise an event's counters with its participants (admin repair tool)"""
+        with transaction.atomic():
+            held = self.held_counts(event)
+            self._ensure_counters(event, list(held))
+            for counter in event.registration_counters.select_for_update().order_by('participant_type'):
+                counter.held = held.get(counter.participant_type, 0)
+                counter.save(update_fields=['held'])
+        return held
+
+    def _refresh_badges(self, event_id, participants):
+        # Waitlisted badges are refused at the scan desk - update the entries of every participant moved on or off the waitlist
+        if participants:
+            get_checkin_scan_service().refresh(event_id, [participant.id for participant in participants])
+
+    def _cap(self, event, scope):
+        if scope == OVERALL:
+            return event.maximum_attendees or None
+        cap = (event.participant_type_caps or {}).get(scope)
+        return int(cap) if cap not in (None, '') else None
+
+    def _full_message(self, scope):
+        if scope == OVERALL:
+            return "This event is full"
+        return f"No {EventParticipant.ParticipantType(scope).label.lower()} places left"
+
+    def _ensure_counters(self, event, scopes):
+        existing = set(EventRegistrationCounter.objects.filter(
+            event=event, participant_type__in=scopes,
+        ).values_list('participant_type', flat=True))
+        missing = [scope for scope in scopes if scope not in existing]
+        if missing:
+            held = self.held_counts(event)
+            EventRegistrationCounter.objects.bulk_create(
+                [EventRegistrationCounter(event=event, participant_type=scope, held=held.get(scope, 0)) for scope in missing],
+                ignore_conflicts=True,
+            )
+        return missing
+
+    def _claim(self, event, participant_type):
+        # Returns None when a place was taken, else the scope (OVERALL or the type) that is full
+        self._ensure_counters(event, [OVERALL, participant_type])
+        try:
+            with transaction.atomic():
+                for scope in (OVERALL, participant_type):
+                    counters = EventRegistrationCounter.objects.filter(event=event, participant_type=scope)
+                    cap = self._cap(event, scope)
+                    if cap is not None:
+                        counters = counters.filter(held__lt=cap)
+                    if not counters.update(held=F('held') + 1):
+                        raise _CapacityReached(scope)
+        except _CapacityReached as full:
+            return full.scope
+        return None
+
+    def _free_place(self, event, participant_type):
+        # Caller is in a transaction and has already moved the participant out of a holding status
+        seeded = self._ensure_counters(event, [OVERALL, participant_type])
+        for scope in (OVERALL, participant_type):
+            if scope not in seeded:
+                EventRegistrationCounter.objects.filter(
+                    event=event, participant_type=scope, held__gt=0,
+                ).update(held=F('held') - 1)
+        return self._offer_places(event)
+
+    def _offer_places(self, event):
+        offers = []
+        expires_at = timezone.now() + timedelta(hours=event.waitlist_offer_hours)
+        for candidate in self.waitlist(event).select_for_update(skip_locked=True):
+            full_scope = self._claim(event, candidate.participant_type)
+            if full_scope == OVERALL:
+                break
+            if full_scope is not None:
+                # Only this type is full - later waitlisters of other types may still fit
+                continue
+            candidate.status = ParticipantStatus.REGISTERED
+            candidate.offer_expires_at = expires_at
+            candidate.save(update_fields=['status', 'offer_expires_at'])
+            offers.append(candidate)
+            logger.info(f"⬆️ Offered {candidate.event_pax_id} a place until {expires_at:%Y-%m-%d %H:%M}")
+        return offers
+
+
+def get_registration_capacity_service():
+    """Get registration capacity service instance"""
+    return RegistrationCapacityService()
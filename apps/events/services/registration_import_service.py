@@ -0,0 +1,630 @@
+"""
+Registration Import Service
+Registers a spreadsheet (CSV) of offline registrations for an event in bulk.
+
+- Uploading is a dry run: every row is validated against the event with a handful
+  of set-based queries (areas, packages, questions, members matched by email) and
+  stored with its errors and warnings - unknown areas, invalid packages, duplicate
+  emails and near-duplicate names are reported before anything is registered
+- Committing registers the valid rows in batches. Each batch runs in its own
+  transaction: members are matched or created, then participants, payments and
+  question answers are written with bulk_create, places are claimed from the
+  capacity counters once per batch, and the rows are marked IMPORTED
+- One email job sends every booking confirmation of a commit
+- Imports are resumable and idempotent: re-uploading the same file returns the
+  existing import (matched by SHA-256), and committing again only picks up rows
+  that are still VALID; rows whose member is already registered are SKIPPED
+
+Columns are matched case-insensitively, spaces and underscores alike, and use the
+same names as the participant export so an export can be edited and re-imported:
+First Name, Last Name, Email (required), Phone, Date Of Birth, Gender, Ministry,
+Area, Package, Participant Type, External ID, Notes, Accessibility Requirements,
+Special Requests, Allergies (separated by ;), Emergency Contact, Emergency
+Relationship, Emergency Phone, plus one column per extra question (its name).
+"""
+import csv
+import hashlib
+import io
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from difflib import SequenceMatcher
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.text import slugify
+from apps.events.models import (
+    AreaLocation, Event, EventParticipant, EventPayment, ExtraQuestion, QuestionAnswer,
+    RegistrationImport, RegistrationImportRow,
+)
+from apps.events.services.registration_capacity_service import get_registration_capacity_service
+from apps.users.models import Allergy, CommunityUser, EmergencyContact, UserAllergy
+from core.identifiers import assign_event_pax_ids, assign_user_identifiers
+
+logger = logging.getLogger(__name__)
+
+ImportStatus = RegistrationImport.ImportStatus
+RowStatus = RegistrationImportRow.RowStatus
+ParticipantStatus = EventParticipant.ParticipantStatus
+ParticipantType = EventParticipant.ParticipantType
+QuestionType = ExtraQuestion.QuestionType
+
+IMPORT_BATCH_SIZE = 200
+NAME_SIMILARITY_THRESHOLD = 0.85  # same threshold as the participant check-in name matching
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email')
+COLUMN_ALIASES = {
+    'email_address': 'email',
+    'primary_email': 'email',
+    'phone_number': 'phone',
+    'dob': 'date_of_birth',
+    'type': 'participant_type',
+    'reference': 'external_id',
+    'emergency_contact_name': 'emergency_contact',
+    'emergency_contact_relationship': 'emergency_relationship',
+    'emergency_contact_phone': 'emergency_phone',
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+
+def get_max_import_rows():
+    """Largest spreadsheet accepted in one upload (settings.REGISTRATION_IMPORT_MAX_ROWS)"""
+    return getattr(settings, 'REGISTRATION_IMPORT_MAX_ROWS', 5000)
+
+
+def _column(header):
+    key = re.sub(r'[\s\-]+', '_', (header or '').strip().lower())
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _choice(choices, value):
+    # Match a TextChoices value or label, e.g. 'Service team' -> SERVICE_TEAM
+    if not value:
+        return None
+    key = _column(value).upper()
+    for choice_value, label in choices.choices:
+        if key in (choice_value, _column(str(label)).upper()):
+            return choice_value
+    return False
+
+
+class _Lookups:
+    # Everything rows are resolved against, loaded once per validate/commit
+    def __init__(self, event):
+        self.areas = {}
+        for area in AreaLocation.objects.only('id', 'area_name', 'area_code'):
+            self.areas[area.area_name.strip().lower()] = area.id
+            if area.area_code:
+                self.areas[area.area_code.strip().lower()] = area.id
+
+        self.packages = {slugify(package.name): package for package in event.payment_packages.all()}
+        self.default_package = next(
+            (package for package in self.packages.values() if package.main_package and package.is_active),
+            None,
+        )
+        active = [package for package in self.packages.values() if package.is_active]
+        if self.default_package is None and len(active) == 1:
+            self.default_package = active[0]
+        self.prices = {}
+
+        self.questions = {}
+        for question in event.extra_questions.prefetch_related('choices'):
+            self.questions[_column(question.question_name)] = question
+
+    def price(self, package):
+        # Package-level price: imports never carry a service team discount
+        if package.pk not in self.prices:
+            self.prices[package.pk] = package.get_user_discounted_price(None)['discounted_price']
+        return self.prices[package.pk]
+
+
+class RegistrationImportService:
+    """Service for validating and committing bulk registration imports"""
+
+    def upload(self, event, uploaded_file, uploaded_by=None):
+        """
+        Store and validate (dry run) an uploaded CSV of registrations.
+
+        Args:
+            event: Event instance
+            uploaded_file: File-like object with the CSV content
+            uploaded_by: User uploading the file
+
+        Returns:
+            tuple: (registration_import: RegistrationImport | None, message: str)
+        """
+        content = uploaded_file.read()
+        file_hash = hashlib.sha256(content).hexdigest()
+        existing = RegistrationImport.objects.filter(event=event, file_hash=file_hash).first()
+        if existing:
+            return existing, "This file was already uploaded - returning the existing import"
+
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return None, "The file must be a UTF-8 encoded CSV"
+
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            return None, "The file is empty"
+        headers = {header: _column(header) for header in reader.fieldnames if header}
+        missing = [column for column in REQUIRED_COLUMNS if column not in headers.values()]
+        if missing:
+            return None, f"Missing required columns: {', '.join(missing)}"
+
+        records = []
+        for row_number, row in enumerate(reader, start=2):  # row 1 is the header
+            data = {headers[key]: (value or '').strip() for key, value in row.items() if key in headers}
+            if any(data.values()):
+                records.append((row_number, data))
+        if not records:
+            return None, "The file has no registrations"
+        if len(records) > get_max_import_rows():
+            return None, f"The file has more than {get_max_import_rows()} registrations - split it into smaller files"
+
+        try:
+            with transaction.atomic():
+                registration_import = RegistrationImport.objects.create(
+                    event=event,
+                    uploaded_by=uploaded_by,
+                    file_name=getattr(uploaded_file, 'name', '') or '',
+                    file_hash=file_hash,
+                )
+                rows = self.validate(event, records, registration_import)
+                RegistrationImportRow.objects.bulk_create(rows, batch_size=IMPORT_BATCH_SIZE)
+                self._refresh_counts(registration_import)
+        except IntegrityError:
+            # The same file was uploaded concurrently
+            return RegistrationImport.objects.get(event=event, file_hash=file_hash), "This file was already uploaded - returning the existing import"
+
+        logger.info(
+            f"📥 Registration import {registration_import.id} for {event.event_code}: "
+            f"{registration_import.valid_rows} valid, {registration_import.invalid_rows} invalid"
+        )
+        return registration_import, "File validated"
+
+    def validate(self, event, records, registration_import=None):
+        """
+        Validate spreadsheet rows against the event (no data is written).
+
+        Args:
+            event: Event instance
+            records: list of (row_number, {column: value})
+            registration_import: RegistrationImport the rows will belong to
+
+        Returns:
+            list[RegistrationImportRow]: Unsaved rows with status, errors and warnings
+        """
+        lookups = _Lookups(event)
+        rows = []
+        first_row_by_email = {}
+        for row_number, data in records:
+            row = RegistrationImportRow(registration_import=registration_import, row_number=row_number, data=data)
+            row.errors, row.warnings = self._row_errors(data, lookups), []
+            email = data.get('email', '').lower()
+            if email in first_row_by_email:
+                row.errors.append(f"Duplicate email - also on row {first_row_by_email[email]}")
+            elif email:
+                first_row_by_email[email] = row_number
+            rows.append(row)
+
+        self._check_members(event, rows)
+        self._check_similar_names(rows)
+        for row in rows:
+            if row.errors:
+                row.status = RowStatus.INVALID
+        return rows
+
+    def commit(self, registration_import, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Register every VALID row of an import, batch by batch.
+        Safe to call again after a failure or while another commit runs - batches
+        claim their rows with SKIP LOCKED and imported rows are never picked up twice.
+
+        Returns:
+            tuple: (registration_import: RegistrationImport, message: str)
+        """
+        event = Event.objects.get(pk=registration_import.event_id)
+        RegistrationImport.objects.filter(pk=registration_import.pk).update(status=ImportStatus.IMPORTING)
+        lookups = _Lookups(event)
+        participant_ids, held_back = [], []
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    registration_import.rows.select_for_update(skip_locked=True)
+                    .filter(status=RowStatus.VALID).exclude(pk__in=held_back)
+                    .order_by('row_number')[:batch_size]
+                )
+                if not rows:
+                    break
+                imported, full = self._commit_batch(event, rows, lookups)
+            participant_ids.extend(imported)
+            held_back.extend(full)
+
+        self._refresh_counts(registration_import)
+        if not held_back and not registration_import.rows.filter(status=RowStatus.VALID).exists():
+            registration_import.status = ImportStatus.COMPLETED
+            registration_import.completed_at = timezone.now()
+            registration_import.save(update_fields=['status', 'completed_at'])
+
+        if participant_ids:
+            from apps.events.tasks import send_bulk_booking_confirmation_emails
+            from apps.events.websocket_utils import websocket_notifier
+            ids = [str(participant_id) for participant_id in participant_ids]
+            transaction.on_commit(lambda: send_bulk_booking_confirmation_emails.delay(ids))
+            websocket_notifier.notify_roster_changed(event.id, ids)
+
+        logger.info(f"✅ Registration import {registration_import.id}: {len(participant_ids)} registered, {len(held_back)} held back")
+        message = f"{len(participant_ids)} registrations imported"
+        if held_back:
+            message += f" - {len(held_back)} rows were not imported because the event is full"
+        return registration_import, message
+
+    def report(self, registration_import, include_valid=False):
+        """
+        Validation/import report for an organiser.
+
+        Returns:
+            dict: counts plus the rows with errors or warnings (all rows if include_valid)
+        """
+        rows = registration_import.rows.all()
+        if not include_valid:
+            rows = rows.exclude(errors=[], warnings=[])
+        return {
+            'id': str(registration_import.id),
+            'file_name': registration_import.file_name,
+            'status': registration_import.status,
+            'total_rows': registration_import.total_rows,
+            'valid_rows': registration_import.valid_rows,
+            'invalid_rows': registration_import.invalid_rows,
+            'imported_rows': registration_import.imported_rows,
+            'skipped_rows': registration_import.skipped_rows,
+            'created_at': registration_import.created_at,
+            'completed_at': registration_import.completed_at,
+            'rows': [
+                {
+                    'row_number': row.row_number,
+                    'status': row.status,
+                    'email': row.data.get('email'),
+                    'name': f"{row.data.get('first_name', '')} {row.data.get('last_name', '')}".strip(),
+                    'errors': row.errors,
+                    'warnings': row.warnings,
+                    'participant_id': str(row.participant_id) if row.participant_id else None,
+                }
+                for row in rows
+            ],
+        }
+
+    # Validation
+
+    def _row_errors(self, data, lookups):
+        errors = []
+        for column in REQUIRED_COLUMNS:
+            if not data.get(column):
+                errors.append(f"{column.replace('_', ' ').capitalize()} is required")
+        if data.get('email'):
+            try:
+                validate_email(data['email'])
+            except ValidationError:
+                errors.append(f"Invalid email '{data['email']}'")
+        if data.get('date_of_birth') and self._parse_date(data['date_of_birth']) is None:
+            errors.append(f"Invalid date of birth '{data['date_of_birth']}' - use YYYY-MM-DD")
+        for column, choices in (
+            ('gender', CommunityUser.GenderType),
+            ('ministry', CommunityUser.MinistryType),
+            ('participant_type', ParticipantType),
+            ('emergency_relationship', EmergencyContact.ContactRelationshipType),
+        ):
+            if _choice(choices, data.get(column)) is False:
+                errors.append(f"Unknown {column.replace('_', ' ')} '{data[column]}'")
+        if data.get('area') and data['area'].lower() not in lookups.areas:
+            errors.append(f"Unknown area '{data['area']}'")
+
+        if data.get('package'):
+            package = lookups.packages.get(slugify(data['package']))
+            if package is None:
+                errors.append(f"Unknown package '{data['package']}'")
+            elif not package.is_active:
+                errors.append(f"Package '{package.name}' is not active")
+        elif lookups.packages and lookups.default_package is None:
+            errors.append("Package is required - this event has more than one package")
+
+        for column, question in lookups.questions.items():
+            value = data.get(column)
+            if not value:
+                continue
+            if question.question_type in (QuestionType.CHOICE, QuestionType.MULTICHOICE) and not self._choices(question, value):
+                errors.append(f"'{value}' is not an option for '{question.question_name}'")
+            elif question.question_type == QuestionType.INTEGER and not value.lstrip('-').isdigit():
+                errors.append(f"'{question.question_name}' must be a whole number")
+        return errors
+
+    def _check_members(self, event, rows):
+        # Match rows to existing members by email in one query, and flag those already registered
+        emails = {row.data['email'].lower() for row in rows if row.data.get('email')}
+        members = self._members_by_email(emails)
+        registered = set(event.participants.filter(user__in=members.values()).values_list('user_id', flat=True))
+        external_ids = set(event.participants.filter(
+            secondary_reference_id__in=[row.data['external_id'] for row in rows if row.data.get('external_id')]
+        ).values_list('secondary_reference_id', flat=True))
+
+        for row in rows:
+            member = members.get(row.data.get('email', '').lower())
+            if member is not None:
+                row.user = member
+                if member.pk in registered:
+                    row.status = RowStatus.SKIPPED
+                    row.warnings.append(f"{member.username} is already registered for this event")
+                    continue
+                if (member.first_name.lower(), member.last_name.lower()) != (
+                    row.data.get('first_name', '').lower(), row.data.get('last_name', '').lower()
+                ):
+                    row.warnings.append(f"Email belongs to existing member {member.get_full_name()} ({member.username})")
+            if row.data.get('external_id') in external_ids:
+                row.status = RowStatus.SKIPPED
+                row.warnings.append(f"External ID {row.data['external_id']} is already registered for this event")
+
+    def _check_similar_names(self, rows):
+        # Near-duplicate names within the file, and against members not matched by email
+        named = [row for row in rows if row.data.get('first_name') and row.data.get('last_name')]
+        for index, row in enumerate(named):
+            for other in named[:index]:
+                if other.data.get('email', '').lower() != row.data.get('email', '').lower() and self._similar(row.data, other.data):
+                    row.warnings.append(f"Similar name to row {other.row_number}")
+                    break
+
+        unmatched = [row for row in named if row.user_id is None]
+        prefixes = {row.data['last_name'][:3].lower() for row in unmatched}
+        if not prefixes:
+            return
+        prefix_filter = Q()
+        for prefix in prefixes:
+            prefix_filter |= Q(last_name__istartswith=prefix)
+        candidates = defaultdict(list)
+        for member in CommunityUser.objects.filter(prefix_filter).only('username', 'first_name', 'last_name'):
+            candidates[member.last_name[:3].lower()].append(member)
+        for row in unmatched:
+            for member in candidates[row.data['last_name'][:3].lower()]:
+                if self._similar(row.data, {'first_name': member.first_name, 'last_name': member.last_name}):
+                    row.warnings.append(f"Similar name to existing member {member.username} - check this is not the same person")
+                    break
+
+    def _similar(self, data, other):
+        name = f"{data['first_name']} {data['last_name']}".lower().strip()
+        other_name = f"{other['first_name']} {other['last_name']}".lower().strip()
+        return SequenceMatcher(None, name, other_name).ratio() >= NAME_SIMILARITY_THRESHOLD
+
+    def _parse_date(self, value):
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        return None
+
+    def _choices(self, question, value):
+        options = list(question.choices.all())
+
+        def match(text):
+            text = text.strip().lower()
+            return next((option for option in options if text in (option.text.lower(), (option.value or '').lower())), None)
+
+        whole = match(value)
+        if whole is not None or question.question_type == QuestionType.CHOICE:
+            return [whole] if whole else []
+        selected = [match(part) for part in re.split(r'[;,]', value) if part.strip()]
+        return selected if all(selected) else []
+
+    def _members_by_email(self, emails):
+        if not emails:
+            return {}
+        members = {}
+        matches = CommunityUser.objects.annotate(
+            primary_lower=Lower('primary_email'), secondary_lower=Lower('secondary_email'),
+        ).filter(Q(primary_lower__in=emails) | Q(secondary_lower__in=emails))
+        for member in matches:
+            for email in (member.primary_lower, member.secondary_lower):
+                if email in emails:
+                    # A primary email wins over someone else's secondary email
+                    if email not in members or email == member.primary_lower:
+                        members[email] = member
+        return members
+
+    # Commit
+
+    def _commit_batch(self, event, rows, lookups):
+        # Runs inside the batch transaction; returns (imported participant ids, row ids held back as full)
+        members = self._members_by_email({row.data['email'].lower() for row in rows})
+        registered = set(event.participants.filter(user__in=members.values()).values_list('user_id', flat=True))
+        external_ids = set(event.participants.filter(
+            secondary_reference_id__in=[row.data['external_id'] for row in rows if row.data.get('external_id')]
+        ).values_list('secondary_reference_id', flat=True))
+
+        to_register, skipped, new_users = [], [], []
+        for row in rows:
+            member = members.get(row.data['email'].lower())
+            if member is not None and member.pk in registered:
+                row.status = RowStatus.SKIPPED
+                row.warnings.append(f"{member.username} is already registered for this event")
+                skipped.append(row)
+                continue
+            if row.data.get('external_id') in external_ids:
+                row.status = RowStatus.SKIPPED
+                row.warnings.append(f"External ID {row.data['external_id']} is already registered for this event")
+                skipped.append(row)
+                continue
+            if member is None:
+                member = self._new_user(row.data, lookups)
+                members[row.data['email'].lower()] = member
+                new_users.append(member)
+            row.user = member
+            registered.add(member.pk)
+            to_register.append(row)
+
+        if new_users:
+            assign_user_identifiers(new_users)
+            CommunityUser.objects.bulk_create(new_users)
+            new_user_ids = {user.pk for user in new_users}
+            self._add_emergency_contacts([row for row in to_register if row.user_id in new_user_ids])
+        self._add_allergies(to_register)
+        if not to_register:
+            RegistrationImportRow.objects.bulk_update(skipped, ['status', 'warnings'])
+            return [], []
+
+        statuses = get_registration_capacity_service().register_batch(
+            event, [self._participant_type(row.data) for row in to_register]
+        )
+        participants, full = [], []
+        now = timezone.now()
+        organisation = event.organisation
+        for row, (registration_status, message) in zip(to_register, statuses):
+            if registration_status is None:
+                full.append(row.pk)
+                continue
+            participant = EventParticipant(
+                event=event,
+                user=row.user,
+                participant_type=self._participant_type(row.data),
+                status=registration_status,
+                waitlisted_at=now if registration_status == ParticipantStatus.WAITLISTED else None,
+                organisation=organisation,
+                secondary_reference_id=row.data.get('external_id') or None,
+                notes=row.data.get('notes') or None,
+                accessibility_requirements=row.data.get('accessibility_requirements') or None,
+                special_requests=row.data.get('special_requests') or None,
+            )
+            if registration_status == ParticipantStatus.WAITLISTED:
+                row.warnings.append(message)
+            row.participant = participant
+            participants.append(participant)
+        assign_event_pax_ids(participants)
+        EventParticipant.objects.bulk_create(participants)
+
+        imported = [row for row in to_register if row.participant is not None]
+        self._add_payments(event, imported, lookups)
+        self._add_answers(imported, lookups)
+
+        for row in imported:
+            row.status = RowStatus.IMPORTED
+        RegistrationImportRow.objects.bulk_update(imported + skipped, ['status', 'warnings', 'user', 'participant'])
+
+        holding = sum(1 for participant in participants if participant.status != ParticipantStatus.WAITLISTED)
+        if event.number_of_pax is not None and holding:
+            Event.objects.filter(pk=event.pk).update(number_of_pax=F('number_of_pax') + holding)
+        return [participant.pk for participant in participants], full
+
+    def _new_user(self, data, lookups):
+        date_of_birth = self._parse_date(data['date_of_birth']) if data.get('date_of_birth') else None
+        user = CommunityUser(
+            first_name=data['first_name'][:50],
+            last_name=data['last_name'][:50],
+            primary_email=data['email'],
+            phone_number=data.get('phone') or None,
+            date_of_birth=date_of_birth,
+            gender=_choice(CommunityUser.GenderType, data.get('gender')) or None,
+            ministry=_choice(CommunityUser.MinistryType, data.get('ministry')) or CommunityUser.MinistryType.YOUTH_GUEST,
+            area_from_id=lookups.areas.get(data.get('area', '').lower()),
+        )
+        user.normalise_profile()
+        user.set_unusable_password()
+        return user
+
+    def _participant_type(self, data):
+        return _choice(ParticipantType, data.get('participant_type')) or ParticipantType.PARTICIPANT
+
+    def _add_emergency_contacts(self, rows):
+        contacts = []
+        for row in rows:
+            name = row.data.get('emergency_contact')
+            if not name:
+                continue
+            first_name, _space, last_name = name.partition(' ')
+            contacts.append(EmergencyContact(
+                user=row.user,
+                first_name=first_name.title()[:50],
+                last_name=last_name.title()[:50],
+                phone_number=row.data.get('emergency_phone') or None,
+                contact_relationship=_choice(EmergencyContact.ContactRelationshipType, row.data.get('emergency_relationship')) or None,
+                is_primary=True,
+            ))
+        EmergencyContact.objects.bulk_create(contacts)
+
+    def _add_allergies(self, rows):
+        wanted = {}
+        for row in rows:
+            for name in (row.data.get('allergies') or '').split(';'):
+                # Export format is 'Name (Severity): instructions' - keep the name
+                name = re.split(r'[(:]', name)[0].strip()
+                if name:
+                    wanted.setdefault(row.user, set()).add(name.title())
+        if not wanted:
+            return
+        names = {name for user_names in wanted.values() for name in user_names}
+        allergies = {
+            allergy.name_lower: allergy
+            for allergy in Allergy.objects.annotate(name_lower=Lower('name')).filter(name_lower__in={name.lower() for name in names})
+        }
+        missing = [Allergy(name=name) for name in names if name.lower() not in allergies]
+        Allergy.objects.bulk_create(missing)
+        allergies.update({allergy.name.lower(): allergy for allergy in missing})
+        UserAllergy.objects.bulk_create(
+            [UserAllergy(user=user, allergy=allergies[name.lower()]) for user, user_names in wanted.items() for name in user_names],
+            ignore_conflicts=True,
+        )
+
+    def _add_payments(self, event, rows, lookups):
+        payments = []
+        for row in rows:
+            package = lookups.packages.get(slugify(row.data['package'])) if row.data.get('package') else lookups.default_package
+            if package is None:
+                continue
+            amount = lookups.price(package)
+            waitlisted = row.participant.status == ParticipantStatus.WAITLISTED
+            payment = EventPayment(
+                user=row.participant,
+                event=event,
+                package=package,
+                amount=amount,
+                currency=package.currency,
+                # Offline registrations are paid for (or not) outside the site - only free places are settled
+                status=EventPayment.PaymentStatus.SUCCEEDED if amount == 0 and not waitlisted else EventPayment.PaymentStatus.PENDING,
+            )
+            payment.assign_references()
+            payments.append(payment)
+        EventPayment.objects.bulk_create(payments)
+
+    def _add_answers(self, rows, lookups):
+        answers, selections = [], []
+        for row in rows:
+            for column, question in lookups.questions.items():
+                value = row.data.get(column)
+                if not value:
+                    continue
+                answer = QuestionAnswer(participant=row.participant, question=question)
+                if question.question_type in (QuestionType.CHOICE, QuestionType.MULTICHOICE):
+                    selections.extend((answer, choice) for choice in self._choices(question, value))
+                else:
+                    answer.answer_text = value
+                answers.append(answer)
+        QuestionAnswer.objects.bulk_create(answers)
+        Through = QuestionAnswer.selected_choices.through
+        Through.objects.bulk_create([Through(questionanswer_id=answer.pk, questionchoice_id=choice.pk) for answer, choice in selections])
+
+    def _refresh_counts(self, registration_import):
+        counts = dict(registration_import.rows.values_list('status').annotate(total=Count('id')))
+        registration_import.total_rows = sum(counts.values())
+        registration_import.valid_rows = counts.get(RowStatus.VALID, 0)
+        registration_import.invalid_rows = counts.get(RowStatus.INVALID, 0)
+        registration_import.imported_rows = counts.get(RowStatus.IMPORTED, 0)
+        registration_import.skipped_rows = counts.get(RowStatus.SKIPPED, 0)
+        registration_import.save(update_fields=['total_rows', 'valid_rows', 'invalid_rows', 'imported_rows', 'skipped_rows'])
+
+
+def get_registration_import_service():
+    """Get registration import service instance"""
+    return RegistrationImportService()
@@ -0,0 +1,543 @@
+"""
+Event Roster Service
+Versioned participant roster behind the live check-in websocket (EventCheckInConsumer).
+
+- Every change to an event's roster (check-ins/outs, registrations, bulk actions) bumps a
+  per-event version number in the cache and records which participants changed at that
+  version (one cache key per version, so concurrent workers never overwrite each other)
+- Each connection subscribes with its filters, order and page. On a change it re-reads
+  only the participant IDs of its window (one indexed query) and sends the inserts,
+  updates and removals that affect that window; full participant payloads are built only
+  for rows entering or changing inside it
+- Reconnecting clients send the last version they saw and the IDs they hold. While the
+  change records since then are still cached they get a diff instead of a full reload
+- Filter options (areas, allergies, ...) are cached per event and refreshed when someone
+  registers, instead of being rebuilt over every participant on each request
+- Dashboard counts (participants, checked in today) are cached per event and dropped on
+  every roster change; missing events are counted together in two grouped queries
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.db.models import Count, Q, Max, Prefetch
+from django.utils import timezone
+from apps.events.models import EventDayAttendance, EventParticipant, EventPayment, QuestionAnswer
+from core.db_executor import run_in_pool
+
+logger = logging.getLogger(__name__)
+
+ROSTER_CHANGE_TTL = 60 * 60  # how long a reconnecting client can resume from
+MAX_RESUME_VERSIONS = 500  # further behind than this, a full reload is cheaper
+FILTER_OPTIONS_TTL = 5 * 60
+DASHBOARD_COUNTS_TTL = 5 * 60
+MAX_PAGE_SIZE = 200
+ALL = '*'  # change record for "any participant may have changed" (bulk actions)
+
+
+def _version_key(event_id):
+    return f"roster:version:{event_id}"
+
+
+def _change_key(event_id, version):
+    return f"roster:change:{event_id}:{version}"
+
+
+def _filter_options_key(event_id):
+    return f"roster:filter_options:{event_id}"
+
+
+def _dashboard_counts_key(event_id):
+    return f"roster:dashboard_counts:{event_id}"
+
+
+class EventRosterService:
+    """Service for versioned, windowed participant rosters"""
+
+    def version(self, event_id):
+        """Current roster version of an event (0 before the first change)"""
+        return cache.get(_version_key(event_id), 0)
+
+    async def aversion(self, event_id):
+        return await cache.aget(_version_key(event_id), 0)
+
+    def record_change(self, event_id, participant_ids=None):
+        """
+        Bump the roster version and remember what changed.
+
+        Args:
+            event_id: Event ID
+            participant_ids: IDs of changed participants, or None if any may have changed
+
+        Returns:
+            int: The new version
+        """
+        key = _version_key(event_id)
+        cache.add(key, 0, timeout=None)
+        version = cache.incr(key)
+        changed = [str(participant_id) for participant_id in participant_ids] if participant_ids is not None else ALL
+        cache.set(_change_key(event_id, version), changed, ROSTER_CHANGE_TTL)
+        cache.delete(_dashboard_counts_key(event_id))
+        return version
+
+    def changes_since(self, event_id, version):
+        """
+        Participants changed after a version.
+
+        Returns:
+            tuple: (changed_ids: set | None, current_version: int) - None means resuming is
+                   not possible (too far behind, records expired, or a bulk change) and the
+                   client needs a full reload
+        """
+        current = self.version(event_id)
+        if version > current or current - version > MAX_RESUME_VERSIONS:
+            return None, current
+        if version == current:
+            return set(), current
+        keys = [_change_key(event_id, number) for number in range(version + 1, current + 1)]
+        records = cache.get_many(keys)
+        if len(records) != len(keys) or ALL in records.values():
+            return None, current
+        return {participant_id for changed in records.values() for participant_id in changed}, current
+
+    def queryset(self, event_id, filters=None, order_by='recent_updates'):
+        """Filtered, ordered (non-cancelled) participants of an event - same filters as the check-in screen"""
+        # IMPORTANT: Exclude cancelled participants by default
+        participants = EventParticipant.objects.filter(
+            event_id=event_id
+        ).exclude(
+            status='CANCELLED'
+        )
+        
+        # Apply filters if provided
+        if filters:
+            filter_conditions = Q()
+            
+            # Search filter
+            if filters.get('search'):
+                search_term = filters['search']
+                filter_conditions &= (
+                    Q(user__first_name__icontains=search_term) |
+                    Q(user__last_name__icontains=search_term) |
+                    Q(user__primary_email__icontains=search_term) |
+                    Q(user__member_id__icontains=search_term) |
+                    Q(event_pax_id__icontains=search_term)
+                )
+            
+            # Area filter
+            if filters.get('area'):
+                area_term = filters['area']
+                filter_conditions &= (
+                    Q(user__area_from__area_name__icontains=area_term) |
+                    Q(user__area_from__area_code__icontains=area_term)
+                )
+            
+            # Chapter filter
+            if filters.get('chapter'):
+                filter_conditions &= Q(user__area_from__unit__chapter__chapter_name__icontains=filters['chapter'])
+            
+            # Cluster filter  
+            if filters.get('cluster'):
+                filter_conditions &= Q(user__area_from__unit__chapter__cluster__cluster_id__icontains=filters['cluster'])
+            
+            # Status filter
+            if filters.get('status'):
+                status_upper = filters['status'].upper()
+                if status_upper in ['REGISTERED', 'CONFIRMED', 'CANCELLED']:
+                    filter_conditions &= Q(status__iexact=status_upper)
+                elif status_upper == 'CHECKED_IN':
+                    # Participants checked in today
+                    from datetime import date
+                    today = date.today()
+                    filter_conditions &= (
+                        Q(user__event_attendance__check_in_time__date=today) &
+                        Q(user__event_attendance__check_in_time__isnull=False) &
+                        Q(user__event_attendance__check_out_time__isnull=True)
+                    )
+                elif status_upper == 'NOT_CHECKED_IN':
+                    # Participants not checked in today
+                    from datetime import date
+                    today = date.today()
+                    filter_conditions &= ~Q(
+                        user__event_attendance__check_in_time__date=today,
+                        user__event_attendance__check_in_time__isnull=False
+                    )
+                elif status_upper == 'PENDING_PAYMENT':
+                    filter_conditions &= Q(verified=False)
+            
+            # Identity filter (email/member ID)
+            if filters.get('identity'):
+                identity_term = filters['identity']
+                filter_conditions &= (
+                    Q(user__primary_email__icontains=identity_term) |
+                    Q(user__member_id__icontains=identity_term) |
+                    Q(user__first_name__icontains=identity_term) |
+                    Q(user__last_name__icontains=identity_term) |
+                    Q(event_pax_id__icontains=identity_term)
+                )
+            
+            # Bank reference filter#
+            if filters.get('bank_reference'):
+                filter_conditions &= Q(participant_event_payments__bank_reference__icontains=filters['bank_reference'])
+                filter_conditions |= Q(user__product_payments__bank_reference__icontains=filters['bank_reference'])
+            
+            # Outstanding payments filter
+            if filters.get('outstanding_payments'):
+                if filters['outstanding_payments'].lower() == 'true':
+                    filter_conditions &= Q(verified=False)  # Has outstanding payments
+                elif filters['outstanding_payments'].lower() == 'false':
+                    filter_conditions &= Q(verified=True)   # No outstanding payments
+            
+            # Emergency contact name filter
+            if filters.get('emergency_contact_name'):
+                emergency_name = filters['emergency_contact_name']
+                filter_conditions &= (
+                    Q(user__community_user_emergency_contacts__first_name__icontains=emergency_name) |
+                    Q(user__community_user_emergency_contacts__last_name__icontains=emergency_name) |
+                    Q(user__community_user_emergency_contacts__preferred_name__icontains=emergency_name)
+                )
+
+            # Emergency contacts filter
+            if filters.get('emergency_contact_relationship'):
+                filter_conditions &= Q(
+                    user__community_user_emergency_contacts__contact_relationship__icontains=filters['emergency_contact_relationship']
+                )
+            
+            # Has emergency contact filter
+            if filters.get('has_emergency_contact'):
+                has_contact = filters['has_emergency_contact'].lower() == 'true'
+                if has_contact:
+                    filter_conditions &= Q(user__community_user_emergency_contacts__isnull=False)
+                else:
+                    filter_conditions &= Q(user__community_user_emergency_contacts__isnull=True)
+            
+            # Allergy filter
+            if filters.get('allergy_name'):
+                filter_conditions &= Q(
+                    user__user_allergies__allergy__name__icontains=filters['allergy_name']
+                )
+            
+            # Allergy severity filter
+            if filters.get('allergy_severity'):
+                filter_conditions &= Q(
+                    user__user_allergies__severity__iexact=filters['allergy_severity']
+                )
+            
+            # Has allergies filter
+            if filters.get('has_allergies'):
+                has_allergies = filters['has_allergies'].lower() == 'true'
+                if has_allergies:
+                    filter_conditions &= Q(user__user_allergies__isnull=False)
+                else:
+                    filter_conditions &= Q(user__user_allergies__isnull=True)
+            
+            # Medical condition filter
+            if filters.get('medical_condition_name'):
+                filter_conditions &= Q(
+                    user__user_medical_conditions__condition__name__icontains=filters['medical_condition_name']
+                )
+            
+            # Medical condition severity filter
+            if filters.get('medical_condition_severity'):
+                filter_conditions &= Q(
+                    user__user_medical_conditions__severity__iexact=filters['medical_condition_severity']
+                )
+            
+            # Has medical conditions filter
+            if filters.get('has_medical_conditions'):
+                has_conditions = filters['has_medical_conditions'].lower() == 'true'
+                if has_conditions:
+                    filter_conditions &= Q(user__user_medical_conditions__isnull=False)
+                else:
+                    filter_conditions &= Q(user__user_medical_conditions__isnull=True)
+
+            # Extra question filters
+            if filters.get('question_filters'):
+                print(f"🔍 Processing question_filters: {filters['question_filters']}")
+                for question_filter in filters['question_filters']:
+                    print(f"🔍 Processing single question_filter: {question_filter} (type: {type(question_filter)})")
+                    question_id = question_filter.get('question_id')
+                    question_value = question_filter.get('value')
+                    question_type = question_filter.get('question_type')
+                    
+                    if not question_id or not question_value:
+                        continue
+                        
+                    # Get the question to understand its type
+                    from apps.events.models import ExtraQuestion, QuestionAnswer
+                    try:
+                        question = ExtraQuestion.objects.get(id=question_id)
+                    except ExtraQuestion.DoesNotExist:
+                        continue
+                    
+                    # Build filter conditions based on question type
+                    if question.question_type in ['TEXT', 'TEXTAREA', 'INTEGER']:
+                        # Text search in answer_text
+                        filter_conditions &= Q(
+                            event_question_answers__question=question,
+                            event_question_answers__answer_text__icontains=question_value
+                        )
+                    elif question.question_type == 'BOOLEAN':
+                        # Boolean matching
+                        boolean_value = question_value.lower() in ['true', 'yes', '1']
+                        filter_conditions &= Q(
+                            event_question_answers__question=question,
+                            event_question_answers__answer_text__iexact=str(boolean_value).lower()
+                        )
+                    elif question.question_type in ['CHOICE', 'MULTICHOICE']:
+                        # Choice matching - check both selected choices and answer_text
+                        filter_conditions &= Q(
+                            event_question_answers__question=question
+                        ) & (
+                            Q(event_question_answers__selected_choices__text__icontains=question_value) |
+                            Q(event_question_answers__selected_choices__value__icontains=question_value) |
+                            Q(event_question_answers__answer_text__icontains=question_value)
+                        )
+            
+            participants = participants.filter(filter_conditions).distinct()
+        
+        # Apply ordering
+        if order_by == 'recent_updates':
+            participants = participants.annotate(
+                latest_checkin=Max('user__event_attendance__check_in_time')
+            ).order_by('-latest_checkin', '-registration_date', 'id')
+        elif order_by == 'name':
+            participants = participants.order_by('user__first_name', 'user__last_name', 'id')
+        elif order_by == 'registration_date':
+            participants = participants.order_by('-registration_date', 'id')
+        else:
+            participants = participants.order_by('registration_date', 'id')
+        return participants
+
+    def window(self, event_id, filters=None, order_by='recent_updates', page=1, page_size=50):
+        """
+        Participant IDs on one page of a subscription, in order.
+
+        Returns:
+            tuple: (ids: list[str], count: int)
+        """
+        participants = self.queryset(event_id, filters, order_by)
+        start = (page - 1) * page_size
+        ids = [str(participant_id) for participant_id in participants.values_list('id', flat=True)[start:start + page_size]]
+        return ids, participants.count()
+
+    async def awindow(self, event_id, filters=None, order_by='recent_updates', page=1, page_size=50):
+        """window() on the async ORM - question filters look their questions up synchronously, so those run in a pool"""
+        if filters and filters.get('question_filters'):
+            return await run_in_pool('short', self.window, event_id, filters, order_by, page, page_size)
+        participants = self.queryset(event_id, filters, order_by)
+        start = (page - 1) * page_size
+        ids = [str(participant_id) async for participant_id in participants.values_list('id', flat=True)[start:start + page_size]]
+        return ids, await participants.acount()
+
+    def serialize(self, participant_ids):
+        """
+        Websocket payloads for participants, keyed by ID (missing/deleted IDs are left out).
+        Related rows are loaded for the whole batch, so the query count doesn't grow with it.
+        """
+        from apps.events.websocket_utils import participant_product_orders, serialize_participant_for_websocket
+        from apps.users.models import UserAllergy, UserMedicalCondition
+        participants = list(EventParticipant.objects.filter(id__in=participant_ids).select_related(
+            'user', 'user__area_from', 'user__area_from__unit__chapter', 'user__area_from__unit__chapter__cluster',
+            'event', 'organisation',
+        ).prefetch_related(
+            Prefetch('user__user_allergies', queryset=UserAllergy.objects.select_related('allergy'), to_attr='ws_allergies'),
+            Prefetch('user__user_medical_conditions', queryset=UserMedicalCondition.objects.select_related('condition'), to_attr='ws_medical_conditions'),
+            'user__community_user_emergency_contacts',
+            Prefetch(
+                'event_question_answers',
+                queryset=QuestionAnswer.objects.select_related('question').prefetch_related('selected_choices'),
+                to_attr='ws_question_answers',
+            ),
+        ))
+        if not participants:
+            return {}
+
+        # Attendance, payments and orders belong to (user, event) pairs
+        user_ids = {participant.user_id for participant in participants}
+        event_ids = {participant.event_id for participant in participants}
+        attendance = defaultdict(list)
+        for record in EventDayAttendance.objects.filter(user_id__in=user_ids, event_id__in=event_ids).order_by('-check_in_time'):
+            attendance[(record.user_id, record.event_id)].append(record)
+        payments = defaultdict(list)
+        for payment in EventPayment.objects.filter(user__in=participants, event_id__in=event_ids):
+            payments[(payment.user_id, payment.event_id)].append(payment)
+        orders = defaultdict(list)
+        for order in participant_product_orders().filter(cart__user_id__in=user_ids, cart__event_id__in=event_ids):
+            orders[(order.cart.user_id, order.cart.event_id)].append(order)
+
+        for participant in participants:
+            participant.ws_attendance = attendance[(participant.user_id, participant.event_id)]
+            participant.ws_event_payments = payments[(participant.id, participant.event_id)]
+            participant.ws_product_orders = orders[(participant.user_id, participant.event_id)]
+        return {str(participant.id): serialize_participant_for_websocket(participant) for participant in participants}
+
+    def diff(self, known_ids, window_ids, changed_ids, payloads=None):
+        """
+        What a client holding known_ids needs to show window_ids.
+
+        Args:
+            known_ids: IDs the client currently shows
+            window_ids: IDs now on the client's page, in order
+            changed_ids: IDs whose data changed since the client's version
+            payloads: Already serialized participants to reuse, keyed by ID
+
+        Returns:
+            dict: {'order', 'inserts', 'updates', 'removals'} - empty lists when nothing the client shows changed
+        """
+        known = set(known_ids)
+        window = set(window_ids)
+        inserted = [participant_id for participant_id in window_ids if participant_id not in known]
+        updated = [participant_id for participant_id in window_ids if participant_id in known and participant_id in changed_ids]
+        removed = [participant_id for participant_id in known_ids if participant_id not in window]
+
+        payloads = dict(payloads or {})
+        missing = [participant_id for participant_id in inserted + updated if participant_id not in payloads]
+        if missing:
+            payloads.update(self.serialize(missing))
+        return {
+            'order': list(window_ids),
+            'inserts': [payloads[participant_id] for participant_id in inserted if participant_id in payloads],
+            'updates': [payloads[participant_id] for participant_id in updated if participant_id in payloads],
+            'removals': removed,
+        }
+
+    def filter_options(self, event_id):
+        """Distinct areas, chapters, allergies, ... across an event's participants (cached)"""
+        key = _filter_options_key(event_id)
+        options = cache.get(key)
+        if options is not None:
+            return options
+        
+        # Collect filter options from all participants (not just paginated)
+        # Also exclude cancelled participants from filter options
+        all_participants = EventParticipant.objects.filter(
+            event_id=event_id
+        ).exclude(
+            status='CANCELLED'
+        ).select_related(
+            'user__area_from'
+        ).prefetch_related(
+            'user__community_user_emergency_contacts',
+            'user__user_allergies__allergy',
+            'user__user_medical_conditions__condition'
+        )
+        
+        areas = set()
+        chapters = set() 
+        clusters = set()
+        emergency_contact_names = set()
+        emergency_contact_relationships = set()
+        allergy_names = set()
+        allergy_severities = set()
+        medical_condition_names = set()
+        medical_condition_severities = set()
+        
+        for p in all_participants:
+            if hasattr(p.user, 'area_from') and p.user.area_from:
+                if p.user.area_from.area_name:
+                    areas.add(p.user.area_from.area_name)
+                if p.user.area_from.path_chapter_name:
+                    chapters.add(p.user.area_from.path_chapter_name)
+                if p.user.area_from.path_cluster_code:
+                    clusters.add(p.user.area_from.path_cluster_code)
+            
+            # Collect emergency contact names and relationships
+            for contact in p.user.community_user_emergency_contacts.all():
+                # Collect contact names for autocomplete
+                if contact.first_name and contact.last_name:
+                    full_name = f"{contact.first_name} {contact.last_name}"
+                    emergency_contact_names.add(full_name)
+                if contact.preferred_name:
+                    emergency_contact_names.add(contact.preferred_name)
+                
+                # Collect relationships
+                if contact.contact_relationship:
+                    emergency_contact_relationships.add(contact.get_contact_relationship_display())
+            
+            # Collect allergy information
+            for allergy in p.user.user_allergies.all():
+                if allergy.allergy and allergy.allergy.name:
+                    allergy_names.add(allergy.allergy.name)
+                if allergy.severity:
+                    allergy_severities.add(allergy.get_severity_display())
+            
+            # Collect medical condition information
+            for condition in p.user.user_medical_conditions.all():
+                if condition.condition and condition.condition.name:
+                    medical_condition_names.add(condition.condition.name)
+                if condition.severity:
+                    medical_condition_severities.add(condition.get_severity_display())
+        
+        options = {
+            'areas': sorted(areas),
+            'chapters': sorted(chapters),
+            'clusters': sorted(clusters),
+            'emergency_contact_names': sorted(emergency_contact_names),
+            'emergency_contact_relationships': sorted(emergency_contact_relationships),
+            'allergy_names': sorted(allergy_names),
+            'allergy_severities': sorted(allergy_severities),
+            'medical_condition_names': sorted(medical_condition_names),
+            'medical_condition_severities': sorted(medical_condition_severities),
+        }
+        cache.set(key, options, FILTER_OPTIONS_TTL)
+        return options
+
+    def invalidate_filter_options(self, event_id):
+        cache.delete(_filter_options_key(event_id))
+
+    def dashboard_counts(self, event_ids):
+        """
+        Participant and checked-in-today counts of events, as shown on the dashboard.
+
+        Returns:
+            dict: {event_id (str): {'participant_count': int, 'checked_in_count': int}}
+        """
+        event_ids = [str(event_id) for event_id in event_ids]
+        cached = cache.get_many([_dashboard_counts_key(event_id) for event_id in event_ids])
+        counts = {
+            event_id: cached[_dashboard_counts_key(event_id)]
+            for event_id in event_ids if _dashboard_counts_key(event_id) in cached
+        }
+        missing = [event_id for event_id in event_ids if event_id not in counts]
+        if not missing:
+            return counts
+
+        # Today as a timestamp range (index friendly), in the site's time zone
+        today = timezone.localdate()
+        day_start = timezone.make_aware(datetime.combine(today, time.min))
+        day_end = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+        participants = EventParticipant.objects.filter(event_id__in=missing).order_by().values('event_id').annotate(
+            total=Count('id')
+        )
+        checked_in = EventDayAttendance.objects.filter(
+            event_id__in=missing, check_in_time__gte=day_start, check_in_time__lt=day_end,
+        ).order_by().values('event_id').annotate(total=Count('user_id', distinct=True))
+        participant_counts = {str(row['event_id']): row['total'] for row in participants}
+        checked_in_counts = {str(row['event_id']): row['total'] for row in checked_in}
+
+        fresh = {
+            event_id: {
+                'participant_count': participant_counts.get(event_id, 0),
+                'checked_in_count': checked_in_counts.get(event_id, 0),
+            }
+            for event_id in missing
+        }
+        cache.set_many({_dashboard_counts_key(event_id): value for event_id, value in fresh.items()}, DASHBOARD_COUNTS_TTL)
+        counts.update(fresh)
+        return counts
+
+
+def clamp_page(page, page_size):
+    """Sanitise client supplied paging: (page >= 1, 1 <= page_size <= MAX_PAGE_SIZE)"""
+    try:
+        page = max(int(page), 1)
+        page_size = min(max(int(page_size), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return 1, 50
+    return page, page_size
+
+
+def get_roster_service():
+    """Get event roster service instance"""
+    return EventRosterService()
@@ -0,0 +1,189 @@
+"""
+Workshop Enrolment Service
+Enrols event participants into breakout workshops.
+
+- Capacity is enforced under a row lock on the workshop, so concurrent enrolments
+  can never push enrolled_count past max_participants
+- Overflow joins the workshop's waitlist (ordered by join time); whenever a place
+  frees up (cancellation, capacity raised) the head of the waitlist is promoted
+- A participant cannot hold (or wait for) two workshops whose time slots overlap
+
+Locks are always taken participant first, then workshop, to avoid deadlocks.
+"""
+import logging
+from django.db import transaction
+from django.utils import timezone
+from apps.events.models import EventParticipant, EventWorkshop, EventWorkshopEnrolment
+
+logger = logging.getLogger(__name__)
+
+EnrolmentStatus = EventWorkshopEnrolment.EnrolmentStatus
+
+
+class WorkshopEnrolmentService:
+    """Service for enrolling participants in workshops and managing waitlists"""
+
+    ACTIVE_STATUSES = [EnrolmentStatus.ENROLLED, EnrolmentStatus.WAITLISTED]
+
+    def enrol(self, workshop_id, participant_id):
+        """
+        Enrol a participant in a workshop, or add them to its waitlist if it is full.
+
+        Args:
+            workshop_id: EventWorkshop ID
+            participant_id: EventParticipant ID
+
+        Returns:
+            tuple: (enrolment: EventWorkshopEnrolment | None, message: str, created: bool)
+                   - created is False when the participant already held an enrolment or waitlist place
+        """
+        with transaction.atomic():
+            participant = EventParticipant.objects.select_for_update().get(pk=participant_id)
+            workshop = EventWorkshop.objects.select_for_update().get(pk=workshop_id)
+
+            if workshop.event_id != participant.event_id:
+                return None, "Participant is not registered for this workshop's event", False
+            if not workshop.is_published:
+                return None, "Workshop is not open for enrolment", False
+            if participant.status == EventParticipant.ParticipantStatus.CANCELLED:
+                return None, "Cancelled participants cannot enrol in workshops", False
+
+            existing = workshop.enrolments.filter(participant=participant, status__in=self.ACTIVE_STATUSES).first()
+            if existing:
+                return existing, f"Already {existing.get_status_display().lower()} for this workshop", False
+
+            clash = self.find_clash(participant, workshop)
+            if clash:
+                return None, (
+                    f"Clashes with '{clash.workshop.title}' "
+                    f"({clash.workshop.start_time:%H:%M}-{clash.workshop.end_time:%H:%M})"
+                ), False
+
+            if workshop.enrolled_count < workshop.max_participants:
+                enrolment = EventWorkshopEnrolment.objects.create(
+                    workshop=workshop, participant=participant,
+                    status=EnrolmentStatus.ENROLLED, enrolled_at=timezone.now(),
+                )
+                workshop.enrolled_count += 1
+                message = "Enrolled in workshop"
+            else:
+                enrolment = EventWorkshopEnrolment.objects.create(
+                    workshop=workshop, participant=participant, status=EnrolmentStatus.WAITLISTED,
+                )
+                workshop.waitlist_count += 1
+                message = f"Workshop is full - added to the waitlist (position {workshop.waitlist_count})"
+
+            self._save_counts(workshop)
+
+        logger.info(f"🎓 {participant.event_pax_id} -> {workshop.title}: {enrolment.status}")
+        return enrolment, message, True
+
+    def cancel(self, workshop_id, participant_id):
+        """
+        Drop a participant's enrolment (or waitlist place) and promote from the waitlist.
+
+        Returns:
+            tuple: (promoted: list[EventWorkshopEnrolment], message: str)
+        """
+        with transaction.atomic():
+            participant = EventParticipant.objects.select_for_update().get(pk=participant_id)
+            workshop = EventWorkshop.objects.select_for_update().get(pk=workshop_id)
+
+            enrolment = workshop.enrolments.filter(participant=participant, status__in=self.ACTIVE_STATUSES).first()
+            if enrolment is None:
+                return [], "Participant is not enrolled in this workshop"
+
+            if enrolment.status == EnrolmentStatus.ENROLLED:
+                workshop.enrolled_count -= 1
+            else:
+                workshop.waitlist_count -= 1
+            enrolment.status = EnrolmentStatus.CANCELLED
+            enrolment.cancelled_at = timezone.now()
+            enrolment.save(update_fields=['status', 'cancelled_at'])
+
+            promoted = self._promote_waitlist(workshop)
+            self._save_counts(workshop)
+
+        for promotion in promoted:
+            logger.info(f"⬆️ Promoted {promotion.participant_id} from waitlist of {workshop.title}")
+        return promoted, "Enrolment cancelled"
+
+    def fill_from_waitlist(self, workshop_id):
+        """
+        Promote waitlisted participants into any free places (e.g. after max_participants was raised).
+
+        Returns:
+            list[EventWorkshopEnrolment]: Promoted enrolments
+        """
+        with transaction.atomic():
+            workshop = EventWorkshop.objects.select_for_update().get(pk=workshop_id)
+            promoted = self._promote_waitlist(workshop)
+            self._save_counts(workshop)
+        return promoted
+
+    def find_clash(self, participant, workshop):
+        """Active enrolment of the participant in another workshop overlapping this one's time slot"""
+        return participant.workshop_enrolments.filter(
+            status__in=self.ACTIVE_STATUSES,
+            workshop__event_id=workshop.event_id,
+            workshop__start_time__lt=workshop.end_time,
+            workshop__end_time__gt=workshop.start_time,
+        ).exclude(workshop=workshop).select_related('workshop').first()
+
+    def waitlist(self, workshop):
+        """Waitlisted enrolments in promotion order"""
+        return workshop.enrolments.filter(status=EnrolmentStatus.WAITLISTED).order_by('created_at', 'id')
+
+    def capacity_overview(self, event_id):
+        """
+        Live capacity of every published workshop of an event (one query, from the counters).
+
+        Returns:
+            list: [{'id', 'title', 'start_time', 'end_time', 'venue', 'room', 'max_participants',
+                    'enrolled', 'waitlisted', 'remaining', 'is_full'}, ...]
+        """
+        rows = EventWorkshop.objects.filter(event_id=event_id, is_published=True).order_by('start_time').values(
+            'id', 'title', 'start_time', 'end_time', 'venue', 'room',
+            'max_participants', 'enrolled_count', 'waitlist_count',
+        )
+        return [
+            {
+                'id': row['id'],
+                'title': row['title'],
+                'start_time': row['start_time'],
+                'end_time': row['end_time'],
+                'venue': row['venue'],
+                'room': row['room'],
+                'max_participants': row['max_participants'],
+                'enrolled': row['enrolled_count'],
+                'waitlisted': row['waitlist_count'],
+                'remaining': max(row['max_participants'] - row['enrolled_count'], 0),
+                'is_full': row['enrolled_count'] >= row['max_participants'],
+            }
+            for row in rows
+        ]
+
+    def _promote_waitlist(self, workshop):
+        # Caller holds the workshop lock
+        promoted = []
+        free_places = workshop.max_participants - workshop.enrolled_count
+        if free_places <= 0 or workshop.waitlist_count <= 0:
+            return promoted
+
+        for enrolment in self.waitlist(workshop).select_for_update()[:free_places]:
+            enrolment.status = EnrolmentStatus.ENROLLED
+            enrolment.enrolled_at = timezone.now()
+            enrolment.save(update_fields=['status', 'enrolled_at'])
+            workshop.enrolled_count += 1
+            workshop.waitlist_count -= 1
+            promoted.append(enrolment)
+        return promoted
+
+    def _save_counts(self, workshop):
+        workshop.is_full = workshop.enrolled_count >= workshop.max_participants
+        workshop.save(update_fields=['enrolled_count', 'waitlist_count', 'is_full'])
+
+
+def get_workshop_enrolment_service():
+    """Get workshop enrolment service instance"""
+    return WorkshopEnrolmentService()
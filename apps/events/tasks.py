@@ -14,12 +14,21 @@ Key Features:
 Tasks:
 - mark_ended_events_as_completed: Automatically marks events as COMPLETED
   when their end_date has passed
+- process_refund_batch_item: Submits one refund of a bulk refund batch to
+  Stripe, retrying transient failures with exponential backoff
+- expire_waitlist_offers: Releases waitlist offers that were not accepted in
+  time and offers free places to the next participants on each waitlist
+- generate_event_export: Writes a large participant/payment/merch export to
+  storage and notifies the organiser who requested it
+- send_bulk_booking_confirmation_emails: Sends the booking confirmations of a
+  registration import over one mail connection
 """
 
 from celery import shared_task
 from django.utils import timezone
 from django.db.models import Q
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
@@ -174,3 +183,168 @@ def send_event_reminder_emails(self):
     # - Send reminder emails
     # - Log sent emails
     return 0
+
+
+# Backoff for transient Stripe failures: 30s, 60s, 120s, ... capped at 30 minutes
+REFUND_RETRY_BASE_DELAY = 30
+REFUND_RETRY_MAX_DELAY = 1800
+
+
+@shared_task(
+    bind=True,
+    name='events.process_refund_batch_item',
+    max_retries=6,
+)
+def process_refund_batch_item(self, item_id):
+    """
+    Submit a single RefundBatchItem to Stripe.
+    
+    This task:
+    - Is enqueued once per refund when a refund batch is created
+    - Sends the item's idempotency key with every attempt (no double refunds)
+    - Retries rate limits / connection errors with exponential backoff and jitter
+    - Fails the item on the last attempt instead of retrying forever
+    - Is idempotent (finished items are skipped)
+    
+    Returns:
+        str: Final item status
+    """
+    # Import here to avoid circular imports
+    from apps.events.services.bulk_refund_service import BulkRefundService, RetryableRefundError
+    
+    try:
+        return BulkRefundService().process_item(
+            item_id,
+            final_attempt=self.request.retries >= self.max_retries,
+        )
+    except RetryableRefundError as exc:
+        countdown = min(REFUND_RETRY_BASE_DELAY * (2 ** self.request.retries), REFUND_RETRY_MAX_DELAY)
+        countdown += random.randint(0, REFUND_RETRY_BASE_DELAY)
+        logger.warning(
+            f"[Bulk Refunds] Retrying refund batch item {item_id} in {countdown}s "
+            f"(retry {self.request.retries + 1}/{self.max_retries})"
+        )
+        raise self.retry(exc=exc, countdown=countdown)
+
+
+@shared_task(
+    bind=True,
+    name='events.expire_waitlist_offers',
+    max_retries=3,
+    default_retry_delay=60,
+)
+def expire_waitlist_offers(self):
+    """
+    Release lapsed waitlist offers and refill free places from waitlists.
+    
+    This task:
+    - Cancels REGISTERED participants whose offer_expires_at has passed
+      and offers each freed place to the next in line
+    - Offers any other free places (e.g. after a cap was raised) to events
+      that still have a waitlist
+    - Is idempotent (safe to run multiple times)
+    
+    Returns:
+        dict: {'expired': int, 'offers': int}
+    """
+    # Import here to avoid circular imports
+    from apps.events.models import EventParticipant
+    from apps.events.services.registration_capacity_service import get_registration_capacity_service
+    
+    try:
+        service = get_registration_capacity_service()
+        result = service.expire_offers()
+        
+        waitlisted_event_ids = EventParticipant.objects.filter(
+            status=EventParticipant.ParticipantStatus.WAITLISTED
+        ).values_list('event_id', flat=True).distinct()
+        for event_id in waitlisted_event_ids:
+            result['offers'] += len(service.fill_from_waitlist(event_id))
+        
+        logger.info(
+            f"[Waitlist] {result['expired']} offers lapsed, {result['offers']} places offered"
+        )
+        return result
+    
+    except Exception as exc:
+        logger.error(f"[Waitlist] Error expiring waitlist offers: {str(exc)}", exc_info=True)
+        raise self.retry(exc=exc)
+
+
+@shared_task(
+    bind=True,
+    name='events.generate_event_export',
+    max_retries=3,
+    default_retry_delay=60,
+)
+def generate_event_export(self, export_id):
+    """
+    Generate a queued EventExport file.
+    
+    This task:
+    - Is enqueued when an export is too large to stream from the request
+      (or a background export was asked for)
+    - Reads rows in chunks through a server-side cursor (constant memory)
+    - Stores the CSV/XLSX in the default storage and notifies the requester
+    - Is idempotent (completed exports are skipped)
+    
+    Returns:
+        str: Final export status
+    """
+    # Import here to avoid circular imports
+    from apps.events.services.export_service import ExportFormatUnavailable, get_export_service
+    
+    try:
+        return get_export_service().run(export_id)
+    except ExportFormatUnavailable as exc:
+        # Retrying cannot install the missing library
+        logger.error(f"[Exports] Export {export_id} cannot be generated: {exc}")
+        return 'FAILED'
+    except Exception as exc:
+        logger.error(f"[Exports] Error generating export {export_id}: {str(exc)}", exc_info=True)
+        raise self.retry(exc=exc)
+
+
+@shared_task(
+    bind=True,
+    name='events.send_bulk_booking_confirmation_emails',
+    max_retries=3,
+    default_retry_delay=60,
+)
+def send_bulk_booking_confirmation_emails(self, participant_ids):
+    """
+    Send booking confirmations for a batch of imported registrations.
+    
+    This task:
+    - Is enqueued once per registration import commit, not once per participant
+    - Loads the participants in one query and reuses a single mail connection
+    - Does not retry individual failures (a retry would resend the whole batch)
+    
+    Returns:
+        dict: {'sent': int, 'failed': int}
+    """
+    # Import here to avoid circular imports
+    from django.core.mail import get_connection
+    from apps.events.email_utils import send_booking_confirmation_email
+    from apps.events.models import EventParticipant
+    
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as exc:
+        logger.error(f"[Imports] Could not open mail connection: {str(exc)}", exc_info=True)
+        raise self.retry(exc=exc)
+    
+    result = {'sent': 0, 'failed': 0}
+    participants = EventParticipant.objects.filter(pk__in=participant_ids).select_related('event', 'user')
+    try:
+        for participant in participants:
+            if send_booking_confirmation_email(participant, connection=connection):
+                result['sent'] += 1
+            else:
+                result['failed'] += 1
+    finally:
+        connection.close()
+    
+    logger.info(f"[Imports] {result['sent']} booking confirmations sent, {result['failed']} failed")
+    return result
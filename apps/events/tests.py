@@ -1,3 +1,1749 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import stripe
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from apps.events.models import (
+    AreaLocation, ChapterLocation, ClusterLocation, CountryLocation, SearchAreaSupportLocation, UnitLocation,
+    CheckInSyncOperation, Event, EventAttendanceHourlyRollup, EventServiceTeamMember, EventDayAttendance, EventExport, EventParticipant, EventPayment,
+    EventPaymentMethod, EventPaymentPackage, ExtraQuestion, QuestionAnswer, QuestionChoice,
+    EventRegistrationCounter, EventWorkshop, EventWorkshopEnrolment,
+    ParticipantRefund, RefundBatch, RefundBatchItem, RegistrationImport, RegistrationImportRow
+)
+from apps.events.services.checkin_scan_service import (
+    ALREADY_CHECKED_IN, CHECKED_IN, NOT_ALLOWED, WRONG_EVENT, get_checkin_scan_service
+)
+from apps.events.services.checkin_sync_service import CheckInSyncService
+from apps.events.services.export_service import EventExportService
+from apps.events.services.bulk_refund_service import BulkRefundService, RetryableRefundError
+from apps.events.services.registration_capacity_service import RegistrationCapacityService
+from apps.events.services.roster_service import EventRosterService
+from apps.events.services.workshop_enrolment_service import WorkshopEnrolmentService
+from apps.events.consumers import EventCheckInConsumer, EventDashboardConsumer
+from apps.events.tasks import process_refund_batch_item
+from apps.events.websocket_utils import CheckInBroadcaster, websocket_notifier
+from apps.shop.models import EventCart, EventProduct, EventProductOrder, ProductPayment, ProductPaymentMethod
+from apps.users.models import Allergy, CommunityUser, EmergencyContact, UserAllergy
+from core.db_executor import db_pool
+from core.identifiers import assign_event_pax_ids
+from core.query_profiling import QueryProfilingMixin, get_query_profile, query_signature, start_profile, stop_profile
+from core.routing import websocket_urlpatterns
+from core.websocket_limits import CLOSE_IDLE, CLOSE_TOO_MANY_CONNECTIONS, SCOPE_USER, _slot_key, get_websocket_metrics
+from core.location_hierarchy import VERSION_CACHE_KEY, get_area_path, search_locations
+
+
+class FakeStripeRefunds:
+    """
+    Local stand-in for `stripe.Refund`. Outcomes are scripted per PaymentIntent
+    ('succeed', 'decline', 'rate_limit'); each call consumes one outcome and the last one repeats.
+    Requests re-sent with an idempotency key that already succeeded return the original refund.
+    """
+    def __init__(self, outcomes=None):
+        self.outcomes = {intent: list(plan) for intent, plan in (outcomes or {}).items()}
+        self.calls = []
+        self.created = {}
+
+    def create(self, payment_intent, amount, idempotency_key=None, **params):
+        self.calls.append({'payment_intent': payment_intent, 'amount': amount, 'idempotency_key': idempotency_key})
+        if idempotency_key in self.created:
+            return self.created[idempotency_key]
+
+        plan = self.outcomes.get(payment_intent, ['succeed'])
+        outcome = plan.pop(0) if len(plan) > 1 else plan[0]
+        if outcome == 'rate_limit':
+            raise stripe.RateLimitError("Too many requests hit the API too quickly.")
+        if outcome == 'decline':
+            raise stripe.CardError("Your card was declined.", None, 'card_declined')
+
+        refund = {
+            'id': f"re_{len(self.created) + 1}",
+            'object': 'refund',
+            'amount': amount,
+            'payment_intent': payment_intent,
+            'status': 'succeeded',
+            'metadata': params.get('metadata', {}),
+        }
+        self.created[idempotency_key] = refund
+        return refund
+
+
+class FakeStripeClient:
+    """Fake `stripe` module exposing the Refund resource"""
+    def __init__(self, outcomes=None):
+        self.Refund = FakeStripeRefunds(outcomes)
+
+
+class BulkRefundServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Event", last_name="Admin")
+        cls.event = Event.objects.create(
+            name="Cancelled Camp", start_date=timezone.now() + timedelta(days=30), created_by=cls.admin
+        )
+
+    def _refund(self, intent_id, amount="40.00", is_automatic=True, status=ParticipantRefund.RefundStatus.PENDING):
+        user = CommunityUser.objects.create_user(password="password", first_name="Pax", last_name=intent_id)
+        participant = EventParticipant.objects.create(event=self.event, user=user)
+        payment = EventPayment.objects.create(
+            user=participant, event=self.event, amount=Decimal(amount),
+            status=EventPayment.PaymentStatus.REFUND_PROCESSING, stripe_payment_intent=intent_id
+        )
+        return ParticipantRefund.objects.create(
+            participant=participant, event=self.event, event_payment=payment,
+            refund_amount=Decimal(amount), refund_reason=ParticipantRefund.RefundReason.EVENT_CANCELLED,
+            removal_reason_details="Event cancelled", refund_contact_email="secretariat@example.com",
+            is_automatic_refund=is_automatic, status=status,
+        )
+
+    def _create_batch(self, service):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            batch, message = service.create_batch(self.event, user=self.admin)
+        self.assertEqual(len(callbacks), 1)
+        return batch
+
+    def test_batch_selects_only_approved_automatic_refunds(self):
+        approved = self._refund("pi_approved")
+        self._refund("pi_manual", is_automatic=False)
+        self._refund("pi_done", status=ParticipantRefund.RefundStatus.PROCESSED)
+
+        batch = self._create_batch(BulkRefundService(FakeStripeClient()))
+
+        self.assertEqual(batch.total_items, 1)
+        item = batch.items.get()
+        self.assertEqual(item.participant_refund, approved)
+        self.assertEqual(item.status, RefundBatchItem.ItemStatus.QUEUED)
+
+        # Refunds already queued are not picked up by a second batch
+        batch, message = BulkRefundService(FakeStripeClient()).create_batch(self.event)
+        self.assertIsNone(batch)
+
+    def test_success_and_decline_update_statuses_and_progress(self):
+        succeeded = self._refund("pi_ok")
+        declined = self._refund("pi_declined")
+        client = FakeStripeClient({"pi_declined": ['decline']})
+        service = BulkRefundService(client)
+        batch = self._create_batch(service)
+
+        for item in batch.items.all():
+            service.process_item(item.id)
+
+        succeeded.refresh_from_db()
+        declined.refresh_from_db()
+        self.assertEqual(succeeded.status, ParticipantRefund.RefundStatus.IN_PROGRESS)
+        self.assertEqual(succeeded.stripe_refund_id, "re_1")
+        self.assertEqual(declined.status, ParticipantRefund.RefundStatus.FAILED)
+        self.assertIn("declined", declined.stripe_failure_reason)
+
+        batch.refresh_from_db()
+        progress = service.get_progress(batch)
+        self.assertEqual(batch.status, RefundBatch.BatchStatus.COMPLETED_WITH_ERRORS)
+        self.assertEqual((progress['succeeded'], progress['failed'], progress['pending']), (1, 1, 0))
+        self.assertEqual(progress['percent_complete'], 100.0)
+
+    def test_rate_limit_is_retried_with_the_same_idempotency_key(self):
+        refund = self._refund("pi_busy")
+        client = FakeStripeClient({"pi_busy": ['rate_limit', 'succeed']})
+        service = BulkRefundService(client)
+        item = self._create_batch(service).items.get()
+
+        with self.assertRaises(RetryableRefundError):
+            service.process_item(item.id)
+        item.refresh_from_db()
+        self.assertEqual(item.status, RefundBatchItem.ItemStatus.PROCESSING)
+        self.assertEqual(item.attempts, 1)
+
+        self.assertEqual(service.process_item(item.id), RefundBatchItem.ItemStatus.SUCCEEDED)
+        # Re-running a finished item never calls Stripe again
+        self.assertEqual(service.process_item(item.id), RefundBatchItem.ItemStatus.SUCCEEDED)
+
+        keys = {call['idempotency_key'] for call in client.Refund.calls}
+        self.assertEqual(keys, {item.idempotency_key})
+        self.assertEqual(len(client.Refund.calls), 2)
+        refund.refresh_from_db()
+        self.assertEqual(refund.stripe_refund_id, "re_1")
+
+    def test_task_fails_item_on_last_retry(self):
+        refund = self._refund("pi_throttled")
+        client = FakeStripeClient({"pi_throttled": ['rate_limit']})
+        item = self._create_batch(BulkRefundService(client)).items.get()
+
+        with mock.patch.object(stripe, 'Refund', client.Refund):
+            result = process_refund_batch_item.apply(args=[item.id], retries=process_refund_batch_item.max_retries)
+
+        self.assertEqual(result.get(), RefundBatchItem.ItemStatus.FAILED)
+        refund.refresh_from_db()
+        self.assertEqual(refund.status, ParticipantRefund.RefundStatus.FAILED)
+        self.assertIn("Gave up", refund.stripe_failure_reason)
+        self.assertEqual(RefundBatch.objects.get(id=item.batch_id).failed_count, 1)
+
+    def test_bulk_process_endpoint_requires_permission(self):
+        self._refund("pi_endpoint")
+        client = APIClient()
+        url = reverse('participantrefund-bulk-process')
+
+        outsider = CommunityUser.objects.create_user(password="password", first_name="Out", last_name="Sider")
+        client.force_authenticate(outsider)
+        response = client.post(url, {'event_id': str(self.event.id)}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=False):
+            response = client.post(url, {'event_id': str(self.event.id)}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['batch']['total_items'], 1)
+
+        progress_url = reverse('participantrefund-bulk-batch-progress', args=[response.data['batch']['batch_id']])
+        response = client.get(progress_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'][0]['status'], RefundBatchItem.ItemStatus.QUEUED)
+
+
+class AttendanceTrendsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Dash", last_name="Board")
+        cls.event = Event.objects.create(
+            name="Long Camp",
+            start_date=datetime(2026, 7, 1, 8, 0, tzinfo=dt_timezone.utc),
+            end_date=datetime(2026, 7, 5, 18, 0, tzinfo=dt_timezone.utc),
+            created_by=cls.admin,
+        )
+        cls.scans = [
+            # (check-in, check-out) in UTC
+            (datetime(2026, 7, 1, 9, 5), datetime(2026, 7, 1, 17, 30)),
+            (datetime(2026, 7, 1, 9, 40), None),
+            (datetime(2026, 7, 2, 9, 10), datetime(2026, 7, 2, 10, 0)),
+            (datetime(2026, 7, 3, 14, 0), None),
+        ]
+
+    def _scan_all(self):
+        for index, (check_in, check_out) in enumerate(self.scans):
+            user = CommunityUser.objects.create_user(password="password", first_name="Pax", last_name=str(index))
+            attendance = EventDayAttendance.objects.create(
+                event=self.event, user=user, check_in_time=check_in.replace(tzinfo=dt_timezone.utc)
+            )
+            if check_out:
+                attendance = EventDayAttendance.objects.get(id=attendance.id)
+                attendance.check_out_time = check_out.replace(tzinfo=dt_timezone.utc)
+                attendance.save()
+
+    def _trends(self, granularity):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('event-attendance_trends', args=[self.event.id])
+        response = client.get(url, {'granularity': granularity})
+        self.assertEqual(response.status_code, 200)
+        return {row['period']: (row['check_ins'], row['check_outs']) for row in response.data['data']}
+
+    def test_hourly_and_event_day_buckets(self):
+        self._scan_all()
+
+        self.assertEqual(self._trends('hourly'), {
+            '2026-07-01 09:00': (2, 0),
+            '2026-07-01 17:00': (0, 1),
+            '2026-07-02 09:00': (1, 0),
+            '2026-07-02 10:00': (0, 1),
+            '2026-07-03 14:00': (1, 0),
+        })
+        self.assertEqual(self._trends('event_days'), {'Day 1': (2, 1), 'Day 2': (1, 1), 'Day 3': (1, 0)})
+
+    def test_event_days_are_stored_and_follow_the_event_start(self):
+        self._scan_all()
+        days = lambda: list(
+            EventDayAttendance.objects.filter(event=self.event).order_by('check_in_time').values_list('day_date', 'day_index')
+        )
+        self.assertEqual([day for _, day in days()], [1, 1, 2, 3])
+        self.assertEqual(days()[2][0], datetime(2026, 7, 2).date())
+
+        event = Event.objects.get(id=self.event.id)
+        event.start_date = datetime(2026, 6, 30, 8, 0, tzinfo=dt_timezone.utc)
+        event.save()
+        self.assertEqual([day for _, day in days()], [2, 2, 3, 4])
+        self.assertEqual(self._trends('event_days'), {'Day 2': (2, 1), 'Day 3': (1, 1), 'Day 4': (1, 0)})
+
+    @override_settings(ATTENDANCE_HOURLY_ROLLUP=True)
+    def test_rollup_matches_attendance_records(self):
+        self._scan_all()
+        with self.settings(ATTENDANCE_HOURLY_ROLLUP=False):
+            from_records = self._trends('daily')
+
+        self.assertEqual(EventAttendanceHourlyRollup.objects.filter(event=self.event).count(), 5)
+        self.assertEqual(from_records, {'2026-07-01': (2, 1), '2026-07-02': (1, 1), '2026-07-03': (1, 0)})
+        self.assertEqual(self._trends('daily'), from_records)
+
+        # Re-saving a record that is already checked out does not count it twice
+        EventDayAttendance.objects.filter(check_out_time__isnull=False).first().save()
+        self.assertEqual(self._trends('daily'), from_records)
+
+        EventAttendanceHourlyRollup.objects.filter(event=self.event).delete()
+        self.assertEqual(EventAttendanceHourlyRollup.rebuild(self.event), 5)
+        self.assertEqual(self._trends('daily'), from_records)
+
+
+class LocationHierarchyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryLocation.objects.create(country="GB", general_sector="EUROPE", specific_sector="WEST_EUROPE")
+        cls.cluster = ClusterLocation.objects.create(cluster_id="d", world_location=cls.country)
+        cls.chapter = ChapterLocation(chapter_name="southeast", chapter_code="SE", cluster=cls.cluster)
+        cls.chapter.save()
+        cls.unit = UnitLocation.objects.create(unit_name="a", chapter=cls.chapter)
+        cls.area = AreaLocation.objects.create(area_name="frimley", area_code="FRM", unit=cls.unit)
+
+    def test_area_stores_its_ancestry(self):
+        area = AreaLocation.objects.get(id=self.area.id)
+        self.assertEqual(area.path_chapter_id, self.chapter.id)
+        self.assertEqual(area.path_cluster_code, "D")
+        self.assertEqual(area.path_country_name, "United Kingdom")
+        with self.assertNumQueries(0):
+            label = str(area)
+        self.assertEqual(label, f"{self.country} -> Cluster D -> southeast -> UNIT A -> Frimley")
+
+    def test_renaming_or_reparenting_an_ancestor_refreshes_areas(self):
+        other_cluster = ClusterLocation.objects.create(cluster_id="e", world_location=self.country)
+        chapter = ChapterLocation.objects.get(id=self.chapter.id)
+        chapter.chapter_name = "surrey"
+        chapter.cluster = other_cluster
+        chapter.save()
+
+        area = AreaLocation.objects.get(id=self.area.id)
+        self.assertEqual(area.path_chapter_name, "surrey")
+        self.assertEqual(area.path_cluster_id, other_cluster.id)
+        self.assertIn("Cluster E -> surrey -> UNIT A", area.path_display)
+        self.assertEqual(get_area_path(self.area.id)["cluster_code"], "E")
+
+    def test_process_cache_resolves_paths_without_queries(self):
+        get_area_path(self.area.id)
+        with self.assertNumQueries(0):
+            path = get_area_path(self.area.id)
+        self.assertEqual((path["area_name"], path["chapter_name"], path["cluster_code"]), ("Frimley", "southeast", "D"))
+        self.assertIsNone(get_area_path(None))
+
+    def test_the_shared_version_is_checked_once_per_interval(self):
+        get_area_path(self.area.id)
+        with mock.patch.object(cache, "get", wraps=cache.get) as cache_get:
+            for _ in range(3):
+                get_area_path(self.area.id)
+            self.assertEqual(cache_get.call_count, 0)
+
+            # A change made by another process is picked up once the interval has passed
+            cache.set(VERSION_CACHE_KEY, "other-process", None)
+            with override_settings(LOCATION_HIERARCHY_VERSION_CHECK_SECONDS=0), self.assertNumQueries(3):
+                get_area_path(self.area.id)
+            self.assertEqual(cache_get.call_count, 1)
+
+
+class LocationSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        country = CountryLocation.objects.create(country="GB", general_sector="EUROPE", specific_sector="WEST_EUROPE")
+        cluster = ClusterLocation.objects.create(cluster_id="d", world_location=country)
+        cls.chapter = ChapterLocation(chapter_name="southeast", chapter_code="SE", cluster=cluster)
+        cls.chapter.save()
+        unit = UnitLocation.objects.create(unit_name="a", chapter=cls.chapter)
+        cls.horsham = AreaLocation.objects.create(area_name="horsham", area_code="HOR", unit=unit)
+        cls.north_crawley = AreaLocation.objects.create(area_name="north crawley", area_code="NCR", unit=unit)
+        SearchAreaSupportLocation.objects.create(name="crawley", relative_area=cls.horsham)
+        SearchAreaSupportLocation.objects.create(name="ifield", relative_area=cls.horsham)
+
+    def test_prefix_matches_rank_before_word_and_alias_matches(self):
+        results = [(area["area_name"], alias) for area, alias in search_locations("craw")]
+        self.assertEqual(results, [("Horsham", "crawley"), ("North-crawley", None)])
+
+        results = [area["area_name"] for area, _alias in search_locations("hors")]
+        self.assertEqual(results, ["Horsham"])
+
+    def test_substring_matches_follow_prefix_matches(self):
+        AreaLocation.objects.create(area_name="hampton", area_code="HAM", unit=self.horsham.unit)
+        results = [area["area_name"] for area, _alias in search_locations("ham")]
+        self.assertEqual(results, ["Hampton", "Horsham"])
+
+    def test_search_is_served_from_memory_once_warm(self):
+        search_locations("hor")
+        with self.assertNumQueries(0):
+            results = search_locations("se", limit=1)
+        self.assertEqual(len(results), 1)
+
+    def test_endpoints_resolve_aliases(self):
+        client = APIClient()
+        response = client.get(reverse('communityuser-search-areas'), {'q': 'ifie'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['areas'][0]['id'], str(self.horsham.id))
+        self.assertEqual(response.data['areas'][0]['matched_alias'], "ifield")
+        self.assertEqual(set(response.data['areas'][0]), {
+            'id', 'area_id', 'area_name', 'area_code', 'unit_name', 'chapter_name',
+            'cluster_id', 'cluster_name', 'country_name', 'matched_alias',
+        })
+        self.assertEqual(response.data['areas'][0]['country_name'], "United Kingdom")
+
+        response = client.get(reverse('chapterlocation-from-location'), {'location': 'crawley'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["area"], "Horsham")
+        self.assertEqual(response.data["related"], ["ifield"])
+
+        response = client.get(reverse('chapterlocation-areas-from-chapter'), {'chapter_name': 'SE'})
+        self.assertEqual([area["area_name"] for area in response.data], ["Horsham", "North-crawley"])
+
+
+class WorkshopEnrolmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Work", last_name="Shop")
+        cls.event = Event.objects.create(
+            name="Breakout Conference", start_date=datetime(2026, 9, 1, 8, 0, tzinfo=dt_timezone.utc), created_by=cls.admin
+        )
+        cls.workshop = cls._workshop("Prayer", 10, max_participants=2)
+        cls.participants = [
+            EventParticipant.objects.create(
+                event=cls.event,
+                user=CommunityUser.objects.create_user(password="password", first_name="Pax", last_name=f"Number{index}")
+            )
+            for index in range(3)
+        ]
+
+    @classmethod
+    def _workshop(cls, title, hour, max_participants=20):
+        start = datetime(2026, 9, 1, hour, 0, tzinfo=dt_timezone.utc)
+        return EventWorkshop.objects.create(
+            event=cls.event, title=title, description="-", objectives="-",
+            start_time=start, end_time=start + timedelta(hours=1), duration_minutes=60,
+            max_participants=max_participants,
+        )
+
+    def test_overflow_is_waitlisted_and_promoted_when_a_place_frees_up(self):
+        service = WorkshopEnrolmentService()
+        first, second, third = self.participants
+        service.enrol(self.workshop.id, first.id)
+        service.enrol(self.workshop.id, second.id)
+        enrolment, message, _created = service.enrol(self.workshop.id, third.id)
+        self.assertEqual(enrolment.status, EventWorkshopEnrolment.EnrolmentStatus.WAITLISTED)
+        self.assertIn("position 1", message)
+
+        promoted, _message = service.cancel(self.workshop.id, first.id)
+        self.assertEqual([promotion.participant_id for promotion in promoted], [third.id])
+
+        self.workshop.refresh_from_db()
+        self.assertEqual((self.workshop.enrolled_count, self.workshop.waitlist_count), (2, 0))
+        self.assertTrue(self.workshop.is_full)
+
+    def test_time_slot_clashes_are_rejected(self):
+        service = WorkshopEnrolmentService()
+        overlapping = self._workshop("Worship", 10)
+        later = self._workshop("Bible Study", 11)
+        participant = self.participants[0]
+
+        service.enrol(self.workshop.id, participant.id)
+        enrolment, message, _created = service.enrol(overlapping.id, participant.id)
+        self.assertIsNone(enrolment)
+        self.assertIn("Prayer", message)
+        # Back-to-back slots do not clash
+        enrolment, _message, _created = service.enrol(later.id, participant.id)
+        self.assertIsNotNone(enrolment)
+
+    def test_editing_a_workshop_keeps_concurrent_enrolment_counts(self):
+        stale = EventWorkshop.objects.get(id=self.workshop.id)
+        WorkshopEnrolmentService().enrol(self.workshop.id, self.participants[0].id)
+
+        # The view's serializer (resolved through the URLconf, which loads the API modules in order)
+        serializer_class = resolve(reverse('eventworkshop-detail', args=[self.workshop.id])).func.cls.serializer_class
+        serializer = serializer_class(stale, data={'title': "Evening Prayer"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.workshop.refresh_from_db()
+        self.assertEqual((self.workshop.title, self.workshop.enrolled_count), ("Evening Prayer", 1))
+
+    def test_workshop_writes_need_the_event_permission(self):
+        url = reverse('eventworkshop-detail', args=[self.workshop.id])
+        facilitator_url = reverse('eventworkshop-add-facilitator', args=[self.workshop.id])
+        create = {
+            'event': self.event.id, 'title': "Worship", 'description': "-", 'objectives': "-",
+            'start_time': "2026-09-01T14:00:00Z", 'end_time': "2026-09-01T15:00:00Z", 'duration_minutes': 60,
+            'max_participants': 20,
+        }
+        anonymous = APIClient()
+        participant = APIClient()
+        participant.force_authenticate(self.participants[0].user)
+        # The cookie JWT authentication sends no WWW-Authenticate challenge, so anonymous requests get 403 too
+        for who, client in (("anonymous", anonymous), ("participant", participant)):
+            with self.subTest(who=who):
+                self.assertEqual(client.post(reverse('eventworkshop-list'), create).status_code, 403)
+                self.assertEqual(client.patch(url, {'title': "Hijacked"}).status_code, 403)
+                self.assertEqual(client.put(url, {**create, 'title': "Hijacked"}).status_code, 403)
+                self.assertEqual(client.post(facilitator_url, {'user_id': self.admin.id}).status_code, 403)
+                self.assertEqual(client.delete(url).status_code, 403)
+        self.assertEqual(anonymous.get(reverse('eventworkshop-list')).status_code, 403)
+        self.assertEqual(anonymous.get(reverse('eventworkshop-capacity'), {'event': self.event.id}).status_code, 200)
+        self.workshop.refresh_from_db()
+        self.assertEqual((self.workshop.title, self.workshop.facilitators.count()), ("Prayer", 0))
+
+        organiser = APIClient()
+        organiser.force_authenticate(self.admin)
+        self.assertEqual(organiser.patch(url, {'title': "Evening Prayer"}).status_code, 200)
+        self.assertEqual(organiser.post(facilitator_url, {'user_id': self.admin.id}).status_code, 200)
+        self.assertEqual(organiser.delete(url).status_code, 204)
+
+    def test_enrol_endpoint_and_capacity_overview(self):
+        client = APIClient()
+        client.force_authenticate(self.participants[0].user)
+        response = client.post(reverse('eventworkshop-enrol', args=[self.workshop.id]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['remaining_capacity'], 1)
+
+        response = client.post(reverse('eventworkshop-enrol', args=[self.workshop.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['remaining_capacity'], 1)
+
+        response = client.get(reverse('eventworkshop-capacity'), {'event': str(self.event.id)})
+        self.assertEqual(response.data['workshops'][0]['enrolled'], 1)
+        self.assertEqual(response.data['workshops'][0]['remaining'], 1)
+
+
+class WorkshopEnrolmentConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_enrolments_never_exceed_capacity(self):
+        admin = CommunityUser.objects.create_user(password="password", first_name="Race", last_name="Admin")
+        event = Event.objects.create(name="Busy Conference", start_date=timezone.now(), created_by=admin)
+        start = timezone.now() + timedelta(days=1)
+        workshop = EventWorkshop.objects.create(
+            event=event, title="Popular", description="-", objectives="-", start_time=start,
+            end_time=start + timedelta(hours=1), duration_minutes=60, max_participants=3,
+        )
+        participants = [
+            EventParticipant.objects.create(
+                event=event, user=CommunityUser.objects.create_user(password="password", first_name="Pax", last_name=f"Racer{index}")
+            )
+            for index in range(8)
+        ]
+
+        barrier = threading.Barrier(len(participants))
+
+        def enrol(participant):
+            try:
+                barrier.wait()
+                WorkshopEnrolmentService().enrol(workshop.id, participant.id)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enrol, args=(participant,)) for participant in participants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statuses = list(workshop.enrolments.values_list('status', flat=True))
+        self.assertEqual(statuses.count(EventWorkshopEnrolment.EnrolmentStatus.ENROLLED), 3)
+        self.assertEqual(statuses.count(EventWorkshopEnrolment.EnrolmentStatus.WAITLISTED), 5)
+        workshop.refresh_from_db()
+        self.assertEqual((workshop.enrolled_count, workshop.waitlist_count), (3, 5))
+
+
+def register_for_event(event, first_name, last_name, participant_type=EventParticipant.ParticipantType.PARTICIPANT):
+    user = CommunityUser.objects.create_user(password="password", first_name=first_name, last_name=last_name)
+    return RegistrationCapacityService().create_participant(event, user, participant_type)
+
+
+class RegistrationCapacityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Cap", last_name="Admin")
+        cls.event = Event.objects.create(
+            name="Small Retreat", start_date=timezone.now() + timedelta(days=30), created_by=cls.admin, maximum_attendees=2
+        )
+
+    def held(self, participant_type=EventRegistrationCounter.OVERALL):
+        return EventRegistrationCounter.objects.get(event=self.event, participant_type=participant_type).held
+
+    def test_register_endpoint_waitlists_when_full_and_rejects_without_waitlist(self):
+        client = APIClient()
+        statuses = []
+        for index in range(3):
+            client.force_authenticate(CommunityUser.objects.create_user(password="password", first_name="Api", last_name=f"Pax{index}"))
+            response = client.post(reverse("eventparticipant-register"), {"event_id": str(self.event.id)}, format="json")
+            statuses.append(response.status_code)
+        self.assertEqual(statuses, [201, 201, 202])
+        self.assertEqual(self.held(), 2)
+
+        Event.objects.filter(pk=self.event.pk).update(waitlist_enabled=False)
+        client.force_authenticate(CommunityUser.objects.create_user(password="password", first_name="Api", last_name="Late"))
+        response = client.post(reverse("eventparticipant-register"), {"event_id": str(self.event.id)}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["error"], "This event is full")
+
+    def test_cancellation_offers_place_and_lapsed_offer_passes_down_the_waitlist(self):
+        service = RegistrationCapacityService()
+        first, _ = register_for_event(self.event, "Early", "One")
+        register_for_event(self.event, "Early", "Two")
+        second_waiting, message = register_for_event(self.event, "Wait", "One")
+        third_waiting, _ = register_for_event(self.event, "Wait", "Two")
+        self.assertEqual(second_waiting.status, EventParticipant.ParticipantStatus.WAITLISTED)
+        self.assertIn("waitlist", message)
+
+        offers, _message = service.cancel(first.id)
+        self.assertEqual([offer.id for offer in offers], [second_waiting.id])
+        second_waiting.refresh_from_db()
+        self.assertEqual(second_waiting.status, EventParticipant.ParticipantStatus.REGISTERED)
+        self.assertIsNotNone(second_waiting.offer_expires_at)
+        self.assertEqual(self.held(), 2)
+
+        EventParticipant.objects.filter(pk=second_waiting.pk).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+        participant, message = service.accept_offer(second_waiting.id)
+        self.assertIsNone(participant)
+        self.assertEqual(message, "The waitlist offer has expired")
+
+        self.assertEqual(service.expire_offers(), {'expired': 1, 'offers': 1})
+        second_waiting.refresh_from_db()
+        third_waiting.refresh_from_db()
+        self.assertEqual(second_waiting.status, EventParticipant.ParticipantStatus.CANCELLED)
+        self.assertEqual(third_waiting.status, EventParticipant.ParticipantStatus.REGISTERED)
+        self.assertEqual(self.held(), 2)
+
+        participant, _message = service.accept_offer(third_waiting.id)
+        self.assertIsNone(participant.offer_expires_at)
+        self.assertEqual(service.expire_offers(), {'expired': 0, 'offers': 0})
+
+    def test_participant_type_cap_lets_other_types_through_the_waitlist(self):
+        Event.objects.filter(pk=self.event.pk).update(participant_type_caps={"VOLUNTEER": 1})
+        self.event.refresh_from_db()
+        volunteer_type = EventParticipant.ParticipantType.VOLUNTEER
+
+        register_for_event(self.event, "Vol", "One", volunteer_type)
+        waiting_volunteer, message = register_for_event(self.event, "Vol", "Two", volunteer_type)
+        participant, _ = register_for_event(self.event, "Pax", "One")
+        waiting_participant, _ = register_for_event(self.event, "Pax", "Two")
+        self.assertEqual(message, "No volunteer places left - added to the waitlist")
+        self.assertEqual(waiting_participant.status, EventParticipant.ParticipantStatus.WAITLISTED)
+
+        offers, _message = RegistrationCapacityService().cancel(participant.id)
+        self.assertEqual([offer.id for offer in offers], [waiting_participant.id])
+        waiting_volunteer.refresh_from_db()
+        self.assertEqual(waiting_volunteer.status, EventParticipant.ParticipantStatus.WAITLISTED)
+        self.assertEqual((self.held(), self.held(volunteer_type)), (2, 1))
+
+    def test_deleting_a_registration_releases_its_place(self):
+        holder, _ = register_for_event(self.event, "Gone", "Soon")
+        register_for_event(self.event, "Stays", "Here")
+        waiting, _ = register_for_event(self.event, "Next", "InLine")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            holder.delete()
+
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, EventParticipant.ParticipantStatus.REGISTERED)
+        self.assertEqual(self.held(), 2)
+
+    def test_counters_are_seeded_from_existing_registrations(self):
+        for index in range(2):
+            EventParticipant.objects.create(
+                event=self.event, user=CommunityUser.objects.create_user(password="password", first_name="Old", last_name=f"Pax{index}")
+            )
+        participant, _ = register_for_event(self.event, "New", "Pax")
+        self.assertEqual(participant.status, EventParticipant.ParticipantStatus.WAITLISTED)
+        self.assertEqual(RegistrationCapacityService().capacity_overview(self.event)['remaining'], 0)
+
+
+class RegistrationCapacityConcurrencyTests(TransactionTestCase):
+
+    def test_parallel_registrations_never_oversell(self):
+        admin = CommunityUser.objects.create_user(password="password", first_name="Rush", last_name="Admin")
+        event = Event.objects.create(name="Opening Rush", start_date=timezone.now(), created_by=admin, maximum_attendees=5)
+        users = [
+            CommunityUser.objects.create_user(password="password", first_name="Rush", last_name=f"Racer{index}")
+            for index in range(20)
+        ]
+
+        barrier = threading.Barrier(len(users))
+        errors = []
+
+        def register(user):
+            try:
+                barrier.wait()
+                RegistrationCapacityService().create_participant(event, user, EventParticipant.ParticipantType.PARTICIPANT)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        statuses = list(event.participants.values_list('status', flat=True))
+        self.assertEqual(statuses.count(EventParticipant.ParticipantStatus.REGISTERED), 5)
+        self.assertEqual(statuses.count(EventParticipant.ParticipantStatus.WAITLISTED), 15)
+        self.assertEqual(EventRegistrationCounter.objects.get(event=event, participant_type="").held, 5)
+
+
+class EventPaxIdTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Pax", last_name="Admin")
+        cls.camp = Event.objects.create(
+            name="Anchored", name_code="ANCRD", event_type=Event.EventType.YOUTH_CAMP,
+            start_date=datetime(2026, 8, 1, tzinfo=dt_timezone.utc), created_by=cls.admin,
+        )
+        cls.retreat = Event.objects.create(
+            name="Quiet Days", start_date=datetime(2026, 9, 1, tzinfo=dt_timezone.utc), created_by=cls.admin,
+        )
+
+    def _user(self, index):
+        return CommunityUser.objects.create_user(password="password", first_name="Pax", last_name=f"Person{index}")
+
+    def test_participant_ids_come_from_the_event_sequence(self):
+        first = EventParticipant.objects.create(event=self.camp, user=self._user(1))
+        second = EventParticipant.objects.create(event=self.camp, user=self._user(2))
+        self.assertEqual((first.event_pax_id, second.event_pax_id), ("YYC2026ANCRD-0001", "YYC2026ANCRD-0002"))
+
+    def test_bulk_allocation_across_events_is_one_statement(self):
+        participants = [
+            EventParticipant(event=event, user=self._user(index))
+            for index, event in enumerate([self.camp, self.retreat, self.camp])
+        ]
+        with self.assertNumQueries(1):
+            assign_event_pax_ids(participants)
+        EventParticipant.objects.bulk_create(participants)
+
+        self.assertEqual(
+            [participant.event_pax_id.rsplit("-", 1)[1] for participant in participants],
+            ["0001", "0001", "0002"],
+        )
+        self.assertTrue(participants[1].event_pax_id.startswith(self.retreat.event_code[:15]))
+
+    def test_events_sharing_a_code_share_the_sequence(self):
+        north, south = [
+            Event.objects.create(
+                name=name, event_type=Event.EventType.YOUTH_CAMP,
+                start_date=datetime(2026, 8, 1, tzinfo=dt_timezone.utc), created_by=self.admin,
+            )
+            for name in ("Anchored North", "Anchored South")
+        ]
+        self.assertEqual(north.event_code, south.event_code)
+
+        first = EventParticipant.objects.create(event=north, user=self._user(1))
+        second = EventParticipant.objects.create(event=south, user=self._user(2))
+        self.assertEqual((first.event_pax_id, second.event_pax_id), ("YYC2026ANCHO-0001", "YYC2026ANCHO-0002"))
+
+
+
+class EventExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Export", last_name="Organiser")
+        cls.event = Event.objects.create(
+            name="Kitchen Count", start_date=timezone.now() + timedelta(days=10), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.question = ExtraQuestion.objects.create(
+            event=cls.event, question_name="Transport", question_body="How are you travelling?",
+            question_type=ExtraQuestion.QuestionType.CHOICE,
+        )
+        coach = QuestionChoice.objects.create(question=cls.question, text="Coach")
+
+        cls.user = CommunityUser.objects.create_user(password="password", first_name="Ada", last_name="Baker")
+        UserAllergy.objects.create(
+            user=cls.user, allergy=Allergy.objects.create(name="peanuts"),
+            severity=UserAllergy.Severity.SEVERE, instructions="EpiPen in bag",
+        )
+        EmergencyContact.objects.create(user=cls.user, first_name="Bea", last_name="Baker", phone_number="+447700900000")
+        cls.participant = EventParticipant.objects.create(event=cls.event, user=cls.user)
+        answer = QuestionAnswer.objects.create(participant=cls.participant, question=cls.question)
+        answer.selected_choices.add(coach)
+        EventPayment.objects.create(user=cls.participant, event=cls.event, amount=Decimal("45.00"))
+
+    def _client(self, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.organiser)
+        return client
+
+    def test_text_cells_that_spreadsheets_read_as_formulas_are_escaped(self):
+        service = EventExportService()
+        for value in ("=SUM(A1)", "@cmd", "+1+2", "-2+3", "\t=cmd", "\r=cmd"):
+            with self.subTest(value=value):
+                self.assertEqual(service._cell(value), f"'{value}")
+        self.assertEqual((service._cell("Coach"), service._cell(-5)), ("Coach", -5))
+
+    def test_roster_streams_csv_with_medical_and_answers(self):
+        response = self._client().get(reverse("event-export", args=[self.event.id, "participants"]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        header, row = list(csv.reader(content.splitlines()))
+        record = dict(zip(header, row))
+        self.assertEqual(record["Participant ID"], self.participant.event_pax_id)
+        self.assertEqual(record["Allergies"], "Peanuts (Severe): EpiPen in bag")
+        self.assertEqual(record["Emergency Contact"], "Bea Baker")
+        self.assertEqual(record["Transport"], "Coach")
+
+    def test_export_requires_the_dashboard_permission(self):
+        outsider = CommunityUser.objects.create_user(password="password", first_name="Not", last_name="Staff")
+
+        response = self._client(outsider).get(reverse("event-export", args=[self.event.id, "payments"]))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_large_export_runs_as_background_job(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, EVENT_EXPORT_SYNC_ROW_LIMIT=0
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._client().get(reverse("event-export", args=[self.event.id, "payments"]))
+            self.assertEqual(response.status_code, 202)
+
+            export = EventExport.objects.get(pk=response.data["id"])
+            self.assertEqual((export.status, export.row_count), (EventExport.ExportStatus.COMPLETED, 1))
+            with export.file.open("rb") as stored:
+                ledger = list(csv.reader(stored.read().decode("utf-8-sig").splitlines()))
+            self.assertEqual(ledger[1][0], "Registration")
+            self.assertEqual(ledger[1][3], self.participant.event_pax_id)
+            self.assertEqual(ledger[1][9], "45.00")
+
+            status_response = self._client().get(reverse("event-export-status", args=[self.event.id, export.id]))
+            self.assertEqual(status_response.data["status"], EventExport.ExportStatus.COMPLETED)
+
+    def test_rows_are_read_in_chunks(self):
+        service = EventExportService()
+        with mock.patch("apps.events.services.export_service.EXPORT_CHUNK_SIZE", 1), \
+                mock.patch("django.db.models.query.QuerySet.iterator", autospec=True,
+                           side_effect=lambda queryset, chunk_size=None: iter(list(queryset))) as iterator:
+            rows = list(service.rows(self.event, EventExport.ExportType.PARTICIPANTS))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(iterator.call_args.kwargs["chunk_size"], 1)
+
+
+class RegistrationImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Import", last_name="Organiser")
+        cls.event = Event.objects.create(
+            name="Offline Weekend", start_date=timezone.now() + timedelta(days=10), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        country = CountryLocation.objects.create(country="GB", general_sector="EUROPE", specific_sector="WEST_EUROPE")
+        cluster = ClusterLocation.objects.create(cluster_id="d", world_location=country)
+        chapter = ChapterLocation(chapter_name="southeast", chapter_code="SE", cluster=cluster)
+        chapter.save()
+        unit = UnitLocation.objects.create(unit_name="a", chapter=chapter)
+        cls.area = AreaLocation.objects.create(area_name="frimley", area_code="FRM", unit=unit)
+        cls.package = EventPaymentPackage.objects.create(event=cls.event, name="Full weekend", price=Decimal("40.00"), main_package=True)
+        cls.question = ExtraQuestion.objects.create(
+            event=cls.event, question_name="Transport", question_body="How are you travelling?",
+            question_type=ExtraQuestion.QuestionType.CHOICE,
+        )
+        cls.coach = QuestionChoice.objects.create(question=cls.question, text="Coach")
+
+        cls.member = CommunityUser.objects.create_user(password="password", first_name="Ada", last_name="Baker")
+        cls.member.primary_email = "ada@example.com"
+        cls.member.save()
+
+    CSV = (
+        "First Name,Last Name,Email,Area,Package,Transport,Allergies,Emergency Contact,Emergency Phone\n"
+        "Ada,Baker,ADA@example.com,FRM,,Coach,,,\n"
+        "Ben,Carter,ben@example.com,Frimley,Full weekend,Coach,Peanuts; Shellfish,Cat Carter,+447700900001\n"
+        "Dan,Evans,dan@example.com,Nowhere,Half day,,,,\n"
+        "Benn,Carter,bencarter@example.com,,,Bus,,,\n"
+        "Eve,Fox,ben@example.com,,,,,,\n"
+    )
+
+    def _upload(self, content=None):
+        client = APIClient()
+        client.force_authenticate(self.organiser)
+        upload = SimpleUploadedFile("offline.csv", (content or self.CSV).encode("utf-8-sig"), content_type="text/csv")
+        return client, client.post(reverse("event-imports", args=[self.event.id]), {"file": upload}, format="multipart")
+
+    def test_upload_is_a_dry_run_report(self):
+        _client, response = self._upload()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["total_rows"], response.data["valid_rows"], response.data["invalid_rows"]), (5, 2, 3))
+        report = {row["row_number"]: row for row in response.data["rows"]}
+        self.assertEqual(sorted(report), [4, 5, 6])  # rows without issues are left out
+        self.assertEqual(report[5]["status"], RegistrationImportRow.RowStatus.INVALID)
+        self.assertIn("Unknown area 'Nowhere'", report[4]["errors"])
+        self.assertIn("Unknown package 'Half day'", report[4]["errors"])
+        self.assertIn("'Bus' is not an option for 'Transport'", report[5]["errors"])
+        self.assertIn("Similar name to row 3", report[5]["warnings"])
+        self.assertIn("Duplicate email - also on row 3", report[6]["errors"])
+        self.assertFalse(self.event.participants.exists())
+        self.assertFalse(CommunityUser.objects.filter(primary_email="ben@example.com").exists())
+
+    def test_commit_registers_valid_rows_with_one_email_job(self):
+        client, response = self._upload()
+
+        with mock.patch("apps.events.tasks.send_bulk_booking_confirmation_emails.delay") as send_emails, \
+                self.captureOnCommitCallbacks(execute=True):
+            commit = client.post(reverse("event-import-commit", args=[self.event.id, response.data["id"]]))
+
+        self.assertEqual(commit.status_code, 200)
+        self.assertEqual((commit.data["status"], commit.data["imported_rows"]), (RegistrationImport.ImportStatus.COMPLETED, 2))
+        ben = CommunityUser.objects.get(primary_email="ben@example.com")
+        self.assertEqual((ben.area_from_id, ben.username[:4]), (self.area.id, "YGT-"))
+        self.assertFalse(ben.has_usable_password())
+        self.assertEqual(sorted(ben.user_allergies.values_list("allergy__name", flat=True)), ["Peanuts", "Shellfish"])
+        self.assertEqual(ben.community_user_emergency_contacts.get().phone_number, "+447700900001")
+
+        participants = self.event.participants.select_related("user")
+        self.assertEqual({participant.user_id for participant in participants}, {self.member.id, ben.id})
+        self.assertTrue(all(participant.event_pax_id for participant in participants))
+        payments = EventPayment.objects.filter(event=self.event)
+        self.assertEqual([(payment.package_id, payment.amount) for payment in payments], [(self.package.id, Decimal("40.00"))] * 2)
+        self.assertTrue(all(payment.bank_reference for payment in payments))
+        self.assertEqual(QuestionAnswer.objects.filter(participant__event=self.event, selected_choices=self.coach).count(), 2)
+        self.assertEqual(EventRegistrationCounter.objects.get(event=self.event, participant_type="").held, 2)
+        send_emails.assert_called_once()
+        self.assertEqual(sorted(send_emails.call_args.args[0]), sorted(str(participant.id) for participant in participants))
+
+    def test_reupload_and_recommit_are_idempotent(self):
+        client, response = self._upload()
+        with mock.patch("apps.events.tasks.send_bulk_booking_confirmation_emails.delay"):
+            client.post(reverse("event-import-commit", args=[self.event.id, response.data["id"]]))
+
+        _client, again = self._upload()
+        self.assertEqual(again.data["id"], response.data["id"])
+        with mock.patch("apps.events.tasks.send_bulk_booking_confirmation_emails.delay") as send_emails:
+            recommit = client.post(reverse("event-import-commit", args=[self.event.id, response.data["id"]]))
+        self.assertEqual(recommit.data["imported_rows"], 2)
+        send_emails.assert_not_called()
+
+        # A new file with an already registered member skips that row
+        _client, overlap = self._upload("First Name,Last Name,Email\nBen,Carter,ben@example.com\n")
+        self.assertEqual(overlap.data["skipped_rows"], 1)
+        self.assertEqual(self.event.participants.count(), 2)
+
+
+class FakeChannelLayer:
+
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+class CheckInBroadcasterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Desk", last_name="Lead")
+        cls.event = Event.objects.create(
+            name="Scan Rush", start_date=timezone.now() - timedelta(hours=1), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.ada = EventParticipant.objects.create(
+            event=cls.event, user=CommunityUser.objects.create_user(password="password", first_name="Ada", last_name="Baker"),
+        )
+        cls.ben = EventParticipant.objects.create(
+            event=cls.event, user=CommunityUser.objects.create_user(password="password", first_name="Ben", last_name="Carter"),
+        )
+
+    def setUp(self):
+        self.broadcaster = CheckInBroadcaster(window=0)
+        self.layer = FakeChannelLayer()
+        patcher = mock.patch("apps.events.websocket_utils.get_channel_layer", return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Flushed by hand instead of by the background thread
+        start = mock.patch.object(self.broadcaster, "_start")
+        start.start()
+        self.addCleanup(start.stop)
+
+    def test_burst_is_sent_as_one_batch_per_group(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.broadcaster.enqueue(self.event.id, self.ada.id, "checkin")
+            self.broadcaster.enqueue(self.event.id, self.ben.id, "checkin")
+            self.broadcaster.enqueue(self.event.id, self.ada.id, "checkout")
+            self.broadcaster.enqueue(self.event.id, self.ada.id, "checkin")
+
+        self.assertEqual(self.layer.sent, [])
+        self.assertEqual(self.broadcaster.flush(), 2)
+
+        [(group, message)] = self.layer.sent
+        self.assertEqual((group, message["type"]), (f"event_checkin_{self.event.id}", "checkin_batch"))
+        updates = message["updates"]
+        self.assertEqual([update["participant"]["id"] for update in updates], [str(self.ben.id), str(self.ada.id)])
+        self.assertEqual((updates[1]["action"], updates[1]["merged"]), ("checkin", 3))
+        self.assertEqual(self.broadcaster.flush(), 0)
+
+    def test_updates_wait_for_the_transaction_to_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.broadcaster.enqueue(self.event.id, self.ada.id, "checkin", participant_data={"id": str(self.ada.id)})
+        self.assertEqual(self.broadcaster.flush(), 0)
+
+        callbacks[0]()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.broadcaster.flush(), 1)
+
+
+class EventRosterServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Desk", last_name="Lead")
+        cls.event = Event.objects.create(
+            name="Roster Day", start_date=timezone.now() - timedelta(hours=1), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.participants = {
+            name: EventParticipant.objects.create(
+                event=cls.event, user=CommunityUser.objects.create_user(password="password", first_name=name, last_name="Roster"),
+            )
+            for name in ("Bea", "Cal", "Dee")
+        }
+
+    def setUp(self):
+        self.service = EventRosterService()
+
+    def _id(self, name):
+        return str(self.participants[name].id)
+
+    def test_window_changes_become_inserts_updates_and_removals(self):
+        known, count = self.service.window(self.event.id, order_by="name", page=1, page_size=2)
+        self.assertEqual((known, count), ([self._id("Bea"), self._id("Cal")], 3))
+
+        aaron = EventParticipant.objects.create(
+            event=self.event, user=CommunityUser.objects.create_user(password="password", first_name="Aaron", last_name="Roster"),
+        )
+        window, count = self.service.window(self.event.id, order_by="name", page=1, page_size=2)
+        diff = self.service.diff(known, window, {self._id("Bea"), self._id("Dee")})
+
+        self.assertEqual(diff["order"], [str(aaron.id), self._id("Bea")])
+        self.assertEqual([row["id"] for row in diff["inserts"]], [str(aaron.id)])
+        self.assertEqual([row["id"] for row in diff["updates"]], [self._id("Bea")])  # Dee is not on this page
+        self.assertEqual(diff["removals"], [self._id("Cal")])
+        self.assertEqual(count, 4)
+
+    def test_clients_resume_from_a_version(self):
+        start = self.service.version(self.event.id)
+        self.service.record_change(self.event.id, [self._id("Bea")])
+        self.service.record_change(self.event.id, [self._id("Cal"), self._id("Bea")])
+
+        changed, version = self.service.changes_since(self.event.id, start)
+        self.assertEqual((changed, version), ({self._id("Bea"), self._id("Cal")}, start + 2))
+        self.assertEqual(self.service.changes_since(self.event.id, version), (set(), version))
+
+        # After a bulk action (any participant may have changed) only a reload is safe
+        self.service.record_change(self.event.id)
+        self.assertIsNone(self.service.changes_since(self.event.id, start)[0])
+
+
+class CheckInScanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Scan", last_name="Desk")
+        cls.event = Event.objects.create(
+            name="Scan Camp", start_date=timezone.now() - timedelta(hours=1), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.other_event = Event.objects.create(
+            name="Other Camp", start_date=timezone.now() - timedelta(hours=1), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.participant = EventParticipant.objects.create(
+            event=cls.event, user=CommunityUser.objects.create_user(password="password", first_name="Ivy", last_name="Scan"),
+        )
+        cls.stranger = EventParticipant.objects.create(
+            event=cls.other_event, user=CommunityUser.objects.create_user(password="password", first_name="Ned", last_name="Scan"),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.organiser)
+
+    def _scan(self, code):
+        return self.client.post(reverse("event-scan", args=[self.event.id]), {"code": code}, format="json")
+
+    def test_scan_checks_in_once_and_reports_duplicates_from_the_index(self):
+        response = self._scan(self.participant.event_pax_id)
+
+        self.assertEqual((response.status_code, response.data["outcome"]), (201, CHECKED_IN))
+        self.participant.refresh_from_db()
+        self.assertEqual(self.participant.status, EventParticipant.ParticipantStatus.ATTENDED)
+        self.assertEqual(EventDayAttendance.objects.filter(event=self.event).count(), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._scan(self.participant.event_pax_id)
+        self.assertEqual((response.status_code, response.data["outcome"]), (200, ALREADY_CHECKED_IN))
+        self.assertFalse([query for query in queries if "events_eventparticipant" in query["sql"]])
+        self.assertFalse([query for query in queries if "events_eventdayattendance" in query["sql"]])
+
+    def test_a_badge_recorded_while_waiting_for_the_lock_is_not_checked_in_twice(self):
+        service = get_checkin_scan_service()
+        service.load(self.event.id)
+        real_add = cache.add
+        other_desk = []
+
+        def add_after_other_desk(key, *args, **kwargs):
+            # The other desk scans the same badge between this desk's read and its lock
+            if key.startswith("scan:lock") and not other_desk:
+                other_desk.append(None)
+                other_desk[0] = get_checkin_scan_service().scan(self.event, self.participant.event_pax_id)
+            return real_add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, "add", side_effect=add_after_other_desk):
+            result, _message = service.scan(self.event, self.participant.event_pax_id)
+
+        self.assertEqual((other_desk[0][0]["outcome"], result["outcome"]), (CHECKED_IN, ALREADY_CHECKED_IN))
+        self.assertEqual(EventDayAttendance.objects.filter(event=self.event).count(), 1)
+
+    def test_waitlist_promotions_refresh_the_scan_index(self):
+        Event.objects.filter(pk=self.event.pk).update(maximum_attendees=1)
+        self.event.refresh_from_db()
+        waiting, _ = register_for_event(self.event, "Wes", "Scan")
+        self.assertEqual(waiting.status, EventParticipant.ParticipantStatus.WAITLISTED)
+        get_checkin_scan_service().load(self.event.id)
+
+        Event.objects.filter(pk=self.event.pk).update(maximum_attendees=2)
+        RegistrationCapacityService().fill_from_waitlist(self.event.id)
+        response = self._scan(waiting.event_pax_id)
+        self.assertEqual((response.status_code, response.data["outcome"]), (201, CHECKED_IN))
+
+    def test_wrong_event_cancelled_and_late_registrations(self):
+        get_checkin_scan_service().load(self.event.id)
+
+        response = self._scan(self.stranger.event_pax_id)
+        self.assertEqual((response.status_code, response.data["outcome"]), (409, WRONG_EVENT))
+        self.assertEqual(response.data["event"]["id"], str(self.other_event.id))
+
+        RegistrationCapacityService().cancel(self.participant.id)
+        response = self._scan(self.participant.event_pax_id)
+        self.assertEqual((response.status_code, response.data["outcome"]), (409, NOT_ALLOWED))
+
+        # Registered after the index was loaded: found with one lookup and added to the index
+        late = EventParticipant.objects.create(
+            event=self.event, user=CommunityUser.objects.create_user(password="password", first_name="Lou", last_name="Scan"),
+        )
+        response = self._scan(late.event_pax_id)
+        self.assertEqual((response.status_code, response.data["participant"]["name"]), (201, "Lou Scan"))
+        self.assertFalse(EventDayAttendance.objects.filter(user=self.participant.user).exists())
+
+
+class CheckInSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organiser = CommunityUser.objects.create_user(password="password", first_name="Sync", last_name="Desk")
+        cls.event = Event.objects.create(
+            name="Retreat", start_date=timezone.now() - timedelta(days=1), created_by=cls.organiser,
+            is_public=True, approved=True,
+        )
+        cls.participants = {
+            name: EventParticipant.objects.create(
+                event=cls.event, user=CommunityUser.objects.create_user(password="password", first_name=name, last_name="Sync"),
+            )
+            for name in ("Bea", "Cal")
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.organiser)
+        self.base = timezone.now() - timedelta(minutes=10)
+
+    def _operation(self, key, name, action, seconds):
+        return {
+            "key": key, "participant_id": str(self.participants[name].id), "action": action,
+            "client_time": (self.base + timedelta(seconds=seconds)).isoformat(),
+        }
+
+    def _sync(self, device, token, *operations):
+        return self.client.post(
+            reverse("event-checkin-sync", args=[self.event.id]),
+            {"device_id": device, "sync_token": token, "operations": list(operations)}, format="json",
+        )
+
+    def _snapshot(self):
+        response = self.client.get(reverse("event-checkin-sync-snapshot", args=[self.event.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["signature"], CheckInSyncService().sign_snapshot(response.data))
+        return response.data
+
+    def test_desks_resolve_double_check_ins_and_early_check_outs(self):
+        token = self._snapshot()["sync_token"]
+
+        desk_a = self._sync("desk-a", token, self._operation("a-1", "Bea", "check_in", 0))
+        self.assertEqual(desk_a.data["results"][0]["outcome"], "APPLIED")
+
+        # Desk B saw Bea later, and checked Cal out before anyone uploaded Cal's check-in
+        desk_b = self._sync(
+            "desk-b", token,
+            self._operation("b-1", "Bea", "check_in", 5),
+            self._operation("b-2", "Cal", "check_out", 30),
+        )
+        self.assertEqual([result["outcome"] for result in desk_b.data["results"]], ["MERGED", "DEFERRED"])
+        self.assertEqual(desk_b.data["results"][0]["attendance_id"], desk_a.data["results"][0]["attendance_id"])
+
+        desk_a = self._sync("desk-a", desk_a.data["sync_token"], self._operation("a-2", "Cal", "check_in", 10))
+        self.assertEqual(desk_a.data["results"][0]["outcome"], "APPLIED")
+        # Bea's record was last written by desk B
+        self.assertEqual([change["participant_id"] for change in desk_a.data["changes"]], [str(self.participants["Bea"].id)])
+
+        bea = EventDayAttendance.objects.get(user=self.participants["Bea"].user)
+        cal = EventDayAttendance.objects.get(user=self.participants["Cal"].user)
+        self.assertEqual(bea.check_in_time, self.base)
+        self.assertEqual((cal.check_in_time, cal.check_out_time), (self.base + timedelta(seconds=10), self.base + timedelta(seconds=30)))
+        self.assertEqual(
+            CheckInSyncOperation.objects.get(idempotency_key="b-2").outcome, CheckInSyncOperation.Outcome.APPLIED
+        )
+        self.assertEqual(
+            EventParticipant.objects.get(pk=self.participants["Cal"].pk).status, EventParticipant.ParticipantStatus.ATTENDED
+        )
+
+    def test_replayed_batches_and_bad_tokens(self):
+        token = self._snapshot()["sync_token"]
+        batch = [self._operation("a-1", "Bea", "check_in", 0), self._operation("a-2", "Bea", "check_out", 60)]
+
+        first = self._sync("desk-a", token, *batch)
+        again = self._sync("desk-a", token, *batch)
+
+        self.assertEqual([result["outcome"] for result in first.data["results"]], ["APPLIED", "APPLIED"])
+        self.assertEqual([result["replayed"] for result in again.data["results"]], [True, True])
+        self.assertEqual(again.data["results"][1]["attendance_id"], first.data["results"][1]["attendance_id"])
+        self.assertEqual(EventDayAttendance.objects.filter(event=self.event).count(), 1)
+
+        self.assertEqual(self._sync("desk-a", token + "x", *batch).status_code, 400)
+
+
+class EventDashboardFanOutTests(TransactionTestCase):
+    # Consumers close the connection between database_sync_to_async calls, so no wrapping transaction
+
+    def setUp(self):
+        cache.clear()
+        self.organiser = CommunityUser.objects.create_user(password="password", first_name="Dash", last_name="Lead")
+        self.helper = CommunityUser.objects.create_user(password="password", first_name="Dash", last_name="Helper")
+        self.outsider = CommunityUser.objects.create_user(password="password", first_name="Dash", last_name="Outsider")
+        self.event = Event.objects.create(
+            name="Dashboard Day", start_date=timezone.now() - timedelta(days=2), created_by=self.organiser,
+            is_public=True, approved=True,
+        )
+        EventServiceTeamMember.objects.create(user=self.helper, event=self.event)
+        self.participant = EventParticipant.objects.create(
+            event=self.event, user=CommunityUser.objects.create_user(password="password", first_name="Kim", last_name="Dash"),
+        )
+
+    async def _connect(self, user):
+        communicator = WebsocketCommunicator(EventDashboardConsumer.as_asgi(), "/ws/dashboard/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_one_group_send_reaches_every_supervisor(self):
+        communicators = [await self._connect(user) for user in (self.organiser, self.helper, self.outsider)]
+        layer = websocket_notifier.channel_layer
+
+        with mock.patch.object(layer, "group_send", wraps=layer.group_send) as group_send:
+            await sync_to_async(websocket_notifier.notify_event_dashboard)(self.event.id, "participant_checked_in", {"n": 1})
+        self.assertEqual(group_send.call_count, 1)
+
+        for communicator in communicators[:2]:
+            message = await communicator.receive_json_from()
+            self.assertEqual((message["event_id"], message["update_type"]), (str(self.event.id), "participant_checked_in"))
+        self.assertTrue(await communicators[2].receive_nothing())
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    async def test_event_list_counts_todays_check_ins_from_the_cache(self):
+        await sync_to_async(EventDayAttendance.objects.create)(
+            event=self.event, user=self.participant.user, check_in_time=timezone.now(),
+        )
+        communicator = await self._connect(self.organiser)
+
+        await communicator.send_json_to({"type": "get_events"})
+        [event] = (await communicator.receive_json_from())["events"]
+        self.assertEqual((event["participant_count"], event["checked_in_count"]), (1, 1))
+
+        # Cached until the roster changes
+        await sync_to_async(EventDayAttendance.objects.filter(event=self.event).delete)()
+        await communicator.send_json_to({"type": "get_events"})
+        self.assertEqual((await communicator.receive_json_from())["events"][0]["checked_in_count"], 1)
+        await sync_to_async(EventRosterService().record_change)(self.event.id)
+        await communicator.send_json_to({"type": "get_events"})
+        self.assertEqual((await communicator.receive_json_from())["events"][0]["checked_in_count"], 0)
+        await communicator.disconnect()
+
+
+@override_settings(CHANNELS_MAX_CONNECTIONS_PER_USER=50)
+class CheckInConsumerLoadTests(TransactionTestCase):
+    # Many check-in screens on one event, with bulk operations running alongside paging
+
+    CLIENTS = 20
+
+    def setUp(self):
+        cache.clear()
+        self.organiser = CommunityUser.objects.create_user(password="password", first_name="Load", last_name="Lead")
+        self.event = Event.objects.create(
+            name="Load Day", start_date=timezone.now() - timedelta(days=1), created_by=self.organiser,
+            is_public=True, approved=True,
+        )
+        for number in range(10):
+            EventParticipant.objects.create(
+                event=self.event, status=EventParticipant.ParticipantStatus.CONFIRMED,
+                user=CommunityUser.objects.create_user(password="password", first_name=f"Load{number}", last_name="Guest"),
+            )
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/events/checkin/{self.event.id}/")
+        communicator.scope["user"] = self.organiser
+        connected, _ = await communicator.connect(timeout=10)
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_concurrent_clients_page_while_a_bulk_check_in_runs(self):
+        communicators = await asyncio.gather(*(self._connect() for _ in range(self.CLIENTS)))
+        initial = await asyncio.gather(*(communicator.receive_json_from(timeout=30) for communicator in communicators))
+        self.assertTrue(all(frame["type"] == "initial_data" and frame["pagination"]["count"] == 10 for frame in initial))
+
+        # Hold the bulk check-in open until the other screens have paged
+        release = threading.Event()
+        bulk_checkin = EventCheckInConsumer.bulk_checkin.__wrapped__
+
+        def held_bulk_checkin(consumer, *args, **kwargs):
+            release.wait(10)
+            return bulk_checkin(consumer, *args, **kwargs)
+
+        with mock.patch.object(EventCheckInConsumer, "bulk_checkin", db_pool("bulk")(held_bulk_checkin)):
+            await communicators[0].send_json_to({"type": "bulk_checkin_all"})
+            for communicator in communicators[1:]:
+                await communicator.send_json_to({"type": "get_participants", "page": 2, "page_size": 4})
+            pages = await asyncio.gather(*(communicator.receive_json_from(timeout=5) for communicator in communicators[1:]))
+            self.assertTrue(all(len(page["participants"]) == 4 for page in pages))
+            self.assertFalse(release.is_set())
+
+            release.set()
+            result = await communicators[0].receive_json_from(timeout=10)
+        self.assertEqual((result["type"], result["checked_in_count"]), ("bulk_checkin_result", 10))
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+
+class WebsocketLimitTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.organiser = CommunityUser.objects.create_user(password="password", first_name="Limit", last_name="Lead")
+        self.event = Event.objects.create(
+            name="Limit Day", start_date=timezone.now() - timedelta(days=1), created_by=self.organiser,
+            is_public=True, approved=True,
+        )
+        EventParticipant.objects.create(
+            event=self.event, status=EventParticipant.ParticipantStatus.CONFIRMED,
+            user=CommunityUser.objects.create_user(password="password", first_name="Lim", last_name="Guest"),
+        )
+
+    async def _connect(self, path="/ws/events/dashboard/"):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        communicator.scope["user"] = self.organiser
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    @override_settings(CHANNELS_MAX_CONNECTIONS_PER_USER=1)
+    async def test_connections_over_the_user_cap_are_refused_until_one_closes(self):
+        first = await self._connect()
+        refused = await self._connect()
+        self.assertEqual((await refused.receive_json_from())["code"], "too_many_connections")
+        self.assertEqual((await refused.receive_output())["code"], CLOSE_TOO_MANY_CONNECTIONS)
+
+        await first.disconnect()
+        again = await self._connect()
+        self.assertTrue(await again.receive_nothing())
+        await again.disconnect()
+        self.assertEqual((await sync_to_async(get_websocket_metrics)(1))["connection_refused"], 1)
+
+    @override_settings(CHANNELS_MAX_CONNECTIONS_PER_USER=2, CHANNELS_HEARTBEAT_INTERVAL=0.05)
+    async def test_a_leaked_connection_expires_while_live_ones_heartbeat(self):
+        # A connection of a crashed worker, last heartbeat just under the expiry ago
+        key = _slot_key(SCOPE_USER, self.organiser.id)
+        await cache.aset(key, {"dead-worker": time.time() - 1.1}, 60)
+        live = await self._connect()
+        refused = await self._connect()
+        self.assertEqual((await refused.receive_json_from())["code"], "too_many_connections")
+
+        await asyncio.sleep(0.3)
+        again = await self._connect()
+        self.assertEqual(len(await cache.aget(key)), 2)
+        for communicator in (live, again):
+            await communicator.disconnect()
+        self.assertEqual(await cache.aget(key), {})
+
+    @override_settings(CHANNELS_HEAVY_MESSAGE_RATE=(2, 60))
+    async def test_heavy_messages_over_the_rate_are_dropped(self):
+        communicator = await self._connect()
+        for _ in range(3):
+            await communicator.send_json_to({"type": "get_events"})
+        replies = [await communicator.receive_json_from() for _ in range(3)]
+        self.assertEqual([reply["type"] for reply in replies], ["user_events", "user_events", "throttled"])
+
+        # Light messages still go through
+        await communicator.send_json_to({"type": "ping", "timestamp": 1})
+        self.assertEqual((await communicator.receive_json_from())["type"], "pong")
+        await communicator.disconnect()
+        self.assertEqual((await sync_to_async(get_websocket_metrics)(1))["throttled"], 1)
+
+    @override_settings(CHANNELS_HEARTBEAT_INTERVAL=0.05, CHANNELS_IDLE_TIMEOUT=0.12)
+    async def test_idle_connections_are_pinged_then_closed(self):
+        communicator = await self._connect()
+        frames = []
+        while not frames or frames[-1]["type"] == "websocket.send":
+            frames.append(await communicator.receive_output())
+        self.assertEqual(json.loads(frames[0]["text"])["type"], "ping")
+        self.assertEqual((frames[-1]["type"], frames[-1]["code"]), ("websocket.close", CLOSE_IDLE))
+        self.assertEqual((await sync_to_async(get_websocket_metrics)(1))["idle_closed"], 1)
+
+    async def test_overlapping_bulk_check_ins_on_an_event_are_refused(self):
+        path = f"/ws/events/checkin/{self.event.id}/"
+        first, second = await self._connect(path), await self._connect(path)
+        for communicator in (first, second):
+            self.assertEqual((await communicator.receive_json_from())["type"], "initial_data")
+
+        release = threading.Event()
+        bulk_checkin = EventCheckInConsumer.bulk_checkin.__wrapped__
+
+        def held_bulk_checkin(consumer, *args, **kwargs):
+            release.wait(10)
+            return bulk_checkin(consumer, *args, **kwargs)
+
+        with mock.patch.object(EventCheckInConsumer, "bulk_checkin", db_pool("bulk")(held_bulk_checkin)):
+            await first.send_json_to({"type": "bulk_checkin_all"})
+            await asyncio.sleep(0.1)
+            await second.send_json_to({"type": "bulk_checkin_all"})
+            refused = await second.receive_json_from(timeout=5)
+            self.assertEqual((refused["type"], refused["success"]), ("bulk_checkin_result", False))
+
+            release.set()
+            result = await first.receive_json_from(timeout=10)
+        self.assertEqual((result["success"], result["checked_in_count"]), (True, 1))
+        for communicator in (first, second):
+            await communicator.disconnect()
+
+
+class QueryProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CommunityUser.objects.create_user(password="password", first_name="Prof", last_name="Iler")
+        cls.event = Event.objects.create(
+            name="Profiled Day", start_date=timezone.now() - timedelta(days=1), end_date=timezone.now() + timedelta(days=1),
+            created_by=cls.admin,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _trends(self):
+        response = self.client.get(reverse('event-attendance_trends', args=[self.event.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sampled_requests_are_recorded_per_view_action(self):
+        self._trends()
+        self.assertEqual(get_query_profile(), [])
+
+        with self.settings(QUERY_PROFILING_SAMPLE_RATE=1):
+            self._trends()
+            self._trends()
+        [row] = get_query_profile()
+        self.assertEqual((row['endpoint'], row['kind'], row['samples']), ('EventViewSet.attendance_trends', 'http', 2))
+        self.assertGreater(row['queries']['p95'], 0)
+        self.assertGreaterEqual(row['wall_ms']['p95'], row['db_ms']['p95'])
+
+    def test_unknown_websocket_message_types_share_one_endpoint(self):
+        class Consumer:
+            async def websocket_receive(self, message):
+                pass
+
+        class ProbeConsumer(QueryProfilingMixin, Consumer):
+            profiled_message_types = frozenset({'get_events'})
+
+        consumer = ProbeConsumer()
+        with self.settings(QUERY_PROFILING_SAMPLE_RATE=1):
+            for message_type in ('get_events', 'made_up_1', 'made_up_2', None, ['get_events']):
+                async_to_sync(consumer.websocket_receive)({'text': json.dumps({'type': message_type})})
+            async_to_sync(consumer.websocket_receive)({'text': 'not json'})
+        samples = {row['endpoint']: row['samples'] for row in get_query_profile()}
+        self.assertEqual(samples, {'ProbeConsumer.get_events': 1, 'ProbeConsumer.unknown': 5})
+
+    def test_repeated_queries_are_flagged_as_n_plus_one(self):
+        users = [CommunityUser.objects.create_user(password="password", first_name="Rep", last_name=str(n)) for n in range(5)]
+        profile, token = start_profile('http')
+        try:
+            for user in users:
+                list(EventParticipant.objects.filter(user_id=user.id))
+            list(EventParticipant.objects.filter(user_id__in=[user.id for user in users]))
+        finally:
+            stop_profile(token)
+        profile.record('Loop.test')
+
+        [row] = get_query_profile('Loop.test')
+        self.assertEqual((row['queries']['max'], row['n_plus_one']), (6, 1))
+        self.assertEqual(row['duplicates'][0]['count'], 5)
+        self.assertEqual(query_signature("SELECT 1 WHERE a IN (%s, %s) AND b = 'x'"), "SELECT ? WHERE a IN (...) AND b = ?")
+
+
+def seed_event(participants=200):
+    """
+    A realistic event for query budgets: participants spread over two clusters with
+    payments, question answers, today's attendance (half of them), merch carts with
+    orders and product payments (a third of them).
+    """
+    country = CountryLocation.objects.create(country="GB", general_sector="EUROPE", specific_sector="WEST_EUROPE")
+    areas = []
+    for cluster_id in ("b", "c"):
+        cluster = ClusterLocation.objects.create(cluster_id=cluster_id, world_location=country)
+        chapter = ChapterLocation(chapter_name=f"chapter{cluster_id}", chapter_code=f"C{cluster_id.upper()}", cluster=cluster)
+        chapter.save()
+        unit = UnitLocation.objects.create(unit_name=cluster_id, chapter=chapter)
+        areas += [
+            AreaLocation.objects.create(area_name=f"area{cluster_id}{n}", area_code=f"A{cluster_id.upper()}{n}", unit=unit)
+            for n in range(2)
+        ]
+
+    admin = CommunityUser.objects.create_user(
+        first_name="Budget", last_name="Admin", area_from=areas[0], is_staff=True, is_superuser=True,
+    )
+    now = timezone.now()
+    event = Event.objects.create(
+        name="Budget Conference", start_date=now - timedelta(days=1), end_date=now + timedelta(days=2),
+        created_by=admin, is_public=True, approved=True,
+    )
+    package = EventPaymentPackage.objects.create(event=event, name="Full weekend", price=Decimal("60.00"))
+    method = EventPaymentMethod.objects.create(event=event, method=EventPaymentMethod.MethodType.BANK_TRANSFER)
+    question = ExtraQuestion.objects.create(
+        event=event, question_name="Transport", question_body="How are you travelling?",
+        question_type=ExtraQuestion.QuestionType.CHOICE,
+    )
+    choices = [QuestionChoice.objects.create(question=question, text=text) for text in ("Coach", "Car")]
+    product = EventProduct.objects.create(title="Hoodie", event=event, seller=admin, price=Decimal("20.00"), stock=10000)
+    product_method = ProductPaymentMethod.objects.create(event=event, method=ProductPaymentMethod.MethodType.BANK_TRANSFER)
+
+    carts = []
+    for n in range(participants):
+        user = CommunityUser.objects.create_user(first_name=f"Guest{n}", last_name="Budget", area_from=areas[n % len(areas)])
+        participant = EventParticipant.objects.create(
+            event=event, user=user,
+            status=EventParticipant.ParticipantStatus.ATTENDED if n % 2 else EventParticipant.ParticipantStatus.CONFIRMED,
+        )
+        EventPayment.objects.create(
+            user=participant, event=event, package=package, method=method, amount=Decimal("60.00"),
+            status=EventPayment.PaymentStatus.SUCCEEDED if n % 3 else EventPayment.PaymentStatus.PENDING,
+        )
+        answer = QuestionAnswer.objects.create(participant=participant, question=question)
+        answer.selected_choices.add(choices[n % 2])
+        if n % 2:
+            EventDayAttendance.objects.create(event=event, user=user, check_in_time=now - timedelta(minutes=n))
+        if n % 3 == 0:
+            cart = EventCart.objects.create(user=user, event=event, total=Decimal("40.00"))
+            cart.products.add(product)
+            EventProductOrder.objects.create(
+                product=product, cart=cart, quantity=2, price_at_purchase=Decimal("20.00"),
+                status=EventProductOrder.Status.PURCHASED,
+            )
+            if n % 6 == 0:
+                ProductPayment.objects.create(
+                    user=user, cart=cart, method=product_method, amount=Decimal("40.00"),
+                    status=ProductPayment.PaymentStatus.SUCCEEDED,
+                )
+            carts.append(cart)
+
+    return SimpleNamespace(admin=admin, event=event, product=product, product_method=product_method, carts=carts, areas=areas)
+
+
+# Most queries each endpoint may run against seed_event(). None of them depend on the
+# number of participants, so a loop that starts querying per participant blows the budget.
+QUERY_BUDGETS = {
+    'list': 13,
+    'retrieve': 11,
+    'my_events': 11,
+    'participants': 19,
+    'daily_checkin_status': 7,
+    'outstanding_payments_by_location': 9,
+    'attendance_trends': 7,
+    'registration-distribution': 2,
+    'payment-distribution': 4,
+    'merch-statistics': 7,
+    'overall-summary': 10,
+    'merch-payment-distribution': 3,
+    'merch-revenue-timeline': 2,
+    'merch-payment-methods': 2,
+    'merch-cart-funnel': 6,
+    'merch-orders': 5,
+    'merch-refund-statistics': 5,
+    'event-overview': 18,
+    'event-timeline': 10,
+    'event-revenue': 12,
+    'event-by-location': 7,
+    'event-payment-methods': 7,
+    'checkout': 55,
+    'ws_get_participants': 15,
+}
+
+
+class QueryBudgetTests(TestCase):
+    PARTICIPANTS = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_event(cls.PARTICIPANTS)
+        cls.event = cls.seed.event
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seed.admin)
+
+    def assertQueryBudget(self, name, call):
+        """Run call() and fail - listing the repeated queries - if it runs more than its budget"""
+        with CaptureQueriesContext(connection) as context:
+            result = call()
+        budget = QUERY_BUDGETS[name]
+        queries = [query['sql'] for query in context.captured_queries]
+        if len(queries) > budget:
+            # Column lists hide what matters - which table, filtered how
+            repeated = Counter(re.sub(r"^SELECT .*? FROM", "SELECT ... FROM", query_signature(sql)) for sql in queries).most_common()
+            report = "\n".join(f"  {count} x {signature[:300]}" for signature, count in repeated)
+            self.fail(f"{name} ran {len(queries)} queries (budget {budget}, {len(queries) - budget} over):\n{report}")
+        return result
+
+    def get(self, name, url, **params):
+        response = self.assertQueryBudget(name, lambda: self.client.get(url, params))
+        self.assertEqual(response.status_code, 200, f"{name}: {response.data}")
+        return response.data
+
+    def test_event_endpoints(self):
+        event_id = self.event.id
+        self.assertEqual(self.get('list', reverse('event-list'))['count'], 1)
+        self.assertEqual(self.get('retrieve', reverse('event-detail', args=[event_id]))['participant_count'], self.PARTICIPANTS)
+        self.assertIn('results', self.get('my_events', reverse('event-my-events')))
+
+        participants = self.get('participants', reverse('event-participants', args=[event_id]))
+        self.assertEqual(participants['count'], self.PARTICIPANTS)
+        self.assertIn('filter_options', participants)
+
+    def test_participants_page_cost_does_not_grow_with_its_size(self):
+        # Load the location hierarchy first; both pages hold participants with carts (a third have one)
+        self.client.get(reverse('event-participants', args=[self.event.id]))
+        counts = {}
+        for page_size in (10, 30):
+            with mock.patch.object(PageNumberPagination, "page_size", page_size), \
+                    CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse('event-participants', args=[self.event.id]))
+            self.assertEqual(len(response.data['results']), page_size)
+            counts[page_size] = len(context.captured_queries)
+        self.assertEqual(counts[10], counts[30])
+
+    def test_live_dashboard_endpoints(self):
+        event_id = self.event.id
+        day = self.get(
+            'daily_checkin_status', reverse('event-daily_checkin_status', args=[event_id]),
+            day=timezone.localdate().isoformat(),
+        )
+        self.assertEqual(day['total_participants'], self.PARTICIPANTS)
+
+        outstanding = self.get('outstanding_payments_by_location', reverse('event-outstanding_payments_by_location', args=[event_id]))
+        self.assertEqual(sum(row['participant_count'] for row in outstanding['data']), self.PARTICIPANTS)
+
+        trends = self.get('attendance_trends', reverse('event-attendance_trends', args=[event_id]))
+        self.assertEqual((trends['granularity'], sum(row.get('check_ins', 0) for row in trends['data'])), ('daily', self.PARTICIPANTS // 2))
+
+    def test_statistics_endpoints(self):
+        event_id = self.event.id
+        payment_distribution = self.get('payment-distribution', reverse('event-statistics-payment-distribution', args=[event_id]))
+        self.assertEqual(sum(row['total_participants'] for row in payment_distribution['data']), self.PARTICIPANTS)
+        self.assertEqual(sum(row['event_payments_outstanding'] for row in payment_distribution['data']), self.PARTICIPANTS)
+
+        merch_distribution = self.get('merch-payment-distribution', reverse('event-statistics-merch-payment-distribution', args=[event_id]))
+        self.assertEqual(sum(row['participants_with_orders'] for row in merch_distribution['data']), self.PARTICIPANTS // 6)
+
+        for name, keys in [
+            ('registration-distribution', {'data', 'group_by', 'total_participants'}),
+            ('merch-statistics', {'carts', 'products', 'revenue', 'summary'}),
+            ('overall-summary', {'merch', 'participants', 'revenue'}),
+            ('merch-revenue-timeline', {'data', 'summary'}),
+            ('merch-payment-methods', {'data', 'summary'}),
+            ('merch-cart-funnel', {'funnel', 'summary'}),
+            ('merch-orders', {'orders', 'summary', 'count'}),
+            ('merch-refund-statistics', {'summary', 'timeline', 'recent_refunds'}),
+        ]:
+            data = self.get(name, reverse(f'event-statistics-{name}', args=[event_id]))
+            self.assertLessEqual(keys, set(data), name)
+
+    def test_payment_overview_endpoints(self):
+        kwargs = {'event_id': self.event.id}
+        overview = self.get('event-overview', reverse('payment-overview-event-overview', kwargs=kwargs))
+        self.assertEqual(overview['total_participants'], self.PARTICIPANTS)
+
+        by_location = self.get('event-by-location', reverse('payment-overview-event-by-location', kwargs=kwargs))
+        self.assertEqual(sum(row['total_participants'] for row in by_location), self.PARTICIPANTS)
+        self.assertEqual(sum(row['total_payments'] for row in by_location), self.PARTICIPANTS)
+        self.assertEqual(sum(Decimal(row['total_amount']) for row in by_location), Decimal("60.00") * self.PARTICIPANTS)
+
+        self.assertIn('gross_revenue', self.get('event-revenue', reverse('payment-overview-event-revenue', kwargs=kwargs)))
+        self.assertIsInstance(self.get('event-timeline', reverse('payment-overview-event-timeline', kwargs=kwargs)), list)
+        methods = self.get('event-payment-methods', reverse('payment-overview-event-payment-methods', kwargs=kwargs))
+        self.assertEqual(sum(row['count'] for row in methods), self.PARTICIPANTS + self.PARTICIPANTS // 6)
+
+    def test_checkout(self):
+        cart = self.seed.carts[1]
+        response = self.assertQueryBudget('checkout', lambda: self.client.post(
+            reverse('eventcart-checkout', args=[cart.pk]),
+            {'payment_method_id': str(self.seed.product_method.id), 'first_name': 'Guest', 'last_name': 'Budget', 'email': 'guest@example.com'},
+            format='json',
+        ))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIn('payment', response.data)
+
+    def test_websocket_participant_page(self):
+        # What EventCheckInConsumer.get_participants_data runs for a page (its pools use
+        # their own connections, which can't see this test's transaction)
+        service = EventRosterService()
+
+        def page():
+            ids, count = service.window(self.event.id, {}, 'recent_updates', 1, 50)
+            return ids, count, service.serialize(ids), service.filter_options(self.event.id)
+
+        ids, count, payloads, options = self.assertQueryBudget('ws_get_participants', page)
+        self.assertEqual((len(ids), count), (50, self.PARTICIPANTS))
+        self.assertEqual(set(payloads), set(ids))
+        first = next(payload for payload in payloads.values() if payload['product_orders'])
+        self.assertEqual(first['product_orders'][0]['quantity'], 2)
+        self.assertEqual(len(first['event_question_answers']), 1)
+        self.assertEqual(len(first['event_payments']), 1)
+        self.assertIn('areas', options)
@@ -1,8 +1,13 @@
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+import atexit
 import json
+import threading
+import time
 from datetime import datetime
+from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
 from django.utils import timezone
 import pytz
 
@@ -26,6 +31,133 @@ def convert_to_london_time(dt):
         return dt
 
 
+def get_checkin_broadcast_window():
+    """Seconds check-in updates are buffered before one batched frame is sent (settings.CHECKIN_BROADCAST_WINDOW)"""
+    return getattr(settings, 'CHECKIN_BROADCAST_WINDOW', 0.25)
+
+
+class CheckInBroadcaster:
+    """
+    Coalesces check-in/check-out broadcasts for EventCheckInConsumer groups.
+    
+    Requests only put the update in an in-process buffer (no channel layer round-trip).
+    A background thread wakes up once per window, keeps the latest update per participant,
+    serializes each participant once and sends ONE 'checkin_batch' message per event group.
+    A burst of scans from several desks therefore becomes a frame per window instead of a
+    frame per scan, and repeated scans of the same person collapse into one entry.
+    """
+    
+    def __init__(self, window=None):
+        self.window = window
+        self._pending = {}  # event id -> {participant id: update}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def enqueue(self, event_id, participant_id, action, source='automatic', participant_data=None):
+        """
+        Buffer an update, sent with the next batch once the current transaction commits.
+        participant_data is serialized by the flusher when not given.
+        """
+        update = {
+            'participant_id': str(participant_id),
+            'participant': participant_data,
+            'action': action,
+            'source': source,
+            'timestamp': datetime.now().isoformat(),
+        }
+        transaction.on_commit(lambda: self._buffer(str(event_id), update))
+    
+    def _buffer(self, event_id, update):
+        with self._lock:
+            updates = self._pending.setdefault(event_id, {})
+            previous = updates.pop(update['participant_id'], None)
+            # Latest state wins; keep the position at the end so batches stay in scan order
+            update['merged'] = previous['merged'] + 1 if previous else 1
+            updates[update['participant_id']] = update
+        self._start()
+        self._wakeup.set()
+    
+    def flush(self):
+        """
+        Send everything buffered so far, one group_send per event group.
+        
+        Returns:
+            int: Number of updates sent
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        
+        missing = [
+            update['participant_id'] for updates in pending.values() for update in updates.values()
+            if update['participant'] is None
+        ]
+        serialized = {}
+        if missing:
+            from apps.events.models import EventParticipant
+            for participant in EventParticipant.objects.filter(id__in=missing).select_related('user', 'event', 'organisation'):
+                serialized[str(participant.id)] = serialize_participant_for_websocket(participant)
+        
+        from apps.events.services.roster_service import get_roster_service
+        roster = get_roster_service()
+        channel_layer = get_channel_layer()
+        sent = 0
+        for event_id, updates in pending.items():
+            group_name = f'event_checkin_{event_id}'
+            batch = []
+            for update in updates.values():
+                participant_data = update.pop('participant') or serialized.get(update['participant_id'])
+                if participant_data is None:
+                    continue  # deleted since the scan
+                batch.append({**update, 'participant': participant_data})
+            if not batch:
+                continue
+            version = roster.record_change(event_id, [update['participant_id'] for update in batch])
+            if not channel_layer:
+                continue
+            try:
+                async_to_sync(channel_layer.group_send)(group_name, {
+                    'type': 'checkin_batch',
+                    'updates': batch,
+                    'version': version,
+                    'timestamp': datetime.now().isoformat(),
+                })
+                sent += len(batch)
+                print(f"📡 CHECKIN_BATCH - Sent {len(batch)} updates to group {group_name}")
+            except Exception as e:
+                print(f"❌ CHECKIN_BATCH FAILED - Group {group_name}: {e}")
+        return sent
+    
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='checkin-broadcaster', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Collect everything that arrives during the window into one batch
+            time.sleep(self.window if self.window is not None else get_checkin_broadcast_window())
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ CHECKIN_BATCH FAILED - Error: {e}")
+            finally:
+                # This thread keeps its own database connection - do not hold it between batches
+                connections.close_all()
+
+
+checkin_broadcaster = CheckInBroadcaster()
+atexit.register(checkin_broadcaster.flush)
+
+
 class WebSocketNotifier:
     """
     Utility class for sending WebSocket notifications to event groups
@@ -34,43 +166,22 @@ class WebSocketNotifier:
     def __init__(self):
         self.channel_layer = get_channel_layer()
     
-    def notify_checkin_update(self, event_id, participant_data, action='checkin', source='manual'):
+    def notify_checkin_update(self, event_id, participant_data=None, action='checkin', source='manual', participant_id=None):
         """
-        Send check-in update to all connected clients monitoring this event
+        Queue a check-in update for all connected clients monitoring this event.
+        Updates are coalesced and sent in batches (see CheckInBroadcaster), so this never
+        waits for the channel layer.
         
         Args:
             event_id (str/UUID): The event ID
-            participant_data (dict): Participant information
+            participant_data (dict): Participant information (serialized later from participant_id if omitted)
             action (str): 'checkin' or 'checkout'
             source (str): 'manual' (user-initiated) or 'automatic' (system/bulk)
+            participant_id (str/UUID): The participant ID, when participant_data is omitted
         """
-        participant_name = participant_data.get('user', {}).get('first_name', 'Unknown')
-        print(f"🚀 NOTIFY_CHECKIN_UPDATE - Event ID: {event_id}, Participant: {participant_name}, Action: {action}, Source: {source}")
-        
-        if not self.channel_layer:
-            print(f"❌ NOTIFY_CHECKIN_UPDATE FAILED - No channel layer available")
-            return
-        
-        event_group_name = f'event_checkin_{event_id}'
-        print(f"📡 NOTIFY_CHECKIN_UPDATE - Sending to group: {event_group_name}")
-        
-        message = {
-            'type': 'checkin_update',
-            'participant': participant_data,
-            'action': action,
-            'source': source,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        try:
-            async_to_sync(self.channel_layer.group_send)(
-                event_group_name,
-                message
-            )
-            print(f"✅ NOTIFY_CHECKIN_UPDATE SUCCESS - Sent to group {event_group_name}")
-        except Exception as e:
-            print(f"❌ NOTIFY_CHECKIN_UPDATE FAILED - Error: {e}")
-            raise
+        participant_id = participant_id or participant_data['id']
+        print(f"🚀 NOTIFY_CHECKIN_UPDATE - Event ID: {event_id}, Participant: {participant_id}, Action: {action}, Source: {source}")
+        checkin_broadcaster.enqueue(event_id, participant_id, action, source, participant_data=participant_data)
     
     def notify_participant_registered(self, event_id, participant_data):
         """
@@ -80,6 +191,10 @@ class WebSocketNotifier:
             event_id (str/UUID): The event ID
             participant_data (dict): Participant information
         """
+        from apps.events.services.roster_service import get_roster_service
+        roster = get_roster_service()
+        version = roster.record_change(event_id, [participant_data['id']])
+        roster.invalidate_filter_options(event_id)
         if not self.channel_layer:
             return
         
@@ -88,6 +203,7 @@ class WebSocketNotifier:
         message = {
             'type': 'participant_registered',
             'participant': participant_data,
+            'version': version,
             'timestamp': datetime.now().isoformat()
         }
         
@@ -113,11 +229,13 @@ class WebSocketNotifier:
         event_group_name = f'event_checkin_{event_id}'
         print(f"📡 NOTIFY_BULK_CHECKIN_UPDATE - Sending to group: {event_group_name} ({checked_in_count} checked in)")
         
+        from apps.events.services.roster_service import get_roster_service
         message = {
             'type': 'bulk_action_summary',
             'action': 'bulk_checkin',
             'checked_in_count': checked_in_count,
             'skipped_count': skipped_count,
+            'version': get_roster_service().record_change(event_id),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -147,11 +265,13 @@ class WebSocketNotifier:
         event_group_name = f'event_checkin_{event_id}'
         print(f"📡 NOTIFY_BULK_CHECKOUT_UPDATE - Sending to group: {event_group_name} ({checked_out_count} checked out)")
         
+        from apps.events.services.roster_service import get_roster_service
         message = {
             'type': 'bulk_action_summary',
             'action': 'bulk_checkout',
             'checked_out_count': checked_out_count,
             'skipped_count': skipped_count,
+            'version': get_roster_service().record_change(event_id),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -164,6 +284,32 @@ class WebSocketNotifier:
         except Exception as e:
             print(f"❌ NOTIFY_BULK_CHECKOUT_UPDATE FAILED - Error: {e}")
     
+    def notify_roster_changed(self, event_id, participant_ids=None):
+        """
+        Tell check-in screens that participants changed without sending their data
+        (e.g. after a registration import); each screen refreshes only the rows it shows.
+        
+        Args:
+            event_id (str/UUID): The event ID
+            participant_ids (list): Changed participant IDs, or None if any may have changed
+        """
+        from apps.events.services.roster_service import get_roster_service
+        roster = get_roster_service()
+        version = roster.record_change(event_id, participant_ids)
+        roster.invalidate_filter_options(event_id)
+        if not self.channel_layer:
+            return
+        
+        try:
+            async_to_sync(self.channel_layer.group_send)(f'event_checkin_{event_id}', {
+                'type': 'roster_changed',
+                'participant_ids': [str(participant_id) for participant_id in participant_ids] if participant_ids is not None else None,
+                'version': version,
+                'timestamp': datetime.now().isoformat()
+            })
+        except Exception as e:
+            print(f"❌ NOTIFY_ROSTER_CHANGED FAILED - Error: {e}")
+    
     def notify_event_update(self, user_ids, event_id, update_type, data):
         """
         Send event update to specific users' dashboard
@@ -192,18 +338,63 @@ class WebSocketNotifier:
                 dashboard_group_name,
                 message
             )
+    
+    def notify_event_dashboard(self, event_id, update_type, data):
+        """
+        Send an event update to every dashboard watching the event - a single group_send,
+        however many supervisors there are (EventDashboardConsumer joins one group per event)
+        
+        Args:
+            event_id (str/UUID): The event ID
+            update_type (str): Type of update (e.g., 'participant_checked_in')
+            data (dict): Update data
+        """
+        if not self.channel_layer:
+            return
+        
+        try:
+            async_to_sync(self.channel_layer.group_send)(f'event_dashboard_{event_id}', {
+                'type': 'event_update',
+                'event_id': str(event_id),
+                'update_type': update_type,
+                'data': data,
+                'timestamp': datetime.now().isoformat()
+            })
+        except Exception as e:
+            print(f"❌ NOTIFY_EVENT_DASHBOARD FAILED - Error: {e}")
 
 
 # Global instance for easy access
 websocket_notifier = WebSocketNotifier()
 
 
+def participant_product_orders():
+    """Product orders as serialized for websockets, with their cart's latest bank reference"""
+    from django.db.models import OuterRef, Subquery
+    from apps.shop.models import EventProductOrder
+    from apps.shop.models.payments import ProductPayment
+    latest_reference = ProductPayment.objects.filter(
+        cart=OuterRef('cart'),
+        bank_reference__isnull=False
+    ).order_by('-created_at').values('bank_reference')[:1]
+    return EventProductOrder.objects.select_related('product', 'size', 'cart').annotate(
+        latest_bank_reference=Subquery(latest_reference)
+    ).order_by('-added')
+
+
+def _related_rows(participant, attr, queryset):
+    """Rows prefetched onto the participant as `attr` (see EventRosterService.serialize), else the queryset's rows"""
+    rows = getattr(participant, attr, None)
+    return rows if rows is not None else list(queryset)
+
+
 def serialize_participant_for_websocket(participant):
     """
     Serialize participant data for WebSocket transmission
     
     Args:
-        participant: EventParticipant instance
+        participant: EventParticipant instance (EventRosterService.serialize prefetches
+            the related rows for a page of participants; otherwise they are queried here)
     
     Returns:
         dict: Serialized participant data
@@ -215,12 +406,12 @@ def serialize_participant_for_websocket(participant):
         from apps.events.models import EventDayAttendance
         from datetime import date
         
-        all_attendance = EventDayAttendance.objects.filter(
+        all_attendance = _related_rows(participant, 'ws_attendance', EventDayAttendance.objects.filter(
             event=participant.event,
             user=participant.user
-        ).order_by('-check_in_time')
+        ).order_by('-check_in_time'))
         
-        print(f"📅 SERIALIZING - Found {all_attendance.count()} attendance records")
+        print(f"📅 SERIALIZING - Found {len(all_attendance)} attendance records")
         
         # Determine current status based on latest attendance
         current_status = 'not-checked-in'  # Default
@@ -228,8 +419,8 @@ def serialize_participant_for_websocket(participant):
         check_in_time = None
         check_out_time = None
         
-        if all_attendance.exists():
-            latest_attendance = all_attendance.first()
+        if all_attendance:
+            latest_attendance = all_attendance[0]
             latest_check_in_time = latest_attendance.check_in_time
             latest_check_out_time = latest_attendance.check_out_time
             
@@ -265,10 +456,10 @@ def serialize_participant_for_websocket(participant):
         
         # Get payment information for priority sorting
         from apps.events.models import EventPayment
-        event_payments = EventPayment.objects.filter(
+        event_payments = _related_rows(participant, 'ws_event_payments', EventPayment.objects.filter(
             user=participant,  # EventPayment.user is a ForeignKey to EventParticipant
             event=participant.event
-        )
+        ))
         
         has_payment_issues = False
         total_outstanding = 0
@@ -298,33 +489,13 @@ def serialize_participant_for_websocket(participant):
             payment_data.append(payment_info)
 
         # Get product orders for this participant through cart->user relationship
-        from apps.shop.models import EventProductOrder, EventCart
-        
-        # Debug: Check if user has any carts for this event
-        user_carts = EventCart.objects.filter(user=participant.user, event=participant.event)
-        print(f"🛒 SERIALIZE - User {participant.user.first_name} has {user_carts.count()} carts for event {participant.event.id}")
-        
-        product_orders = EventProductOrder.objects.filter(
+        product_orders = _related_rows(participant, 'ws_product_orders', participant_product_orders().filter(
             cart__user=participant.user,
             cart__event=participant.event
-        ).select_related('product', 'size', 'cart').order_by('-added')
+        ))
         
         product_orders_data = []
         for order in product_orders:
-            # Get bank_reference from the associated ProductPayment for this cart
-            bank_reference = None
-            try:
-                from apps.shop.models.payments import ProductPayment
-                payment = ProductPayment.objects.filter(
-                    cart=order.cart,
-                    bank_reference__isnull=False
-                ).order_by('-created_at').first()
-                
-                if payment:
-                    bank_reference = payment.bank_reference
-            except Exception:
-                pass
-            
             order_info = {
                 'id': str(order.id),
                 'order_reference_id': order.order_reference_id,
@@ -338,7 +509,7 @@ def serialize_participant_for_websocket(participant):
                 'change_requested': order.change_requested,
                 'change_reason': order.change_reason,
                 'added': convert_to_london_time(order.added).isoformat() if order.added else None,
-                'bank_reference': bank_reference,
+                'bank_reference': order.latest_bank_reference,
             }
             product_orders_data.append(order_info)
         
@@ -369,7 +540,7 @@ def serialize_participant_for_websocket(participant):
         # Get user allergies
         allergies_data = []
         try:
-            user_allergies = participant.user.user_allergies.select_related('allergy').all()
+            user_allergies = _related_rows(participant.user, 'ws_allergies', participant.user.user_allergies.select_related('allergy'))
             for user_allergy in user_allergies:
                 allergy_info = {
                     'id': str(user_allergy.id),
@@ -386,7 +557,7 @@ def serialize_participant_for_websocket(participant):
         # Get user medical conditions  
         medical_conditions_data = []
         try:
-            user_conditions = participant.user.user_medical_conditions.select_related('condition').all()
+            user_conditions = _related_rows(participant.user, 'ws_medical_conditions', participant.user.user_medical_conditions.select_related('condition'))
             for user_condition in user_conditions:
                 condition_info = {
                     'id': str(user_condition.id),
@@ -423,9 +594,9 @@ def serialize_participant_for_websocket(participant):
         event_question_answers_data = []
         try:
             from apps.events.models import QuestionAnswer
-            question_answers = QuestionAnswer.objects.filter(
+            question_answers = _related_rows(participant, 'ws_question_answers', QuestionAnswer.objects.filter(
                 participant=participant
-            ).select_related('question').prefetch_related('selected_choices').all()
+            ).select_related('question').prefetch_related('selected_choices'))
             
             for answer in question_answers:
                 # Get selected choices
@@ -588,33 +759,20 @@ def serialize_participant_for_websocket(participant):
             raise e
 
 
-def get_event_supervisors(event):
+def get_supervised_event_ids(user):
     """
-    Get list of user IDs who should receive event updates
+    IDs of the events whose dashboard updates a user receives (as creator or service team member)
     
     Args:
-        event: Event instance
+        user: CommunityUser instance
     
     Returns:
-        list: List of user IDs
+        list: List of event IDs
     """
-    user_ids = []
-    
-    print(f"🔍 GET_EVENT_SUPERVISORS - Event: {event.name} (ID: {event.id})")
-    
-    # Add event creator
-    if event.created_by:
-        user_ids.append(event.created_by.id)
-        print(f"👤 GET_EVENT_SUPERVISORS - Added event creator: {event.created_by.username} (ID: {event.created_by.id})")
-    else:
-        print(f"⚠️ GET_EVENT_SUPERVISORS - No event creator found")
-    
-    # Add service team members
-    service_team_users = event.service_team_members.values_list('user_id', flat=True)
-    user_ids.extend(service_team_users)
-    print(f"👥 GET_EVENT_SUPERVISORS - Added {len(service_team_users)} service team members: {list(service_team_users)}")
-    
-    final_user_ids = list(set(user_ids))  # Remove duplicates
-    print(f"📋 GET_EVENT_SUPERVISORS - Final supervisor IDs: {final_user_ids}")
+    from django.db.models import Q
+    from apps.events.models import Event
     
-    return final_user_ids
\ No newline at end of file
+    return list(
+        Event.objects.filter(Q(created_by=user) | Q(service_team_members__user=user))
+        .order_by().values_list('id', flat=True).distinct()
+    )
@@ -32,6 +32,7 @@ class RefundCartSerializer(serializers.ModelSerializer):
             'cart_status',
             'order_items_count'
         ]
+        extra_kwargs = {'total': {'coerce_to_string': False}}
     
     def get_order_items_count(self, obj):
         return obj.orders.count()
@@ -367,7 +368,7 @@ class CreateOrderRefundSerializer(serializers.ModelSerializer):
                 'refund_amount': "Refund amount must be greater than zero"
             })
         
-        if cart.total and refund_amount > Decimal(str(cart.total)):
+        if cart.total and refund_amount > cart.total:
             raise serializers.ValidationError({
                 'refund_amount': f"Refund amount cannot exceed cart total (£{cart.total})"
             })
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from apps.shop.models.payments import ProductPaymentMethod, ProductPaymentPackage, ProductPayment
 from apps.shop.models.shop_models import EventProduct, EventCart
+from core.money import round_money
 
 class ProductPaymentMethodSerializer(serializers.ModelSerializer):
     """Serializer for ProductPaymentMethod with security validations."""
@@ -216,10 +217,9 @@ class ProductPaymentSerializer(serializers.ModelSerializer):
             
             # Validate amount matches cart total (within reason)
             if amount and cart.total:
-                cart_total_decimal = cart.total
-                if abs(amount - cart_total_decimal) > 0.01:  # Allow 1 penny difference for rounding
+                if round_money(amount) != round_money(cart.total):
                     raise serializers.ValidationError(
-                        f"Payment amount (£{amount:.2f}) does not match cart total (£{cart_total_decimal:.2f})."
+                        f"Payment amount (£{amount:.2f}) does not match cart total (£{cart.total:.2f})."
                     )
         
         return super().validate(attrs)
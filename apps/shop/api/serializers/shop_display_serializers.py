@@ -96,6 +96,7 @@ class EventCartDisplaySerializer(serializers.ModelSerializer):
             "created", "updated", "approved", "submitted", 
             "active", "notes", "shipping_address", "orders"
         ]
+        extra_kwargs = {"total": {"coerce_to_string": False}}
 
 
 class EventProductOrderMinimalSerializer(serializers.ModelSerializer):
@@ -171,6 +172,7 @@ class EventCartMinimalSerializer(serializers.ModelSerializer):
             "created", "approved", "submitted", "active", 
             "orders", "order_count", "payment_method", "created_via_admin", "cart_status"
         ]
+        extra_kwargs = {"total": {"coerce_to_string": False}}
 
 
 class EventProductLightSerializer(serializers.ModelSerializer):
@@ -808,6 +808,8 @@ class EventCartSerializer(serializers.ModelSerializer):
         
         read_only_fields = ["uuid", "user", "user_email", "event_name", "order_reference_id", "created", "updated", 
                           "cart_status", "locked_at", "lock_expires_at"]
+        # Stored as Decimal, still rendered as a JSON number for existing clients
+        extra_kwargs = {"total": {"coerce_to_string": False}}
         
     def create(self, validated_data):
         from apps.shop.models.shop_models import EventProductOrder
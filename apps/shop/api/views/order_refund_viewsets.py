@@ -22,6 +22,7 @@ from apps.shop.api.serializers import (
 )
 from apps.shop.services.order_refund_service import get_order_refund_service
 from core.event_permissions import has_event_permission
+from core.statistics import grouped_statistics, choice_buckets
 
 logger = logging.getLogger(__name__)
 
@@ -578,61 +579,51 @@ class OrderRefundViewSet(viewsets.ModelViewSet):
         # Only count refunds for paid orders (where refund_amount > 0)
         queryset = queryset.filter(refund_amount__gt=0)
         
-        # Calculate statistics
-        total_refunds = queryset.count()
-        total_amount = queryset.aggregate(Sum('refund_amount'))['refund_amount__sum'] or 0
-        
-        # Count by status
-        pending_count = queryset.filter(status=OrderRefund.RefundStatus.PENDING).count()
-        pending_amount = queryset.filter(status=OrderRefund.RefundStatus.PENDING).aggregate(
-            Sum('refund_amount'))['refund_amount__sum'] or 0
-        
-        in_progress_count = queryset.filter(status=OrderRefund.RefundStatus.IN_PROGRESS).count()
-        in_progress_amount = queryset.filter(status=OrderRefund.RefundStatus.IN_PROGRESS).aggregate(
-            Sum('refund_amount'))['refund_amount__sum'] or 0
-        
-        processed_count = queryset.filter(status=OrderRefund.RefundStatus.PROCESSED).count()
-        processed_amount = queryset.filter(status=OrderRefund.RefundStatus.PROCESSED).aggregate(
-            Sum('refund_amount'))['refund_amount__sum'] or 0
-        
-        failed_count = queryset.filter(status=OrderRefund.RefundStatus.FAILED).count()
-        cancelled_count = queryset.filter(status=OrderRefund.RefundStatus.CANCELLED).count()
+        # All buckets in a single conditional-aggregation query
+        stats = grouped_statistics(
+            queryset,
+            amount_field='refund_amount',
+            groups={
+                'status': choice_buckets('status', OrderRefund.RefundStatus.choices),
+                'reason': choice_buckets('refund_reason', OrderRefund.RefundReason.choices),
+                'method': {
+                    'automatic': Q(is_automatic_refund=True),
+                    'manual': Q(is_automatic_refund=False),
+                },
+                'stock': {'restored': Q(stock_restored=True)},
+            },
+            average=True,
+        )
+        by_status = stats['groups']['status']
+        by_method = stats['groups']['method']
         
         status_counts = {
-            'pending': pending_count,
-            'in_progress': in_progress_count,
-            'processed': processed_count,
-            'failed': failed_count,
-            'cancelled': cancelled_count
+            'pending': by_status[OrderRefund.RefundStatus.PENDING]['count'],
+            'in_progress': by_status[OrderRefund.RefundStatus.IN_PROGRESS]['count'],
+            'processed': by_status[OrderRefund.RefundStatus.PROCESSED]['count'],
+            'failed': by_status[OrderRefund.RefundStatus.FAILED]['count'],
+            'cancelled': by_status[OrderRefund.RefundStatus.CANCELLED]['count']
         }
         
-        reason_counts = {}
-        for choice in OrderRefund.RefundReason.choices:
-            reason_key = choice[0]
-            count = queryset.filter(refund_reason=reason_key).count()
-            if count > 0:
-                reason_counts[reason_key] = count
-        
-        avg_refund_amount = queryset.aggregate(models.Avg('refund_amount'))['refund_amount__avg'] or 0
-        
-        automatic_count = queryset.filter(is_automatic_refund=True).count()
-        manual_count = queryset.filter(is_automatic_refund=False).count()
-        
-        stock_restored_count = queryset.filter(stock_restored=True).count()
+        reason_counts = {
+            reason: bucket['count']
+            for reason, bucket in stats['groups']['reason'].items()
+            if bucket['count'] > 0
+        }
         
         return Response({
-            'total_refunds': total_refunds,
-            'total_amount': float(total_amount),
-            'pending_count': pending_count,
-            'pending_amount': float(pending_amount),
-            'in_progress_count': in_progress_count,
-            'in_progress_amount': float(in_progress_amount),
-            'processed_count': processed_count,
-            'processed_amount': float(processed_amount),
-            'average_amount': float(avg_refund_amount),
+            'total_refunds': stats['count'],
+            'total_amount': float(stats['amount']),
+            'pending_count': by_status[OrderRefund.RefundStatus.PENDING]['count'],
+            'pending_amount': float(by_status[OrderRefund.RefundStatus.PENDING]['amount']),
+            'in_progress_count': by_status[OrderRefund.RefundStatus.IN_PROGRESS]['count'],
+            'in_progress_amount': float(by_status[OrderRefund.RefundStatus.IN_PROGRESS]['amount']),
+            'processed_count': by_status[OrderRefund.RefundStatus.PROCESSED]['count'],
+            'processed_amount': float(by_status[OrderRefund.RefundStatus.PROCESSED]['amount']),
+            'average_amount': float(stats['average']),
             'status_breakdown': status_counts,
             'reason_breakdown': reason_counts,
-            'automatic_refunds': automatic_count,
-            'manual_refunds': manual_count,
-            'stock_restored_count': stock_restored_count,
+            'automatic_refunds': by_method['automatic']['count'],
+            'manual_refunds': by_method['manual']['count'],
+            'stock_restored_count': stats['groups']['stock']['restored']['count'],
         })
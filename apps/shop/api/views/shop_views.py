@@ -7,6 +7,8 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction, models
 from datetime import timedelta
+from decimal import Decimal
+from core.money import round_money, sum_money
 from apps.shop.models.shop_models import EventProduct, EventCart, EventProductOrder, ProductPurchaseTracker
 from apps.shop.models.metadata_models import ProductSize
 from apps.shop.models.payments import ProductPaymentMethod, ProductPayment, ProductPaymentLog
@@ -356,11 +358,10 @@ class EventCartViewSet(viewsets.ModelViewSet):
                     })
             
             # Update cart total
-            total = 0
-            for order in cart.orders.all():
-                total += (order.price_at_purchase or order.product.price) * order.quantity
-                
-            cart.total = total
+            cart.total = sum_money(
+                (order.price_at_purchase or order.product.price) * order.quantity
+                for order in cart.orders.select_related('product')
+            )
             cart.save()
         
         serialized = self.get_serializer(cart)
@@ -474,10 +475,10 @@ class EventCartViewSet(viewsets.ModelViewSet):
                     cart.products.remove(product_id)
             
             # Recalculate cart total
-            total = 0
-            for order in cart.orders.all():
-                total += (order.price_at_purchase or order.product.price) * order.quantity
-            cart.total = total
+            cart.total = sum_money(
+                (order.price_at_purchase or order.product.price) * order.quantity
+                for order in cart.orders.select_related('product')
+            )
             cart.save()
         
         serialized = self.get_serializer(cart)
@@ -572,7 +573,7 @@ class EventCartViewSet(viewsets.ModelViewSet):
             cart.save()
             
             # Calculate and validate cart total with stock checks
-            calculated_total = 0
+            calculated_total = Decimal('0')
             stock_issues = []
             
             # Lock orders first (without select_related on nullable size field)
@@ -629,19 +630,23 @@ class EventCartViewSet(viewsets.ModelViewSet):
                 })
             
             # Keep total in decimal format (pounds)
-            calculated_total_decimal = calculated_total
+            calculated_total_decimal = round_money(calculated_total)
             
-            # Validate provided amount if given
+            # Validate provided amount if given (compared to the penny, never as floats)
             provided_amount = request.data.get('amount')
             if provided_amount is not None:
-                if float(provided_amount) != float(calculated_total_decimal):
+                try:
+                    provided_amount = round_money(provided_amount)
+                except ValueError:
+                    provided_amount = None
+                if provided_amount != calculated_total_decimal:
                     # Unlock cart
                     cart.cart_status = EventCart.CartStatus.ACTIVE
                     cart.locked_at = None
                     cart.lock_expires_at = None
                     cart.save()
                     raise serializers.ValidationError(
-                        f"Provided amount (£{provided_amount:.2f}) does not match cart total (£{calculated_total_decimal:.2f})."
+                        f"Provided amount (£{request.data.get('amount')}) does not match cart total (£{calculated_total_decimal})."
                     )
             
             # Create payment record with contact info
@@ -671,7 +676,7 @@ class EventCartViewSet(viewsets.ModelViewSet):
             # Update cart status
             cart.submitted = True
             cart.active = False
-            cart.total = calculated_total  # Ensure total is correctly set
+            cart.total = calculated_total_decimal  # Ensure total is correctly set
             cart.cart_status = EventCart.CartStatus.LOCKED  # Keep locked until payment completes
             cart.save()
             
@@ -1008,10 +1013,10 @@ class EventCartViewSet(viewsets.ModelViewSet):
                     )
 
             # Recalculate total
-            total = 0
-            for order in cart.orders.all():
-                total += (order.price_at_purchase or order.product.price) * order.quantity
-            cart.total = total
+            cart.total = sum_money(
+                (order.price_at_purchase or order.product.price) * order.quantity
+                for order in cart.orders.select_related('product')
+            )
             cart.save()
 
         summary = []
@@ -0,0 +1,105 @@
+"""
+Management command to reconcile local payment records with Stripe.
+
+Runs the reconciliation immediately (without Celery) and prints the discrepancy
+report. Use --schedule to create/update the daily Celery Beat periodic task instead.
+
+Usage:
+    python manage.py reconcile_stripe_payments --days 7
+    python manage.py reconcile_stripe_payments --days 2 --auto-fix
+    python manage.py reconcile_stripe_payments --schedule
+"""
+
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import PeriodicTask, CrontabSchedule
+import json
+
+from apps.shop.services.payment_reconciliation_service import PaymentReconciliationService
+
+
+class Command(BaseCommand):
+    help = 'Reconcile ProductPayment/EventPayment/refund records against Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Size of the trailing window (in days) to reconcile',
+        )
+        parser.add_argument(
+            '--auto-fix',
+            action='store_true',
+            help='Apply safe corrections to local records',
+        )
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Create or update the daily Celery Beat task instead of running now',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            self._schedule(options['days'], options['auto_fix'])
+            return
+
+        report = PaymentReconciliationService().reconcile_recent(
+            days=options['days'],
+            auto_fix=options['auto_fix'],
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Reconciled {report['period_start']} -> {report['period_end']}"
+        ))
+        self.stdout.write(f"  PaymentIntents checked: {report['payment_intents_checked']}")
+        self.stdout.write(f"  Refunds checked: {report['refunds_checked']}")
+
+        if not report['discrepancies']:
+            self.stdout.write(self.style.SUCCESS('✓ No discrepancies found'))
+            return
+
+        for discrepancy in report['discrepancies']:
+            style = self.style.SUCCESS if discrepancy['fixed'] else self.style.WARNING
+            self.stdout.write(style(
+                f"  - [{discrepancy['type']}] {discrepancy['stripe_object']} {discrepancy['stripe_id']} "
+                f"{discrepancy['local_model'] or ''} {discrepancy['local_id'] or ''} "
+                f"local={discrepancy['local_status']}/{discrepancy['local_amount']} "
+                f"stripe={discrepancy['stripe_status']}/{discrepancy['stripe_amount']}"
+                f"{' (fixed)' if discrepancy['fixed'] else ''}"
+            ))
+
+        self.stdout.write(self.style.WARNING(
+            f"\n{report['discrepancy_count']} discrepancies, {report['fixed_count']} fixed"
+        ))
+
+    def _schedule(self, days, auto_fix):
+        # Daily at 03:00, after the nightly Stripe payouts settle
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute='0',
+            hour='3',
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+        )
+
+        task_name = 'Reconcile Stripe Payments'
+        task, created = PeriodicTask.objects.update_or_create(
+            name=task_name,
+            defaults={
+                'task': 'shop.reconcile_stripe_payments',
+                'crontab': schedule,
+                'interval': None,
+                'kwargs': json.dumps({'days': days, 'auto_fix': auto_fix}),
+                'enabled': True,
+                'description': (
+                    'Compares local payment and refund records with Stripe and reports discrepancies. '
+                    'Runs daily over a trailing window.'
+                ),
+            }
+        )
+
+        verb = 'Created' if created else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} periodic task: {task.name}'))
+        self.stdout.write(f'  Task Function: {task.task}')
+        self.stdout.write(f'  Schedule: {schedule}')
+        self.stdout.write(f'  Kwargs: {task.kwargs}')
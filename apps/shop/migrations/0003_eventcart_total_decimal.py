@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:10
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+
+
+def copy_float_totals(apps, schema_editor):
+    """Convert stored float totals to exact two-place decimals (half-up)"""
+    EventCart = apps.get_model('shop', 'EventCart')
+    carts = []
+    for cart in EventCart.objects.only('uuid', 'total').iterator(chunk_size=2000):
+        # repr() gives the shortest float representation, so 19.99 stays 19.99
+        cart.total_decimal = Decimal(repr(cart.total or 0.0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        carts.append(cart)
+        if len(carts) >= 2000:
+            EventCart.objects.bulk_update(carts, ['total_decimal'])
+            carts = []
+    if carts:
+        EventCart.objects.bulk_update(carts, ['total_decimal'])
+
+
+def copy_decimal_totals(apps, schema_editor):
+    EventCart = apps.get_model('shop', 'EventCart')
+    carts = []
+    for cart in EventCart.objects.only('uuid', 'total_decimal').iterator(chunk_size=2000):
+        cart.total = float(cart.total_decimal or 0)
+        carts.append(cart)
+        if len(carts) >= 2000:
+            EventCart.objects.bulk_update(carts, ['total'])
+            carts = []
+    if carts:
+        EventCart.objects.bulk_update(carts, ['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventcart',
+            name='total_decimal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='Total Cost'),
+        ),
+        migrations.RunPython(copy_float_totals, copy_decimal_totals),
+        migrations.RemoveField(
+            model_name='eventcart',
+            name='total',
+        ),
+        migrations.RenameField(
+            model_name='eventcart',
+            old_name='total_decimal',
+            new_name='total',
+        ),
+    ]
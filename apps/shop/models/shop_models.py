@@ -3,6 +3,8 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.utils import timezone
 import uuid
+from decimal import Decimal
+from core.money import round_money, sum_money
 
 from .metadata_models import ProductMaterial, ProductCategory
 
@@ -519,7 +521,7 @@ class EventCart(models.Model):
     uuid = models.UUIDField(_("Cart UUID"), default=uuid.uuid4, editable=False, primary_key=True)
     order_reference_id = models.CharField(_("Order ID"), max_length=100, unique=True, blank=True, null=True) # required for tracking order references
     
-    total = models.FloatField(_("Total Cost"), default=0)
+    total = models.DecimalField(_("Total Cost"), max_digits=10, decimal_places=2, default=Decimal('0.00'))
     shipping_cost = models.DecimalField(_("Shipping Cost"), max_digits=10, decimal_places=2, default=0.00)
     created = models.DateTimeField(_("Created At"), default=timezone.now)
     updated = models.DateTimeField(_("Last Updated"), auto_now=True)
@@ -590,16 +592,20 @@ class EventCart(models.Model):
 
             self.order_reference_id = f"ORD{self.event.event_code}-{str(self.uuid)[:10]}"
 
+        self.total = round_money(self.total)
         return super().save(*args, **kwargs)
     
     @property
     def total_amount(self):
-        """Calculate total amount including shipping"""
-        product_total = sum(
-            order.price_at_purchase * order.quantity 
-            for order in self.orders.filter(status=EventProductOrder.Status.PURCHASED)
+        """Calculate total amount including shipping (uses prefetched `purchased_orders` if present)"""
+        orders = getattr(self, 'purchased_orders', None)
+        if orders is None:
+            orders = self.orders.filter(status=EventProductOrder.Status.PURCHASED)
+        product_total = sum_money(
+            (order.price_at_purchase or 0) * order.quantity
+            for order in orders
         )
-        return round(product_total + float(self.shipping_cost), 2)
+        return round_money(product_total + round_money(self.shipping_cost))
     
 class EventProductOrder(models.Model):
     '''
@@ -665,7 +671,7 @@ class EventProductOrder(models.Model):
             self.order_reference_id = f"ORD{self.cart.event.event_code[:5]}-{str(self.cart.uuid)[:5]}-{str(self.product.uuid)[:5]}-{str(uuid.uuid4())[:5]}"
         if self.price_at_purchase is None:
             self.price_at_purchase = self.product.get_price_for_user(self.cart.user)
-            self.price_at_purchase = round(self.price_at_purchase, 2)
+            self.price_at_purchase = round_money(self.price_at_purchase)
         return super().save(force_insert, force_update, using, update_fields)
 
     def __str__(self) -> str:
@@ -11,6 +11,7 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from apps.shop.models import OrderRefund, ProductPayment, EventCart
 from apps.shop.stripe_service import StripePaymentService
+from core.money import to_minor_units
 
 logger = logging.getLogger(__name__)
 
@@ -39,66 +40,29 @@ class OrderRefundService:
         Returns:
             tuple: (success: bool, message: str)
         """
-        # Validation checks
-        can_process, message = refund.can_process_refund()
+        can_process, message = self.validate_automatic_refund(refund)
         if not can_process:
-            logger.warning(f"Refund {refund.refund_reference} cannot be processed: {message}")
             return False, message
         
-        if refund.status not in [OrderRefund.RefundStatus.PENDING]:
-            logger.warning(f"Refund {refund.refund_reference} has invalid status: {refund.status}")
-            return False, f"Refund status must be PENDING. Current status: {refund.get_status_display()}"
-        
-        if not refund.is_automatic_refund:
-            logger.warning(f"Refund {refund.refund_reference} is not configured for automatic processing")
-            return False, "This refund is not configured for automatic processing"
-        
-        if not refund.stripe_payment_intent:
-            logger.error(f"Refund {refund.refund_reference} missing Stripe payment intent")
-            return False, "No Stripe payment intent found for this refund"
-        
-        if not refund.payment or refund.payment.status != ProductPayment.PaymentStatus.REFUND_PROCESSING:
-            return False, "Payment must be in REFUND_PROCESSING status"
-        
         try:
             # Update status to processing
             refund.status = OrderRefund.RefundStatus.IN_PROGRESS
             refund.save()
             logger.info(f"Processing automatic refund {refund.refund_reference} for £{refund.refund_amount}")
             
-            # Calculate refund amount in cents
-            refund_amount_cents = int(refund.refund_amount * 100)
-            
-            # Create refund in Stripe
-            stripe_refund = stripe.Refund.create(
-                payment_intent=refund.stripe_payment_intent,
-                amount=refund_amount_cents,
-                reason=self._map_refund_reason_to_stripe(refund.refund_reason),
-                metadata={
-                    'refund_id': str(refund.id),
-                    'cart_id': str(refund.cart.uuid) if refund.cart else None,
-                    'event_id': str(refund.event.id) if refund.event else None,
-                    'event_code': refund.event.event_code if refund.event else None,
-                    'refund_reference': refund.refund_reference
-                }
-            )
-            
-            # Update refund with Stripe information
-            refund.stripe_refund_id = stripe_refund.id
-            refund.refund_method = 'Stripe'
-            refund.save()
+            self.create_stripe_refund(refund)
             
             logger.info(f"⏳ Stripe refund {refund.refund_reference} initiated and marked as IN_PROGRESS. Awaiting manual verification.")
             return True, "Refund payment sent via Stripe. Please verify completion to finalize."
         
-        except stripe.error.InvalidRequestError as e:
+        except stripe.InvalidRequestError as e:
             refund.status = OrderRefund.RefundStatus.FAILED
             refund.stripe_failure_reason = str(e)
             refund.save()
             logger.error(f"❌ Stripe invalid request for refund {refund.refund_reference}: {e}")
             return False, f"Stripe error: {str(e)}"
         
-        except stripe.error.CardError as e:
+        except stripe.CardError as e:
             refund.status = OrderRefund.RefundStatus.FAILED
             refund.stripe_failure_reason = str(e)
             refund.save()
@@ -112,6 +76,79 @@ class OrderRefundService:
             logger.exception(f"❌ Unexpected error processing refund {refund.refund_reference}")
             return False, f"Unexpected error: {str(e)}"
     
+    def validate_automatic_refund(self, refund):
+        """
+        Check that a refund can be submitted to Stripe.
+        
+        Args:
+            refund: OrderRefund instance
+            
+        Returns:
+            tuple: (valid: bool, message: str)
+        """
+        can_process, message = refund.can_process_refund()
+        if not can_process:
+            logger.warning(f"Refund {refund.refund_reference} cannot be processed: {message}")
+            return False, message
+        
+        if refund.status not in [OrderRefund.RefundStatus.PENDING]:
+            logger.warning(f"Refund {refund.refund_reference} has invalid status: {refund.status}")
+            return False, f"Refund status must be PENDING. Current status: {refund.get_status_display()}"
+        
+        if not refund.is_automatic_refund:
+            logger.warning(f"Refund {refund.refund_reference} is not configured for automatic processing")
+            return False, "This refund is not configured for automatic processing"
+        
+        if not refund.stripe_payment_intent:
+            logger.error(f"Refund {refund.refund_reference} missing Stripe payment intent")
+            return False, "No Stripe payment intent found for this refund"
+        
+        if not refund.payment or refund.payment.status != ProductPayment.PaymentStatus.REFUND_PROCESSING:
+            return False, "Payment must be in REFUND_PROCESSING status"
+        
+        return True, "Refund can be submitted to Stripe"
+    
+    def create_stripe_refund(self, refund, idempotency_key=None, stripe_client=None):
+        """
+        Create the refund in Stripe and record the Stripe refund ID.
+        Stripe errors are raised so the caller can decide whether to fail or retry.
+        
+        Args:
+            refund: OrderRefund instance (already validated and IN_PROGRESS)
+            idempotency_key: Optional key so retried calls never refund twice
+            stripe_client: Optional Stripe client (defaults to the stripe module)
+            
+        Returns:
+            The Stripe Refund object
+        """
+        client = stripe_client or stripe
+        request_options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+        
+        # Calculate refund amount in cents
+        refund_amount_cents = to_minor_units(refund.refund_amount, refund.currency)
+        
+        # Create refund in Stripe
+        stripe_refund = client.Refund.create(
+            payment_intent=refund.stripe_payment_intent,
+            amount=refund_amount_cents,
+            reason=self._map_refund_reason_to_stripe(refund.refund_reason),
+            metadata={
+                'refund_id': str(refund.id),
+                'cart_id': str(refund.cart.uuid) if refund.cart else None,
+                'event_id': str(refund.event.id) if refund.event else None,
+                'event_code': refund.event.event_code if refund.event else None,
+                'refund_reference': refund.refund_reference
+            },
+            **request_options
+        )
+        
+        # Update refund with Stripe information
+        refund.stripe_refund_id = stripe_refund['id']
+        refund.refund_method = 'Stripe'
+        refund.save()
+        
+        return stripe_refund
+    
     def process_manual_refund(self, refund, processor_notes=None):
         """
         Initiate manual refund processing (bank transfer, cash, etc.).
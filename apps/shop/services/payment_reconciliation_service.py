@@ -0,0 +1,431 @@
+"""
+Payment Reconciliation Service
+Compares local payment and refund records against what Stripe actually holds and
+produces a discrepancy report, with an optional auto-fix mode for safe corrections.
+
+Covered records:
+- ProductPayment, EventPayment, DonationPayment (matched by stripe_payment_intent)
+- ParticipantRefund, OrderRefund (matched by stripe_refund_id, falling back to the
+  refund_reference stored in the Stripe refund metadata)
+
+Discrepancy types:
+- missing_local: Stripe holds an object with no matching local record
+- missing_stripe: a local record points at a Stripe object that does not exist
+- amount_mismatch: amounts differ between Stripe and the local record(s)
+- status_mismatch: the local status contradicts the Stripe status
+
+The Stripe client is injectable so the service can be exercised against a fake client.
+"""
+import stripe
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.money import DEFAULT_CURRENCY, from_minor_units, sum_money, to_minor_units
+from apps.shop.models import ProductPayment, ProductPaymentLog, OrderRefund
+from apps.events.models import EventPayment, DonationPayment, ParticipantRefund, EventParticipant
+
+logger = logging.getLogger(__name__)
+
+# Initialize Stripe
+STRIPE_TEST_MODE = getattr(settings, 'STRIPE_TEST_MODE', True)
+STRIPE_SECRET_KEY = getattr(settings, 'STRIPE_SECRET_KEY_TEST' if STRIPE_TEST_MODE else 'STRIPE_SECRET_KEY_LIVE', None)
+
+if STRIPE_SECRET_KEY:
+    stripe.api_key = STRIPE_SECRET_KEY
+
+
+class PaymentReconciliationService:
+    """Service for reconciling local payment and refund records with Stripe"""
+
+    MISSING_LOCAL = 'missing_local'
+    MISSING_STRIPE = 'missing_stripe'
+    AMOUNT_MISMATCH = 'amount_mismatch'
+    STATUS_MISMATCH = 'status_mismatch'
+
+    PAGE_SIZE = 100
+
+    # Local payment statuses (shared values across ProductPayment, EventPayment and DonationPayment)
+    SETTLED_PAYMENT_STATUSES = {'SUCCEEDED', 'REFUND_PROCESSING', 'REFUNDED'}
+    UNSETTLED_PAYMENT_STATUSES = {'PENDING', 'FAILED', 'CANCELLED'}
+
+    # Local refund statuses (shared values across ParticipantRefund and OrderRefund)
+    ACTIVE_REFUND_STATUSES = {'IN_PROGRESS', 'PROCESSED'}
+    CLOSED_REFUND_STATUSES = {'FAILED', 'CANCELLED'}
+
+    def __init__(self, stripe_client=None):
+        self.stripe_client = stripe_client or stripe
+
+    def reconcile(self, start, end, auto_fix=False):
+        """
+        Reconcile all Stripe PaymentIntents and refunds created in [start, end).
+
+        Args:
+            start: timezone-aware datetime (inclusive)
+            end: timezone-aware datetime (exclusive)
+            auto_fix: apply safe corrections to local records where possible
+
+        Returns:
+            dict: JSON-serialisable discrepancy report
+        """
+        logger.info(f"[Stripe Reconciliation] Reconciling {start.isoformat()} -> {end.isoformat()} (auto_fix={auto_fix})")
+
+        discrepancies = []
+        intents_checked = self._reconcile_payment_intents(start, end, auto_fix, discrepancies)
+        refunds_checked = self._reconcile_refunds(start, end, auto_fix, discrepancies)
+
+        summary = defaultdict(int)
+        for discrepancy in discrepancies:
+            summary[discrepancy['type']] += 1
+
+        report = {
+            'period_start': start.isoformat(),
+            'period_end': end.isoformat(),
+            'auto_fix': auto_fix,
+            'payment_intents_checked': intents_checked,
+            'refunds_checked': refunds_checked,
+            'discrepancy_count': len(discrepancies),
+            'fixed_count': sum(1 for d in discrepancies if d['fixed']),
+            'summary': dict(summary),
+            'discrepancies': discrepancies,
+        }
+
+        logger.info(
+            f"[Stripe Reconciliation] Checked {intents_checked} intents and {refunds_checked} refunds, "
+            f"found {report['discrepancy_count']} discrepancies ({report['fixed_count']} fixed)"
+        )
+        return report
+
+    def reconcile_recent(self, days=2, auto_fix=False):
+        """Reconcile the trailing window of `days` days ending now"""
+        end = timezone.now()
+        return self.reconcile(end - timedelta(days=days), end, auto_fix=auto_fix)
+
+    # ==================== STRIPE PAGING ====================
+
+    def _list_all(self, resource, start, end):
+        """Page through a Stripe list endpoint for objects created in [start, end)"""
+        created = {'gte': int(start.timestamp()), 'lt': int(end.timestamp())}
+        starting_after = None
+
+        while True:
+            params = {'created': created, 'limit': self.PAGE_SIZE}
+            if starting_after:
+                params['starting_after'] = starting_after
+
+            page = resource.list(**params)
+            data = page['data']
+            for obj in data:
+                yield obj
+
+            if not page.get('has_more') or not data:
+                break
+            starting_after = data[-1]['id']
+
+    def _retrieve(self, resource, object_id):
+        """Retrieve a single Stripe object, returning None if Stripe does not know it"""
+        try:
+            return resource.retrieve(object_id)
+        except stripe.InvalidRequestError as e:
+            if getattr(e, 'code', None) == 'resource_missing':
+                return None
+            raise
+
+    # ==================== PAYMENT INTENTS ====================
+
+    def _reconcile_payment_intents(self, start, end, auto_fix, discrepancies):
+        intents = {intent['id']: intent for intent in self._list_all(self.stripe_client.PaymentIntent, start, end)}
+        local_by_intent = self._load_local_payments(intents.keys())
+
+        for intent_id, intent in intents.items():
+            rows = local_by_intent.get(intent_id)
+            if not rows:
+                discrepancies.append(self._discrepancy(
+                    self.MISSING_LOCAL, 'payment_intent', intent_id,
+                    stripe_status=intent.get('status'),
+                    stripe_amount=self._stripe_amount(intent),
+                    notes=f"No local payment uses this PaymentIntent (metadata: {dict(intent.get('metadata') or {})})",
+                ))
+                continue
+            self._compare_payment_intent(intent, rows, auto_fix, discrepancies)
+
+        # Local payments created in the window whose intent was not returned by the listing
+        for model in (ProductPayment, EventPayment, DonationPayment):
+            unseen = model.objects.filter(
+                created_at__gte=start,
+                created_at__lt=end,
+                stripe_payment_intent__isnull=False,
+            ).exclude(stripe_payment_intent='').exclude(stripe_payment_intent__in=intents.keys())
+
+            for row in unseen:
+                intent = self._retrieve(self.stripe_client.PaymentIntent, row.stripe_payment_intent)
+                if intent is None:
+                    discrepancies.append(self._discrepancy(
+                        self.MISSING_STRIPE, 'payment_intent', row.stripe_payment_intent,
+                        local=row, local_status=row.status, local_amount=row.amount,
+                        notes="Stripe has no PaymentIntent with this ID",
+                    ))
+                    continue
+                intents[intent['id']] = intent
+                self._compare_payment_intent(intent, self._load_local_payments([intent['id']])[intent['id']], auto_fix, discrepancies)
+
+        return len(intents)
+
+    def _load_local_payments(self, intent_ids):
+        """Map PaymentIntent ID -> local payment rows (an event payment and its donation share one intent)"""
+        intent_ids = list(intent_ids)
+        local_by_intent = defaultdict(list)
+        if not intent_ids:
+            return local_by_intent
+
+        for model in (ProductPayment, EventPayment, DonationPayment):
+            for row in model.objects.filter(stripe_payment_intent__in=intent_ids):
+                local_by_intent[row.stripe_payment_intent].append(row)
+        return local_by_intent
+
+    def _compare_payment_intent(self, intent, rows, auto_fix, discrepancies):
+        intent_id = intent['id']
+        stripe_status = intent.get('status')
+        stripe_amount = self._stripe_amount(intent)
+        currency = intent.get('currency') or DEFAULT_CURRENCY
+        local_amount = sum_money((row.amount for row in rows), currency)
+
+        if to_minor_units(local_amount, currency) != intent.get('amount'):
+            discrepancies.append(self._discrepancy(
+                self.AMOUNT_MISMATCH, 'payment_intent', intent_id,
+                local=rows[0], local_status=rows[0].status, local_amount=local_amount,
+                stripe_status=stripe_status, stripe_amount=stripe_amount,
+                notes=f"Local total across {len(rows)} record(s) differs from the PaymentIntent amount",
+            ))
+
+        for row in rows:
+            if stripe_status == 'succeeded':
+                consistent = row.status in self.SETTLED_PAYMENT_STATUSES
+                fixable = not consistent
+            elif stripe_status == 'canceled':
+                consistent = row.status in self.UNSETTLED_PAYMENT_STATUSES - {'PENDING'}
+                fixable = row.status == 'PENDING'
+            else:
+                # requires_payment_method / requires_confirmation / requires_action / processing
+                consistent = row.status in self.UNSETTLED_PAYMENT_STATUSES
+                fixable = False
+
+            if consistent:
+                continue
+
+            discrepancy = self._discrepancy(
+                self.STATUS_MISMATCH, 'payment_intent', intent_id,
+                local=row, local_status=row.status, local_amount=row.amount,
+                stripe_status=stripe_status, stripe_amount=stripe_amount,
+                fixable=fixable,
+            )
+            if fixable and auto_fix:
+                discrepancy['fixed'] = self._fix_payment_status(row, intent)
+            discrepancies.append(discrepancy)
+
+    @transaction.atomic
+    def _fix_payment_status(self, row, intent):
+        """Bring a local payment in line with a terminal Stripe PaymentIntent status"""
+        metadata = {'source': 'stripe_reconciliation', 'intent_id': intent['id']}
+
+        if intent.get('status') == 'succeeded':
+            if isinstance(row, ProductPayment):
+                row.complete_payment(log_metadata=metadata)
+            else:
+                row.status = row.PaymentStatus.SUCCEEDED
+                row.paid_at = row.paid_at or timezone.now()
+                row.verified = True
+                row.save()
+
+                if isinstance(row, EventPayment) and row.user and row.user.status == EventParticipant.ParticipantStatus.REGISTERED:
+                    row.user.status = EventParticipant.ParticipantStatus.CONFIRMED
+                    row.user.save()
+            logger.info(f"[Stripe Reconciliation] Marked {row._meta.object_name} {row.pk} as SUCCEEDED from {intent['id']}")
+            return True
+
+        if intent.get('status') == 'canceled':
+            old_status = row.status
+            if isinstance(row, ProductPayment):
+                row.status = ProductPayment.PaymentStatus.CANCELLED
+                row.save()
+                ProductPaymentLog.log_action(
+                    payment=row,
+                    action='reconciliation_cancelled',
+                    old_status=old_status,
+                    new_status=row.status,
+                    notes=f"PaymentIntent {intent['id']} was cancelled on Stripe",
+                    metadata=metadata,
+                )
+            else:
+                row.status = row.PaymentStatus.FAILED
+                row.save()
+            logger.info(f"[Stripe Reconciliation] Marked {row._meta.object_name} {row.pk} as {row.status} from {intent['id']}")
+            return True
+
+        return False
+
+    # ==================== REFUNDS ====================
+
+    def _reconcile_refunds(self, start, end, auto_fix, discrepancies):
+        refunds = {refund['id']: refund for refund in self._list_all(self.stripe_client.Refund, start, end)}
+        local_by_refund = self._load_local_refunds(refunds.values())
+
+        for refund_id, refund in refunds.items():
+            row = local_by_refund.get(refund_id)
+            if row is None:
+                discrepancies.append(self._discrepancy(
+                    self.MISSING_LOCAL, 'refund', refund_id,
+                    stripe_status=refund.get('status'),
+                    stripe_amount=self._stripe_amount(refund),
+                    notes=f"No local refund record for PaymentIntent {refund.get('payment_intent')}",
+                ))
+                continue
+            self._compare_refund(refund, row, auto_fix, discrepancies)
+
+        # Local refunds touched in the window whose Stripe refund was not returned by the listing
+        for model in (ParticipantRefund, OrderRefund):
+            unseen = model.objects.filter(
+                updated_at__gte=start,
+                updated_at__lt=end,
+                stripe_refund_id__isnull=False,
+            ).exclude(stripe_refund_id='').exclude(stripe_refund_id__in=refunds.keys())
+
+            for row in unseen:
+                refund = self._retrieve(self.stripe_client.Refund, row.stripe_refund_id)
+                if refund is None:
+                    discrepancies.append(self._discrepancy(
+                        self.MISSING_STRIPE, 'refund', row.stripe_refund_id,
+                        local=row, local_status=row.status, local_amount=row.refund_amount,
+                        notes="Stripe has no refund with this ID",
+                    ))
+                    continue
+                refunds[refund['id']] = refund
+                self._compare_refund(refund, row, auto_fix, discrepancies)
+
+        return len(refunds)
+
+    def _load_local_refunds(self, refunds):
+        """Map Stripe refund ID -> local refund row"""
+        refunds = list(refunds)
+        local_by_refund = {}
+        if not refunds:
+            return local_by_refund
+
+        refund_ids = [refund['id'] for refund in refunds]
+        for model in (ParticipantRefund, OrderRefund):
+            for row in model.objects.filter(stripe_refund_id__in=refund_ids):
+                local_by_refund[row.stripe_refund_id] = row
+
+        # Refunds created before the local record stored its Stripe ID can still be found by reference
+        references = {}
+        for refund in refunds:
+            reference = (refund.get('metadata') or {}).get('refund_reference')
+            if refund['id'] not in local_by_refund and reference:
+                references[reference] = refund['id']
+
+        if references:
+            for model in (ParticipantRefund, OrderRefund):
+                for row in model.objects.filter(refund_reference__in=references.keys()):
+                    local_by_refund[references[row.refund_reference]] = row
+
+        return local_by_refund
+
+    def _compare_refund(self, refund, row, auto_fix, discrepancies):
+        refund_id = refund['id']
+        stripe_status = refund.get('status')
+        stripe_amount = self._stripe_amount(refund)
+
+        if to_minor_units(row.refund_amount, refund.get('currency') or row.currency) != refund.get('amount'):
+            discrepancies.append(self._discrepancy(
+                self.AMOUNT_MISMATCH, 'refund', refund_id,
+                local=row, local_status=row.status, local_amount=row.refund_amount,
+                stripe_status=stripe_status, stripe_amount=stripe_amount,
+            ))
+
+        if row.stripe_refund_id != refund_id:
+            discrepancy = self._discrepancy(
+                self.STATUS_MISMATCH, 'refund', refund_id,
+                local=row, local_status=row.status, local_amount=row.refund_amount,
+                stripe_status=stripe_status, stripe_amount=stripe_amount,
+                fixable=not row.stripe_refund_id,
+                notes=f"Local record references Stripe refund {row.stripe_refund_id or 'None'}",
+            )
+            if discrepancy['fixable'] and auto_fix:
+                row.stripe_refund_id = refund_id
+                row.refund_method = row.refund_method or 'Stripe'
+                row.save()
+                discrepancy['fixed'] = True
+            discrepancies.append(discrepancy)
+
+        if stripe_status in ('failed', 'canceled'):
+            consistent = row.status in self.CLOSED_REFUND_STATUSES
+            fixable = row.status in self.ACTIVE_REFUND_STATUSES or row.status == 'PENDING'
+        elif stripe_status == 'succeeded':
+            # Succeeded Stripe refunds still await admin verification, so IN_PROGRESS is expected
+            consistent = row.status in self.ACTIVE_REFUND_STATUSES
+            fixable = row.status == 'PENDING'
+        else:
+            # pending / requires_action
+            consistent = row.status in self.ACTIVE_REFUND_STATUSES - {'PROCESSED'}
+            fixable = row.status == 'PENDING'
+
+        if consistent:
+            return
+
+        discrepancy = self._discrepancy(
+            self.STATUS_MISMATCH, 'refund', refund_id,
+            local=row, local_status=row.status, local_amount=row.refund_amount,
+            stripe_status=stripe_status, stripe_amount=stripe_amount,
+            fixable=fixable,
+        )
+        if fixable and auto_fix:
+            discrepancy['fixed'] = self._fix_refund_status(row, refund)
+        discrepancies.append(discrepancy)
+
+    def _fix_refund_status(self, row, refund):
+        """Bring a local refund in line with the Stripe refund status"""
+        if refund.get('status') in ('failed', 'canceled'):
+            row.status = row.RefundStatus.FAILED
+            row.stripe_failure_reason = refund.get('failure_reason') or f"Stripe refund {refund.get('status')}"
+        else:
+            # Stripe has the refund in flight or done; leave final verification to an admin
+            row.status = row.RefundStatus.IN_PROGRESS
+        row.save()
+        logger.info(f"[Stripe Reconciliation] Marked {row._meta.object_name} {row.refund_reference} as {row.status} from {refund['id']}")
+        return True
+
+    # ==================== HELPERS ====================
+
+    @staticmethod
+    def _stripe_amount(stripe_object):
+        """Amount of a Stripe object converted from minor units using its own currency"""
+        if stripe_object.get('amount') is None:
+            return None
+        return from_minor_units(stripe_object['amount'], stripe_object.get('currency') or DEFAULT_CURRENCY)
+
+    @staticmethod
+    def _discrepancy(discrepancy_type, stripe_object, stripe_id, local=None, local_status=None,
+                     local_amount=None, stripe_status=None, stripe_amount=None, fixable=False, notes=""):
+        return {
+            'type': discrepancy_type,
+            'stripe_object': stripe_object,
+            'stripe_id': stripe_id,
+            'local_model': local._meta.object_name if local is not None else None,
+            'local_id': str(local.pk) if local is not None else None,
+            'local_status': local_status,
+            'local_amount': str(local_amount) if local_amount is not None else None,
+            'stripe_status': stripe_status,
+            'stripe_amount': str(stripe_amount) if stripe_amount is not None else None,
+            'fixable': fixable,
+            'fixed': False,
+            'notes': notes,
+        }
+
+
+# Convenience function for quick access
+def get_payment_reconciliation_service(stripe_client=None):
+    """Get instance of PaymentReconciliationService"""
+    return PaymentReconciliationService(stripe_client=stripe_client)
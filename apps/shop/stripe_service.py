@@ -17,6 +17,7 @@ from django.utils import timezone
 from decimal import Decimal
 import logging
 
+from core.money import to_decimal, to_minor_units
 from apps.shop.models.payments import ProductPayment, ProductPaymentLog, ProductPaymentMethod
 from apps.shop.models.shop_models import EventCart, ProductPurchaseTracker
 from apps.events.models import EventPayment, DonationPayment
@@ -55,7 +56,7 @@ class StripePaymentService:
         
         try:
             # Convert amount to cents (Stripe uses smallest currency unit)
-            amount_cents = int(payment.amount * 100)
+            amount_cents = to_minor_units(payment.amount, payment.currency)
             
             # Prepare metadata
             intent_metadata = {
@@ -215,7 +216,7 @@ class StripePaymentService:
         except ValueError:
             logger.error("Invalid webhook payload")
             return None
-        except stripe.error.SignatureVerificationError:
+        except stripe.SignatureVerificationError:
             logger.error("Invalid webhook signature")
             return None
     
@@ -243,7 +244,7 @@ class StripePaymentService:
             }
             
             if amount:
-                refund_data['amount'] = int(amount * 100)  # Convert to cents
+                refund_data['amount'] = to_minor_units(amount, payment.currency)
             
             refund = stripe.Refund.create(**refund_data)
             
@@ -258,7 +259,7 @@ class StripePaymentService:
             logger.info(f"Created refund {refund.id} for payment {payment.payment_reference_id}")
             return refund
             
-        except stripe.error.StripeError as e:
+        except stripe.StripeError as e:
             logger.error(f"Stripe error creating refund: {e}")
             return None
     
@@ -285,10 +286,10 @@ class StripePaymentService:
             # Calculate total amount (event + optional donation)
             total_amount = event_payment.amount
             if donation_payment:
-                total_amount += Decimal(donation_payment.amount)
+                total_amount += to_decimal(donation_payment.amount)
             
             # Convert amount to cents (Stripe uses smallest currency unit)
-            amount_cents = int(total_amount * 100)
+            amount_cents = to_minor_units(total_amount, event_payment.currency)
             
             # Get discount information if available
             discount_metadata = {}
@@ -490,13 +491,13 @@ class StripePaymentService:
             }
             
             if amount:
-                refund_data['amount'] = int(amount * 100)  # Convert to cents
+                refund_data['amount'] = to_minor_units(amount, event_payment.currency)
             
             refund = stripe.Refund.create(**refund_data)
             
             logger.info(f"Created refund {refund.id} for event payment {event_payment.event_payment_tracking_number}")
             return refund
             
-        except stripe.error.StripeError as e:
+        except stripe.StripeError as e:
             logger.error(f"Stripe error creating event refund: {e}")
             return None
@@ -0,0 +1,56 @@
+"""
+Celery Tasks for Shop and Payment Management
+
+Tasks:
+- reconcile_stripe_payments: Compares local payment/refund records with Stripe
+  and reports (optionally fixes) discrepancies
+"""
+
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    name='shop.reconcile_stripe_payments',
+    max_retries=3,
+    default_retry_delay=300,  # Retry after 5 minutes (Stripe outages are usually short)
+)
+def reconcile_stripe_payments(self, days=2, auto_fix=False):
+    """
+    Reconcile Stripe PaymentIntents and refunds against local records.
+
+    This task:
+    - Runs daily (configured in django-celery-beat)
+    - Covers a trailing window of `days` days so late webhooks are still caught
+    - Only applies safe corrections when auto_fix is enabled
+    - Is idempotent (safe to run multiple times)
+
+    Returns:
+        dict: Discrepancy report (stored in the Celery result backend)
+    """
+    try:
+        # Import here to avoid circular imports
+        from apps.shop.services.payment_reconciliation_service import PaymentReconciliationService
+
+        report = PaymentReconciliationService().reconcile_recent(days=days, auto_fix=auto_fix)
+
+        for discrepancy in report['discrepancies']:
+            if not discrepancy['fixed']:
+                logger.warning(
+                    f"[Stripe Reconciliation] {discrepancy['type']} on {discrepancy['stripe_object']} "
+                    f"{discrepancy['stripe_id']} ({discrepancy['local_model']} {discrepancy['local_id']}): "
+                    f"local={discrepancy['local_status']}/{discrepancy['local_amount']} "
+                    f"stripe={discrepancy['stripe_status']}/{discrepancy['stripe_amount']}"
+                )
+
+        return report
+
+    except Exception as exc:
+        logger.error(
+            f"[Stripe Reconciliation] Error reconciling payments: {str(exc)}",
+            exc_info=True
+        )
+        raise self.retry(exc=exc)
@@ -1,3 +1,342 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import stripe
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.events.models import Event, EventParticipant, EventPayment, DonationPayment, ParticipantRefund
+from apps.shop.models import EventCart, EventProduct, EventProductOrder, ProductPayment, ProductPaymentMethod, OrderRefund
+from apps.shop.services.payment_reconciliation_service import PaymentReconciliationService
+from apps.users.models import CommunityUser
+from core.money import from_minor_units, round_money, sum_money, to_decimal, to_minor_units
+
+
+class FakeStripeResource:
+    """
+    Minimal in-memory stand-in for a Stripe API resource (PaymentIntent, Refund).
+    Objects are plain dicts shaped like the Stripe API payloads.
+    """
+    def __init__(self, objects=()):
+        self.objects = {obj['id']: obj for obj in objects}
+        self.list_calls = 0
+
+    def add(self, obj):
+        self.objects[obj['id']] = obj
+        return obj
+
+    def list(self, created=None, limit=10, starting_after=None):
+        self.list_calls += 1
+        objects = sorted(self.objects.values(), key=lambda obj: (-obj['created'], obj['id']))
+        if created:
+            objects = [
+                obj for obj in objects
+                if created.get('gte', float('-inf')) <= obj['created'] < created.get('lt', float('inf'))
+            ]
+        if starting_after:
+            ids = [obj['id'] for obj in objects]
+            objects = objects[ids.index(starting_after) + 1:]
+        return {'data': objects[:limit], 'has_more': len(objects) > limit}
+
+    def retrieve(self, object_id):
+        if object_id not in self.objects:
+            raise stripe.InvalidRequestError(
+                f"No such object: '{object_id}'", 'id', code='resource_missing'
+            )
+        return self.objects[object_id]
+
+
+class FakeStripeClient:
+    """Fake `stripe` module exposing the resources used by the payment services"""
+    def __init__(self, payment_intents=(), refunds=()):
+        self.PaymentIntent = FakeStripeResource(payment_intents)
+        self.Refund = FakeStripeResource(refunds)
+
+
+def fake_intent(intent_id, amount, status='succeeded', created=None, metadata=None):
+    return {
+        'id': intent_id,
+        'object': 'payment_intent',
+        'amount': amount,
+        'status': status,
+        'created': int((created or timezone.now()).timestamp()),
+        'metadata': metadata or {},
+    }
+
+
+def fake_refund(refund_id, amount, payment_intent, status='succeeded', created=None, metadata=None):
+    return {
+        'id': refund_id,
+        'object': 'refund',
+        'amount': amount,
+        'payment_intent': payment_intent,
+        'status': status,
+        'created': int((created or timezone.now()).timestamp()),
+        'metadata': metadata or {},
+    }
+
+
+class PaymentReconciliationServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(
+            password="password", first_name="Test", last_name="Buyer"
+        )
+        cls.event = Event.objects.create(name="Anchored", start_date=timezone.now() + timedelta(days=30))
+        cls.participant = EventParticipant.objects.create(event=cls.event, user=cls.user)
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=1)
+        self.end = self.now + timedelta(minutes=1)
+
+    def _product_payment(self, intent_id, amount="25.00", status=ProductPayment.PaymentStatus.PENDING):
+        cart = EventCart.objects.create(user=self.user, event=self.event, total=Decimal(amount))
+        return ProductPayment.objects.create(
+            user=self.user, cart=cart, amount=Decimal(amount), status=status, stripe_payment_intent=intent_id
+        )
+
+    def test_clean_records_produce_no_discrepancies(self):
+        self._product_payment("pi_clean", status=ProductPayment.PaymentStatus.SUCCEEDED)
+        client = FakeStripeClient(payment_intents=[fake_intent("pi_clean", 2500)])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end)
+
+        self.assertEqual(report['payment_intents_checked'], 1)
+        self.assertEqual(report['discrepancies'], [])
+
+    def test_succeeded_intent_with_pending_payment_is_fixed(self):
+        payment = self._product_payment("pi_pending")
+        client = FakeStripeClient(payment_intents=[fake_intent("pi_pending", 2500)])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end)
+        self.assertEqual(report['summary'], {'status_mismatch': 1})
+        self.assertTrue(report['discrepancies'][0]['fixable'])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, ProductPayment.PaymentStatus.PENDING)
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end, auto_fix=True)
+        self.assertEqual(report['fixed_count'], 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, ProductPayment.PaymentStatus.SUCCEEDED)
+        self.assertTrue(payment.logs.filter(action='payment_succeeded').exists())
+
+    def test_locally_succeeded_payment_not_settled_on_stripe_is_not_auto_fixed(self):
+        payment = self._product_payment("pi_unpaid", status=ProductPayment.PaymentStatus.SUCCEEDED)
+        client = FakeStripeClient(payment_intents=[fake_intent("pi_unpaid", 2500, status='requires_payment_method')])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end, auto_fix=True)
+
+        self.assertEqual(report['summary'], {'status_mismatch': 1})
+        self.assertFalse(report['discrepancies'][0]['fixed'])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, ProductPayment.PaymentStatus.SUCCEEDED)
+
+    def test_event_payment_and_donation_share_an_intent(self):
+        EventPayment.objects.create(
+            user=self.participant, event=self.event, amount=Decimal("50.00"),
+            status=EventPayment.PaymentStatus.SUCCEEDED, stripe_payment_intent="pi_combined"
+        )
+        DonationPayment.objects.create(
+            user=self.participant, event=self.event, amount=Decimal("10.00"),
+            status=DonationPayment.PaymentStatus.SUCCEEDED, stripe_payment_intent="pi_combined"
+        )
+        client = FakeStripeClient(payment_intents=[fake_intent("pi_combined", 6000)])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end)
+        self.assertEqual(report['discrepancies'], [])
+
+        client.PaymentIntent.objects["pi_combined"]['amount'] = 5000
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end)
+        self.assertEqual(report['summary'], {'amount_mismatch': 1})
+        self.assertEqual(report['discrepancies'][0]['local_amount'], "60.00")
+        self.assertEqual(report['discrepancies'][0]['stripe_amount'], "50.00")
+
+    def test_missing_local_and_missing_stripe(self):
+        self._product_payment("pi_gone")
+        client = FakeStripeClient(payment_intents=[fake_intent("pi_orphan", 1000, metadata={'payment_id': '999'})])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end)
+
+        self.assertEqual(report['summary'], {'missing_local': 1, 'missing_stripe': 1})
+        by_type = {d['type']: d for d in report['discrepancies']}
+        self.assertEqual(by_type['missing_local']['stripe_id'], "pi_orphan")
+        self.assertEqual(by_type['missing_stripe']['stripe_id'], "pi_gone")
+        self.assertEqual(by_type['missing_stripe']['local_model'], "ProductPayment")
+
+    def test_lists_are_paged(self):
+        for index in range(5):
+            self._product_payment(f"pi_page_{index}", status=ProductPayment.PaymentStatus.SUCCEEDED)
+        client = FakeStripeClient(payment_intents=[fake_intent(f"pi_page_{index}", 2500) for index in range(5)])
+
+        service = PaymentReconciliationService(client)
+        service.PAGE_SIZE = 2
+        report = service.reconcile(self.start, self.end)
+
+        self.assertEqual(report['payment_intents_checked'], 5)
+        self.assertEqual(client.PaymentIntent.list_calls, 3)
+        self.assertEqual(report['discrepancies'], [])
+
+    def test_failed_stripe_refund_marks_local_refund_failed(self):
+        payment = EventPayment.objects.create(
+            user=self.participant, event=self.event, amount=Decimal("50.00"),
+            status=EventPayment.PaymentStatus.REFUND_PROCESSING, stripe_payment_intent="pi_refunded"
+        )
+        refund = ParticipantRefund.objects.create(
+            participant=self.participant, event=self.event, event_payment=payment,
+            refund_amount=Decimal("50.00"), status=ParticipantRefund.RefundStatus.IN_PROGRESS,
+            removal_reason_details="Cancelled", refund_contact_email="secretariat@example.com",
+            stripe_refund_id="re_failed",
+        )
+        client = FakeStripeClient(
+            payment_intents=[fake_intent("pi_refunded", 5000)],
+            refunds=[fake_refund("re_failed", 5000, "pi_refunded", status='failed')],
+        )
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end, auto_fix=True)
+
+        self.assertEqual(report['refunds_checked'], 1)
+        self.assertEqual(report['summary'], {'status_mismatch': 1})
+        refund.refresh_from_db()
+        self.assertEqual(refund.status, ParticipantRefund.RefundStatus.FAILED)
+
+    def test_refund_matched_by_reference_records_stripe_id(self):
+        refund = ParticipantRefund.objects.create(
+            participant=self.participant, event=self.event, refund_amount=Decimal("20.00"),
+            status=ParticipantRefund.RefundStatus.IN_PROGRESS, removal_reason_details="Removed",
+            refund_contact_email="secretariat@example.com",
+        )
+        client = FakeStripeClient(refunds=[
+            fake_refund("re_unlinked", 2000, "pi_x", metadata={'refund_reference': refund.refund_reference})
+        ])
+
+        report = PaymentReconciliationService(client).reconcile(self.start, self.end, auto_fix=True)
+
+        self.assertEqual(report['fixed_count'], 1)
+        refund.refresh_from_db()
+        self.assertEqual(refund.stripe_refund_id, "re_unlinked")
+
+
+class RefundStatisticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CommunityUser.objects.create_user(
+            password="password", first_name="Finance", last_name="Team", is_staff=True
+        )
+        cls.event = Event.objects.create(name="Stats Camp", start_date=timezone.now() + timedelta(days=30))
+        for amount, refund_status, reason, automatic in [
+            ("10.00", OrderRefund.RefundStatus.PENDING, OrderRefund.RefundReason.WRONG_SIZE, True),
+            ("20.00", OrderRefund.RefundStatus.PENDING, OrderRefund.RefundReason.WRONG_SIZE, False),
+            ("30.00", OrderRefund.RefundStatus.PROCESSED, OrderRefund.RefundReason.CHANGED_MIND, True),
+            ("40.00", OrderRefund.RefundStatus.FAILED, OrderRefund.RefundReason.CHANGED_MIND, True),
+        ]:
+            cart = EventCart.objects.create(user=cls.staff, event=cls.event, total=Decimal(amount))
+            OrderRefund.objects.create(
+                cart=cart, user=cls.staff, event=cls.event, refund_amount=Decimal(amount),
+                status=refund_status, refund_reason=reason, is_automatic_refund=automatic,
+            )
+
+    def test_order_refund_statistics_in_one_query(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        url = reverse('orderrefund-statistics')
+
+        with self.assertNumQueries(1):
+            response = client.get(url, {'event_id': str(self.event.id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_refunds'], 4)
+        self.assertEqual(response.data['total_amount'], 100.0)
+        self.assertEqual(response.data['pending_count'], 2)
+        self.assertEqual(response.data['pending_amount'], 30.0)
+        self.assertEqual(response.data['processed_amount'], 30.0)
+        self.assertEqual(response.data['average_amount'], 25.0)
+        self.assertEqual(response.data['status_breakdown'], {
+            'pending': 2, 'in_progress': 0, 'processed': 1, 'failed': 1, 'cancelled': 0
+        })
+        self.assertEqual(response.data['reason_breakdown'], {'WRONG_SIZE': 2, 'CHANGED_MIND': 2})
+        self.assertEqual((response.data['automatic_refunds'], response.data['manual_refunds']), (3, 1))
+        self.assertEqual(response.data['stock_restored_count'], 0)
+
+
+class MoneyTests(SimpleTestCase):
+
+    def test_floats_convert_without_binary_artefacts(self):
+        self.assertEqual(to_decimal(0.1), Decimal('0.1'))
+        self.assertEqual(sum_money([0.1, 0.2]), Decimal('0.30'))
+        with self.assertRaises(ValueError):
+            to_decimal("twelve pounds")
+
+    def test_non_finite_and_out_of_range_amounts_are_rejected(self):
+        for value in ("inf", "-Infinity", "nan", Decimal("Infinity")):
+            with self.assertRaises(ValueError):
+                round_money(value)
+        with self.assertRaises(ValueError):
+            round_money("1e30")
+
+    def test_rounding_is_half_up(self):
+        self.assertEqual(round_money("2.675"), Decimal('2.68'))
+        self.assertEqual(round_money("2.665"), Decimal('2.67'))
+        self.assertEqual(round_money("1.005"), Decimal('1.01'))
+
+    def test_minor_units_follow_currency_precision(self):
+        # int(19.99 * 100) truncates to 1998
+        self.assertEqual(to_minor_units(19.99, 'gbp'), 1999)
+        self.assertEqual(to_minor_units(Decimal('1500'), 'JPY'), 1500)
+        self.assertEqual(from_minor_units(1999, 'gbp'), Decimal('19.99'))
+        self.assertEqual(from_minor_units(1500, 'jpy'), Decimal('1500'))
+
+
+class EventCartTotalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(password="password", first_name="Cart", last_name="Owner")
+        cls.event = Event.objects.create(name="Merch Camp", start_date=timezone.now() + timedelta(days=30))
+        cls.product = EventProduct.objects.create(
+            title="Hoodie", event=cls.event, seller=cls.user, price=Decimal("19.99")
+        )
+
+    def test_total_is_stored_as_rounded_decimal(self):
+        cart = EventCart.objects.create(user=self.user, event=self.event, total=0.1 + 0.2)
+        cart.refresh_from_db()
+        self.assertEqual(cart.total, Decimal('0.30'))
+
+    def test_total_amount_adds_shipping_exactly(self):
+        cart = EventCart.objects.create(user=self.user, event=self.event, shipping_cost=Decimal('3.33'))
+        EventProductOrder.objects.create(
+            product=self.product, cart=cart, quantity=3, status=EventProductOrder.Status.PURCHASED
+        )
+        self.assertEqual(cart.total_amount, Decimal('63.30'))
+
+
+class CheckoutAmountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(password="password", first_name="Check", last_name="Out")
+        cls.event = Event.objects.create(name="Merch Camp", start_date=timezone.now() + timedelta(days=30))
+        cls.product = EventProduct.objects.create(
+            title="Hoodie", event=cls.event, seller=cls.user, price=Decimal("20.00"), stock=100
+        )
+        cls.method = ProductPaymentMethod.objects.create(event=cls.event, method=ProductPaymentMethod.MethodType.BANK_TRANSFER)
+
+    def test_unparseable_amounts_are_rejected_not_server_errors(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for amount in ("inf", "1e30"):
+            cart = EventCart.objects.create(user=self.user, event=self.event, total=Decimal("20.00"))
+            cart.products.add(self.product)
+            EventProductOrder.objects.create(
+                product=self.product, cart=cart, quantity=1, price_at_purchase=Decimal("20.00"),
+                status=EventProductOrder.Status.PURCHASED,
+            )
+            response = client.post(reverse('eventcart-checkout', args=[cart.pk]), {
+                'payment_method_id': str(self.method.id), 'amount': amount,
+                'first_name': 'Check', 'last_name': 'Out', 'email': 'check@example.com',
+            }, format='json')
+            self.assertEqual(response.status_code, 400, (amount, response.data))
@@ -7,20 +7,29 @@ to prevent XSS attacks.
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
 from django.conf import settings
 from datetime import timedelta
 
-from .serializers import CommunityUserSerializer
+from core.login_throttle import get_client_ip, get_lockout, get_login_metrics, register_failure, register_success
+from core.token_revocation import (
+    RefreshTokenReused, issue_refresh_token, revoke_all_sessions, revoke_refresh_token, rotate_refresh_token
+)
+from .serializers import CommunityUserSerializer, LoginUserSerializer
 
 
 class SecureTokenObtainView(APIView):
     """
     Secure login endpoint that sets JWT tokens in HTTPOnly cookies
     instead of returning them in the response body.
+
+    Failed attempts are throttled per username and per client IP with an
+    exponential lockout (see core.login_throttle); locked-out attempts are
+    rejected with 429 before any password check. The response only carries
+    the user's identity - the full profile comes from /api/users/current/.
     """
     permission_classes = [AllowAny]
 
@@ -33,10 +42,18 @@ class SecureTokenObtainView(APIView):
                 'detail': 'Username and password are required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        client_ip = get_client_ip(request)
+        retry_after = get_lockout(username, client_ip)
+        if retry_after:
+            return self.locked_response(retry_after)
+
         # Authenticate user
         user = authenticate(username=username, password=password)
         
         if user is None:
+            lockout = register_failure(username, client_ip)
+            if lockout:
+                return self.locked_response(lockout)
             return Response({
                 'detail': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
@@ -46,13 +63,16 @@ class SecureTokenObtainView(APIView):
                 'detail': 'Account is disabled'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        register_success(username, client_ip)
+        update_last_login(None, user)
+
+        # Generate tokens (each login starts a new refresh-token family, see core.token_revocation)
+        refresh = issue_refresh_token(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
-        # Serialize user data
-        user_data = CommunityUserSerializer(user).data
+        # Identity only - the full profile is fetched lazily from the current-user endpoint
+        user_data = LoginUserSerializer(user).data
 
         # Create response
         response = Response({
@@ -89,11 +109,40 @@ class SecureTokenObtainView(APIView):
 
         return response
 
+    @staticmethod
+    def locked_response(retry_after):
+        response = Response({
+            'detail': 'Too many failed login attempts. Try again later.',
+            'retry_after': retry_after
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class LoginMetricsView(APIView):
+    """
+    Failed/successful/locked-out login counts for the last ?minutes= minutes (default 15).
+    Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get('minutes', 15))
+        except ValueError:
+            return Response({
+                'detail': 'minutes must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_login_metrics(minutes), status=status.HTTP_200_OK)
+
 
 class SecureTokenRefreshView(APIView):
     """
     Secure token refresh endpoint that reads refresh token from HTTPOnly cookie
     and sets new access token in HTTPOnly cookie.
+
+    The refresh token is always rotated. Presenting a refresh token that was
+    already rotated revokes its whole session (see core.token_revocation).
     """
     permission_classes = [AllowAny]
 
@@ -107,8 +156,8 @@ class SecureTokenRefreshView(APIView):
             }, status=status.HTTP_401_UNAUTHORIZED)
 
         try:
-            # Validate and refresh token
-            refresh = RefreshToken(refresh_token)
+            # Consume the refresh token and issue its successor in the same session
+            refresh = rotate_refresh_token(refresh_token)
             access_token = str(refresh.access_token)
 
             # Create response
@@ -127,24 +176,22 @@ class SecureTokenRefreshView(APIView):
                 path='/'
             )
 
-            # Optionally rotate refresh token (if ROTATE_REFRESH_TOKENS is True)
-            if settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS', False):
-                refresh.set_jti()
-                refresh.set_exp()
-                new_refresh_token = str(refresh)
-                
-                response.set_cookie(
-                    key='refresh_token',
-                    value=new_refresh_token,
-                    max_age=int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()),
-                    httponly=True,
-                    secure=True,  # Required for samesite='None'
-                    samesite='None',  # Required for cross-origin
-                    path='/'
-                )
+            response.set_cookie(
+                key='refresh_token',
+                value=str(refresh),
+                max_age=int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()),
+                httponly=True,
+                secure=True,  # Required for samesite='None'
+                samesite='None',  # Required for cross-origin
+                path='/'
+            )
 
             return response
 
+        except RefreshTokenReused:
+            return Response({
+                'detail': 'Session revoked, please log in again'
+            }, status=status.HTTP_401_UNAUTHORIZED)
         except TokenError as e:
             return Response({
                 'detail': 'Invalid or expired refresh token'
@@ -159,21 +206,21 @@ class SecureLogoutView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        # Optionally blacklist the refresh token
+        # Revoke this session's refresh-token family server-side
         refresh_token = request.COOKIES.get('refresh_token')
         
-        if refresh_token and settings.SIMPLE_JWT.get('BLACKLIST_AFTER_ROTATION', False):
-            try:
-                token = RefreshToken(refresh_token)
-                token.blacklist()
-            except Exception:
-                pass  # Token already invalid or blacklist not enabled
+        if refresh_token:
+            revoke_refresh_token(refresh_token)
 
         # Create response
         response = Response({
             'message': 'Logout successful'
         }, status=status.HTTP_200_OK)
 
+        return self.clear_auth_cookies(response)
+
+    @staticmethod
+    def clear_auth_cookies(response):
         # Clear all auth cookies - using set_cookie with max_age=0 for more reliable deletion
         # This is more reliable than delete_cookie() in some browsers
         # IMPORTANT: Cookie deletion settings must match creation settings
@@ -198,6 +245,22 @@ class SecureLogoutView(APIView):
 
         return response
 
+
+class LogoutAllSessionsView(APIView):
+    """
+    Log the current user out on every device: revokes all refresh-token
+    families and every access token issued so far.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoked = revoke_all_sessions(request.user.pk)
+        response = Response({
+            'message': 'Logged out of all sessions',
+            'sessions_revoked': revoked
+        }, status=status.HTTP_200_OK)
+        return SecureLogoutView.clear_auth_cookies(response)
+
 class CurrentUserView(APIView):
     """
     Get current authenticated user information.
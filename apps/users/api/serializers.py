@@ -8,6 +8,7 @@ from apps.users.models import (
     Allergy, MedicalCondition, EmergencyContact, UserAllergy, UserMedicalCondition
 )
 from apps.events.models import AreaLocation, Organisation
+from core.location_hierarchy import get_area_path
 
 class CommunityRoleSerializer(serializers.ModelSerializer):
     '''
@@ -339,22 +340,22 @@ class CommunityUserSerializer(serializers.ModelSerializer):
         
         
     def get_area_from_display(self, user):
-        area_from = getattr(user, "area_from")
-        if area_from is None:
+        path = get_area_path(user.area_from_id)
+        if path is None:
             return 
-        return area_from.area_name
+        return path["area_name"]
     
     def get_chapter(self, user):
-        area_from = getattr(user, "area_from")
-        if area_from is None:
+        path = get_area_path(user.area_from_id)
+        if path is None:
             return 
-        return area_from.unit.chapter.chapter_name
+        return path["chapter_name"]
     
     def get_cluster(self, user):
-        area_from = getattr(user, "area_from")
-        if area_from is None:
+        path = get_area_path(user.area_from_id)
+        if path is None:
             return 
-        return area_from.unit.chapter.cluster.cluster_id
+        return path["cluster_code"]
 
 
 
@@ -915,6 +916,22 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         return super().to_internal_value(data)
 
 
+class LoginUserSerializer(serializers.ModelSerializer):
+    '''
+    Identity-only payload returned by the login endpoint.
+    The full profile (roles, allergies, medical conditions, contacts, location) is fetched
+    afterwards from the current-user endpoint, so a login never serializes related data.
+    '''
+    full_name = serializers.CharField(source='get_full_name', read_only=True)
+    short_name = serializers.CharField(source='get_short_name', read_only=True)
+
+    class Meta:
+        model = CommunityUser
+        fields = ('id', 'member_id', 'username', 'full_name', 'short_name', 'first_name', 'last_name',
+                  'preferred_name', 'primary_email', 'profile_picture', 'is_encoder', 'is_active')
+        read_only_fields = fields
+
+
 class SimplifiedCommunityUserSerializer(serializers.ModelSerializer):
     '''
     Simplified Community User serializer for dropdowns, lists, and registration.
@@ -947,11 +964,12 @@ class SimplifiedCommunityUserSerializer(serializers.ModelSerializer):
         Return area information with chapter and cluster details.
         Returns None if user has no area assigned.
         """
-        if obj.area_from:
+        path = get_area_path(obj.area_from_id)
+        if path:
             return {
-                "area": obj.area_from.area_name,
-                "chapter": obj.area_from.unit.chapter.chapter_name,
-                "cluster": obj.area_from.unit.chapter.cluster.cluster_id,
+                "area": path["area_name"],
+                "chapter": path["chapter_name"],
+                "cluster": path["cluster_code"],
             }
         return None
 
@@ -347,8 +347,7 @@ class CommunityUserViewSet(viewsets.ModelViewSet):
         Returns areas with their chapter and cluster information
         Public endpoint - no authentication required for registration
         '''
-        from apps.events.models import AreaLocation, ChapterLocation
-        from apps.events.api.serializers import SimplifiedAreaLocationSerializer
+        from core.location_hierarchy import area_summary, search_locations
         
         query = request.query_params.get('q', '').strip()
         chapter_filter = request.query_params.get('chapter', '').strip()
@@ -360,32 +359,20 @@ class CommunityUserViewSet(viewsets.ModelViewSet):
                 'areas': []
             })
         
-        queryset = AreaLocation.objects.filter(active=True).select_related(
-            'unit__chapter__cluster__world_location'
-        )
+        # Served from the in-memory location index: prefix matches on area/chapter names and codes
+        # and on support locations (e.g. "crawley" -> Horsham), ranked exact > prefix > substring
+        matches = search_locations(query, chapter=chapter_filter, limit=limit)
+        
+        areas = []
+        for area, alias in matches:
+            data = area_summary(area)
+            if alias:
+                data['matched_alias'] = alias
+            areas.append(data)
         
-        # Search by area name or chapter
-        if query:
-            queryset = queryset.filter(
-                models.Q(area_name__icontains=query) |
-                models.Q(unit__chapter__chapter_name__icontains=query) |
-                models.Q(unit__chapter__chapter_code__icontains=query) |
-                models.Q(area_code__icontains=query)
-            )
-        
-        # Filter by specific chapter if provided
-        if chapter_filter:
-            queryset = queryset.filter(
-                models.Q(unit__chapter__chapter_name__icontains=chapter_filter) |
-                models.Q(unit__chapter__chapter_code__icontains=chapter_filter)
-            )
-        
-        queryset = queryset.order_by('unit__chapter__chapter_name', 'area_name')[:limit]
-        
-        serializer = SimplifiedAreaLocationSerializer(queryset, many=True)
         return response.Response({
-            'count': queryset.count(),
-            'areas': serializer.data
+            'count': len(areas),
+            'areas': areas
         })
         
 class CommunityRoleViewSet(viewsets.ModelViewSet):
@@ -573,10 +560,21 @@ class EmergencyContactViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 class CurrentUserView(views.APIView):
+    '''
+    Full profile of the logged-in user. The login endpoint only returns identity
+    fields, so clients load the profile from here once after logging in.
+    '''
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        serializer = CommunityUserSerializer(request.user)
+        user = get_user_model().objects.select_related('area_from').prefetch_related(
+            'role_links__role',
+            'role_links__allowed_organisation_control',
+            'community_user_emergency_contacts',
+            'user_allergies__allergy',
+            'user_medical_conditions__condition',
+        ).get(pk=request.user.pk)
+        serializer = CommunityUserSerializer(user)
         return response.Response(serializer.data)
 
 
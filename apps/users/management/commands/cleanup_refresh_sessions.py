@@ -0,0 +1,65 @@
+"""
+Management command to prune ended sessions from the refresh-token revocation store.
+
+Runs the cleanup immediately (without Celery). Use --schedule to create/update
+the daily Celery Beat periodic task instead.
+
+Usage:
+    python manage.py cleanup_refresh_sessions
+    python manage.py cleanup_refresh_sessions --schedule
+"""
+
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import PeriodicTask, CrontabSchedule
+
+from apps.users.tasks import cleanup_refresh_sessions
+
+
+class Command(BaseCommand):
+    help = 'Prune expired/revoked refresh-token families from per-user session indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Create or update the daily Celery Beat task instead of running now',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            self._schedule()
+            return
+
+        result = cleanup_refresh_sessions.apply().get()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Checked {result['users_checked']} users, pruned {result['families_pruned']} ended sessions"
+        ))
+
+    def _schedule(self):
+        # Daily at 04:00, after the Stripe reconciliation
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute='0',
+            hour='4',
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+        )
+
+        task, created = PeriodicTask.objects.update_or_create(
+            name='Cleanup Refresh Sessions',
+            defaults={
+                'task': 'users.cleanup_refresh_sessions',
+                'crontab': schedule,
+                'interval': None,
+                'enabled': True,
+                'description': (
+                    'Prunes ended sessions from the refresh-token revocation store. '
+                    'Family and token keys expire on their own.'
+                ),
+            }
+        )
+
+        verb = 'Created' if created else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} periodic task: {task.name}'))
+        self.stdout.write(f'  Task Function: {task.task}')
+        self.stdout.write(f'  Schedule: {schedule}')
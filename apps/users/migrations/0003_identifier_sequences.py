@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:16
+
+from django.db import migrations, models
+
+from core.identifiers import username_reservations
+
+
+def seed_username_sequences(apps, schema_editor):
+    # Register existing usernames so generated ones continue after them (CFC-JOHNSMITH2 -> next is CFC-JOHNSMITH3)
+    CommunityUser = apps.get_model('users', 'CommunityUser')
+    IdentifierSequence = apps.get_model('users', 'IdentifierSequence')
+
+    values = {}
+    for username in CommunityUser.objects.values_list('username', flat=True).iterator(chunk_size=2000):
+        for scope, value in username_reservations(username).items():
+            values[scope] = max(values.get(scope, 0), value)
+
+    IdentifierSequence.objects.bulk_create(
+        [IdentifierSequence(scope=scope, last_value=value) for scope, value in values.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_communityrole_role_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=150, unique=True, verbose_name='scope')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='last allocated value')),
+            ],
+            options={
+                'verbose_name': 'Identifier Sequence',
+                'verbose_name_plural': 'Identifier Sequences',
+            },
+        ),
+        migrations.RunPython(seed_username_sequences, migrations.RunPython.noop),
+    ]
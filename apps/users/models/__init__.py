@@ -1,3 +1,4 @@
 from .user_models import *
 from .metadata_models import *
+from .identifier_models import *
 from .user_manager import CommunityUserManager
\ No newline at end of file
@@ -0,0 +1,18 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class IdentifierSequence(models.Model):
+    '''
+    Named counters for human-readable identifiers (usernames, member IDs, event participant IDs).
+    Values are only allocated through core.identifiers, which bumps a scope with a single upsert.
+    '''
+    scope = models.CharField(max_length=150, unique=True, verbose_name=_("scope"))
+    last_value = models.BigIntegerField(default=0, verbose_name=_("last allocated value"))
+
+    class Meta:
+        verbose_name = _("Identifier Sequence")
+        verbose_name_plural = _("Identifier Sequences")
+
+    def __str__(self):
+        return f"{self.scope}: {self.last_value}"
@@ -1,4 +1,3 @@
-from django.utils.text import slugify
 from django.contrib.auth.models import BaseUserManager
 
 
@@ -10,13 +9,7 @@ class CommunityUserManager(BaseUserManager):
         if not extra_fields.get("first_name") or not extra_fields.get("last_name"):
             raise ValueError("Users must have a first and last name")
         
-        # Generate username if not provided
-        if not username:
-            ministry = extra_fields.get("ministry", "CFC")
-            first_name = extra_fields.get("first_name", "")
-            last_name = extra_fields.get("last_name", "")
-            username = slugify(f"{ministry}-{first_name}{last_name}").upper()
-            
+        # Without a username, CommunityUser.save allocates one (E.g. CFC-JOHNSMITH, CFC-JOHNSMITH1)
         email = extra_fields.get("primary_email")
         user = self.model(
             username=username,
@@ -1,6 +1,7 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
-from django.utils.text import slugify
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator, EmailValidator, RegexValidator
@@ -9,10 +10,8 @@ import datetime
 import uuid
 
 from .user_manager import CommunityUserManager
-
-MAX_MEMBER_ID_LENGTH = 20
-MAX_MEMBER_ID_FIRST_NAME = 5
-MAX_MEMBER_ID_LAST_NAME = 5
+from core.identifiers import assign_user_identifiers, reserve_username
+from core.user_cache import invalidate_cached_user
 
 class CommunityUser(AbstractBaseUser, PermissionsMixin):
     '''
@@ -140,22 +139,19 @@ class CommunityUser(AbstractBaseUser, PermissionsMixin):
 
 
     def save(self, *args, **kwargs):
-        # Track if this is a new instance (needs member_id generation)
-        # is_new_instance = self.pk is None
-        needs_member_id = not self.member_id
+        if self._state.adding and self.username:
+            # Explicitly chosen username - keep generated ones from reusing it
+            reserve_username(self.username)
+                
+        self.normalise_profile()
         
-        # Ensure username is unique
-    
-        if not self.username: 
-            base_username = slugify(f"{self.ministry}-{self.first_name}{self.last_name}").upper()
-            self.username = base_username
+        # Unique username (E.g. CFC-JOHNSMITH1) and member ID (E.g. 2025-JOHNSMITH-00A1) in one allocation
+        if not self.username or not self.member_id:
+            assign_user_identifiers([self])
+        super().save(*args, **kwargs)
         
-        # Check for duplicates and append number if needed
-        counter = 1
-        while CommunityUser.objects.filter(username=self.username).exclude(pk=self.pk).exists():
-            self.username = f"{base_username}{counter}"
-            counter += 1
-                
+    def normalise_profile(self):
+        """Derive age and tidy names - done on every save, call before bulk_create"""
         # Calculate age from date of birth if provided
         if self.date_of_birth:
             today = datetime.date.today()
@@ -165,24 +161,6 @@ class CommunityUser(AbstractBaseUser, PermissionsMixin):
         self.first_name = self.first_name.strip().capitalize()
         self.last_name = self.last_name.strip().capitalize()
         self.preferred_name = self.preferred_name.strip().capitalize() if self.preferred_name else None
-        # First save to get the UUID if this is a new instance
-        super().save(*args, **kwargs)
-        # Generate member ID after we have the UUID
-        if needs_member_id:
-            # Generate member ID using the now-available UUID
-            name_slug = slugify(
-                f"{self.first_name[:MAX_MEMBER_ID_FIRST_NAME]}{self.last_name[:MAX_MEMBER_ID_LAST_NAME]}"
-            ).upper()
-            
-            # Use current year if uploaded_at is not set
-            year = self.user_uploaded_at.year if self.user_uploaded_at else datetime.datetime.now().year
-            
-            # Generate unique member ID E.g. 2025-ROME-SALARDAbDASDS3S
-            uuid_part = str(self.id).replace('-', '')[:MAX_MEMBER_ID_LENGTH - len(name_slug) - 5]
-            self.member_id = f"{year}-{name_slug}-{uuid_part}"
-            
-            # Save again to persist the member_id
-            super().save(update_fields=['member_id'])
         
     def get_full_name(self):
         """Return first + last name, or preferred name if available"""
@@ -333,4 +311,10 @@ class UserCommunityRole(models.Model):
 
     def __str__(self):
         return f"{self.user} → {self.role} (by {self.assigned_by or 'system'})"
-    
+
+
+@receiver(post_save, sender=CommunityUser)
+@receiver(post_delete, sender=CommunityUser)
+def community_user_changed(sender, instance, **kwargs):
+    # Covers profile edits, deactivation and password changes
+    invalidate_cached_user(instance.pk)
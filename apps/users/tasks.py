@@ -0,0 +1,53 @@
+"""
+Celery Tasks for User Management
+
+Tasks:
+- cleanup_refresh_sessions: Prunes ended sessions from the per-user refresh-token
+  family indexes kept by core.token_revocation
+"""
+
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    name='users.cleanup_refresh_sessions',
+    max_retries=3,
+    default_retry_delay=300,
+)
+def cleanup_refresh_sessions(self):
+    """
+    Drop expired and revoked refresh-token families from users' session indexes.
+
+    This task:
+    - Runs daily (configured in django-celery-beat)
+    - Only visits users who logged in within the refresh-token lifetime
+      (older indexes have already expired from the cache)
+    - Is idempotent (safe to run multiple times)
+
+    Returns:
+        dict: {'users_checked': int, 'families_pruned': int}
+    """
+    try:
+        # Import here to avoid circular imports
+        from datetime import timedelta
+        from django.contrib.auth import get_user_model
+        from django.utils import timezone
+        from core.token_revocation import cleanup_user_indexes, refresh_lifetime
+
+        since = timezone.now() - timedelta(seconds=refresh_lifetime())
+        user_ids = get_user_model().objects.filter(last_login__gte=since).values_list('id', flat=True)
+
+        result = cleanup_user_indexes(user_ids.iterator(chunk_size=2000))
+        logger.info(
+            f"[Session Cleanup] Checked {result['users_checked']} users, "
+            f"pruned {result['families_pruned']} ended sessions"
+        )
+        return result
+
+    except Exception as exc:
+        logger.error(f"[Session Cleanup] Error cleaning up refresh sessions: {str(exc)}", exc_info=True)
+        raise self.retry(exc=exc)
@@ -1,8 +1,271 @@
-from django.test import TestCase
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import empty
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.users.models import CommunityUser
+from apps.users.tasks import cleanup_refresh_sessions
+from core.authentication import JWTCookieAuthentication
+from core.identifiers import assign_user_identifiers
+from core.login_throttle import get_client_ip, get_login_metrics, lockout_seconds
+from core.token_revocation import (
+    RefreshTokenRevoked, RefreshTokenReused, active_session_count, issue_refresh_token,
+    _rotated_key, revoke_all_sessions, revoke_family, rotate_refresh_token
+)
+from core.user_cache import LazyUser, get_token_user
 
 class SimpleTest(TestCase):
     def test_homepage_status_code(self):
         # Assuming you have a home view at '/'
         response = self.client.get('/redoc')
-        self.assertEqual(response.status_code, 301)
\ No newline at end of file
+        self.assertEqual(response.status_code, 301)
+
+@override_settings(LOGIN_THROTTLE_USER_ATTEMPTS=3, LOGIN_THROTTLE_IP_ATTEMPTS=10, LOGIN_THROTTLE_BASE_LOCKOUT=30)
+class LoginThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(
+            username="jdoe", password="correct-horse", first_name="John", last_name="Doe"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('auth_login')
+
+    def login(self, password, ip="10.0.0.1"):
+        return self.client.post(
+            self.url, {'username': 'jdoe', 'password': password},
+            content_type='application/json', REMOTE_ADDR=ip
+        )
+
+    def test_successful_login_returns_identity_only(self):
+        response = self.login("correct-horse")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], "jdoe")
+        self.assertNotIn('roles', response.data['user'])
+        self.assertNotIn('emergency_contacts', response.data['user'])
+
+    def test_lockout_blocks_before_password_check_and_doubles(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+        self.assertEqual(self.login("wrong").status_code, 401)
+        response = self.login("wrong")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], "30")
+
+        with mock.patch('apps.users.api.auth_views.authenticate') as authenticate:
+            response = self.login("correct-horse")
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+
+        self.assertEqual(lockout_seconds(4, 3), 60)
+        self.assertEqual(lockout_seconds(50, 3), 3600)
+
+    def test_username_lockout_applies_across_ips(self):
+        for index in range(3):
+            self.login("wrong", ip=f"10.0.0.{index}")
+        self.assertEqual(self.login("correct-horse", ip="10.0.0.99").status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_USER_ATTEMPTS=100)
+    def test_spoofed_forwarded_for_does_not_reset_the_ip_lockout(self):
+        # nginx appends the real peer address to whatever X-Forwarded-For the client sent
+        for index in range(9):
+            response = self.client.post(
+                self.url, {'username': 'jdoe', 'password': 'wrong'}, content_type='application/json',
+                HTTP_X_FORWARDED_FOR=f"203.0.113.{index}, 10.0.0.7",
+            )
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            self.url, {'username': 'jdoe', 'password': 'wrong'}, content_type='application/json',
+            HTTP_X_FORWARDED_FOR="198.51.100.1, 10.0.0.7",
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(get_client_ip(RequestFactory().get('/', HTTP_X_REAL_IP="10.0.0.8", HTTP_X_FORWARDED_FOR="1.2.3.4")), "10.0.0.8")
+
+    def test_failed_logins_are_counted_in_metrics(self):
+        self.login("wrong")
+        self.login("correct-horse")
+        metrics = get_login_metrics(5)
+        self.assertEqual((metrics['failed'], metrics['succeeded']), (1, 1))
+        self.assertEqual(metrics['failure_rate'], 0.5)
+
+
+class UserCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(
+            username="asmith", password="correct-horse", first_name="Ann", last_name="Smith"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = AccessToken.for_user(self.user)
+
+    def test_token_user_is_served_from_cache(self):
+        authenticator = JWTCookieAuthentication()
+        authenticator.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = authenticator.get_user(self.token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.first_name, "Ann")
+        # The password hash is not cached but still loads on demand
+        self.assertTrue(user.check_password("correct-horse"))
+
+    def test_deactivation_invalidates_cached_user(self):
+        authenticator = JWTCookieAuthentication()
+        authenticator.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authenticator.get_user(self.token)
+
+    @override_settings(AUTH_LAZY_USER=True)
+    def test_lazy_user_only_builds_instance_when_needed(self):
+        user = get_token_user(self.user.pk)
+        self.assertIsInstance(user, LazyUser)
+        self.assertTrue(user.is_active and user.is_authenticated)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIs(user._wrapped, empty)
+        self.assertEqual(user.last_name, "Smith")
+        self.assertIsInstance(user, CommunityUser)
+
+
+class RefreshTokenRevocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CommunityUser.objects.create_user(
+            username="bjones", password="correct-horse", first_name="Ben", last_name="Jones"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def refresh(self, token):
+        self.client.cookies['refresh_token'] = str(token)
+        return self.client.post(reverse('auth_refresh'))
+
+    def test_refresh_rotates_within_the_same_family(self):
+        first = issue_refresh_token(self.user)
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+
+        second = RefreshToken(response.cookies['refresh_token'].value)
+        self.assertNotEqual(second['jti'], first['jti'])
+        self.assertEqual(second['family'], first['family'])
+        self.assertEqual(self.refresh(second).status_code, 200)
+
+    def test_reusing_a_rotated_token_revokes_the_family(self):
+        stolen = issue_refresh_token(self.user)
+        current = rotate_refresh_token(str(stolen))
+        # Replayed after the grace window
+        cache.delete(_rotated_key(stolen['jti']))
+
+        with self.assertRaises(RefreshTokenReused):
+            rotate_refresh_token(str(stolen))
+        # The legitimate holder's token died with the family
+        with self.assertRaises(RefreshTokenRevoked):
+            rotate_refresh_token(str(current))
+
+        response = self.refresh(stolen)
+        self.assertEqual(response.status_code, 401)
+
+    def test_concurrent_refreshes_with_the_same_token_share_the_successor(self):
+        shared = issue_refresh_token(self.user)
+        successors = []
+        for _tab in range(2):
+            response = self.refresh(shared)
+            self.assertEqual(response.status_code, 200)
+            successors.append(response.cookies['refresh_token'].value)
+
+        self.assertEqual(successors[0], successors[1])
+        self.assertEqual(self.refresh(RefreshToken(successors[0])).status_code, 200)
+        self.assertEqual(active_session_count(self.user.pk), 1)
+
+    def test_logout_revokes_only_that_session(self):
+        laptop = issue_refresh_token(self.user)
+        phone = issue_refresh_token(self.user)
+        self.client.cookies['refresh_token'] = str(laptop)
+        self.client.post(reverse('auth_logout'))
+
+        with self.assertRaises(RefreshTokenRevoked):
+            rotate_refresh_token(str(laptop))
+        rotate_refresh_token(str(phone))
+        self.assertEqual(active_session_count(self.user.pk), 1)
+
+    def test_logout_all_revokes_every_session_and_access_token(self):
+        laptop = issue_refresh_token(self.user)
+        phone = issue_refresh_token(self.user)
+        self.client.cookies['access_token'] = str(phone.access_token)
+
+        # Log out a second after both logins
+        later = mock.Mock(time=mock.Mock(return_value=time.time() + 1))
+        with mock.patch("core.token_revocation.time", later):
+            response = self.client.post(reverse('auth_logout_all'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sessions_revoked'], 2)
+
+        for token in (laptop, phone):
+            with self.assertRaises(RefreshTokenRevoked):
+                rotate_refresh_token(str(token))
+        with self.assertRaises(AuthenticationFailed):
+            JWTCookieAuthentication().get_user(phone.access_token)
+
+    def test_logging_back_in_within_the_second_of_logout_all_works(self):
+        revoke_all_sessions(self.user.pk)
+        refresh = issue_refresh_token(self.user)
+        JWTCookieAuthentication().get_user(refresh.access_token)
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+
+    def test_cleanup_prunes_ended_sessions(self):
+        issue_refresh_token(self.user)
+        revoked = issue_refresh_token(self.user)
+        revoke_family(revoked['family'])
+        CommunityUser.objects.filter(pk=self.user.pk).update(last_login=timezone.now())
+
+        result = cleanup_refresh_sessions.apply().get()
+        self.assertEqual(result['families_pruned'], 1)
+        self.assertEqual(active_session_count(self.user.pk), 1)
+
+
+class IdentifierAllocationTests(TestCase):
+
+    def test_new_user_gets_sequential_username_and_member_id_in_one_write(self):
+        with self.assertNumQueries(2):  # sequence upsert + insert
+            first = CommunityUser.objects.create_user(password="password", first_name="anna", last_name="smith", ministry="CFC")
+        second = CommunityUser.objects.create_user(password="password", first_name="Anna", last_name="Smith", ministry="CFC")
+
+        self.assertEqual((first.username, second.username), ("CFC-ANNASMITH", "CFC-ANNASMITH1"))
+        year = timezone.now().year
+        self.assertRegex(first.member_id, rf"^{year}-ANNASMITH-[0-9A-Z]{{4}}$")
+        self.assertNotEqual(first.member_id, second.member_id)
+
+    def test_explicit_usernames_are_never_generated_again(self):
+        CommunityUser.objects.create_user(username="CFC-BENJONES2", password="password", first_name="Ben", last_name="Jones", ministry="CFC")
+        generated = {
+            CommunityUser.objects.create_user(password="password", first_name="Ben", last_name="Jones", ministry="CFC").username
+            for _index in range(3)
+        }
+        self.assertEqual(len(generated), 3)
+        self.assertNotIn("CFC-BENJONES2", generated)
+
+    def test_bulk_allocation_for_bulk_create(self):
+        users = [CommunityUser(first_name="Cara", last_name="Lee", ministry="SFC") for _index in range(3)]
+        with self.assertNumQueries(1):
+            assign_user_identifiers(users)
+        CommunityUser.objects.bulk_create(users)
+
+        self.assertEqual([user.username for user in users], ["SFC-CARALEE", "SFC-CARALEE1", "SFC-CARALEE2"])
+        self.assertEqual(len({user.member_id for user in users}), 3)
+        self.assertEqual(
+            CommunityUser.objects.create_user(password="password", first_name="Cara", last_name="Lee", ministry="SFC").username,
+            "SFC-CARALEE3",
+        )
+
@@ -5,6 +5,10 @@ instead of the Authorization header.
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from core.token_revocation import is_revoked_for_user
+from core.user_cache import get_token_user
 
 
 class JWTCookieAuthentication(JWTAuthentication):
@@ -50,6 +54,29 @@ class JWTCookieAuthentication(JWTAuthentication):
         
         return user, validated_token
 
+    def get_user(self, validated_token):
+        """
+        Resolve the token's user through the shared short-TTL user cache
+        (see core.user_cache) instead of querying CommunityUser on every request.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user = get_token_user(user_id)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        # "Log out all sessions" also invalidates access tokens issued before it
+        if is_revoked_for_user(user_id, validated_token.get('iat')):
+            raise AuthenticationFailed('Session has been revoked', code='token_revoked')
+
+        return user
+
     def authenticate_header(self, request):
         """
         Override to return None instead of 'Bearer'.
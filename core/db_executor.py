@@ -0,0 +1,73 @@
+"""
+Bounded Database Executors
+
+database_sync_to_async runs every call on the one thread-sensitive executor, so a
+bulk check-in over thousands of participants held up every other websocket's
+queries until it finished. Sync-only database work from async code (anything the
+async ORM can't do: transactions, model save() logic, serializers) now runs in
+small named thread pools instead:
+
+- 'short': quick sync-only calls (serialising a page of participants, a single check-in)
+- 'bulk': long-running operations (bulk check-in/out), capped so they can never take
+  every worker or database connection
+
+Pool sizes come from settings.CHANNELS_DB_POOL_SIZES (e.g. {'short': 8, 'bulk': 2}).
+As with database_sync_to_async, stale connections are closed before and after each call.
+
+Example:
+    @db_pool('bulk')
+    def bulk_checkin(self, filters):
+        ...
+
+    result = await self.bulk_checkin(filters)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+DEFAULT_POOL_SIZES = {'short': 8, 'bulk': 2}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_pool_size(pool):
+    return getattr(settings, 'CHANNELS_DB_POOL_SIZES', {}).get(pool, DEFAULT_POOL_SIZES[pool])
+
+
+def get_executor(pool):
+    """The (lazily created) thread pool for a pool name"""
+    with _executors_lock:
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(max_workers=get_pool_size(pool), thread_name_prefix=f"db-{pool}")
+        return _executors[pool]
+
+
+def _call(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(pool, func, *args, **kwargs):
+    """Run a sync callable in the named pool and await its result"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(pool), functools.partial(context.run, _call, func, args, kwargs))
+
+
+def db_pool(pool):
+    """Decorator turning a sync function/method into a coroutine run in the named pool"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_in_pool(pool, func, *args, **kwargs)
+        return wrapper
+    return decorator
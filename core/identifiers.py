@@ -0,0 +1,228 @@
+"""
+Identifier Allocation
+
+Human-readable identifiers are allocated from named sequences
+(users.IdentifierSequence) instead of being guessed and checked with
+exists() loops. A sequence is bumped with one INSERT ... ON CONFLICT DO
+UPDATE ... RETURNING statement, so each allocation is a single round-trip,
+concurrent allocations can never hand out the same value, and a whole batch
+(for bulk_create) is allocated in the same single statement.
+
+Formats (unchanged in shape from the previous generators):
+- username       CFC-JOHNSMITH, then CFC-JOHNSMITH1, CFC-JOHNSMITH2, ...   scope username:<base>
+- member_id      2025-JOHNSMITH-00A1   (per-year sequence, base 36)        scope member:<year>
+- event_pax_id   YYC2026ANCRD-000F     (per-code sequence, base 36)        scope event_pax:<trimmed event code>
+
+Generated member and participant suffixes are 4 characters, which never
+matches the length of the UUID-derived suffixes issued before, so old and
+new identifiers cannot collide. Event codes are not unique (type + year + the
+first letters of the name), so participant IDs are numbered per code: events
+sharing a code share one sequence. Existing usernames and participant IDs are
+registered with their sequences by migrations; usernames chosen explicitly are
+registered through reserve_username().
+
+An allocation holds the sequence row's lock until the surrounding transaction
+ends. Values consumed by a rolled-back transaction are skipped, not reused.
+
+Example:
+    assign_user_identifiers(users)          # before CommunityUser.objects.bulk_create(users)
+    assign_event_pax_ids(participants)      # before EventParticipant.objects.bulk_create(participants)
+"""
+
+import datetime
+import re
+from collections import Counter
+from django.apps import apps
+from django.db import connection
+from django.utils.text import slugify
+
+SUFFIX_WIDTH = 4
+MAX_EVENT_PAX_ID_LENGTH = 20
+MAX_USERNAME_BASE_LENGTH = 90
+MAX_MEMBER_ID_LENGTH = 20
+MAX_MEMBER_ID_FIRST_NAME = 5
+MAX_MEMBER_ID_LAST_NAME = 5
+
+_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_TRAILING_NUMBER = re.compile(r'^(.*\D)(\d+)$')
+_EVENT_PAX_ID = re.compile(rf'^(.+)-([0-9A-Z]{{{SUFFIX_WIDTH}}})$')
+
+
+def _table():
+    return connection.ops.quote_name(apps.get_model('users', 'IdentifierSequence')._meta.db_table)
+
+
+def _greatest():
+    return 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+
+
+def allocate(counts):
+    """
+    Allocate consecutive values from several sequences in one statement.
+
+    Args:
+        counts: {scope: how many values}
+
+    Returns:
+        dict: {scope: first allocated value} - values first .. first + count - 1 are yours
+    """
+    counts = {scope: count for scope, count in counts.items() if count > 0}
+    if not counts:
+        return {}
+    table = _table()
+    # Sorted so concurrent batches lock sequence rows in the same order
+    scopes = sorted(counts)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (scope, last_value) VALUES {', '.join(['(%s, %s)'] * len(scopes))} "
+            f"ON CONFLICT (scope) DO UPDATE SET last_value = {table}.last_value + EXCLUDED.last_value "
+            f"RETURNING scope, last_value",
+            [value for scope in scopes for value in (scope, counts[scope])],
+        )
+        return {scope: last_value - counts[scope] + 1 for scope, last_value in cursor.fetchall()}
+
+
+def reserve(values):
+    """Make sure sequences never hand out values up to the given ones: {scope: value}"""
+    if not values:
+        return
+    table = _table()
+    scopes = sorted(values)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (scope, last_value) VALUES {', '.join(['(%s, %s)'] * len(scopes))} "
+            f"ON CONFLICT (scope) DO UPDATE SET last_value = {_greatest()}({table}.last_value, EXCLUDED.last_value)",
+            [value for scope in scopes for value in (scope, values[scope])],
+        )
+
+
+def encode_suffix(value, width=SUFFIX_WIDTH):
+    """Base-36, upper case, zero padded: 15 -> '000F'"""
+    digits = ''
+    while value:
+        value, remainder = divmod(value, 36)
+        digits = _ALPHABET[remainder] + digits
+    return digits.rjust(width, '0')
+
+
+# Usernames
+
+def username_base(ministry, first_name, last_name):
+    return slugify(f"{ministry}-{first_name}{last_name}").upper()[:MAX_USERNAME_BASE_LENGTH]
+
+
+def _username_scope(base):
+    return f"username:{base}"
+
+
+def format_username(base, value):
+    return base if value == 1 else f"{base}{value - 1}"
+
+
+def username_reservations(username):
+    """Sequence values an existing username occupies (used by reserve_username and the seeding migration)"""
+    values = {_username_scope(username): 1}
+    match = _TRAILING_NUMBER.match(username)
+    if match:
+        values[_username_scope(match.group(1))] = int(match.group(2)) + 1
+    return values
+
+
+def reserve_username(username):
+    """Register an explicitly chosen username so generated usernames skip it"""
+    reserve(username_reservations(username))
+
+
+# Member IDs
+
+def member_name_slug(first_name, last_name):
+    return slugify(
+        f"{first_name.strip()[:MAX_MEMBER_ID_FIRST_NAME]}{last_name.strip()[:MAX_MEMBER_ID_LAST_NAME]}"
+    ).upper()
+
+
+def _member_scope(year):
+    return f"member:{year}"
+
+
+def format_member_id(year, name_slug, value):
+    return f"{year}-{name_slug}-{encode_suffix(value)}"
+
+
+def _member_year(user):
+    return user.user_uploaded_at.year if user.user_uploaded_at else datetime.datetime.now().year
+
+
+def assign_user_identifiers(users):
+    """
+    Fill in missing usernames and member IDs for unsaved CommunityUser instances
+    with a single allocation statement (also used by CommunityUser.save).
+    """
+    pending_usernames = [(user, username_base(user.ministry, user.first_name, user.last_name)) for user in users if not user.username]
+    pending_members = [(user, _member_year(user)) for user in users if not user.member_id]
+
+    username_counts = Counter(_username_scope(base) for _user, base in pending_usernames)
+    member_counts = Counter(_member_scope(year) for _user, year in pending_members)
+    first_values = allocate({**username_counts, **member_counts})
+
+    for user, base in pending_usernames:
+        scope = _username_scope(base)
+        user.username = format_username(base, first_values[scope])
+        first_values[scope] += 1
+    for user, year in pending_members:
+        scope = _member_scope(year)
+        user.member_id = format_member_id(year, member_name_slug(user.first_name, user.last_name), first_values[scope])
+        first_values[scope] += 1
+    return users
+
+
+# Event participant IDs
+
+def event_pax_prefix(event_code):
+    """The part of the event code that starts its participant IDs"""
+    return event_code[:MAX_EVENT_PAX_ID_LENGTH - SUFFIX_WIDTH - 1].upper()
+
+
+def _event_pax_scope(event_code):
+    return f"event_pax:{event_pax_prefix(event_code)}"
+
+
+def format_event_pax_id(event_code, value):
+    suffix = encode_suffix(value)
+    # Trim the event code rather than the suffix, so long codes still get unique IDs
+    return f"{event_code[:MAX_EVENT_PAX_ID_LENGTH - len(suffix) - 1]}-{suffix}".upper()
+
+
+def event_pax_reservations(event_pax_id):
+    """Sequence value an existing participant ID occupies (used by the seeding migration)"""
+    match = _EVENT_PAX_ID.match(event_pax_id or '')
+    if not match:
+        return {}
+    return {_event_pax_scope(match.group(1)): int(match.group(2), 36)}
+
+
+def assign_event_pax_ids(participants):
+    """
+    Fill in missing event_pax_id values for unsaved EventParticipant instances
+    (any mix of events) with a single allocation statement.
+    """
+    pending = [participant for participant in participants if not participant.event_pax_id]
+    if not pending:
+        return participants
+
+    event_ids = {participant.event_id for participant in pending}
+    event_codes = {
+        participant.event_id: participant.event.event_code
+        for participant in pending if 'event' in participant._state.fields_cache
+    }
+    missing_codes = event_ids - event_codes.keys()
+    if missing_codes:
+        Event = apps.get_model('events', 'Event')
+        event_codes.update(Event.objects.filter(pk__in=missing_codes).values_list('id', 'event_code'))
+
+    first_values = allocate(Counter(_event_pax_scope(event_codes[participant.event_id]) for participant in pending))
+    for participant in pending:
+        scope = _event_pax_scope(event_codes[participant.event_id])
+        participant.event_pax_id = format_event_pax_id(event_codes[participant.event_id], first_values[scope])
+        first_values[scope] += 1
+    return participants
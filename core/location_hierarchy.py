@@ -0,0 +1,333 @@
+"""
+Location Hierarchy Cache
+
+The whole country -> cluster -> chapter -> unit -> area hierarchy is a few hundred
+rows, so each process keeps a copy in memory and resolves any area's ancestry
+without touching the database. The copy is built from the materialized path
+columns on AreaLocation, plus chapters and search-support aliases, in three queries.
+
+The same copy holds a prefix index over area names/codes, chapter names/codes and
+SearchAreaSupportLocation aliases, used by the public typeahead endpoints.
+
+Processes share a version token through the Django cache: saving or deleting any
+location bumps the token and every process reloads its copy on next access. The token
+is read at most once per LOCATION_HIERARCHY_VERSION_CHECK_SECONDS (not once per area
+resolved), so other processes pick up a change within that interval; the process that
+made the change reloads straight away.
+
+Example:
+    path = get_area_path(user.area_from_id)
+    if path:
+        path['chapter_name'], path['cluster_code'], path['display']
+
+    for area, alias in search_locations("craw", limit=5):
+        ...  # alias == "crawley" when the match came from a support location
+"""
+
+import re
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'location_hierarchy:version'
+
+# Longest prefix stored in the index; longer queries are narrowed by their first characters
+MAX_PREFIX_LENGTH = 16
+
+# Kinds of indexed term
+TERM_AREA = 'area'
+TERM_AREA_CODE = 'area_code'
+TERM_CHAPTER = 'chapter'
+TERM_ALIAS = 'alias'
+
+# Match ranks (lower is better)
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_WORD_PREFIX = 2
+RANK_SUBSTRING = 3
+
+_lock = threading.Lock()
+_state = {'version': None, 'hierarchy': None, 'checked_at': 0.0}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_version_check_interval():
+    """Seconds a process trusts its copy before checking the shared version token again"""
+    return _setting('LOCATION_HIERARCHY_VERSION_CHECK_SECONDS', 2)
+
+
+def invalidate_location_hierarchy():
+    """Force every process to reload the hierarchy on next access"""
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+    _state['version'] = None
+
+
+def normalize_location_name(value):
+    """Lowercase and collapse separators so 'Ifield-green', 'ifield green' and 'IFIELD_GREEN' compare equal"""
+    return re.sub(r'[\s\-_]+', ' ', (value or '').lower()).strip()
+
+
+def _current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def _load_hierarchy():
+    from apps.events.models import AreaLocation, ChapterLocation, SearchAreaSupportLocation
+
+    areas = {}
+    for row in AreaLocation.objects.values(
+        'id', 'area_id', 'area_name', 'area_code', 'active', 'unit_id', 'unit__unit_name',
+        'path_chapter_id', 'path_chapter__chapter_code', 'path_chapter_name',
+        'path_cluster_id', 'path_cluster_code', 'path_country_id', 'path_country_name', 'path_display',
+    ):
+        areas[str(row['id'])] = {
+            'id': str(row['id']),
+            'area_id': row['area_id'],
+            'area_name': row['area_name'],
+            'area_code': row['area_code'],
+            'active': row['active'],
+            'unit_id': str(row['unit_id']),
+            'unit_name': row['unit__unit_name'],
+            'chapter_id': str(row['path_chapter_id']) if row['path_chapter_id'] else None,
+            'chapter_code': row['path_chapter__chapter_code'],
+            'chapter_name': row['path_chapter_name'] or None,
+            'cluster_id': str(row['path_cluster_id']) if row['path_cluster_id'] else None,
+            'cluster_code': row['path_cluster_code'] or None,
+            'country_id': str(row['path_country_id']) if row['path_country_id'] else None,
+            'country_name': row['path_country_name'] or None,
+            'display': row['path_display'],
+            'aliases': [],
+        }
+
+    chapters = {
+        str(row['id']): {
+            'id': str(row['id']),
+            'chapter_id': row['chapter_id'],
+            'chapter_name': row['chapter_name'],
+            'chapter_code': row['chapter_code'],
+            'area_ids': [],
+        }
+        for row in ChapterLocation.objects.values('id', 'chapter_id', 'chapter_name', 'chapter_code')
+    }
+    for area in areas.values():
+        if area['chapter_id'] in chapters:
+            chapters[area['chapter_id']]['area_ids'].append(area['id'])
+
+    for name, area_pk in SearchAreaSupportLocation.objects.filter(
+        relative_area__isnull=False
+    ).values_list('name', 'relative_area_id'):
+        area = areas.get(str(area_pk))
+        if area is not None:
+            area['aliases'].append(name)
+
+    return {'areas': areas, 'chapters': chapters, **_build_index(areas)}
+
+
+def _build_index(areas):
+    """
+    Index every searchable term of every area by its prefixes (and the prefixes of each word).
+
+    Returns:
+        dict: {'index': {prefix: [term_ref, ...]}, 'terms': [term_ref, ...]}
+        where term_ref is (area_pk, normalized_term, kind, alias_name_or_None)
+    """
+    index = {}
+    terms = []
+    for area in areas.values():
+        searchable = [
+            (area['area_name'], TERM_AREA, None),
+            (area['area_code'], TERM_AREA_CODE, None),
+            (area['chapter_name'], TERM_CHAPTER, None),
+            (area['chapter_code'], TERM_CHAPTER, None),
+        ] + [(alias, TERM_ALIAS, alias) for alias in area['aliases']]
+
+        for text, kind, alias in searchable:
+            term = normalize_location_name(text)
+            if not term:
+                continue
+            ref = (area['id'], term, kind, alias)
+            terms.append(ref)
+
+            prefixes = set()
+            for start in [0] + [match.end() for match in re.finditer(' ', term)]:
+                word = term[start:start + MAX_PREFIX_LENGTH]
+                prefixes.update(word[:length] for length in range(1, len(word) + 1))
+            for prefix in prefixes:
+                index.setdefault(prefix, []).append(ref)
+
+    return {'index': index, 'terms': terms}
+
+
+def get_location_hierarchy():
+    """
+    Get the in-memory hierarchy (reloading it if any location changed).
+
+    Returns:
+        dict: {
+            'areas': {area_pk: {'id', 'area_id', 'area_name', 'area_code', 'active', 'unit_name',
+                                'chapter_id', 'chapter_code', 'chapter_name', 'cluster_id', 'cluster_code',
+                                'country_id', 'country_name', 'display', 'aliases'}},
+            'chapters': {chapter_pk: {'id', 'chapter_id', 'chapter_name', 'chapter_code', 'area_ids'}},
+            'index': ..., 'terms': ...,
+        }
+    """
+    now = time.monotonic()
+    if _state['version'] is not None and _state['hierarchy'] is not None \
+            and now - _state['checked_at'] < get_version_check_interval():
+        return _state['hierarchy']
+
+    version = _current_version()
+    _state['checked_at'] = now
+    if _state['version'] == version and _state['hierarchy'] is not None:
+        return _state['hierarchy']
+
+    with _lock:
+        if _state['version'] != version or _state['hierarchy'] is None:
+            _state['hierarchy'] = _load_hierarchy()
+            _state['version'] = version
+    return _state['hierarchy']
+
+
+def get_area_path(area_pk):
+    """
+    Resolve an area's ancestry from the in-memory hierarchy.
+
+    Args:
+        area_pk: AreaLocation primary key (UUID or string), e.g. user.area_from_id
+
+    Returns:
+        dict | None: The area's path, or None if there is no such area
+    """
+    if not area_pk:
+        return None
+    return get_location_hierarchy()['areas'].get(str(area_pk))
+
+
+def area_summary(area):
+    """
+    Area entry for the search-areas and areas-from-chapter payloads: the fields of both
+    SimplifiedAreaLocationSerializer variants (location_serializers and event_serializers),
+    which these endpoints used to return.
+    """
+    return {
+        'id': area['id'],
+        'area_id': area['area_id'],
+        'area_name': area['area_name'],
+        'area_code': area['area_code'],
+        'unit_name': area['unit_name'],
+        'chapter_name': area['chapter_name'],
+        'cluster_id': area['cluster_code'],
+        'cluster_name': area['cluster_code'],
+        'country_name': area['country_name'],
+    }
+
+
+def _rank(term, query):
+    if term == query:
+        return RANK_EXACT
+    if term.startswith(query):
+        return RANK_PREFIX
+    if (' ' + query) in term:
+        return RANK_WORD_PREFIX
+    if query in term:
+        return RANK_SUBSTRING
+    return None
+
+
+def search_locations(query, chapter=None, limit=20, active_only=True, kinds=None):
+    """
+    Rank areas matching a typeahead query against area names/codes, chapter names/codes
+    and support-location aliases (an alias match redirects to the alias's area).
+
+    Ranking: exact > prefix > word prefix > substring; direct matches before alias
+    matches; then chapter name and area name.
+
+    Args:
+        query: Text typed by the user (may be empty when filtering by chapter only)
+        chapter: Optional chapter name/code the areas must belong to (substring match)
+        limit: Maximum number of results
+        active_only: Skip inactive areas
+        kinds: Optional set of TERM_* kinds to match against (default: all)
+
+    Returns:
+        list: [(area, matched_alias_or_None), ...]
+    """
+    hierarchy = get_location_hierarchy()
+    areas = hierarchy['areas']
+    query = normalize_location_name(query)
+    chapter = normalize_location_name(chapter)
+
+    def allowed(area):
+        if active_only and not area['active']:
+            return False
+        if chapter:
+            return (
+                chapter in normalize_location_name(area['chapter_name'])
+                or chapter in normalize_location_name(area['chapter_code'])
+            )
+        return True
+
+    if not query:
+        matches = [(area, None) for area in areas.values() if allowed(area)]
+        matches.sort(key=lambda match: (match[0]['chapter_name'] or '', match[0]['area_name']))
+        return matches[:limit]
+
+    best = {}
+
+    def consider(candidates):
+        for area_pk, term, kind, alias in candidates:
+            if kinds and kind not in kinds:
+                continue
+            rank = _rank(term, query)
+            area = areas[area_pk]
+            if rank is None or not allowed(area):
+                continue
+            key = (rank, alias is not None, area['chapter_name'] or '', area['area_name'])
+            if area_pk not in best or key < best[area_pk][0]:
+                best[area_pk] = (key, alias)
+
+    # Exact, prefix and word-prefix matches come from the index
+    consider(hierarchy['index'].get(query[:MAX_PREFIX_LENGTH], []))
+    if len(best) < limit:
+        # Substring matches aren't indexed - scan the terms to fill the remaining places
+        # (they rank after every indexed match)
+        consider(hierarchy['terms'])
+
+    ranked = sorted(best.items(), key=lambda item: item[1][0])
+    return [(areas[area_pk], alias) for area_pk, (_key, alias) in ranked[:limit]]
+
+
+def resolve_location(query):
+    """
+    Resolve free text (a town, an area or one of its support locations) to the best matching area.
+
+    Returns:
+        tuple: (area | None, matched_alias_or_None)
+    """
+    matches = search_locations(query, limit=1, active_only=False, kinds={TERM_AREA, TERM_ALIAS})
+    return matches[0] if matches else (None, None)
+
+
+def get_chapter_areas(chapter_ref):
+    """
+    Find a chapter by name, code or readable chapter ID and return its areas.
+
+    Returns:
+        tuple: (chapter | None, [area, ...]) ordered by unit then area name
+    """
+    hierarchy = get_location_hierarchy()
+    for chapter in hierarchy['chapters'].values():
+        if chapter_ref in (chapter['chapter_name'], chapter['chapter_code'], chapter['chapter_id']):
+            areas = [hierarchy['areas'][area_pk] for area_pk in chapter['area_ids']]
+            areas.sort(key=lambda area: (area['unit_name'], area['area_name']))
+            return chapter, areas
+    return None, []
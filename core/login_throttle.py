@@ -0,0 +1,192 @@
+"""
+Login Throttling
+
+Failed logins are counted in the shared cache per username and per client IP.
+Once a key passes its free-attempt allowance it is locked out, and the lockout
+doubles with every further failure (capped). A locked-out attempt is rejected
+before authenticate() runs, so credential-stuffing bursts never reach the
+password hasher or the database.
+
+Login outcomes are also counted per minute so failed-login rates can be read
+back (see get_login_metrics and the /api/auth/login-metrics/ endpoint).
+
+Example:
+    retry_after = get_lockout(username, ip)
+    if retry_after:
+        return 429 with Retry-After: retry_after
+    user = authenticate(...)
+    if user is None:
+        register_failure(username, ip)
+    else:
+        register_success(username, ip)
+"""
+
+import hashlib
+import logging
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'login_throttle'
+METRICS_PREFIX = 'login_metrics'
+
+SCOPE_USER = 'user'
+SCOPE_IP = 'ip'
+
+OUTCOME_SUCCEEDED = 'succeeded'
+OUTCOME_FAILED = 'failed'
+OUTCOME_LOCKED = 'locked'
+OUTCOMES = (OUTCOME_SUCCEEDED, OUTCOME_FAILED, OUTCOME_LOCKED)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _policy(scope):
+    """Free attempts allowed for a scope before lockouts start"""
+    if scope == SCOPE_USER:
+        return _setting('LOGIN_THROTTLE_USER_ATTEMPTS', 5)
+    return _setting('LOGIN_THROTTLE_IP_ATTEMPTS', 20)
+
+
+def get_client_ip(request):
+    """
+    Client IP as seen by the proxy: X-Real-IP (nginx overwrites it with the peer address),
+    else the rightmost X-Forwarded-For hop - the one nginx appended. Earlier hops come from
+    the client (nginx keeps whatever it sent), so they can't be trusted for throttling.
+    """
+    real_ip = request.META.get('HTTP_X_REAL_IP', '').strip()
+    if real_ip:
+        return real_ip
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _key(scope, identifier, suffix):
+    # Usernames are user input - hash them so any value is a valid cache key
+    digest = hashlib.sha256(str(identifier).strip().lower().encode()).hexdigest()[:32]
+    return f"{CACHE_PREFIX}:{scope}:{digest}:{suffix}"
+
+
+def _scopes(username, ip):
+    return [(scope, identifier) for scope, identifier in ((SCOPE_USER, username), (SCOPE_IP, ip)) if identifier]
+
+
+def lockout_seconds(failures, allowed_attempts):
+    """Lockout after `failures` consecutive failures: base * 2^(failures - allowed), capped"""
+    if failures < allowed_attempts:
+        return 0
+    base = _setting('LOGIN_THROTTLE_BASE_LOCKOUT', 30)
+    maximum = _setting('LOGIN_THROTTLE_MAX_LOCKOUT', 3600)
+    return min(base * 2 ** min(failures - allowed_attempts, 32), maximum)
+
+
+def get_lockout(username, ip):
+    """
+    Check whether a login attempt is currently locked out.
+
+    Returns:
+        int: Seconds until the attempt may be retried (0 if allowed)
+    """
+    now = time.time()
+    keys = [_key(scope, identifier, 'locked_until') for scope, identifier in _scopes(username, ip)]
+    locked_until = max(cache.get_many(keys).values(), default=0)
+    if locked_until > now:
+        record_login_outcome(OUTCOME_LOCKED)
+        return math.ceil(locked_until - now)
+    return 0
+
+
+def register_failure(username, ip):
+    """
+    Count a failed login against the username and IP, locking them out if over the allowance.
+
+    Returns:
+        int: Lockout (seconds) now applied to the attempt, 0 if none
+    """
+    window = _setting('LOGIN_THROTTLE_WINDOW', 3600)
+    applied = 0
+    for scope, identifier in _scopes(username, ip):
+        failures_key = _key(scope, identifier, 'failures')
+        cache.add(failures_key, 0, window)
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(failures_key, 1, window)
+            failures = 1
+
+        lockout = lockout_seconds(failures, _policy(scope))
+        if lockout:
+            cache.set(_key(scope, identifier, 'locked_until'), time.time() + lockout, lockout)
+            # Keep the failure count for as long as the lockout it produced
+            cache.touch(failures_key, max(window, lockout))
+            logger.warning(f"🔒 Login locked for {lockout}s ({scope}, {failures} failures)")
+            applied = max(applied, lockout)
+
+    record_login_outcome(OUTCOME_FAILED)
+    return applied
+
+
+def register_success(username, ip):
+    """Clear the username's failure history after a successful login"""
+    cache.delete_many([
+        _key(SCOPE_USER, username, 'failures'),
+        _key(SCOPE_USER, username, 'locked_until'),
+    ])
+    record_login_outcome(OUTCOME_SUCCEEDED)
+
+
+def _metrics_key(outcome, minute):
+    return f"{METRICS_PREFIX}:{outcome}:{minute}"
+
+
+def record_login_outcome(outcome):
+    """Increment the per-minute counter for a login outcome"""
+    retention = _setting('LOGIN_METRICS_RETENTION_MINUTES', 60)
+    key = _metrics_key(outcome, int(time.time() // 60))
+    cache.add(key, 0, (retention + 1) * 60)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, (retention + 1) * 60)
+
+
+def get_login_metrics(minutes=15):
+    """
+    Login outcomes over the last `minutes` minutes (current minute included).
+
+    Returns:
+        dict: {
+            'minutes': int,
+            'succeeded': int, 'failed': int, 'locked': int,
+            'failed_per_minute': float,
+            'failure_rate': float,   # failed / (succeeded + failed)
+            'timeline': [{'minute': epoch_minute, 'succeeded': n, 'failed': n, 'locked': n}, ...],
+        }
+    """
+    minutes = max(1, min(int(minutes), _setting('LOGIN_METRICS_RETENTION_MINUTES', 60)))
+    current = int(time.time() // 60)
+    window = range(current - minutes + 1, current + 1)
+    counts = cache.get_many([_metrics_key(outcome, minute) for minute in window for outcome in OUTCOMES])
+
+    timeline = [
+        {'minute': minute, **{outcome: counts.get(_metrics_key(outcome, minute), 0) for outcome in OUTCOMES}}
+        for minute in window
+    ]
+    totals = {outcome: sum(bucket[outcome] for bucket in timeline) for outcome in OUTCOMES}
+    attempts = totals[OUTCOME_SUCCEEDED] + totals[OUTCOME_FAILED]
+
+    return {
+        'minutes': minutes,
+        **totals,
+        'failed_per_minute': round(totals[OUTCOME_FAILED] / minutes, 2),
+        'failure_rate': round(totals[OUTCOME_FAILED] / attempts, 4) if attempts else 0.0,
+        'timeline': timeline,
+    }
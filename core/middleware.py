@@ -5,19 +5,20 @@ Custom middleware for WebSocket JWT authentication using HTTPOnly cookies.
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from django.contrib.auth.models import AnonymousUser
-from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 import logging
 
+from core.token_revocation import is_revoked_for_user
+from core.user_cache import get_token_user
+
 logger = logging.getLogger(__name__)
-User = get_user_model()
 
 
 @database_sync_to_async
 def get_user_from_token(token_string):
     """
-    Get user from JWT access token.
+    Get user from JWT access token (through the shared user cache, see core.user_cache).
     """
     try:
         # Validate and decode the token
@@ -30,17 +31,23 @@ def get_user_from_token(token_string):
             logger.warning("No user_id found in token")
             return AnonymousUser()
         
-        # Get user from database
-        user = User.objects.get(id=user_id)
+        # Get user from the cache (database on a miss)
+        user = get_token_user(user_id)
+        if user is None:
+            logger.warning(f"User with ID {user_id} not found")
+            return AnonymousUser()
+        if not user.is_active:
+            logger.warning(f"User with ID {user_id} is inactive")
+            return AnonymousUser()
+        if is_revoked_for_user(user_id, access_token.get('iat')):
+            logger.warning(f"Token for user {user_id} was revoked (logged out of all sessions)")
+            return AnonymousUser()
         logger.info(f"✅ WebSocket auth successful for user: {user.username} (ID: {user_id})")
         return user
         
     except (InvalidToken, TokenError) as e:
         logger.warning(f"Invalid token: {str(e)}")
         return AnonymousUser()
-    except User.DoesNotExist:
-        logger.warning(f"User with ID {user_id} not found")
-        return AnonymousUser()
     except Exception as e:
         logger.error(f"Error authenticating WebSocket user: {str(e)}")
         return AnonymousUser()
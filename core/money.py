@@ -0,0 +1,90 @@
+"""
+Money Utilities
+
+Single place for turning prices, totals and payment amounts into exact
+Decimals. Floats are never used for arithmetic on money: values are
+converted to Decimal, rounded half-up to the currency's precision, and
+only converted to Stripe's integer minor units (pence, cents, ...) at the
+API boundary.
+
+Example:
+    total = sum_money([item.price_at_purchase * item.quantity for item in cart.orders.all()])
+    amount = to_minor_units(total, 'gbp')          # 1999
+    from_minor_units(stripe_refund['amount'], 'gbp')  # Decimal('19.99')
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+DEFAULT_CURRENCY = 'gbp'
+
+# Currencies Stripe charges in whole units (no minor unit)
+# https://docs.stripe.com/currencies#zero-decimal
+ZERO_DECIMAL_CURRENCIES = {
+    'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga',
+    'pyg', 'rwf', 'ugx', 'vnd', 'vuv', 'xaf', 'xof', 'xpf',
+}
+
+
+def decimal_places(currency=DEFAULT_CURRENCY):
+    """Number of decimal places used by a currency"""
+    return 0 if (currency or DEFAULT_CURRENCY).lower() in ZERO_DECIMAL_CURRENCIES else 2
+
+
+def to_decimal(value):
+    """
+    Convert a price/amount to Decimal without float artefacts.
+
+    Floats go through their shortest repr, so 0.1 becomes Decimal('0.1')
+    rather than Decimal('0.1000000000000000055511151231257827').
+
+    Raises:
+        ValueError: If the value is not a finite number
+    """
+    if value is None or value == '':
+        return Decimal('0')
+    if isinstance(value, float):
+        value = repr(value)
+    if not isinstance(value, Decimal):
+        try:
+            value = Decimal(str(value).strip())
+        except (InvalidOperation, TypeError):
+            raise ValueError(f"Invalid amount: {value!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return value
+
+
+def round_money(value, currency=DEFAULT_CURRENCY):
+    """
+    Round an amount half-up to the precision of its currency
+
+    Raises:
+        ValueError: If the value is not a finite number, or too large to hold to that precision
+    """
+    exponent = Decimal(1).scaleb(-decimal_places(currency))
+    try:
+        return to_decimal(value).quantize(exponent, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Amount out of range: {value!r}")
+
+
+def sum_money(values, currency=DEFAULT_CURRENCY):
+    """Add amounts exactly and round the result once"""
+    return round_money(sum((to_decimal(value) for value in values), Decimal('0')), currency)
+
+
+def to_minor_units(value, currency=DEFAULT_CURRENCY):
+    """Convert an amount to Stripe's integer minor units (e.g. 19.99 GBP -> 1999)"""
+    rounded = round_money(value, currency)
+    return int(rounded.scaleb(decimal_places(currency)))
+
+
+def from_minor_units(minor_units, currency=DEFAULT_CURRENCY):
+    """Convert Stripe minor units back to an amount (e.g. 1999 -> Decimal('19.99'))"""
+    return round_money(Decimal(int(minor_units or 0)).scaleb(-decimal_places(currency)), currency)
+
+
+def money_to_float(value, currency=DEFAULT_CURRENCY):
+    """Rounded float for JSON payloads that expose amounts as numbers"""
+    return float(round_money(value, currency))
+
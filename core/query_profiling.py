@@ -0,0 +1,297 @@
+"""
+Query Profiling
+
+Samples a fraction of HTTP requests (QueryProfilingMiddleware) and websocket messages
+(QueryProfilingMixin) and records, per sample:
+
+- the number of SQL queries and total time spent in the database
+- wall time of the request/message
+- duplicate queries (same SQL run more than once) - a query repeated
+  QUERY_PROFILING_N_PLUS_ONE_THRESHOLD times or more is flagged as a likely N+1
+- the endpoint: DRF view and action (e.g. 'EventViewSet.participants'), or consumer
+  and message type for websockets (e.g. 'EventCheckInConsumer.get_participants')
+
+Sampling is off unless settings.QUERY_PROFILING_SAMPLE_RATE is above 0. Unsampled
+requests cost one random() call; queries are counted by an execute wrapper installed
+on every connection that only looks up a context variable when nothing is sampled.
+Queries run in db_executor pools and through the async ORM are attributed to the
+request/message that started them, since both copy the caller's context.
+
+The last QUERY_PROFILING_SAMPLES_PER_ENDPOINT samples per endpoint are kept in the
+shared cache (concurrent writers can occasionally drop a sample - fine for profiling).
+get_query_profile() aggregates them into p50/p95 figures, worst endpoints first; see
+the query_profile management command.
+
+Example:
+    QUERY_PROFILING_SAMPLE_RATE = 0.01   # profile 1% of requests
+
+    $ python manage.py query_profile --limit 10
+"""
+
+import contextvars
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+CACHE_PREFIX = 'query_profile'
+
+KIND_HTTP = 'http'
+KIND_WEBSOCKET = 'websocket'
+
+_active_profile = contextvars.ContextVar('query_profile', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_sample_rate():
+    return _setting('QUERY_PROFILING_SAMPLE_RATE', 0.0)
+
+
+def get_n_plus_one_threshold():
+    """Times the same query must run in one request/message to count as an N+1"""
+    return _setting('QUERY_PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+
+
+def should_sample():
+    rate = get_sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def query_signature(sql):
+    """SQL with literal numbers/strings and IN-list lengths collapsed, so repeats of one query match"""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+\b", "?", sql)
+    return re.sub(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)", "(...)", sql)
+
+
+class QueryProfile:
+    """Queries and timings of one sampled request/message (may be written from several threads)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.lock = threading.Lock()
+
+    def add(self, sql, duration):
+        with self.lock:
+            self.queries += 1
+            self.db_time += duration
+            self.statements[sql] += 1
+
+    def record(self, endpoint, status=None):
+        """Store this profile as a sample of `endpoint`"""
+        signatures = Counter()
+        for sql, count in self.statements.items():
+            signatures[query_signature(sql)] += count
+        duplicates = [
+            {'sql': signature[:500], 'count': count}
+            for signature, count in signatures.most_common(5) if count > 1
+        ]
+        record_sample(endpoint, {
+            'kind': self.kind,
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'duplicates': duplicates,
+            'n_plus_one': bool(duplicates) and duplicates[0]['count'] >= get_n_plus_one_threshold(),
+            'status': status,
+            'at': timezone.now().isoformat(),
+        })
+
+
+def _profile_queries(execute, sql, params, many, context):
+    profile = _active_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add(sql, time.perf_counter() - started)
+
+
+def install_query_counter(connection, **kwargs):
+    if _profile_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+def start_profile(kind):
+    """
+    Start profiling the current request/message.
+
+    Returns:
+        tuple: (profile, context token for stop_profile)
+    """
+    for connection in connections.all(initialized_only=True):
+        # Connections opened before this module was imported
+        install_query_counter(connection)
+    profile = QueryProfile(kind)
+    return profile, _active_profile.set(profile)
+
+
+def stop_profile(token):
+    _active_profile.reset(token)
+
+
+def _endpoint_key(endpoint):
+    digest = hashlib.sha256(endpoint.encode()).hexdigest()[:32]
+    return f"{CACHE_PREFIX}:samples:{digest}"
+
+
+def record_sample(endpoint, sample):
+    """Append a sample to the endpoint's (capped) list in the cache"""
+    ttl = _setting('QUERY_PROFILING_RETENTION', 60 * 60 * 24)
+    limit = _setting('QUERY_PROFILING_SAMPLES_PER_ENDPOINT', 200)
+    key = _endpoint_key(endpoint)
+    samples = cache.get(key) or []
+    samples = (samples + [sample])[-limit:]
+    cache.set(key, samples, ttl)
+
+    endpoints = cache.get(f"{CACHE_PREFIX}:endpoints") or set()
+    if endpoint not in endpoints:
+        cache.set(f"{CACHE_PREFIX}:endpoints", endpoints | {endpoint}, ttl)
+
+
+def reset_query_profile():
+    endpoints = cache.get(f"{CACHE_PREFIX}:endpoints") or set()
+    cache.delete_many([_endpoint_key(endpoint) for endpoint in endpoints] + [f"{CACHE_PREFIX}:endpoints"])
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def get_query_profile(endpoint=None, order_by='wall_ms'):
+    """
+    Aggregate the stored samples, worst endpoints (by p95 of `order_by`) first.
+
+    Args:
+        endpoint: Only this endpoint
+        order_by: 'wall_ms', 'queries' or 'db_ms'
+
+    Returns:
+        list: [{
+            'endpoint': str, 'kind': str, 'samples': int,
+            'queries': {'p50', 'p95', 'max'}, 'db_ms': {...}, 'wall_ms': {...},
+            'n_plus_one': int,          # samples with a likely N+1
+            'duplicates': [{'sql', 'count'}, ...],   # most repeated queries across samples
+        }, ...]
+    """
+    endpoints = [endpoint] if endpoint else sorted(cache.get(f"{CACHE_PREFIX}:endpoints") or set())
+    stored = cache.get_many([_endpoint_key(name) for name in endpoints])
+
+    profile = []
+    for name in endpoints:
+        samples = stored.get(_endpoint_key(name))
+        if not samples:
+            continue
+        duplicates = Counter()
+        for sample in samples:
+            for duplicate in sample['duplicates']:
+                duplicates[duplicate['sql']] += duplicate['count']
+        profile.append({
+            'endpoint': name,
+            'kind': samples[-1]['kind'],
+            'samples': len(samples),
+            **{
+                metric: {
+                    'p50': _percentile([sample[metric] for sample in samples], 50),
+                    'p95': _percentile([sample[metric] for sample in samples], 95),
+                    'max': max(sample[metric] for sample in samples),
+                }
+                for metric in ('queries', 'db_ms', 'wall_ms')
+            },
+            'n_plus_one': sum(1 for sample in samples if sample['n_plus_one']),
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates.most_common(3)],
+        })
+    return sorted(profile, key=lambda row: row[order_by]['p95'], reverse=True)
+
+
+def view_name(view_func, method):
+    """'ViewClass.action' for DRF views (ViewSet actions included), else the view function's name"""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower(), method.lower())
+    return f"{view_class.__name__}.{action}"
+
+
+class QueryProfilingMiddleware:
+    """Profile a sample of requests (see the module docstring)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_sample():
+            return self.get_response(request)
+
+        profile, token = start_profile(KIND_HTTP)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        # Unresolved URLs share one bucket, so scanners can't flood the profile with endpoints
+        profile.record(getattr(request, 'query_profile_endpoint', 'unresolved'), response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if _active_profile.get() is not None:
+            request.query_profile_endpoint = view_name(view_func, request.method)
+
+
+class QueryProfilingMixin:
+    """
+    Profile a sample of a websocket consumer's connects and messages. Mix in first, e.g.
+    class MyConsumer(QueryProfilingMixin, AsyncWebsocketConsumer).
+
+    Messages are recorded per type for the types listed in profiled_message_types (the
+    ones the consumer handles); any other type the client sends shares one 'unknown'
+    endpoint, so clients can't flood the profile with endpoints.
+    """
+    profiled_message_types = frozenset()
+
+    async def websocket_connect(self, message):
+        await self._profiled('connect', super().websocket_connect(message))
+
+    async def websocket_receive(self, message):
+        if not should_sample():
+            return await super().websocket_receive(message)
+        try:
+            message_type = json.loads(message.get('text') or '{}').get('type')
+        except (ValueError, AttributeError):
+            message_type = None
+        if not isinstance(message_type, str) or message_type not in self.profiled_message_types:
+            message_type = 'unknown'
+        await self._profiled(message_type, super().websocket_receive(message), sampled=True)
+
+    async def _profiled(self, name, coroutine, sampled=False):
+        if not (sampled or should_sample()):
+            return await coroutine
+        profile, token = start_profile(KIND_WEBSOCKET)
+        try:
+            await coroutine
+        finally:
+            stop_profile(token)
+        await sync_to_async(profile.record, thread_sensitive=False)(f"{self.__class__.__name__}.{name}")
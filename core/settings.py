@@ -197,6 +197,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',    
+    "core.query_profiling.QueryProfilingMiddleware",  # no-op unless QUERY_PROFILING_SAMPLE_RATE > 0
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -297,6 +298,23 @@ else:
         },
     }
 
+# Cache configuration (shared between web, websocket and worker processes in production)
+if DEBUG:
+    # Development: Use local-memory cache (no Redis required)
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    # Production: Use Redis so cached state is consistent across processes
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://redis:6379/2",  # Use docker-compose service name
+        }
+    }
+
 SECURITY_HEADERS = {
     'Cross-Origin-Opener-Policy': 'unsafe-none',  # TEMPORARY for HTTP
 }
@@ -464,7 +482,9 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
+    # Rotated/logged-out refresh tokens are revoked in the cache (core/token_revocation.py),
+    # not in simplejwt's token_blacklist tables
+    'BLACKLIST_AFTER_ROTATION': False,
     'UPDATE_LAST_LOGIN': True,
 
     'ALGORITHM': 'HS256',
@@ -519,6 +539,29 @@ STRIPE_PUBLISHABLE_KEY_TEST = get_secret('STRIPE_PUBLISHABLE_KEY_TEST', '')
 STRIPE_PUBLISHABLE_KEY_LIVE = get_secret('STRIPE_PUBLISHABLE_KEY_LIVE', '')
 STRIPE_WEBHOOK_SECRET = get_secret('STRIPE_WEBHOOK_SECRET', '')
 
+# Attendance: maintain per-hour check-in/check-out counts and serve trend charts from them
+ATTENDANCE_HOURLY_ROLLUP = get_secret('ATTENDANCE_HOURLY_ROLLUP', 'False') == 'True'
+
+# Login throttling (core/login_throttle.py) - failures allowed per username / per client IP
+# before an exponential lockout (base seconds, doubling per further failure, capped)
+LOGIN_THROTTLE_USER_ATTEMPTS = int(get_secret('LOGIN_THROTTLE_USER_ATTEMPTS', 5))
+LOGIN_THROTTLE_IP_ATTEMPTS = int(get_secret('LOGIN_THROTTLE_IP_ATTEMPTS', 20))
+LOGIN_THROTTLE_BASE_LOCKOUT = int(get_secret('LOGIN_THROTTLE_BASE_LOCKOUT', 30))
+LOGIN_THROTTLE_MAX_LOCKOUT = int(get_secret('LOGIN_THROTTLE_MAX_LOCKOUT', 3600))
+LOGIN_THROTTLE_WINDOW = int(get_secret('LOGIN_THROTTLE_WINDOW', 3600))
+LOGIN_METRICS_RETENTION_MINUTES = 60
+
+# Query profiling (core/query_profiling.py) - fraction of requests/websocket messages whose SQL queries
+# and timings are sampled (0 = off); read back with `python manage.py query_profile`
+QUERY_PROFILING_SAMPLE_RATE = float(get_secret('QUERY_PROFILING_SAMPLE_RATE', 0))
+QUERY_PROFILING_N_PLUS_ONE_THRESHOLD = 5
+QUERY_PROFILING_SAMPLES_PER_ENDPOINT = 200
+
+# Authenticated users are resolved from a short-TTL cache of their row (core/user_cache.py);
+# AUTH_LAZY_USER only builds the full user object when something beyond its ID/flags is used
+AUTH_USER_CACHE_TTL = int(get_secret('AUTH_USER_CACHE_TTL', 60))
+AUTH_LAZY_USER = get_secret('AUTH_LAZY_USER', 'False') == 'True'
+
 # Email Configuration
 EMAIL_BACKEND = get_secret('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = get_secret('EMAIL_HOST', 'smtp.gmail.com')
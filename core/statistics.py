@@ -0,0 +1,94 @@
+"""
+Grouped Statistics Utilities
+
+Helpers for dashboard statistics endpoints. Every bucket of a table
+(per status, per reason, automatic vs manual, ...) is computed with
+conditional aggregation, so a whole breakdown costs a single query
+instead of one count()/aggregate() per bucket.
+
+Example:
+    stats = grouped_statistics(
+        OrderRefund.objects.filter(event=event),
+        amount_field='refund_amount',
+        groups={
+            'status': choice_buckets('status', OrderRefund.RefundStatus.choices),
+            'method': {'automatic': Q(is_automatic_refund=True), 'manual': Q(is_automatic_refund=False)},
+        },
+        average=True,
+    )
+    stats['count'], stats['amount'], stats['average']
+    stats['groups']['status']['PENDING']  # {'count': 3, 'amount': Decimal('45.00')}
+"""
+
+from decimal import Decimal
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+ZERO = Decimal('0.00')
+
+
+def choice_buckets(field, choices):
+    """
+    Build one bucket per value of a choices field.
+
+    Args:
+        field: Model field (or lookup path) holding the choice value
+        choices: TextChoices.choices style list of (value, label)
+
+    Returns:
+        dict: {value: Q(field=value)}
+    """
+    return {value: Q(**{field: value}) for value, _label in choices}
+
+
+def grouped_statistics(queryset, amount_field=None, groups=None, average=False):
+    """
+    Count (and optionally sum) every bucket of every group in one aggregate query.
+
+    Args:
+        queryset: Rows to summarise (already scoped/filtered)
+        amount_field: Optional numeric field summed overall and per bucket
+        groups: dict of group name -> dict of bucket key -> Q filter
+        average: Also return the average of amount_field
+
+    Returns:
+        dict: {
+            'count': int,
+            'amount': Decimal,           # only when amount_field is given
+            'average': Decimal,          # only when average=True
+            'groups': {group: {bucket: {'count': int, 'amount': Decimal}}},
+        }
+    """
+    groups = groups or {}
+    # Aliases are prefixed/positional so they never clash with model fields
+    # and bucket keys never have to be valid SQL identifiers
+    aggregates = {'stat_count': Count('pk')}
+    if amount_field:
+        aggregates['stat_amount'] = Coalesce(Sum(amount_field), ZERO)
+        if average:
+            aggregates['stat_average'] = Coalesce(Avg(amount_field), ZERO)
+
+    aliases = {}
+    for group_index, (group, buckets) in enumerate(groups.items()):
+        for bucket_index, (bucket, condition) in enumerate(buckets.items()):
+            alias = f"stat_g{group_index}_b{bucket_index}"
+            aliases[(group, bucket)] = alias
+            aggregates[f"{alias}_count"] = Count('pk', filter=condition)
+            if amount_field:
+                aggregates[f"{alias}_amount"] = Coalesce(Sum(amount_field, filter=condition), ZERO)
+
+    row = queryset.aggregate(**aggregates)
+
+    result = {'count': row['stat_count'], 'groups': {group: {} for group in groups}}
+    if amount_field:
+        result['amount'] = row['stat_amount']
+        if average:
+            result['average'] = row['stat_average']
+
+    for (group, bucket), alias in aliases.items():
+        bucket_stats = {'count': row[f"{alias}_count"]}
+        if amount_field:
+            bucket_stats['amount'] = row[f"{alias}_amount"]
+        result['groups'][group][bucket] = bucket_stats
+
+    return result
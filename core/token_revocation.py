@@ -0,0 +1,252 @@
+"""
+Refresh Token Revocation Store
+
+Every login starts a refresh-token *family*. Each refresh token carries its
+family ID in a claim, and the cache (Redis in production) records:
+
+- refresh_family:<family>        the family is alive (deleted = whole session revoked)
+- refresh_token:<jti>            the one refresh token of the family that may still be used
+- refresh_rotated:<jti>          for a few seconds after a token is used, the successor it was
+                                 exchanged for
+- refresh_user_families:<user>   the user's families, for "log out all sessions"
+- refresh_user_not_before:<user> tokens issued before this second are revoked
+
+All keys expire with the refresh-token lifetime, so the store never grows
+without bound (unlike simplejwt's blacklist tables).
+
+Refreshing consumes the presented token's key and issues a successor in the
+same family. Presenting an already-consumed token means it was copied
+(a stolen cookie, or a replay): the whole family is revoked, so both the
+thief and the victim have to log in again. The exception is a repeat within
+REFRESH_TOKEN_REUSE_GRACE_SECONDS (default 5) of the first use - several tabs
+refreshing with the same cookie at once - which is handed the same successor.
+
+Example:
+    refresh = issue_refresh_token(user)          # login
+    refresh = rotate_refresh_token(cookie_value) # refresh (raises TokenError subclasses)
+    revoke_refresh_token(cookie_value)           # logout
+    revoke_all_sessions(user.pk)                 # log out everywhere
+"""
+
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+FAMILY_CLAIM = 'family'
+
+
+class RefreshTokenRevoked(TokenError):
+    """The refresh token's session was logged out, expired or revoked"""
+
+
+class RefreshTokenReused(RefreshTokenRevoked):
+    """An already-rotated refresh token was presented again; its family has been revoked"""
+
+
+def refresh_lifetime():
+    return int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+
+
+def reuse_grace_seconds():
+    """How long a used refresh token still returns its successor instead of counting as reuse"""
+    return max(1, int(getattr(settings, 'REFRESH_TOKEN_REUSE_GRACE_SECONDS', 5)))
+
+
+def _family_key(family):
+    return f"refresh_family:{family}"
+
+
+def _token_key(jti):
+    return f"refresh_token:{jti}"
+
+
+def _user_key(user_id):
+    return f"refresh_user_families:{user_id}"
+
+
+def _rotated_key(jti):
+    return f"refresh_rotated:{jti}"
+
+
+def _not_before_key(user_id):
+    return f"refresh_user_not_before:{user_id}"
+
+
+def _prune(families, now):
+    return {family: expires_at for family, expires_at in families.items() if expires_at > now}
+
+
+def _index_family(user_id, family, expires_at):
+    now = time.time()
+    families = _prune(cache.get(_user_key(user_id)) or {}, now)
+    families[family] = expires_at
+    cache.set(_user_key(user_id), families, refresh_lifetime())
+
+
+def issue_refresh_token(user):
+    """
+    Start a new session (token family) for a user.
+
+    Returns:
+        RefreshToken: Token carrying the family claim, registered as the family's current token
+    """
+    lifetime = refresh_lifetime()
+    refresh = RefreshToken.for_user(user)
+    family = uuid.uuid4().hex
+    refresh[FAMILY_CLAIM] = family
+
+    cache.set(_family_key(family), {'user_id': str(user.pk)}, lifetime)
+    cache.set(_token_key(refresh[api_settings.JTI_CLAIM]), family, lifetime)
+    _index_family(user.pk, family, time.time() + lifetime)
+    return refresh
+
+
+def is_revoked_for_user(user_id, issued_at):
+    """Whether a token issued at `issued_at` (epoch seconds) predates the user's last "log out all sessions" """
+    not_before = cache.get(_not_before_key(user_id))
+    # iat is whole seconds: a token issued in the second of the logout (e.g. logging straight back in) stays valid
+    return not_before is not None and (issued_at is None or issued_at < not_before)
+
+
+def rotate_refresh_token(raw_token):
+    """
+    Consume a refresh token and issue its successor in the same family.
+
+    Raises:
+        TokenError: Invalid or expired token
+        RefreshTokenRevoked: The session was logged out/revoked, or the token predates family tracking
+        RefreshTokenReused: The token had already been rotated (longer than the grace window
+                            ago); the family is now revoked
+
+    Returns:
+        RefreshToken: The new refresh token (same family, fresh jti/exp/iat) - within the
+                      grace window, the one already issued for this token
+    """
+    refresh = RefreshToken(raw_token)
+    user_id = refresh.get(api_settings.USER_ID_CLAIM)
+    family = refresh.get(FAMILY_CLAIM)
+
+    if not family:
+        raise RefreshTokenRevoked('Session is not tracked, please log in again')
+    if is_revoked_for_user(user_id, refresh.get('iat')):
+        raise RefreshTokenRevoked('All sessions were logged out')
+    if cache.get(_family_key(family)) is None:
+        raise RefreshTokenRevoked('Session has been revoked')
+
+    jti = refresh[api_settings.JTI_CLAIM]
+    lifetime = refresh_lifetime()
+    refresh.set_jti()
+    refresh.set_exp()
+    refresh.set_iat()
+
+    # add() is atomic: only the first caller records its successor for the token, later
+    # callers within the grace window are given that successor
+    if not cache.add(_rotated_key(jti), str(refresh), reuse_grace_seconds()):
+        successor = cache.get(_rotated_key(jti))
+        if successor is not None:
+            return RefreshToken(successor)
+    # delete() is atomic: only one caller can consume a given token
+    elif cache.delete(_token_key(jti)):
+        cache.set(_token_key(refresh[api_settings.JTI_CLAIM]), family, lifetime)
+        cache.touch(_family_key(family), lifetime)
+        _index_family(user_id, family, time.time() + lifetime)
+        return refresh
+
+    revoke_family(family, user_id)
+    logger.warning(f"🚨 Refresh token reuse detected for user {user_id} - session {family} revoked")
+    raise RefreshTokenReused('Refresh token reuse detected, session revoked')
+
+
+def revoke_family(family, user_id=None):
+    """Revoke one session: every token of the family stops refreshing"""
+    cache.delete(_family_key(family))
+    if user_id:
+        families = cache.get(_user_key(user_id))
+        if families and families.pop(family, None) is not None:
+            cache.set(_user_key(user_id), families, refresh_lifetime())
+
+
+def revoke_refresh_token(raw_token):
+    """
+    Revoke the session a refresh token belongs to (logout).
+
+    Returns:
+        bool: True if a tracked session was revoked
+    """
+    try:
+        refresh = RefreshToken(raw_token)
+    except TokenError:
+        return False
+
+    cache.delete(_token_key(refresh[api_settings.JTI_CLAIM]))
+    family = refresh.get(FAMILY_CLAIM)
+    if not family:
+        return False
+    revoke_family(family, refresh.get(api_settings.USER_ID_CLAIM))
+    return True
+
+
+def revoke_all_sessions(user_id):
+    """
+    Log a user out everywhere: revoke every refresh family and reject every token issued so far
+    (access tokens included, see core.authentication).
+
+    Returns:
+        int: Number of live sessions revoked
+    """
+    lifetime = refresh_lifetime()
+    families = _prune(cache.get(_user_key(user_id)) or {}, time.time())
+    cache.delete_many([_family_key(family) for family in families] + [_user_key(user_id)])
+    cache.set(_not_before_key(user_id), int(time.time()), lifetime)
+    logger.info(f"🔒 All sessions revoked for user {user_id} ({len(families)} active)")
+    return len(families)
+
+
+def active_session_count(user_id):
+    """Number of live sessions (token families) for a user"""
+    families = _prune(cache.get(_user_key(user_id)) or {}, time.time())
+    alive = cache.get_many([_family_key(family) for family in families])
+    return len(alive)
+
+
+def cleanup_user_indexes(user_ids, chunk_size=500):
+    """
+    Drop expired and revoked families from users' session indexes.
+
+    Family and token keys expire on their own; the per-user index is extended on
+    every login, so entries for sessions that ended are pruned here.
+
+    Returns:
+        dict: {'users_checked': int, 'families_pruned': int}
+    """
+    now = time.time()
+    checked = pruned = 0
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        indexes = cache.get_many([_user_key(user_id) for user_id in chunk])
+        checked += len(chunk)
+        for user_id in chunk:
+            families = indexes.get(_user_key(user_id))
+            if not families:
+                continue
+            alive = cache.get_many([_family_key(family) for family in _prune(families, now)])
+            remaining = {
+                family: expires_at for family, expires_at in families.items()
+                if expires_at > now and _family_key(family) in alive
+            }
+            if len(remaining) == len(families):
+                continue
+            pruned += len(families) - len(remaining)
+            if remaining:
+                cache.set(_user_key(user_id), remaining, refresh_lifetime())
+            else:
+                cache.delete(_user_key(user_id))
+    return {'users_checked': checked, 'families_pruned': pruned}
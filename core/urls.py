@@ -10,6 +10,8 @@ from apps.users.api.auth_views import (
     SecureTokenObtainView,
     SecureTokenRefreshView,
     SecureLogoutView,
+    LoginMetricsView,
+    LogoutAllSessionsView,
 )
 
 
@@ -50,6 +52,8 @@ urlpatterns = [
     path('api/auth/login/', SecureTokenObtainView.as_view(), name='auth_login'),
     path('api/auth/refresh/', SecureTokenRefreshView.as_view(), name='auth_refresh'),
     path('api/auth/logout/', SecureLogoutView.as_view(), name='auth_logout'),
+    path('api/auth/logout-all/', LogoutAllSessionsView.as_view(), name='auth_logout_all'),
+    path('api/auth/login-metrics/', LoginMetricsView.as_view(), name='auth_login_metrics'),
     
     # Legacy token endpoints (deprecated - redirect to new secure endpoints)
     path('api/token/', SecureTokenObtainView.as_view(), name='token_obtain_pair'),
@@ -60,6 +64,7 @@ urlpatterns = [
     path('api/users/', include(user_router.urls)),
     path('api/users/', include(health_urlpatterns)),  # Health check endpoint
     path('api/users/current/', CurrentUserView.as_view(), name='current-user'),
+    path('api/events/websocket-metrics/', WebsocketMetricsView.as_view(), name='events_websocket_metrics'),
     path('api/events/', include(event_router.urls)),
     path('api/events/registration/', include(registration_router.urls)),
     path('api/events/payments/', include(payment_routers.urls)),
@@ -0,0 +1,124 @@
+"""
+Authenticated User Cache
+
+Every authenticated HTTP request and websocket connect used to load the
+CommunityUser row even though the JWT already carries the user's ID. The row
+(all concrete columns except the password hash) is now cached in the shared
+cache for a short TTL and rebuilt into a model instance without a query.
+Saving or deleting a user (which covers deactivation and password changes)
+drops the entry; bulk QuerySet.update() calls are only bounded by the TTL.
+
+With AUTH_LAZY_USER enabled, authentication returns a LazyUser: the ID and
+auth flags are answered from the cached row, and the model instance is only
+built when any other attribute is used.
+
+Both core.authentication.JWTCookieAuthentication and
+core.middleware.JWTAuthMiddleware resolve users through get_token_user().
+
+Example:
+    user = get_token_user(validated_token['user_id'])
+    if user is None or not user.is_active:
+        reject
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+
+CACHE_PREFIX = 'auth_user'
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+def user_cache_key(user_id):
+    return f"{CACHE_PREFIX}:{user_id}"
+
+
+def _cached_field_names():
+    # The password hash is never cached; it is left deferred on the rebuilt instance
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def get_user_row(user_id):
+    """
+    Get a user's cached column values, loading them on a miss.
+
+    Returns:
+        dict | None: {attname: value} or None if the user does not exist
+    """
+    if not user_id:
+        return None
+    key = user_cache_key(user_id)
+    row = cache.get(key)
+    if row is None:
+        row = get_user_model().objects.filter(pk=user_id).values(*_cached_field_names()).first()
+        if row is None:
+            return None
+        cache.set(key, row, _ttl())
+    return row
+
+
+def build_user(row):
+    """Rebuild a model instance from a cached row (password stays deferred and loads on access)"""
+    field_names = _cached_field_names()
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, field_names, [row[name] for name in field_names])
+
+
+def get_cached_user(user_id):
+    """
+    Resolve a user ID to a CommunityUser instance through the cache.
+
+    Returns:
+        CommunityUser | None
+    """
+    row = get_user_row(user_id)
+    return build_user(row) if row is not None else None
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    Authenticated user that only builds the model instance when needed.
+
+    id/pk, username and the is_* flags come straight from the cached row; any
+    other attribute (or passing it where a model instance is expected) builds
+    the instance from the same row.
+    """
+
+    def __init__(self, row):
+        self.__dict__['_row'] = row
+        super().__init__(lambda: build_user(row))
+
+    id = property(lambda self: self._row['id'])
+    pk = property(lambda self: self._row['id'])
+    username = property(lambda self: self._row['username'])
+    is_active = property(lambda self: self._row['is_active'])
+    is_staff = property(lambda self: self._row['is_staff'])
+    is_superuser = property(lambda self: self._row['is_superuser'])
+    is_authenticated = True
+    is_anonymous = False
+
+
+def get_token_user(user_id):
+    """
+    The user a token's user_id refers to: a LazyUser when AUTH_LAZY_USER is on,
+    otherwise a model instance. None if the user does not exist.
+    """
+    row = get_user_row(user_id)
+    if row is None:
+        return None
+    if getattr(settings, 'AUTH_LAZY_USER', False):
+        return LazyUser(row)
+    return build_user(row)
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached row (called on save/delete)"""
+    if user_id:
+        cache.delete(user_cache_key(user_id))
@@ -0,0 +1,316 @@
+"""
+Websocket Connection Limits
+
+Connection management shared by the websocket consumers (see ConnectionLimitsMixin):
+
+- Concurrent connections are capped per user and per event. Open connections are
+  tracked in the shared cache, so the caps hold across worker processes: each
+  user/event has one entry per connection (keyed by channel name) holding the time of
+  its last heartbeat. Connections that stop heartbeating (e.g. of a crashed worker)
+  drop out one by one, while the live ones keep theirs
+- Each connection has a message rate limit (token bucket), with a stricter one for
+  heavy messages (roster pages, bulk check-ins) that can each cost many queries.
+  Messages over the limit are dropped and answered with a 'throttled' frame
+- The server pings every connection on an interval and closes connections that have
+  sent nothing for longer than the idle timeout
+- Only one bulk operation runs per event at a time (claim_operation)
+
+Dropped/refused/closed counts are kept per minute, like the login metrics, and can be
+read back with get_websocket_metrics (see the /api/events/websocket-metrics/ endpoint).
+
+Example:
+    class MyConsumer(ConnectionLimitsMixin, AsyncWebsocketConsumer):
+        heavy_message_types = frozenset({'get_page'})
+
+        async def connect(self):
+            if not await self.claim_connection_slots([(SCOPE_USER, user.id)]):
+                return
+            await self.accept()
+            self.start_heartbeat()
+
+        async def disconnect(self, close_code):
+            await self.release_connection()
+
+        async def receive(self, text_data):
+            message_type = json.loads(text_data).get('type')
+            if not await self.accept_message(message_type):
+                return
+            ...
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'ws_limits'
+METRICS_PREFIX = 'ws_metrics'
+
+SCOPE_USER = 'user'
+SCOPE_EVENT = 'event'
+
+# Close codes sent to clients
+CLOSE_IDLE = 4008
+CLOSE_TOO_MANY_CONNECTIONS = 4029
+
+# Metrics
+THROTTLED = 'throttled'                        # messages dropped by a rate limit
+CONNECTION_REFUSED = 'connection_refused'      # connections over a cap
+IDLE_CLOSED = 'idle_closed'                    # connections closed by the idle timeout
+OPERATION_REFUSED = 'operation_refused'        # bulk operations refused while another runs
+METRICS = (THROTTLED, CONNECTION_REFUSED, IDLE_CLOSED, OPERATION_REFUSED)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_connection_cap(scope):
+    """Most concurrent connections allowed for one user/event"""
+    if scope == SCOPE_USER:
+        return _setting('CHANNELS_MAX_CONNECTIONS_PER_USER', 10)
+    return _setting('CHANNELS_MAX_CONNECTIONS_PER_EVENT', 200)
+
+
+def get_heartbeat_interval():
+    """Seconds between server pings"""
+    return _setting('CHANNELS_HEARTBEAT_INTERVAL', 30)
+
+
+def get_idle_timeout():
+    """Seconds without any client message before the connection is closed"""
+    return _setting('CHANNELS_IDLE_TIMEOUT', 90)
+
+
+def _slot_ttl():
+    # Refreshed on every heartbeat, so only connections of dead workers run out
+    return get_heartbeat_interval() * 3 + 1
+
+
+def _slot_key(scope, identifier):
+    return f"{CACHE_PREFIX}:connections:{scope}:{identifier}"
+
+
+async def _update_slots(key, connection_id, claim):
+    """
+    Add/refresh (claim=True) or remove (claim=False) a connection in a user's/event's
+    open connections, dropping the ones whose heartbeat has run out.
+
+    Returns:
+        int: Number of open connections after the update
+    """
+    lock = f"{key}:lock"
+    # Read-modify-write under a short lock; if it can't be had the write goes ahead -
+    # a lost update is repaired by the next heartbeat
+    locked = False
+    for _ in range(50):
+        locked = await cache.aadd(lock, 1, 5)
+        if locked:
+            break
+        await asyncio.sleep(0.01)
+    try:
+        now = time.time()
+        ttl = _slot_ttl()
+        connections = {
+            connection: last_heartbeat
+            for connection, last_heartbeat in (await cache.aget(key) or {}).items()
+            if now - last_heartbeat <= ttl
+        }
+        if claim:
+            connections[connection_id] = now
+        else:
+            connections.pop(connection_id, None)
+        await cache.aset(key, connections, int(ttl) + 1)
+        return len(connections)
+    finally:
+        if locked:
+            await cache.adelete(lock)
+
+
+class TokenBucket:
+    """`capacity` messages per `per_seconds`, refilled continuously"""
+
+    def __init__(self, capacity, per_seconds):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """
+        Take one token.
+
+        Returns:
+            float: 0 if allowed, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class ConnectionLimitsMixin:
+    """
+    Connection caps, message rate limits and heartbeat for an AsyncWebsocketConsumer.
+    Mix in before AsyncWebsocketConsumer; see the module docstring for the hooks to call.
+    """
+    heavy_message_types = frozenset()
+
+    async def claim_connection_slots(self, scopes):
+        """
+        Count this connection against its caps.
+
+        Args:
+            scopes: [(scope, identifier), ...] e.g. [(SCOPE_USER, user.id), (SCOPE_EVENT, event_id)]
+
+        Returns:
+            bool: False if a cap is reached - the connection has then been refused
+                  (accepted, sent an error frame and closed with CLOSE_TOO_MANY_CONNECTIONS)
+        """
+        self.connection_slots = []
+        self.connection_id = getattr(self, 'channel_name', None) or uuid.uuid4().hex
+        for scope, identifier in scopes:
+            key = _slot_key(scope, identifier)
+            count = await _update_slots(key, self.connection_id, claim=True)
+            self.connection_slots.append(key)
+            if count > get_connection_cap(scope):
+                await self.release_connection()
+                await record_websocket_event(CONNECTION_REFUSED)
+                logger.warning(f"🚫 Websocket refused - {scope} {identifier} has {count - 1} open connections")
+                await self.accept()
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'code': 'too_many_connections',
+                    'message': f'Too many open connections for this {scope}',
+                }))
+                await self.close(code=CLOSE_TOO_MANY_CONNECTIONS)
+                return False
+        return True
+
+    async def release_connection(self):
+        """Stop the heartbeat and give back the connection's slots (safe to call more than once)"""
+        task = getattr(self, 'heartbeat_task', None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        self.heartbeat_task = None
+
+        for key in getattr(self, 'connection_slots', []):
+            await _update_slots(key, self.connection_id, claim=False)
+        self.connection_slots = []
+
+    def start_heartbeat(self):
+        """Start pinging the client (call once the connection is accepted)"""
+        self.last_seen = time.monotonic()
+        self.heartbeat_task = asyncio.ensure_future(self._heartbeat())
+
+    async def _heartbeat(self):
+        interval = get_heartbeat_interval()
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self.last_seen > get_idle_timeout():
+                await record_websocket_event(IDLE_CLOSED)
+                logger.info(f"💤 Websocket closed after {get_idle_timeout()}s idle")
+                await self.release_connection()
+                await self.close(code=CLOSE_IDLE)
+                return
+            await self.send(text_data=json.dumps({'type': 'ping', 'timestamp': int(time.time() * 1000)}))
+            for key in self.connection_slots:
+                await _update_slots(key, self.connection_id, claim=True)
+
+    async def accept_message(self, message_type):
+        """
+        Rate limit an incoming message (every message also counts as client activity).
+
+        Returns:
+            bool: False if the message is dropped - the client has been sent a 'throttled' frame
+        """
+        self.last_seen = time.monotonic()
+        if message_type == 'pong':
+            # Reply to a server ping - activity only
+            return False
+
+        if not hasattr(self, 'message_buckets'):
+            self.message_buckets = {
+                'default': TokenBucket(*_setting('CHANNELS_MESSAGE_RATE', (30, 10))),
+                'heavy': TokenBucket(*_setting('CHANNELS_HEAVY_MESSAGE_RATE', (6, 10))),
+            }
+        retry_after = self.message_buckets['default'].take()
+        if not retry_after and message_type in self.heavy_message_types:
+            retry_after = self.message_buckets['heavy'].take()
+        if not retry_after:
+            return True
+
+        await record_websocket_event(THROTTLED)
+        await self.send(text_data=json.dumps({
+            'type': 'throttled',
+            'message_type': message_type,
+            'retry_after': round(retry_after, 2),
+        }))
+        return False
+
+
+async def claim_operation(name):
+    """
+    Claim an exclusive operation (e.g. f'bulk:{event_id}') across all connections.
+
+    Returns:
+        bool: False if it is already running - counted as a refused operation
+    """
+    claimed = await cache.aadd(f"{CACHE_PREFIX}:operation:{name}", 1, _setting('CHANNELS_OPERATION_LOCK_TTL', 600))
+    if not claimed:
+        await record_websocket_event(OPERATION_REFUSED)
+    return claimed
+
+
+async def release_operation(name):
+    await cache.adelete(f"{CACHE_PREFIX}:operation:{name}")
+
+
+def _metrics_key(metric, minute):
+    return f"{METRICS_PREFIX}:{metric}:{minute}"
+
+
+async def record_websocket_event(metric):
+    """Increment the per-minute counter for a metric"""
+    retention = _setting('CHANNELS_METRICS_RETENTION_MINUTES', 60)
+    key = _metrics_key(metric, int(time.time() // 60))
+    await cache.aadd(key, 0, (retention + 1) * 60)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, (retention + 1) * 60)
+
+
+def get_websocket_metrics(minutes=15):
+    """
+    Websocket limit counts over the last `minutes` minutes (current minute included).
+
+    Returns:
+        dict: {
+            'minutes': int,
+            'throttled': int, 'connection_refused': int, 'idle_closed': int, 'operation_refused': int,
+            'timeline': [{'minute': epoch_minute, 'throttled': n, ...}, ...],
+        }
+    """
+    minutes = max(1, min(int(minutes), _setting('CHANNELS_METRICS_RETENTION_MINUTES', 60)))
+    current = int(time.time() // 60)
+    window = range(current - minutes + 1, current + 1)
+    counts = cache.get_many([_metrics_key(metric, minute) for minute in window for metric in METRICS])
+
+    timeline = [
+        {'minute': minute, **{metric: counts.get(_metrics_key(metric, minute), 0) for metric in METRICS}}
+        for minute in window
+    ]
+    return {
+        'minutes': minutes,
+        **{metric: sum(bucket[metric] for bucket in timeline) for metric in METRICS},
+        'timeline': timeline,
+    }